@@ -3,48 +3,133 @@ AI Assistant Core - Voice Assistant Logic
 Enhanced with ChatGPT (OpenAI) + Gemini Support
 THREADING: Supports graceful shutdown via stop_requested flag (HIGH-001 Fixed)
 """
+import contextvars
+import functools
 import os
 import re
-from dotenv import load_dotenv
+import threading
+import time
+import local_math
+import tracing
+from cancellation import CancelToken, CancelledError, run_cancellable
+from intents import IntentEngine
+from streaming import iter_sentences, prefetch, split_sentences
 
-# Load environment variables
-load_dotenv()
+_env_loaded = False
+
+
+def load_environment():
+    """Load .env once, on first use (keeps dotenv off the GUI startup path)"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
 
 # HIGH-001 FIX: Global flag for graceful shutdown
 # Set this to True from external code (GUI) to stop the assistant
 _stop_requested = False
+# Cancelled together with the flag - aborts listening, recognition, AI and speech in flight
+_stop_token = CancelToken()
 
 def request_stop():
     """Request the assistant to stop gracefully"""
     global _stop_requested
     _stop_requested = True
     print("[CORE] Stop requested")
+    _stop_token.cancel("stop requested")
 
 def reset_stop():
     """Reset stop flag (call before starting)"""
-    global _stop_requested
+    global _stop_requested, _stop_token
     _stop_requested = False
+    _stop_token = CancelToken()
 
 def should_stop():
     """Check if stop has been requested"""
     return _stop_requested
 
+def get_stop_token():
+    """CancelToken of the current run (cancelled by request_stop)"""
+    return _stop_token
+
 # ===== FEATURE FLAGS =====
 # Set to True to enable wake word "ZEN", False to disable
 ENABLE_WAKE_WORD = False  # Changed to False - wake word disabled by default
+WAKE_WORD_PRE_ROLL = 0.3  # Seconds of audio before the wake word detection given to the command recognizer
+WAKE_WORD_FOLLOW_UP = 0.8  # Seconds to wait for "Zen, <command>" in one breath before prompting
+ENABLE_BARGE_IN = True  # Stop talking as soon as the user starts speaking over a reply
+BARGE_IN_PRE_ROLL = 0.2  # Seconds before the barge-in point handed to the next listen()
 
 # AI Configuration
 USE_AI = True  # Set to False to use basic responses only
 AI_PROVIDER = "openai"  # Options: "openai" (ChatGPT), "gemini", "both"
+STREAM_RESPONSES = True  # Speak AI replies sentence by sentence while they are generated
+USE_RESPONSE_CACHE = True  # Answer repeated questions from the local response cache
+RESPONSE_CACHE_DB = "response_cache.db"
+CACHE_WITH_HISTORY = True  # Mid-conversation, self-contained questions still use the cache (follow-ups never do)
+USE_CONVERSATION_MEMORY = True  # Send recent turns (+ a summary of older ones) so follow-up questions work
+MEMORY_TOKEN_BUDGET = 600  # Tokens of recent turns sent verbatim; older turns are summarized
+MEMORY_SUMMARY_TOKENS = 200  # Upper bound for the running summary
+TRACE_LATENCY = False  # Also write per-turn latency spans (listen, recognize, route, ai, speak) to TRACE_FILE
+TRACE_FILE = "latency_trace.jsonl"  # Finished turns are appended here (.jsonl or .db)
+HEDGE_REQUESTS = True  # With AI_PROVIDER = "both": race ChatGPT and Gemini instead of trying them in turn
+HEDGE_DELAY = 1.0  # Seconds before the backup provider is started (0 = start both at once)
+OPENAI_MODEL = "gpt-3.5-turbo"  # Fast and cost-effective
+GEMINI_MODEL = "gemini-2.0-flash-exp"
+USE_MODEL_ROUTING = True  # Send complex questions to the capable models below, simple ones to the fast ones above
+CAPABLE_OPENAI_MODEL = "gpt-4o"
+CAPABLE_GEMINI_MODEL = "gemini-1.5-pro"
+FAST_MAX_TOKENS = 150  # Reply budget of the fast tier (also used when routing is off)
+CAPABLE_MAX_TOKENS = 400  # Reply budget of the capable tier
+ROUTING_THRESHOLD = 1.0  # Complexity score at which a question goes to the capable tier (see routing.py)
+# Provider endpoints (None = the real service); OPENAI_BASE_URL / GEMINI_BASE_URL in .env also work,
+# e.g. the local stand-in: python provider_server.py
+OPENAI_BASE_URL = None
+GEMINI_BASE_URL = None
 OPENAI_CLIENT = None  # OpenAI client
 GEMINI_CLIENT = None  # Gemini client
+RESPONSE_CACHE = None  # ResponseCache (created on first use)
+CONVERSATION = None  # conversation.ConversationMemory of the running session
+_session_conversation = contextvars.ContextVar('session_conversation', default=None)  # See start_session()
+HEDGER = None  # hedging.Hedger for AI_PROVIDER = "both"
+ROUTER = None  # routing.QueryRouter - picks the model tier per question
+ECHO_GATE = None  # barge_in.EchoGate - remembers how loud our own voice is at the microphone
+_client_lock = threading.Lock()  # Clients may be created by the warm-up and the assistant at once
 
-def run_ai_assistant_zen():
+SYSTEM_PROMPT = """You are Zen, an intelligent voice assistant like Alexa but powered by advanced AI.
+You have comprehensive knowledge like ChatGPT - you can answer questions about science, history, math, 
+programming, general knowledge, current events, and any topic.
+
+Keep responses:
+- Concise (2-4 sentences) since they'll be spoken aloud
+- Natural and conversational
+- Accurate and helpful
+- Friendly but professional
+
+If you don't know something, be honest but helpful."""
+
+# Fixed phrases - pre-rendered into the audio cache during warm-up (see speech.prerender)
+GREETING = "Hello! I'm your AI assistant powered by ChatGPT. How can I help you?"
+WAKE_PROMPT = "Yes? How can I help you?"
+GOODBYE = "Goodbye!"
+FAREWELL = "Goodbye! Have a great day!"
+HELP_REPLY = "I can answer ANY question like ChatGPT! Ask me about science, history, math, programming, or anything. I can also tell you the time and date. What would you like to know?"
+NO_AI_REPLY = "I need an AI API key to answer that. Please check the SETUP_API_KEYS.txt file to configure OpenAI or Gemini."
+PRERENDER_PHRASES = [GREETING, WAKE_PROMPT, GOODBYE, FAREWELL, HELP_REPLY, NO_AI_REPLY]
+
+def run_ai_assistant_zen(greeting=True):
     """
     Main voice assistant function - AI Assistant Zen
     This function runs the voice assistant loop
+    greeting=False skips the spoken self-test (e.g. when the GUI warm-up
+    has already brought up TTS and the microphone)
     """
     try:
+        load_environment()
+        tracing.configure(TRACE_FILE if TRACE_LATENCY else None)
+        reset_conversation()  # Every session starts without history
+        
         # Import speech modules
         from speech import speak, listen, init_engine
         
@@ -62,13 +147,12 @@ def run_ai_assistant_zen():
             print("="*50)
             print("\n[MODE] Running in SIMPLE MODE - no wake word needed")
             print("       Just speak and the assistant will listen!\n")
-            run_simple_mode()
+            run_simple_mode(greeting)
             return
         
         # Wake word is enabled - check if Porcupine is available
         try:
             import pvporcupine
-            from pvrecorder import PvRecorder
             
             # Get Porcupine access key from environment
             access_key = os.getenv('PORCUPINE_ACCESS_KEY')
@@ -85,7 +169,7 @@ def run_ai_assistant_zen():
                 print("="*50)
                 print("\n[MODE] Running in SIMPLE MODE - no wake word needed")
                 print("       Just speak and the assistant will listen!\n")
-                run_simple_mode()
+                run_simple_mode(greeting)
                 return
             
             # Run with wake word detection
@@ -93,20 +177,55 @@ def run_ai_assistant_zen():
             
         except ImportError:
             print("[WARN] Porcupine wake word detection not available")
-            print("Install with: pip install pvporcupine pvrecorder")
+            print("Install with: pip install pvporcupine")
             print("Running in simple listening mode...")
-            run_simple_mode()
+            run_simple_mode(greeting)
             
     except Exception as e:
         print(f"[ERROR] Error in assistant: {e}")
+    finally:
+        token = get_stop_token()
+        if token.cancelled_at is not None:
+            stop_latency = time.perf_counter() - token.cancelled_at
+            tracing.get_tracer().record("stop", stop_latency)
+            print(f"[CORE] Stopped {stop_latency * 1000:.0f} ms after the stop request")
+        print_latency_summary()
+
+
+def get_latency_summary():
+    """Per-stage latency percentiles of this session (see tracing.py)"""
+    return tracing.get_tracer().summary()
+
+
+def print_latency_summary():
+    summary = get_latency_summary()
+    if not summary:
+        return
+    print("\n[LATENCY] Per-stage latency this session:")
+    for stage, stats in sorted(summary.items()):
+        if stats.get('count'):
+            print(f"  {stage:<18} n={stats['count']:<4} p50={stats['p50_ms']:>8.1f} ms  "
+                  f"p95={stats['p95_ms']:>8.1f} ms  p99={stats['p99_ms']:>8.1f} ms")
+    routing = get_routing_stats()
+    if any(stats['routed'] for stats in routing.values()):
+        print("[LATENCY] AI latency per model tier:")
+        for name, stats in routing.items():
+            for metric, label in (('first_sentence', "first sentence"), ('reply', "full reply")):
+                if stats[metric]['count']:
+                    print(f"  {name:<8} {stats['openai_model']:<16} {label:<15} n={stats[metric]['count']:<4} "
+                          f"p50={stats[metric]['p50_ms']:>8.1f} ms  p95={stats[metric]['p95_ms']:>8.1f} ms")
 
 
-def run_simple_mode():
+def run_simple_mode(greeting=True):
     """
     Simple mode without wake word detection
     Continuously listens and responds
     """
-    from speech import speak, listen
+    from speech import speak, speak_stream, listen
+    
+    cancel = get_stop_token()
+    say = functools.partial(speak, cancel=cancel)
+    say_stream = functools.partial(speak_stream, cancel=cancel)
     
     print("\n" + "="*50)
     print("[MODE] AI ASSISTANT ZEN - SIMPLE MODE")
@@ -115,60 +234,64 @@ def run_simple_mode():
     print("Say 'exit', 'quit', or 'goodbye' to stop.")
     print("="*50 + "\n")
     
-    # Test TTS
-    print("[TEST] Testing text-to-speech...")
-    print("[INFO] You should hear me speak now...")
-    speak("Hello! I'm your AI assistant powered by ChatGPT. How can I help you?")
+    if greeting:
+        # Test TTS
+        print("[TEST] Testing text-to-speech...")
+        print("[INFO] You should hear me speak now...")
+        say(GREETING)
     
-    # Verify with user
-    print("\n" + "="*50)
-    print("[IMPORTANT] Did you hear me speak? (Y/N)")
-    print("="*50)
-    print("[INFO] If NO:")
-    print("  1. Check speakers/headphones are connected")
-    print("  2. Check Windows volume is not muted")  
-    print("  3. Press Ctrl+C to exit and run: python test_voice.py")
-    print("="*50)
-    print("\n[OK] Make sure your microphone is ready...")
-    print("[OK] Starting listening mode...")
-    print("="*50)
+        # Verify with user
+        print("\n" + "="*50)
+        print("[IMPORTANT] Did you hear me speak? (Y/N)")
+        print("="*50)
+        print("[INFO] If NO:")
+        print("  1. Check speakers/headphones are connected")
+        print("  2. Check Windows volume is not muted")  
+        print("  3. Press Ctrl+C to exit and run: python test_voice.py")
+        print("="*50)
+        print("\n[OK] Make sure your microphone is ready...")
+        print("[OK] Starting listening mode...")
+        print("="*50)
     
+    resume_at = None
     while True:
         try:
             # HIGH-001 FIX: Check if stop was requested (e.g., from GUI)
             if should_stop():
                 print("[EXIT] Stop requested externally - shutting down gracefully...")
-                speak("Goodbye!")
+                speak(GOODBYE, block=False)  # Do not hold up the stop
                 break
             
             print("\n[READY] Listening...")
-            # Listen for command
-            command = listen()
+            with tracing.turn("simple"):
+                # Listen for command (from where the user cut in, after a barge-in)
+                command = listen(start_position=resume_at, cancel=cancel)
+                resume_at = None
             
-            # Check again after listen (in case stop was requested during listening)
-            if should_stop():
-                print("[EXIT] Stop requested - shutting down...")
-                break
+                # Check again after listen (in case stop was requested during listening)
+                if should_stop():
+                    print("[EXIT] Stop requested - shutting down...")
+                    break
             
-            if command:
-                print(f"[USER] You said: {command}")
+                if command:
+                    print(f"[USER] You said: {command}")
                 
-                # Check for exit commands
-                if any(word in command.lower() for word in ['exit', 'quit', 'stop', 'goodbye', 'bye']):
-                    print("[EXIT] Exiting...")
-                    speak("Goodbye! Have a great day!")
-                    break
+                    # Check for exit commands
+                    if any(word in command.lower() for word in ['exit', 'quit', 'stop', 'goodbye', 'bye']):
+                        print("[EXIT] Exiting...")
+                        say(FAREWELL)
+                        break
                 
-                # Process command
-                response = process_command(command)
-                print(f"[ASSISTANT] {response}")
-                speak(response)
-            else:
-                print("[WARN] No speech detected or recognition failed. Try again...")
+                    # Process command (speaks each sentence as soon as it is ready)
+                    resume_at = respond_with_barge_in(command, say, cancel, say_stream)
+                else:
+                    print("[WARN] No speech detected or recognition failed. Try again...")
             
+        except CancelledError:
+            continue  # Stop requested mid-turn - the check above ends the loop
         except KeyboardInterrupt:
             print("\n[EXIT] Keyboard interrupt - exiting...")
-            speak("Goodbye!")
+            speak(GOODBYE)
             break
         except Exception as e:
             print(f"[ERROR] {e}")
@@ -179,8 +302,8 @@ def run_with_wake_word(access_key):
     Run assistant with wake word detection (Porcupine)
     """
     import pvporcupine
-    from pvrecorder import PvRecorder
-    from speech import speak, listen
+    from audio_capture import sample_frames
+    from speech import speak, speak_stream, listen, get_capture_session
     
     # Find wake word model file
     wake_word_path = None
@@ -207,50 +330,76 @@ def run_with_wake_word(access_key):
         keyword_paths=[wake_word_path]
     )
     
-    recorder = PvRecorder(device_index=-1, frame_length=porcupine.frame_length)
+    # The wake-word detector and listen() read the same capture session,
+    # so the microphone stays open and speech right after "Zen" is kept
+    session = get_capture_session()
+    detector = session.reader()
+    cancel = get_stop_token()
+    say = functools.partial(speak, cancel=cancel)
+    say_stream = functools.partial(speak_stream, cancel=cancel)
     
     try:
-        recorder.start()
         print("[LISTENING] Listening for wake word 'ZEN'...")
         print("(Say 'ZEN' to activate)\n")
         
-        while True:
-            pcm = recorder.read()
+        for pcm, position in sample_frames(detector, porcupine.frame_length, cancel):
             keyword_index = porcupine.process(pcm)
             
             if keyword_index >= 0:
                 print("[DETECTED] Wake word 'ZEN' detected!")
-                speak("Yes? How can I help you?")
-                
-                # Listen for command
-                command = listen()
+                with tracing.turn("wake_word"):
+                    # "Zen, what's the weather" - the command may already be in the buffer
+                    start = max(1, position - session.frames_for(WAKE_WORD_PRE_ROLL))
+                    command = strip_wake_word(listen(session, start_position=start,
+                                                     timeout=WAKE_WORD_FOLLOW_UP, cancel=cancel))
+                    
+                    if not command and not cancel.cancelled:
+                        say(WAKE_PROMPT)
+                        
+                        # Listen for command
+                        command = listen(session, cancel=cancel)
                 
-                if command:
-                    print(f"[USER] You said: {command}")
+                    if command and not cancel.cancelled:
+                        print(f"[USER] You said: {command}")
                     
-                    # Check for exit commands
-                    if any(word in command.lower() for word in ['exit', 'quit', 'stop', 'goodbye']):
-                        print("[EXIT] Exiting...")
-                        speak("Goodbye! Have a great day!")
-                        break
+                        # Check for exit commands
+                        if any(word in command.lower() for word in ['exit', 'quit', 'stop', 'goodbye']):
+                            print("[EXIT] Exiting...")
+                            say(FAREWELL)
+                            break
                     
-                    # Process command
-                    response = process_command(command)
-                    print(f"[ASSISTANT] {response}")
-                    speak(response)
-                else:
-                    print("[WARN] No speech detected or recognition failed.")
+                        # Process command - if the user talks over the reply, that is the next command
+                        try:
+                            resume_at = respond_with_barge_in(command, say, cancel, say_stream)
+                            while resume_at:
+                                command = strip_wake_word(listen(session, start_position=resume_at, cancel=cancel))
+                                if not command:
+                                    break
+                                print(f"[USER] You said: {command}")
+                                resume_at = respond_with_barge_in(command, say, cancel, say_stream)
+                        except CancelledError:
+                            pass
+                    elif not cancel.cancelled:
+                        print("[WARN] No speech detected or recognition failed.")
                 
+                # Do not re-detect in audio heard during the turn (our own voice included)
+                detector.flush()
                 print("\n[LISTENING] Listening for wake word 'ZEN'...\n")
+        
+        if cancel.cancelled:
+            print("[EXIT] Stop requested - shutting down...")
                 
     except KeyboardInterrupt:
         print("\n[STOP] Stopping assistant...")
     finally:
-        recorder.stop()
-        recorder.delete()
         porcupine.delete()
 
 
+def strip_wake_word(command):
+    """Drop a leading 'Zen' that the pre-roll handed to the recognizer"""
+    return re.sub(r"^\s*(hey\s+)?zen\b[\s,.!]*", "", command or "", flags=re.IGNORECASE)
+
+
 def init_openai():
     """
     Initialize OpenAI GPT (ChatGPT) - PRIMARY AI
@@ -260,6 +409,16 @@ def init_openai():
     if OPENAI_CLIENT is not None:
         return OPENAI_CLIENT
     
+    with _client_lock:
+        if OPENAI_CLIENT is not None:
+            return OPENAI_CLIENT
+        return _create_openai_client()
+
+
+def _create_openai_client():
+    global OPENAI_CLIENT
+    
+    load_environment()
     try:
         from openai import OpenAI
         
@@ -270,7 +429,10 @@ def init_openai():
             print("[INFO] Get API key from: https://platform.openai.com/api-keys")
             return None
         
-        OPENAI_CLIENT = OpenAI(api_key=api_key)
+        base_url = OPENAI_BASE_URL or os.getenv('OPENAI_BASE_URL')
+        OPENAI_CLIENT = OpenAI(api_key=api_key, base_url=base_url or None)
+        if base_url:
+            print(f"[INFO] ChatGPT endpoint: {base_url}")
         print("[OK] ChatGPT (OpenAI) initialized successfully! 🚀")
         return OPENAI_CLIENT
         
@@ -292,6 +454,16 @@ def init_gemini():
     if GEMINI_CLIENT is not None:
         return GEMINI_CLIENT
     
+    with _client_lock:
+        if GEMINI_CLIENT is not None:
+            return GEMINI_CLIENT
+        return _create_gemini_client()
+
+
+def _create_gemini_client():
+    global GEMINI_CLIENT
+    
+    load_environment()
     try:
         from google import genai
         
@@ -302,7 +474,12 @@ def init_gemini():
             print("[INFO] Get free API key from: https://makersuite.google.com/app/apikey")
             return None
         
-        GEMINI_CLIENT = genai.Client(api_key=api_key)
+        base_url = GEMINI_BASE_URL or os.getenv('GEMINI_BASE_URL')
+        if base_url:
+            GEMINI_CLIENT = genai.Client(api_key=api_key, http_options={'base_url': base_url})
+            print(f"[INFO] Gemini endpoint: {base_url}")
+        else:
+            GEMINI_CLIENT = genai.Client(api_key=api_key)
         print("[OK] Gemini AI initialized successfully! ✨")
         return GEMINI_CLIENT
         
@@ -315,24 +492,257 @@ def init_gemini():
         return None
 
 
+def get_response_cache():
+    """Open the response cache on first use (None when disabled or broken)"""
+    global RESPONSE_CACHE, USE_RESPONSE_CACHE
+    
+    if not USE_RESPONSE_CACHE:
+        return None
+    if RESPONSE_CACHE is None:
+        try:
+            from response_cache import ResponseCache
+            RESPONSE_CACHE = ResponseCache(RESPONSE_CACHE_DB)
+        except Exception as e:
+            print(f"[WARN] Response cache unavailable: {e}")
+            USE_RESPONSE_CACHE = False
+            return None
+    return RESPONSE_CACHE
+
+
+def get_conversation():
+    """Conversation memory of the current session (None when disabled)"""
+    global CONVERSATION
+    if not USE_CONVERSATION_MEMORY:
+        return None
+    session = _session_conversation.get()
+    if session is not None:
+        return session
+    if CONVERSATION is None:
+        from conversation import ConversationMemory
+        CONVERSATION = ConversationMemory(MEMORY_TOKEN_BUDGET, MEMORY_SUMMARY_TOKENS)
+    return CONVERSATION
+
+
+def reset_conversation():
+    global CONVERSATION
+    CONVERSATION = None
+
+
+def start_session(memory=None):
+    """
+    Give the calling thread its own conversation memory
+    For serving several users from one process (load tests, a server):
+    commands processed in this thread/context no longer share the history
+    of the local assistant. Pass a session's existing memory to resume it.
+    Returns the memory in use.
+    """
+    if memory is None:
+        from conversation import ConversationMemory
+        memory = ConversationMemory(MEMORY_TOKEN_BUDGET, MEMORY_SUMMARY_TOKENS)
+    _session_conversation.set(memory)
+    return memory
+
+
+def _remember(prompt, answer):
+    memory = get_conversation()
+    if memory is not None and answer:
+        memory.add(prompt, answer)
+
+
+def _openai_messages(prompt):
+    memory = get_conversation()
+    if memory is None:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+    return memory.messages(SYSTEM_PROMPT, prompt)
+
+
+def _gemini_request(prompt):
+    """(contents, system_instruction) for a Gemini request"""
+    memory = get_conversation()
+    if memory is None:
+        return prompt, SYSTEM_PROMPT
+    return memory.contents(prompt), memory.system_prompt(SYSTEM_PROMPT)
+
+
+def _use_cache(prompt):
+    """
+    Context-free turns always use the cache. Mid-conversation only
+    self-contained questions do (CACHE_WITH_HISTORY): follow-ups depend on
+    the history, and the cache key does not include it.
+    """
+    memory = get_conversation()
+    if memory is None or not len(memory):
+        return True
+    if not CACHE_WITH_HISTORY:
+        return False
+    from conversation import is_follow_up
+    return not is_follow_up(prompt)
+
+
+def _annotate_prompt_size(prompt):
+    memory = get_conversation()
+    if memory is not None:
+        tracing.annotate(prompt_tokens=memory.prompt_tokens(SYSTEM_PROMPT, prompt),
+                         history_turns=len(memory))
+
+
+def _cache_key_parts(tier):
+    """Provider and model part of the cache key for the current configuration and tier"""
+    models = {"openai": tier.openai_model, "gemini": tier.gemini_model}
+    return AI_PROVIDER, models.get(AI_PROVIDER, f"{tier.openai_model}+{tier.gemini_model}")
+
+
+def _cache_get(prompt, tier):
+    cache = get_response_cache()
+    if cache is None:
+        return None
+    try:
+        answer = cache.get(prompt, *_cache_key_parts(tier), SYSTEM_PROMPT)
+        if answer:
+            print("[CACHE] ✓ Answer served from cache")
+        return answer
+    except Exception as e:
+        print(f"[WARN] Cache read failed: {e}")
+        return None
+
+
+def _cache_put(prompt, tier, answer):
+    cache = get_response_cache()
+    if cache is None:
+        return
+    try:
+        cache.put(prompt, *_cache_key_parts(tier), SYSTEM_PROMPT, answer)
+    except Exception as e:
+        print(f"[WARN] Cache write failed: {e}")
+
+
 def get_ai_response(prompt):
     """
     Get intelligent response from AI (ChatGPT primary, Gemini fallback)
+    Repeated questions are answered from the response cache
     """
     if not USE_AI:
         return None
     
-    system_prompt = """You are Zen, an intelligent voice assistant like Alexa but powered by advanced AI.
-You have comprehensive knowledge like ChatGPT - you can answer questions about science, history, math, 
-programming, general knowledge, current events, and any topic.
+    with tracing.span("ai"):
+        tier = _route(prompt)
+        use_cache = _use_cache(prompt)
+        answer = _cache_get(prompt, tier) if use_cache else None
+        if answer:
+            tracing.annotate(cache="hit", provider="cache")
+            _remember(prompt, answer)
+            return answer
+        
+        tracing.annotate(cache="miss" if use_cache else "bypass")
+        _annotate_prompt_size(prompt)
+        start = time.perf_counter()
+        answer = _fetch_ai_response(prompt, tier)
+        if answer:
+            get_router().record(tier.name, time.perf_counter() - start)
+            if use_cache:
+                _cache_put(prompt, tier, answer)
+            _remember(prompt, answer)
+        return answer
 
-Keep responses:
-- Concise (2-4 sentences) since they'll be spoken aloud
-- Natural and conversational
-- Accurate and helpful
-- Friendly but professional
 
-If you don't know something, be honest but helpful."""
+def get_router():
+    global ROUTER
+    from routing import QueryRouter, Tier
+    tiers = {
+        'fast': Tier('fast', OPENAI_MODEL, GEMINI_MODEL, FAST_MAX_TOKENS),
+        'capable': Tier('capable', CAPABLE_OPENAI_MODEL, CAPABLE_GEMINI_MODEL, CAPABLE_MAX_TOKENS),
+    }
+    if ROUTER is None:
+        ROUTER = QueryRouter(tiers, threshold=ROUTING_THRESHOLD)
+    ROUTER.tiers = tiers  # Picks up flag changes, like get_hedger()
+    ROUTER.threshold = ROUTING_THRESHOLD
+    return ROUTER
+
+
+def get_routing_stats():
+    """Questions routed to each model tier and their time to first sentence"""
+    return ROUTER.stats() if ROUTER else {}
+
+
+def _route(prompt):
+    """
+    Model tier for this question (the fast tier when routing is off)
+    The decision is annotated on the turn, so traces can be summarized by="tier".
+    """
+    router = get_router()
+    if not USE_MODEL_ROUTING:
+        return router.tiers['fast']
+    decision = router.route(prompt)
+    tier = decision.tier
+    tracing.annotate(tier=tier.name, route_score=decision.score, route_reasons=decision.reasons)
+    print(f"[ROUTE] {tier.name} tier (score {decision.score:.2f}) -> {tier.openai_model} / {tier.gemini_model}, "
+          f"max {tier.max_tokens} tokens")
+    return tier
+
+
+def get_hedger():
+    global HEDGER
+    if HEDGER is None:
+        from hedging import Hedger
+        HEDGER = Hedger(delay=HEDGE_DELAY)
+    HEDGER.delay = HEDGE_DELAY
+    return HEDGER
+
+
+def get_provider_stats():
+    """Per-provider win rates and latencies of hedged requests"""
+    return HEDGER.stats_dict() if HEDGER else {}
+
+
+def _hedge_candidates(prompt, tier):
+    """(name, fn) pairs for the hedger, ChatGPT first; each fn streams the reply"""
+    candidates = []
+    if init_openai():
+        candidates.append(("ChatGPT", lambda cancel: _openai_stream(OPENAI_CLIENT, prompt, tier, cancel)))
+    if init_gemini():
+        candidates.append(("Gemini", lambda cancel: _gemini_stream(GEMINI_CLIENT, prompt, tier, cancel)))
+    return candidates
+
+
+def _use_hedging():
+    return AI_PROVIDER == "both" and HEDGE_REQUESTS
+
+
+def _fetch_hedged(prompt, tier):
+    """Race ChatGPT and Gemini, return the first complete answer"""
+    def collect(stream_fn):
+        def fn(cancel):
+            parts = []
+            chunks = stream_fn(cancel)
+            try:
+                for chunk in chunks:
+                    if cancel.is_set():
+                        return None
+                    parts.append(chunk)
+            finally:
+                chunks.close()
+            return "".join(parts).strip()
+        return fn
+    
+    try:
+        candidates = [(name, collect(fn)) for name, fn in _hedge_candidates(prompt, tier)]
+        name, answer = get_hedger().call(candidates)
+        tracing.annotate(provider=name, hedged=True)
+        print(f"[AI] ✓ Got {name} Response!")
+        return answer
+    except Exception as e:
+        print(f"[ERROR] {e}")
+        print("[ERROR] No AI service available!")
+        return None
+
+
+def _fetch_ai_response(prompt, tier):
+    """Ask the configured AI provider(s) with the tier's models, no caching"""
+    if _use_hedging():
+        return _fetch_hedged(prompt, tier)
     
     # Try OpenAI (ChatGPT) first - Most powerful option
     if AI_PROVIDER in ["openai", "both"]:
@@ -342,16 +752,14 @@ If you don't know something, be honest but helpful."""
                 print("[AI] Using ChatGPT...")
                 print(f"[AI] Sending question: {prompt[:50]}...")
                 response = client.chat.completions.create(
-                    model="gpt-3.5-turbo",  # Fast and cost-effective
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": prompt}
-                    ],
+                    model=tier.openai_model,
+                    messages=_openai_messages(prompt),
                     temperature=0.7,
-                    max_tokens=150,
+                    max_tokens=tier.max_tokens,
                     timeout=30  # 30 second timeout
                 )
                 answer = response.choices[0].message.content.strip()
+                tracing.annotate(provider="ChatGPT", model=tier.openai_model)
                 print(f"[AI] ✓ Got ChatGPT Response!")
                 print(f"[AI] Response: {answer}")
                 return answer
@@ -368,15 +776,18 @@ If you don't know something, be honest but helpful."""
             client = init_gemini()
             if client:
                 print("[AI] Using Gemini AI...")
+                contents, system_instruction = _gemini_request(prompt)
                 response = client.models.generate_content(
-                    model='gemini-2.0-flash-exp',
-                    contents=prompt,
+                    model=tier.gemini_model,
+                    contents=contents,
                     config={
-                        'system_instruction': system_prompt,
+                        'system_instruction': system_instruction,
                         'temperature': 0.7,
+                        'max_output_tokens': tier.max_tokens,
                     }
                 )
                 answer = response.text.strip()
+                tracing.annotate(provider="Gemini", model=tier.gemini_model)
                 print(f"[AI] Gemini Response: {answer[:50]}...")
                 return answer
         except Exception as e:
@@ -386,53 +797,286 @@ If you don't know something, be honest but helpful."""
     return None
 
 
-def process_command(command):
+def _close_stream(stream):
+    close = getattr(stream, 'close', None)
+    if close:
+        try:
+            close()
+        except Exception:
+            pass  # e.g. a generator still running in another thread - it stops at its next chunk
+
+
+def _abort_on_cancel(stream, cancel):
     """
-    Process voice commands and return intelligent AI-powered responses
-    Now handles ALL questions like ChatGPT!
+    Iterate a provider stream until cancel (threading.Event or CancelToken) is set
+    A watcher thread closes the stream as soon as it is, which aborts the
+    HTTP request even while it is still waiting for the first chunk (e.g.
+    a hedged loser).
     """
-    command_lower = command.lower()
+    finished = threading.Event()
+
+    def watch():
+        while not finished.is_set():
+            if cancel.wait(0.05):
+                _close_stream(stream)
+                return
+
+    if cancel is not None:
+        threading.Thread(target=watch, name="stream-cancel", daemon=True).start()
+    try:
+        for chunk in stream:
+            if cancel is not None and cancel.wait(0):
+                return
+            yield chunk
+    except Exception:
+        if cancel is not None and cancel.wait(0):
+            return  # The read failed because the stream was closed under it
+        raise
+    finally:
+        finished.set()
+        # Closing the stream aborts the HTTP request
+        _close_stream(stream)
+
+
+def _openai_stream(client, prompt, tier, cancel=None):
+    """Yield text deltas from a streaming ChatGPT request (aborted once cancel is set)"""
+    stream = client.chat.completions.create(
+        model=tier.openai_model,
+        messages=_openai_messages(prompt),
+        temperature=0.7,
+        max_tokens=tier.max_tokens,
+        timeout=30,
+        stream=True
+    )
+    for chunk in _abort_on_cancel(stream, cancel):
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def _gemini_stream(client, prompt, tier, cancel=None):
+    """Yield text chunks from a streaming Gemini request (aborted once cancel is set)"""
+    contents, system_instruction = _gemini_request(prompt)
+    stream = client.models.generate_content_stream(
+        model=tier.gemini_model,
+        contents=contents,
+        config={
+            'system_instruction': system_instruction,
+            'temperature': 0.7,
+            'max_output_tokens': tier.max_tokens,
+        }
+    )
+    for chunk in _abort_on_cancel(stream, cancel):
+        if chunk.text:
+            yield chunk.text
+
+
+def get_ai_response_stream(prompt, cancel=None):
+    """
+    Streaming version of get_ai_response
+    Yields complete sentences as soon as the provider has generated them.
+    Cached answers are replayed sentence by sentence without a request.
+    Once cancel fires the request is aborted, and the partial reply is
+    neither cached nor remembered.
+    """
+    if not USE_AI:
+        return
     
-    print(f"[PROCESSING] Command: {command}")
+    with tracing.span("ai", streaming=True):
+        tier = _route(prompt)
+        use_cache = _use_cache(prompt)
+        cached = _cache_get(prompt, tier) if use_cache else None
+        if cached:
+            tracing.annotate(cache="hit", provider="cache")
+            _remember(prompt, cached)
+            yield from split_sentences(cached)
+            return
+        
+        tracing.annotate(cache="miss" if use_cache else "bypass")
+        _annotate_prompt_size(prompt)
+        start = time.perf_counter()
+        sentences = []
+        for sentence in _fetch_ai_response_stream(prompt, tier, cancel):
+            if not sentences:
+                tracing.add_span("ai_first_sentence", start)
+                get_router().record(tier.name, time.perf_counter() - start, 'first_sentence')
+            sentences.append(sentence)
+            yield sentence
+        if cancel is not None and cancel.cancelled:
+            tracing.annotate(cancelled=True)
+            return
+        if sentences:
+            answer = " ".join(sentences)
+            if use_cache:
+                _cache_put(prompt, tier, answer)
+            _remember(prompt, answer)
+
+
+def _until_cancelled(chunks, cancel):
+    """Pass chunks through until cancel fires; closing chunks aborts the request"""
+    try:
+        for chunk in chunks:
+            if cancel is not None and cancel.cancelled:
+                return
+            yield chunk
+    finally:
+        chunks.close()
+
+
+def _fetch_ai_response_stream(prompt, tier, cancel=None):
+    """
+    Stream from the configured AI provider(s), no caching
+    Falls back to Gemini only if ChatGPT failed before producing any text
+    (a half-spoken answer cannot be taken back).
+    """
+    if _use_hedging():
+        tracing.annotate(provider="hedged", hedged=True)
+        try:
+            yield from iter_sentences(_until_cancelled(get_hedger().stream(_hedge_candidates(prompt, tier)), cancel))
+        except Exception as e:
+            print(f"[ERROR] {e}")
+        return
     
-    # Quick local responses (faster than AI)
+    got_text = False
     
-    # Math calculation - Quick pattern matching for simple math
-    if any(word in command_lower for word in ['plus', 'minus', 'times', 'multiply', 'divide', 'into']):
-        # Try to handle basic math locally (faster)
+    if AI_PROVIDER in ["openai", "both"]:
         try:
-            math_patterns = [
-                (r'(\d+\.?\d*)\s*(?:plus|\+)\s*(\d+\.?\d*)', lambda a, b: float(a) + float(b), 'plus'),
-                (r'(\d+\.?\d*)\s*(?:minus|-)\s*(\d+\.?\d*)', lambda a, b: float(a) - float(b), 'minus'),
-                (r'(\d+\.?\d*)\s*(?:times|multiply|multiplied by|\*|into)\s*(\d+\.?\d*)', lambda a, b: float(a) * float(b), 'times'),
-                (r'(\d+\.?\d*)\s*(?:divide|divided by|/)\s*(\d+\.?\d*)', lambda a, b: float(a) / float(b) if float(b) != 0 else None, 'divided by'),
-            ]
-            
-            for pattern, operation, op_name in math_patterns:
-                match = re.search(pattern, command_lower)
-                if match:
-                    num1, num2 = match.groups()
-                    result = operation(num1, num2)
-                    if result is not None:
-                        result_str = str(int(result)) if result == int(result) else str(result)
-                        return f"{num1} {op_name} {num2} equals {result_str}"
-                    else:
-                        return "I cannot divide by zero"
+            client = init_openai()
+            if client:
+                print("[AI] Streaming from ChatGPT...")
+                tracing.annotate(provider="ChatGPT", model=tier.openai_model)
+                for sentence in iter_sentences(_until_cancelled(_openai_stream(client, prompt, tier, cancel), cancel)):
+                    got_text = True
+                    yield sentence
+                if got_text:
+                    print("[AI] ✓ ChatGPT stream complete")
+                    return
+        except Exception as e:
+            print(f"[ERROR] ChatGPT stream error: {e}")
+            if got_text:
+                return
+            if AI_PROVIDER == "openai":
+                print("[INFO] Trying Gemini as fallback...")
+    
+    if cancel is not None and cancel.cancelled:
+        return  # Abandoned - no fallback request
+    
+    if AI_PROVIDER in ["gemini", "both"] or OPENAI_CLIENT is None:
+        try:
+            client = init_gemini()
+            if client:
+                print("[AI] Streaming from Gemini AI...")
+                tracing.annotate(provider="Gemini", model=tier.gemini_model)
+                for sentence in iter_sentences(_until_cancelled(_gemini_stream(client, prompt, tier, cancel), cancel)):
+                    got_text = True
+                    yield sentence
+                if got_text:
+                    print("[AI] ✓ Gemini stream complete")
+                    return
         except Exception as e:
-            print(f"[WARN] Math calculation failed: {e}")
+            print(f"[WARN] Gemini stream error: {e}")
+            if got_text:
+                return
+    
+    print("[ERROR] No AI service available!")
+
+
+# ===== LOCAL INTENTS =====
+# Registered once and compiled into a single keyword automaton (see intents.py)
+LOCAL_INTENTS = IntentEngine()  # Answered before the AI is asked
+FALLBACK_INTENTS = IntentEngine()  # Used only when the AI is unavailable
+
+# Math and unit conversions - answered by the local expression engine (no network)
+@LOCAL_INTENTS.intent("math", keywords=local_math.TRIGGER_WORDS, priority=30)
+def _math_intent(match):
+    return local_math.solve(match.text)
+
+
+@LOCAL_INTENTS.intent(
+    "time",
+    keywords=['time', 'clock'],
+    patterns=[r"\b(?:what|current|what's|whats)\s+(?:time|clock)\b", r'time is it'],
+    priority=20
+)
+def _time_intent(match):
+    from datetime import datetime
+    current_time = datetime.now().strftime("%I:%M %p")
+    return f"The current time is {current_time}"
+
+
+@LOCAL_INTENTS.intent(
+    "date",
+    keywords=['what date', "today's date", 'what is today', 'current date'],
+    priority=20
+)
+def _date_intent(match):
+    from datetime import datetime
+    current_date = datetime.now().strftime("%B %d, %Y")
+    return f"Today is {current_date}"
+
+
+@FALLBACK_INTENTS.intent("joke", keywords=['joke', 'funny'], priority=10)
+def _joke_intent(match):
+    import random
+    jokes = [
+        "Why did the programmer quit his job? Because he didn't get arrays!",
+        "Why do programmers prefer dark mode? Because light attracts bugs!",
+        "How many programmers does it take to change a light bulb? None, that's a hardware problem!"
+    ]
+    return random.choice(jokes)
+
+
+@FALLBACK_INTENTS.intent("help", keywords=['help'], priority=0)
+def _help_intent(match):
+    return HELP_REPLY
+
+
+LOCAL_INTENTS.compile()
+FALLBACK_INTENTS.compile()
+
+
+def _local_response(command_lower):
+    """
+    Quick local responses (faster than AI)
+    Returns None when the command needs the AI
+    """
+    with tracing.span("route"):
+        try:
+            match, response = LOCAL_INTENTS.dispatch(command_lower)
+        except Exception as e:
+            print(f"[WARN] Local intent failed: {e}")
             # Fall through to AI
+            return None
+        if match:
+            tracing.annotate(intent=match.name, provider="local")
+        else:
+            tracing.annotate(intent="ai")
+        return response
+
+
+def _fallback_response(command_lower):
+    """Basic responses used only when AI completely fails"""
+    print("[INFO] Using fallback responses (AI not available)")
+    
+    response = FALLBACK_INTENTS.respond(command_lower)
+    if response:
+        return response
+    
+    # Default response when AI is not available
+    return NO_AI_REPLY
+
+
+def process_command(command):
+    """
+    Process voice commands and return intelligent AI-powered responses
+    Now handles ALL questions like ChatGPT!
+    """
+    command_lower = command.lower()
     
-    # Time check (use more specific matching)
-    if re.search(r'\b(what|current|what\'s|whats)\s+(time|clock)\b', command_lower) or 'time is it' in command_lower:
-        from datetime import datetime
-        current_time = datetime.now().strftime("%I:%M %p")
-        return f"The current time is {current_time}"
+    print(f"[PROCESSING] Command: {command}")
     
-    # Date check
-    if any(phrase in command_lower for phrase in ['what date', "today's date", 'what is today', 'current date']):
-        from datetime import datetime
-        current_date = datetime.now().strftime("%B %d, %Y")
-        return f"Today is {current_date}"
+    local_response = _local_response(command_lower)
+    if local_response:
+        return local_response
     
     # Try AI response for EVERYTHING else - This is where the magic happens!
     if USE_AI:
@@ -444,22 +1088,119 @@ def process_command(command):
             print("[WARN] AI service unavailable. Check your API keys in .env file!")
     
     # Fallback to basic responses only if AI completely fails
-    print("[INFO] Using fallback responses (AI not available)")
+    return _fallback_response(command_lower)
+
+
+def process_command_stream(command, cancel=None):
+    """
+    Same as process_command, but yields the response sentence by sentence
+    AI replies are generated in the background so the caller can speak
+    the first sentence while the rest is still arriving.
+    Raises CancelledError once cancel fires, even mid-request.
+    """
+    if not (USE_AI and STREAM_RESPONSES):
+        yield run_cancellable(process_command, cancel, command)
+        return
     
-    if any(word in command_lower for word in ['joke', 'funny']):
-        import random
-        jokes = [
-            "Why did the programmer quit his job? Because he didn't get arrays!",
-            "Why do programmers prefer dark mode? Because light attracts bugs!",
-            "How many programmers does it take to change a light bulb? None, that's a hardware problem!"
-        ]
-        return random.choice(jokes)
+    command_lower = command.lower()
+    
+    print(f"[PROCESSING] Command: {command}")
     
-    if 'help' in command_lower:
-        return "I can answer ANY question like ChatGPT! Ask me about science, history, math, programming, or anything. I can also tell you the time and date. What would you like to know?"
+    local_response = _local_response(command_lower)
+    if local_response:
+        yield local_response
+        return
     
-    # Default response when AI is not available
-    return "I need an AI API key to answer that. Please check the SETUP_API_KEYS.txt file to configure OpenAI or Gemini."
+    print("[AI] 🤔 Thinking with ChatGPT/AI brain (streaming)...")
+    got_response = False
+    # Fires on stop and when the caller drops the reply (barge-in), so the background
+    # request is aborted and an unheard reply is neither cached nor remembered
+    abandoned = CancelToken()
+    forward = lambda: abandoned.cancel(cancel.reason)
+    if cancel is not None:
+        cancel.add_callback(forward)
+    sentences = prefetch(get_ai_response_stream(command, abandoned), cancel=abandoned)
+    try:
+        for sentence in sentences:
+            got_response = True
+            yield sentence
+    finally:
+        if cancel is not None:
+            cancel.remove_callback(forward)
+        abandoned.cancel("reply abandoned")  # No-op for the producer once the reply is complete
+        sentences.close()
+    
+    if not got_response:
+        print("[WARN] AI service unavailable. Check your API keys in .env file!")
+        yield _fallback_response(command_lower)
+
+
+def respond(command, speak, interrupted=None, cancel=None, speak_stream=None):
+    """
+    Process a command and speak the response (streamed when enabled)
+    Stops before the next sentence once the interrupted event is set;
+    raises CancelledError once cancel fires. With speak_stream(sentences)
+    the whole reply goes to the TTS worker as one utterance, so the next
+    sentence is rendered while the current one plays.
+    """
+    start = time.perf_counter()
+    first_at = None
+    sentences = process_command_stream(command, cancel)
+    
+    def reply():
+        nonlocal first_at
+        for sentence in sentences:
+            if interrupted is not None and interrupted.is_set():
+                print("[INFO] Reply interrupted")
+                break
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            if first_at is None:
+                # "think": from the recognized command to the first speakable sentence
+                tracing.add_span("think", start)
+                tracing.mark("first_audio")
+                first_at = time.perf_counter()
+            print(f"[ASSISTANT] {sentence}")
+            yield sentence
+    
+    try:
+        if speak_stream is None:
+            for sentence in reply():
+                with tracing.span("speak"):
+                    speak(sentence)
+        else:
+            try:
+                speak_stream(reply())
+            finally:
+                if first_at is not None:
+                    tracing.add_span("speak", first_at)  # First sentence ready -> reply spoken
+    finally:
+        sentences.close()
+
+
+def respond_with_barge_in(command, speak, cancel=None, speak_stream=None):
+    """
+    respond() while watching the microphone for the user talking over it
+    Returns the capture position to resume listening from after a barge-in,
+    or None if the reply was spoken to the end.
+    """
+    global ECHO_GATE
+    if not ENABLE_BARGE_IN:
+        respond(command, speak, cancel=cancel, speak_stream=speak_stream)
+        return None
+    
+    from barge_in import BargeInMonitor, EchoGate
+    from speech import get_capture_session, stop_speaking
+    
+    session = get_capture_session()
+    if ECHO_GATE is None:
+        ECHO_GATE = EchoGate(session.frame_seconds)
+    with BargeInMonitor(session, ECHO_GATE, on_barge_in=stop_speaking) as barge:
+        respond(command, speak, barge.triggered, cancel, speak_stream)
+    if not barge.triggered.is_set():
+        return None
+    tracing.mark("barge_in")
+    return max(1, barge.position - session.frames_for(BARGE_IN_PRE_ROLL))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,503 @@
+"""
+Assistant Server - Headless multi-session access to the assistant core
+An asyncio HTTP/WebSocket server (standard library only) in front of
+process_command. Every session keeps its own conversation memory; the
+provider clients, response cache and tracer are shared by all of them.
+Commands run on a thread pool, so sessions waiting on the AI overlap.
+
+    python assistant_server.py --port 8080
+
+    POST   /sessions                    -> {"session": id}
+    POST   /sessions/<id>/command       {"text": "..."} or {"audio": <base64 WAV>}, "audio_out": true
+    GET    /sessions/<id>               session info
+    DELETE /sessions/<id>
+    GET    /health
+    GET    /ws[?session=<id>]           WebSocket: send {"text": ...}, receive each sentence as it is ready
+"""
+import argparse
+import asyncio
+import base64
+import concurrent.futures
+import contextvars
+import hashlib
+import io
+import json
+import os
+import struct
+import threading
+import time
+import uuid
+import wave
+
+import assistant_core
+import tracing
+
+MAX_SESSIONS = 1000
+SESSION_IDLE_TIMEOUT = 15 * 60  # Seconds without a command before a session is dropped
+WORKERS = None  # Commands processed at once; None sizes the pool with default_workers()
+WORKERS_PER_CPU = 64  # Commands mostly wait on the provider; beyond this the CPU is the bottleneck
+MAX_BODY_BYTES = 10 * 1024 * 1024  # Room for ~5 minutes of 16 kHz WAV audio
+
+_WS_MAGIC = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_STATUS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Session:
+    """One user: conversation memory plus bookkeeping"""
+
+    def __init__(self, session_id):
+        self.id = session_id
+        self.memory = None
+        if assistant_core.USE_CONVERSATION_MEMORY:
+            from conversation import ConversationMemory
+            self.memory = ConversationMemory(assistant_core.MEMORY_TOKEN_BUDGET,
+                                             assistant_core.MEMORY_SUMMARY_TOKENS)
+        self.created_at = time.time()
+        self.last_active = time.monotonic()
+        self.commands = 0
+        self.lock = asyncio.Lock()  # A session's commands run in order
+
+    def as_dict(self):
+        return {
+            'session': self.id,
+            'created_at': self.created_at,
+            'commands': self.commands,
+            'history_turns': len(self.memory) if self.memory is not None else 0,
+        }
+
+
+# ===== COMMAND PROCESSING (worker threads) =====
+
+def default_workers(max_sessions=MAX_SESSIONS):
+    """WORKERS_PER_CPU threads per CPU, but no more than sessions (each runs one command at a time)"""
+    return max(1, min(max_sessions, WORKERS_PER_CPU * (os.cpu_count() or 1)))
+
+
+def transcribe(wav_bytes):
+    """Text of a WAV recording, with the configured speech recognizer"""
+    import speech
+    try:
+        with wave.open(io.BytesIO(wav_bytes), 'rb') as wav:
+            pcm = wav.readframes(wav.getnframes())
+            rate, width = wav.getframerate(), wav.getsampwidth()
+    except (wave.Error, EOFError) as e:
+        raise HTTPError(400, f"audio is not a readable WAV file: {e}")
+    with tracing.span("recognize", engine=speech.STT_BACKEND):
+        return speech.get_recognizer().recognize(pcm, rate, width)
+
+
+def run_command(session, text=None, audio=None, audio_out=False, on_sentence=None):
+    """
+    Process one command for a session (blocking - runs on the worker pool)
+    on_sentence(sentence) streams the reply; returns the result dict.
+    """
+    assistant_core.start_session(session.memory)
+    start = time.perf_counter()
+    with tracing.turn("server", session=session.id) as turn:
+        if audio:
+            text = transcribe(audio)
+        if not text:
+            raise HTTPError(400, "No command text (or the audio was not understood)")
+        first_sentence = None
+        if on_sentence:
+            sentences = []
+            for sentence in assistant_core.process_command_stream(text):
+                if first_sentence is None:
+                    first_sentence = time.perf_counter() - start
+                sentences.append(sentence)
+                on_sentence(sentence)
+            reply = " ".join(sentences)
+        else:
+            reply = assistant_core.process_command(text)
+        result = {
+            'text': text,
+            'reply': reply,
+            'provider': turn.attrs.get('provider'),
+            'latency_ms': round((time.perf_counter() - start) * 1000, 1),
+        }
+        if first_sentence is not None:
+            result['first_sentence_ms'] = round(first_sentence * 1000, 1)
+        if audio_out:
+            import speech
+            with tracing.span("render"):
+                wav = speech.render_wav(reply)
+            result['audio'] = base64.b64encode(wav).decode() if wav else None
+    return result
+
+
+# ===== SERVER =====
+
+class AssistantServer:
+    def __init__(self, host="127.0.0.1", port=8080, workers=WORKERS, max_sessions=MAX_SESSIONS,
+                 idle_timeout=SESSION_IDLE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = {}
+        self.workers = workers or default_workers(max_sessions)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers,
+                                                              thread_name_prefix="command")
+        self.active = 0  # Commands being processed right now
+        self.completed = 0
+        self._server = None
+        self._loop = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    # ----- Sessions -----
+
+    def create_session(self):
+        if len(self.sessions) >= self.max_sessions:
+            self.expire_sessions()
+            if len(self.sessions) >= self.max_sessions:
+                raise HTTPError(503, f"Session limit reached ({self.max_sessions})")
+        session = Session(uuid.uuid4().hex)
+        self.sessions[session.id] = session
+        return session
+
+    def get_session(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise HTTPError(404, f"Unknown session {session_id}")
+        return session
+
+    def expire_sessions(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for session_id in [s.id for s in self.sessions.values() if s.last_active < cutoff and not s.lock.locked()]:
+            del self.sessions[session_id]
+
+    async def _expire_loop(self):
+        while True:
+            await asyncio.sleep(min(60, self.idle_timeout))
+            self.expire_sessions()
+
+    async def command(self, session, payload, on_sentence=None):
+        """Run a command on the worker pool (one at a time per session)"""
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "Expected a JSON object")
+        for field in ('text', 'audio'):
+            if not isinstance(payload.get(field), (str, type(None))):
+                raise HTTPError(400, f"{field} must be a string")
+        audio = payload.get('audio')
+        if audio:
+            try:
+                audio = base64.b64decode(audio)
+            except ValueError:
+                raise HTTPError(400, "audio must be a base64 WAV file")
+        async with session.lock:
+            session.last_active = time.monotonic()
+            self.active += 1
+            try:
+                # Fresh context per command: the session memory/tracing turn stay in that thread
+                context = contextvars.copy_context()
+                result = await self._loop.run_in_executor(
+                    self.executor, context.run, run_command, session,
+                    payload.get('text'), audio, bool(payload.get('audio_out')), on_sentence
+                )
+            finally:
+                self.active -= 1
+            session.commands += 1
+            self.completed += 1
+            session.last_active = time.monotonic()
+        result['session'] = session.id
+        return result
+
+    # ----- HTTP -----
+
+    async def _route(self, method, path, body):
+        parts = [p for p in path.split('?', 1)[0].split('/') if p]
+        if parts == ['health']:
+            return 200, {'status': 'ok', 'sessions': len(self.sessions), 'active': self.active,
+                         'completed': self.completed}
+        if parts == ['sessions'] and method == 'POST':
+            return 201, self.create_session().as_dict()
+        if len(parts) == 2 and parts[0] == 'sessions':
+            session = self.get_session(parts[1])
+            if method == 'GET':
+                return 200, session.as_dict()
+            if method == 'DELETE':
+                del self.sessions[session.id]
+                return 200, {'deleted': session.id}
+            raise HTTPError(405, f"{method} not allowed here")
+        if len(parts) == 3 and parts[0] == 'sessions' and parts[2] == 'command':
+            if method != 'POST':
+                raise HTTPError(405, "Use POST")
+            return 200, await self.command(self.get_session(parts[1]), _parse_json(body))
+        raise HTTPError(404, f"Unknown path {path}")
+
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                if headers.get('upgrade', '').lower() == 'websocket':
+                    await self._websocket(path, headers, reader, writer)
+                    break
+                try:
+                    status, payload = await self._route(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception as e:
+                    print(f"[SERVER ERROR] {method} {path}: {e}")
+                    status, payload = 500, {'error': "Internal error"}
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                _write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HTTPError as e:
+            _write_response(writer, e.status, {'error': str(e)}, False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # ----- WebSocket -----
+
+    async def _websocket(self, path, headers, reader, writer):
+        key = headers.get('sec-websocket-key')
+        if not key:
+            _write_response(writer, 400, {'error': "Missing Sec-WebSocket-Key"}, False)
+            return
+        accept = base64.b64encode(hashlib.sha1((key + _WS_MAGIC).encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+
+        query = dict(p.split('=', 1) for p in path.partition('?')[2].split('&') if '=' in p)
+        try:
+            session = self.get_session(query['session']) if 'session' in query else self.create_session()
+        except HTTPError as e:
+            _ws_send(writer, {'type': 'error', 'error': str(e)})
+            writer.write(_ws_frame(0x8, b""))
+            return
+        _ws_send(writer, {'type': 'session', **session.as_dict()})
+        await writer.drain()
+
+        while True:
+            opcode, payload = await _ws_read(reader)
+            if opcode == 0x8:  # Close
+                writer.write(_ws_frame(0x8, payload[:2]))
+                await writer.drain()
+                return
+            if opcode == 0x9:  # Ping
+                writer.write(_ws_frame(0xA, payload))
+                await writer.drain()
+                continue
+            if opcode != 0x1:
+                continue
+            loop = self._loop
+
+            def on_sentence(sentence):
+                # Called from the worker thread - hand the frame to the event loop
+                loop.call_soon_threadsafe(_ws_send, writer, {'type': 'sentence', 'text': sentence})
+
+            try:
+                result = await self.command(session, _parse_json(payload), on_sentence)
+                _ws_send(writer, {'type': 'done', **result})
+            except HTTPError as e:
+                _ws_send(writer, {'type': 'error', 'error': str(e)})
+            except Exception as e:
+                print(f"[SERVER ERROR] WebSocket command: {e}")
+                _ws_send(writer, {'type': 'error', 'error': "Internal error"})
+            await writer.drain()
+
+    # ----- Lifecycle -----
+
+    async def serve(self):
+        """Run until cancelled"""
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port,
+                                                  limit=MAX_BODY_BYTES, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        expire = asyncio.ensure_future(self._expire_loop())
+        print(f"[SERVER] Assistant server on {self.url} ({self.workers} workers)")
+        self._ready.set()
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass  # stop()
+        finally:
+            expire.cancel()
+
+    def start(self):
+        """Serve on a background thread (returns once the port is bound)"""
+        thread = threading.Thread(target=asyncio.run, args=(self.serve(),), name="assistant-server", daemon=True)
+        thread.start()
+        self._ready.wait(10)
+        return self
+
+    def stop(self):
+        if self._loop and self._server:
+            self._loop.call_soon_threadsafe(self._server.close)
+        self.executor.shutdown(wait=False)
+
+
+# ===== PROTOCOL HELPERS =====
+
+def _parse_json(body):
+    try:
+        return json.loads(body or b"{}")
+    except ValueError:
+        raise HTTPError(400, "Invalid JSON body")
+
+
+async def _read_request(reader):
+    """(method, path, headers, body) or None when the client closed the connection"""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, path, _version = line.decode('latin-1').split()
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length")
+    if length < 0:
+        raise HTTPError(400, "Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path, headers, body
+
+
+def _write_response(writer, status, payload, keep_alive=True):
+    data = json.dumps(payload).encode()
+    writer.write((f"HTTP/1.1 {status} {_STATUS.get(status, 'Error')}\r\n"
+                  "Content-Type: application/json\r\n"
+                  f"Content-Length: {len(data)}\r\n"
+                  f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode() + data)
+
+
+def _ws_frame(opcode, payload):
+    length = len(payload)
+    if length < 126:
+        head = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 65536:
+        head = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        head = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return head + payload
+
+
+def _ws_send(writer, message):
+    if not writer.is_closing():
+        writer.write(_ws_frame(0x1, json.dumps(message).encode()))
+
+
+def _unmask(payload, mask):
+    repeated = (mask * (len(payload) // 4 + 1))[:len(payload)]
+    return (int.from_bytes(payload, 'big') ^ int.from_bytes(repeated, 'big')).to_bytes(len(payload), 'big')
+
+
+async def _ws_read(reader):
+    """(opcode, payload) of the next complete message (fragments are joined)"""
+    message, message_opcode = b"", None
+    while True:
+        first, second = await reader.readexactly(2)
+        opcode, length = first & 0x0F, second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await reader.readexactly(8))[0]
+        if length > MAX_BODY_BYTES:
+            raise ConnectionError("WebSocket message too large")
+        mask = await reader.readexactly(4) if second & 0x80 else None
+        payload = await reader.readexactly(length)
+        if mask:
+            payload = _unmask(payload, mask)
+        if opcode >= 0x8:  # Control frames may arrive between fragments
+            return opcode, payload
+        if opcode:
+            message_opcode = opcode
+        message += payload
+        if first & 0x80:
+            return message_opcode, message
+
+
+# ===== CLIENT =====
+
+class ServerClient:
+    """Minimal asyncio client for one keep-alive connection (benchmarks, scripts)"""
+
+    def __init__(self, host="127.0.0.1", port=8080):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port, limit=MAX_BODY_BYTES)
+        return self
+
+    async def request(self, method, path, payload=None):
+        """(status, JSON reply)"""
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self._writer.write((f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                            "Content-Type: application/json\r\n"
+                            f"Content-Length: {len(body)}\r\n\r\n").encode() + body)
+        await self._writer.drain()
+        status = int((await self._reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        data = await self._reader.readexactly(int(headers.get('content-length', 0)))
+        return status, json.loads(data or b"{}")
+
+    async def close(self):
+        if self._writer:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AI Assistant Zen - headless multi-session server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+    args = parser.parse_args(argv)
+
+    assistant_core.load_environment()
+    tracing.configure(assistant_core.TRACE_FILE if assistant_core.TRACE_LATENCY else None)
+    server = AssistantServer(args.host, args.port, args.workers, args.max_sessions)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        print("\n[SERVER] Stopped")
+    finally:
+        assistant_core.print_latency_summary()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
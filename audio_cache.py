@@ -0,0 +1,151 @@
+"""
+Audio Cache - Pre-rendered speech on disk for fixed and frequent phrases
+WAV files rendered once by the TTS engine (save-to-file), keyed on the text
+and the voice, rate and volume they were spoken with. A hit is played
+straight from disk, skipping synthesis; the least recently played files are
+evicted once the cache grows past max_bytes.
+
+    cache = AudioCache(".tts_cache", max_bytes=50 * 1024 * 1024)
+    path = cache.get("Goodbye!", settings)   # None on a miss
+    cache.put("Goodbye!", settings, wav_bytes)
+"""
+import collections
+import hashlib
+import os
+import threading
+
+SUFFIX = ".wav"
+
+
+def cache_key(text, settings):
+    """Stable file name for text spoken with settings (voice, rate, volume)"""
+    raw = "\0".join([text.strip()] + [str(value) for value in settings])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+class AudioCache:
+    """
+    Size-bounded directory of rendered phrases
+    min_repeats: how many times a phrase must be spoken before
+    should_render() asks for it to be cached (1 = everything), so one-off
+    answers don't churn the cache. Thread-safe.
+    """
+
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024, min_repeats=2):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.min_repeats = min_repeats
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # key -> size, least recently used first
+        self._seen = collections.OrderedDict()     # key -> times spoken (bounded)
+        self._pending = set()
+        self.total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, name[:-len(SUFFIX)], stat.st_size))
+        for _mtime, key, size in sorted(files):
+            self._entries[key] = size
+            self.total_bytes += size
+        self._evict()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, item):
+        """(text, settings) in cache - a lookup that doesn't count as a hit or miss"""
+        text, settings = item
+        with self._lock:
+            return cache_key(text, settings) in self._entries
+
+    def get(self, text, settings):
+        """Path of the cached WAV, or None"""
+        key = cache_key(text, settings)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        path = self._path(key)
+        try:
+            os.utime(path)  # Keeps the LRU order across restarts
+        except OSError:
+            with self._lock:
+                self.total_bytes -= self._entries.pop(key, 0)
+            return None
+        return path
+
+    def should_render(self, text, settings):
+        """Count one more use of text; True once it has been spoken min_repeats times"""
+        key = cache_key(text, settings)
+        with self._lock:
+            if key in self._entries or key in self._pending:
+                return False
+            count = self._seen.pop(key, 0) + 1
+            self._seen[key] = count
+            while len(self._seen) > 1000:
+                self._seen.popitem(last=False)
+            if count < self.min_repeats:
+                return False
+            self._pending.add(key)
+            return True
+
+    def put(self, text, settings, wav):
+        """Store rendered WAV bytes (written atomically) and evict down to max_bytes"""
+        key = cache_key(text, settings)
+        with self._lock:
+            self._pending.discard(key)
+            self._seen.pop(key, None)
+        if not wav or len(wav) > self.max_bytes:
+            return None
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(wav)
+        os.replace(tmp, path)
+        with self._lock:
+            self.total_bytes += len(wav) - self._entries.pop(key, 0)
+            self._entries[key] = len(wav)
+            self._evict()
+        return path
+
+    def discard(self, text, settings):
+        """Forget a pending render (e.g. it failed)"""
+        with self._lock:
+            self._pending.discard(cache_key(text, settings))
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
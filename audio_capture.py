@@ -0,0 +1,395 @@
+"""
+Audio Capture - Persistent microphone session with noise-floor tracking
+Keeps the input stream open across turns and updates the energy threshold
+continuously, so listen() starts recording immediately (no 1 s calibration).
+Frames go into a shared ring buffer that the wake-word detector and the
+command recognizer both read from.
+"""
+import collections
+import threading
+import wave
+from array import array
+from vad import Endpointer
+
+# Capture format (16-bit mono PCM)
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+FRAME_SAMPLES = 512  # 32 ms per frame at 16 kHz
+
+
+def frame_energy(frame):
+    """RMS energy of a 16-bit little-endian PCM frame"""
+    samples = array('h')
+    samples.frombytes(frame[:len(frame) - len(frame) % 2])
+    if not samples:
+        return 0.0
+    return (sum(s * s for s in samples) / len(samples)) ** 0.5
+
+
+class NoiseFloorTracker:
+    """
+    Rolling noise-floor estimate
+    Keeps the energies of the last window_seconds of non-speech audio and
+    uses a low percentile of them as the floor; speech bursts barely move it.
+    """
+
+    def __init__(self, frame_seconds, window_seconds=3.0, percentile=0.2,
+                 multiplier=2.5, min_threshold=150.0, initial_threshold=300.0):
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_threshold = min_threshold
+        self.initial_threshold = initial_threshold
+        self._energies = collections.deque(maxlen=max(1, int(window_seconds / frame_seconds)))
+        self._lock = threading.Lock()
+        self._floor = None
+
+    def update(self, energy):
+        with self._lock:
+            self._energies.append(energy)
+            self._floor = None
+
+    @property
+    def noise_floor(self):
+        with self._lock:
+            if not self._energies:
+                return None
+            if self._floor is None:
+                ordered = sorted(self._energies)
+                self._floor = ordered[int(self.percentile * (len(ordered) - 1))]
+            return self._floor
+
+    @property
+    def threshold(self):
+        """Energy above which a frame counts as speech"""
+        floor = self.noise_floor
+        if floor is None:
+            return self.initial_threshold
+        return max(self.min_threshold, floor * self.multiplier)
+
+
+# ===== AUDIO SOURCES =====
+
+class MicrophoneSource:
+    """Microphone input via speech_recognition/PyAudio"""
+
+    def __init__(self, device_index=None, sample_rate=SAMPLE_RATE, frame_samples=FRAME_SAMPLES):
+        self.device_index = device_index
+        self.sample_rate = sample_rate
+        self.sample_width = SAMPLE_WIDTH
+        self.frame_samples = frame_samples
+        self._mic = None
+
+    def open(self):
+        import speech_recognition as sr
+        self._mic = sr.Microphone(
+            device_index=self.device_index,
+            sample_rate=self.sample_rate,
+            chunk_size=self.frame_samples
+        )
+        self._mic.__enter__()
+        self.sample_rate = self._mic.SAMPLE_RATE
+        self.sample_width = self._mic.SAMPLE_WIDTH
+
+    def read(self):
+        return self._mic.stream.read(self.frame_samples)
+
+    def close(self):
+        if self._mic is not None:
+            self._mic.__exit__(None, None, None)
+            self._mic = None
+
+
+class PCMSource:
+    """
+    Recorded 16-bit mono PCM played back as if it were a microphone
+    read() returns b"" at the end of the data. With realtime=True each
+    frame is delivered at the pace it would arrive from a real device.
+    """
+
+    def __init__(self, pcm, sample_rate=SAMPLE_RATE, frame_samples=FRAME_SAMPLES, realtime=False):
+        self.pcm = pcm
+        self.sample_rate = sample_rate
+        self.sample_width = SAMPLE_WIDTH
+        self.frame_samples = frame_samples
+        self.realtime = realtime
+        self._pos = 0
+        self._closed = threading.Event()
+
+    @classmethod
+    def from_wav(cls, path, **kwargs):
+        with wave.open(path, 'rb') as wav:
+            if wav.getsampwidth() != SAMPLE_WIDTH or wav.getnchannels() != 1:
+                raise ValueError(f"{path}: expected 16-bit mono WAV")
+            return cls(wav.readframes(wav.getnframes()), sample_rate=wav.getframerate(), **kwargs)
+
+    def open(self):
+        self._pos = 0
+        self._closed.clear()
+
+    def read(self):
+        size = self.frame_samples * self.sample_width
+        frame = self.pcm[self._pos:self._pos + size]
+        self._pos += size
+        if self.realtime and frame and self._closed.wait(self.frame_samples / self.sample_rate):
+            return b""
+        return frame
+
+    def close(self):
+        self._closed.set()
+
+
+# ===== CAPTURE SESSION =====
+
+class FrameReader:
+    """
+    One consumer's cursor into a CaptureSession's ring buffer
+    Every reader sees every frame; a reader that falls further behind than
+    the ring holds skips ahead to the oldest frame still buffered.
+    """
+
+    def __init__(self, session, position=0):
+        self.session = session
+        self.position = position  # Position of the last frame consumed
+        self.dropped = 0
+
+    def read(self, cancel=None):
+        """Block for the next (frame, energy, position), None once capture has ended or cancel fired"""
+        return self.session._read_after(self, cancel)
+
+    def seek(self, position):
+        """Deliver frames from position onwards next (older audio comes from the ring)"""
+        self.position = max(0, position - 1)
+
+    def flush(self):
+        """Skip everything captured so far"""
+        self.position = self.session.head
+
+    def __iter__(self):
+        while True:
+            item = self.read()
+            if item is None:
+                return
+            yield item
+
+
+def sample_frames(reader, frame_length, cancel=None):
+    """
+    Re-chunk a reader's frames into lists of frame_length int16 samples
+    (the format Porcupine's process() expects). Yields (samples, position)
+    where position is the capture frame holding the last sample.
+    Ends when capture stops or cancel fires.
+    """
+    pending = array('h')
+    for frame, _energy, position in iter(lambda: reader.read(cancel), None):
+        pending.frombytes(frame)
+        while len(pending) >= frame_length:
+            yield pending[:frame_length].tolist(), position
+            del pending[:frame_length]
+
+
+class CaptureSession:
+    """
+    Owns an open audio source for the lifetime of the assistant
+    A single reader thread pulls frames continuously into a ring buffer of
+    the last backlog_seconds of audio. Any number of FrameReaders (wake-word
+    detector, listen(), ...) consume it independently, so the device is
+    opened once and a consumer can start from audio captured before it asked
+    (pre-roll). Between turns frames also feed the noise-floor tracker,
+    except while tracking_paused() is true (e.g. our own TTS is playing).
+    Use backlog_seconds=None with a non-realtime recorded source so no frame
+    is dropped.
+    """
+
+    def __init__(self, source, tracker=None, backlog_seconds=3.0, tracking_paused=None):
+        self.source = source
+        self.tracker = tracker
+        self.tracking_paused = tracking_paused
+        self.backlog_seconds = backlog_seconds
+        self._ring = collections.deque()
+        self._cond = threading.Condition()
+        self._listening = False
+        self._running = False
+        self._thread = None
+        self._frames_read = 0
+        self._listen_reader = FrameReader(self)
+        # (start, end) of the last phrase in seconds of captured audio
+        self.last_phrase = None
+
+    @property
+    def sample_rate(self):
+        return self.source.sample_rate
+
+    @property
+    def sample_width(self):
+        return self.source.sample_width
+
+    @property
+    def frame_seconds(self):
+        return self.source.frame_samples / self.source.sample_rate
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def head(self):
+        """Position of the newest captured frame (frames are numbered from 1)"""
+        with self._cond:
+            return self._frames_read
+
+    def frames_for(self, seconds):
+        return int(round(seconds / self.frame_seconds))
+
+    def start(self):
+        self.source.open()
+        if self.tracker is None:
+            self.tracker = NoiseFloorTracker(self.frame_seconds)
+        maxlen = None
+        if self.backlog_seconds is not None:
+            maxlen = max(1, int(self.backlog_seconds / self.frame_seconds))
+        self._ring = collections.deque(maxlen=maxlen)
+        self._frames_read = 0
+        self._listen_reader = FrameReader(self)
+        self._running = True
+        self._thread = threading.Thread(target=self._read_loop, name="audio-capture", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        # Let the reader finish its current frame before closing the device
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self.source.close()
+
+    def reader(self, start_position=None):
+        """New consumer, starting after the current head or at start_position"""
+        cursor = FrameReader(self, self.head)
+        if start_position is not None:
+            cursor.seek(start_position)
+        return cursor
+
+    def _read_loop(self):
+        try:
+            while self._running:
+                frame = self.source.read()
+                if not frame:
+                    break
+                energy = frame_energy(frame)
+                paused = self.tracking_paused is not None and self.tracking_paused()
+                with self._cond:
+                    if not self._listening and not paused:
+                        self.tracker.update(energy)
+                    self._frames_read += 1
+                    self._ring.append((frame, energy, self._frames_read))
+                    self._cond.notify_all()
+        except Exception as e:
+            print(f"[ERROR] Audio capture stopped: {e}")
+        finally:
+            self._running = False
+            with self._cond:
+                self._cond.notify_all()
+
+    def wake(self):
+        """Wake every blocked reader (e.g. so it notices a cancellation)"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def _read_after(self, reader, cancel=None):
+        with self._cond:
+            while not self._ring or self._ring[-1][2] <= reader.position:
+                if not self._running or (cancel is not None and cancel.cancelled):
+                    return None
+                self._cond.wait(0.1)
+            if cancel is not None and cancel.cancelled:
+                return None
+            oldest = self._ring[0][2]
+            if reader.position < oldest - 1:
+                reader.dropped += oldest - 1 - reader.position
+                reader.position = oldest - 1
+            item = self._ring[reader.position - oldest + 1]
+            reader.position = item[2]
+            return item
+
+    def _next_frame(self, cancel=None):
+        """Block for the next frame of the phrase being listened to"""
+        return self._listen_reader.read(cancel)
+
+    def listen(self, timeout=5, phrase_time_limit=20, pause_threshold=1.5,
+               pre_roll_seconds=0.3, flush=True, on_frame=None, endpointer=None,
+               start_position=None, cancel=None):
+        """
+        Record one phrase and return its raw PCM bytes (None if nobody spoke)
+        All limits are measured in audio time, so recorded sources behave
+        exactly like a live microphone.
+        flush=True discards audio captured before the call (e.g. our own TTS);
+        start_position instead rewinds to an earlier frame still in the ring
+        (e.g. just before a wake word was detected).
+        cancel (CancelToken) aborts the wait and recording; None is returned.
+        on_frame(frame) receives every phrase frame as it arrives (streaming STT).
+        endpointer (vad.Endpointer) decides where the phrase starts and ends;
+        without one a fixed pause_threshold of silence ends it.
+        """
+        frame_seconds = self.frame_seconds
+        if endpointer is None:
+            endpointer = Endpointer.fixed(frame_seconds, pause_threshold)
+        endpointer.reset()
+        pre_roll = collections.deque(maxlen=max(1, int(pre_roll_seconds / frame_seconds),
+                                                endpointer.onset_frames))
+        with self._cond:
+            if start_position is not None:
+                self._listen_reader.seek(start_position)
+            elif flush:
+                self._listen_reader.position = self._frames_read
+            self._listening = True
+        if cancel is not None:
+            cancel.add_callback(self.wake)
+
+        try:
+            # Wait for speech onset, keep adapting to the noise while waiting
+            waited = 0.0
+            while True:
+                item = self._next_frame(cancel)
+                if item is None:
+                    return None
+                frame, energy, position = item
+                speech = endpointer.is_speech(frame, energy, self.tracker.threshold)
+                pre_roll.append(frame)
+                if endpointer.onset(speech):
+                    break
+                if not speech:
+                    self.tracker.update(energy)
+                waited += frame_seconds
+                if timeout is not None and waited >= timeout:
+                    return None
+
+            # Record until the endpointer hears the end or the phrase limit
+            start = (position - endpointer.onset_frames) * frame_seconds
+            phrase = list(pre_roll)
+            if on_frame:
+                for early in phrase:
+                    on_frame(early)
+            threshold = self.tracker.threshold
+            spoken = endpointer.speech_seconds
+            while phrase_time_limit is None or spoken < phrase_time_limit:
+                item = self._next_frame(cancel)
+                if item is None:
+                    if cancel is not None and cancel.cancelled:
+                        return None
+                    break
+                frame, energy, position = item
+                phrase.append(frame)
+                if on_frame:
+                    on_frame(frame)
+                spoken += frame_seconds
+                if endpointer.update(endpointer.is_speech(frame, energy, threshold)):
+                    break
+            self.last_phrase = (start, position * frame_seconds)
+            return b"".join(phrase)
+        finally:
+            if cancel is not None:
+                cancel.remove_callback(self.wake)
+            with self._cond:
+                self._listening = False
@@ -0,0 +1,252 @@
+"""
+Auth - Salted password hashing and an off-thread login/registration service
+Passwords are hashed with scrypt (PBKDF2-SHA256 where OpenSSL lacks it),
+its cost calibrated once per process to take about KDF_TARGET_SECONDS on
+this machine. Rows still holding the old unsalted SHA-256 digest, or a
+cheaper hash than the current calibration, are rehashed on the next
+successful login. AuthService runs hashing and database work on worker
+threads so the GUI thread only polls for the result.
+
+    service = AuthService(get_user_store())
+    future = service.login("a@b.com", "secret")  # -> (success, message)
+"""
+import concurrent.futures
+import hashlib
+import hmac
+import os
+import re
+import threading
+import time
+
+import user_store
+
+KDF_TARGET_SECONDS = 0.1   # Time one hash should take on this machine
+KDF_MIN_COST = 2 ** 14     # scrypt N floor (16 MB with r=8)
+KDF_MAX_COST = 2 ** 20
+PBKDF2_MIN_ITERATIONS = 100000
+PBKDF2_MAX_ITERATIONS = 10 ** 7
+SALT_BYTES = 16
+SCRYPT_R = 8
+SCRYPT_P = 1
+MIN_PASSWORD_LENGTH = 6
+LOGIN_ATTEMPTS = 3  # Verify/stamp rounds when concurrent logins keep changing the stored hash
+
+LOGIN_SUCCESS = "Login successful!"
+WRONG_PASSWORD = "Incorrect password!"
+USER_NOT_FOUND = "User not found!"
+REGISTERED = "Account created successfully!"
+USER_EXISTS = "User already exists!"
+
+_LEGACY_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+_SALTED_HASH = re.compile(r"^(scrypt|pbkdf2_sha256)\$([0-9]{1,10})\$((?:[0-9a-f]{2}){1,64})\$([0-9a-f]{64})$")
+
+_params = None
+_params_lock = threading.Lock()
+
+
+# ===== KEY DERIVATION =====
+
+def _scrypt(password, salt, n):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=SCRYPT_R, p=SCRYPT_P,
+                          maxmem=256 * SCRYPT_R * n, dklen=32)
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+
+
+def calibrate(target_seconds=KDF_TARGET_SECONDS):
+    """
+    (scheme, cost) whose hash takes about target_seconds here
+    Doubles the scrypt N (or PBKDF2 iterations) from the floor until one
+    hash reaches the target.
+    """
+    salt = os.urandom(SALT_BYTES)
+    if hasattr(hashlib, "scrypt"):
+        n = KDF_MIN_COST
+        while n < KDF_MAX_COST:
+            start = time.perf_counter()
+            _scrypt("calibration", salt, n)
+            if time.perf_counter() - start >= target_seconds * 0.75:  # Next doubling would overshoot
+                break
+            n *= 2
+        return "scrypt", n
+    iterations = PBKDF2_MIN_ITERATIONS
+    start = time.perf_counter()
+    _pbkdf2("calibration", salt, iterations)
+    elapsed = time.perf_counter() - start
+    return "pbkdf2_sha256", max(iterations, int(iterations * target_seconds / max(elapsed, 1e-6)))
+
+
+def get_params():
+    """The calibrated (scheme, cost), measured on first use"""
+    global _params
+    with _params_lock:
+        if _params is None:
+            _params = calibrate()
+            print(f"[AUTH] Password hashing: {_params[0]} cost {_params[1]}")
+        return _params
+
+
+def hash_password(password, params=None):
+    """Salted hash string: scheme$cost$salt$digest (hex)"""
+    scheme, cost = params or get_params()
+    salt = os.urandom(SALT_BYTES)
+    digest = _scrypt(password, salt, cost) if scheme == "scrypt" else _pbkdf2(password, salt, cost)
+    return f"{scheme}${cost}${salt.hex()}${digest.hex()}"
+
+
+def legacy_hash(password):
+    """The old unsalted SHA-256 digest (only to recognise not-yet-upgraded rows)"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def parse_hash(password_hash):
+    """
+    (scheme, cost, salt, digest) of a salted hash string, None if malformed
+    Costs outside what this module would ever produce are rejected too, so a
+    tampered row cannot make a login allocate gigabytes or spin for minutes.
+    """
+    match = _SALTED_HASH.match(password_hash) if isinstance(password_hash, str) else None
+    if not match:
+        return None
+    scheme, cost, salt, digest = match.groups()
+    cost = int(cost)
+    if scheme == "scrypt" and not (1 < cost <= KDF_MAX_COST and cost & (cost - 1) == 0):
+        return None
+    if scheme == "pbkdf2_sha256" and not 0 < cost <= PBKDF2_MAX_ITERATIONS:
+        return None
+    return scheme, cost, bytes.fromhex(salt), digest
+
+
+def is_valid_hash(password_hash):
+    """True for a well-formed salted hash or a legacy SHA-256 digest"""
+    return bool(isinstance(password_hash, str) and _LEGACY_SHA256.match(password_hash)) \
+        or parse_hash(password_hash) is not None
+
+
+def verify_password(password, password_hash):
+    """Check password against a salted hash or a legacy SHA-256 digest"""
+    if _LEGACY_SHA256.match(password_hash):
+        return hmac.compare_digest(legacy_hash(password), password_hash)
+    parsed = parse_hash(password_hash)
+    if parsed is None:
+        return False
+    scheme, cost, salt, digest = parsed
+    try:
+        candidate = _scrypt(password, salt, cost) if scheme == "scrypt" else _pbkdf2(password, salt, cost)
+    except (ValueError, MemoryError):  # Parameters this OpenSSL build refuses
+        return False
+    return hmac.compare_digest(candidate.hex(), digest)
+
+
+def needs_rehash(password_hash, params=None):
+    """True for legacy digests and hashes cheaper than the current calibration"""
+    scheme, cost = params or get_params()
+    parts = password_hash.split("$")
+    if len(parts) != 4 or parts[0] != scheme:
+        return True
+    try:
+        return int(parts[1]) < cost
+    except ValueError:
+        return True
+
+
+# ===== VALIDATION =====
+
+def validate_email(email):
+    """
+    Validate email format using regex (RFC 5322 compliant)
+    Returns True if email is valid, False otherwise
+    """
+    # Comprehensive email validation regex
+    email_pattern = r'^[a-zA-Z0-9][a-zA-Z0-9._%+-]{0,63}@[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?(?:\.[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)*\.[a-zA-Z]{2,}$'
+    
+    # Additional validation checks
+    if not email or len(email) > 254:  # Max email length per RFC 5321
+        return False
+    
+    if email.count('@') != 1:  # Must have exactly one @ symbol
+        return False
+    
+    local_part, domain = email.rsplit('@', 1)
+    
+    # Local part (before @) validation
+    if len(local_part) > 64:  # Max local part length
+        return False
+    
+    if local_part.startswith('.') or local_part.endswith('.'):
+        return False
+    
+    if '..' in local_part:  # No consecutive dots
+        return False
+    
+    # Domain validation
+    if len(domain) > 253:  # Max domain length
+        return False
+    
+    if domain.startswith('-') or domain.endswith('-'):
+        return False
+    
+    # Apply regex pattern
+    return re.match(email_pattern, email) is not None
+
+
+# ===== LOGIN / REGISTRATION =====
+
+def authenticate(store, email, password):
+    """(success, message); upgrades the stored hash after a successful login if needed"""
+    stored = store.get_password_hash(email)
+    for _attempt in range(LOGIN_ATTEMPTS):
+        if stored is None:
+            return False, USER_NOT_FOUND
+        if not verify_password(password, stored):
+            return False, WRONG_PASSWORD
+        new_hash = hash_password(password) if needs_rehash(stored) else None
+        # Only stamps the login if the hash is still the one just verified
+        result = store.login(email, stored, new_hash=new_hash)
+        if result == user_store.LOGIN_OK:
+            return True, LOGIN_SUCCESS
+        if result == user_store.NOT_FOUND:
+            return False, USER_NOT_FOUND
+        # Another login rehashed the row (or the password changed) since it was read: check the new hash
+        stored = store.get_password_hash(email)
+    return False, WRONG_PASSWORD
+
+
+def register(store, email, password):
+    """(success, message)"""
+    if store.create_user(email, hash_password(password)):
+        return True, REGISTERED
+    return False, USER_EXISTS
+
+
+class AuthService:
+    """
+    Runs authenticate/register on worker threads
+    Each call returns a concurrent.futures.Future of (success, message);
+    database errors become (False, "Database error: ...") like before.
+    """
+
+    def __init__(self, store, workers=2):
+        self.store = store
+        self._executor = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="auth")
+
+    def _run(self, func, email, password):
+        try:
+            return func(self.store, email, password)
+        except Exception as e:
+            return False, f"Database error: {str(e)}"
+
+    def login(self, email, password):
+        return self._executor.submit(self._run, authenticate, email, password)
+
+    def register(self, email, password):
+        return self._executor.submit(self._run, register, email, password)
+
+    def warm_up(self):
+        """Calibrate the hash cost in the background so the first login doesn't pay for it"""
+        return self._executor.submit(get_params)
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,117 @@
+"""
+Barge-in - Let the user interrupt the assistant while it is speaking
+A monitor thread reads the shared capture session during playback. Our own
+voice reaches the microphone too, so frames are compared against an echo
+gate: a multiple of the recent playback level instead of the noise floor.
+onset_seconds of frames above the gate count as the user talking; playback
+is then cut and the next listen() starts from where the user began.
+"""
+import collections
+import threading
+
+
+class EchoGate:
+    """
+    Energy gate that tells the user's voice apart from our own playback
+    echo_level is a high percentile of recent frame energies during
+    playback; a frame is user speech if it is ratio times louder than that
+    (and above the noise threshold). It is kept across turns, so the echo
+    level of the room/speakers is known from the first frame of each reply;
+    until warmup_seconds of audible playback have been heard it only learns.
+    """
+
+    def __init__(self, frame_seconds, ratio=2.0, window_seconds=2.0, percentile=0.95,
+                 onset_seconds=0.032, warmup_seconds=0.3):
+        self.ratio = ratio
+        self.percentile = percentile
+        self.onset_frames = max(1, round(onset_seconds / frame_seconds))
+        self.warmup_frames = max(1, round(warmup_seconds / frame_seconds))
+        self._energies = collections.deque(maxlen=max(1, int(window_seconds / frame_seconds)))
+        self._heard = 0  # Audible playback frames learned so far
+        self._run = 0
+
+    @property
+    def echo_level(self):
+        if not self._energies:
+            return 0.0
+        ordered = sorted(self._energies)
+        return ordered[int(self.percentile * (len(ordered) - 1))]
+
+    def gate(self, noise_threshold):
+        return max(noise_threshold, self.echo_level * self.ratio)
+
+    def reset(self):
+        self._run = 0
+
+    @property
+    def calibrated(self):
+        return self._heard >= self.warmup_frames
+
+    def update(self, energy, noise_threshold):
+        """Feed a frame captured during playback; True once the user is talking"""
+        if not self.calibrated:
+            if energy > noise_threshold:
+                self._heard += 1
+                self._energies.append(energy)
+            return False
+        if energy > self.gate(noise_threshold):
+            self._run += 1
+            return self._run >= self.onset_frames
+        self._run = 0
+        self._energies.append(energy)
+        return False
+
+
+class BargeInMonitor:
+    """
+    Watch the capture session while a reply is being spoken
+    on_barge_in() is called from the monitor thread (e.g. to stop the TTS).
+    After triggered is set, position is the capture frame where the user
+    started talking - pass it to listen(start_position=...).
+
+        with BargeInMonitor(session, gate, speech.stop_speaking) as barge:
+            respond(command, speak, barge.triggered)
+    """
+
+    def __init__(self, session, gate=None, on_barge_in=None):
+        self.session = session
+        self.gate = gate or EchoGate(session.frame_seconds)
+        self.on_barge_in = on_barge_in
+        self.triggered = threading.Event()
+        self.position = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.gate.reset()
+        reader = self.session.reader()
+        self._thread = threading.Thread(target=self._run, args=(reader,), name="barge-in", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=0.5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _run(self, reader):
+        for _frame, energy, position in reader:
+            if self._stop.is_set():
+                return
+            if self.gate.update(energy, self.session.tracker.threshold):
+                self.position = max(1, position - self.gate.onset_frames + 1)
+                self.triggered.set()
+                print("[BARGE-IN] User started talking - stopping playback")
+                if self.on_barge_in:
+                    try:
+                        self.on_barge_in()
+                    except Exception as e:
+                        print(f"[WARN] Barge-in callback failed: {e}")
+                return
@@ -0,0 +1,1956 @@
+"""
+AI Assistant Zen - Latency Benchmarks
+Runs against local fake providers (no network, no microphone, no speakers)
+
+Usage:
+    python benchmark.py stream
+    python benchmark.py tts [--real]
+    python benchmark.py ttscache [--synth-delay 0.3]
+    python benchmark.py chunked [--sentences 1 2 5 10 20]
+    python benchmark.py cache
+    python benchmark.py intents
+    python benchmark.py math
+    python benchmark.py hedge
+    python benchmark.py startup [--budget-ms 1500]
+    python benchmark.py turns [--trace-file latency_trace.jsonl]
+    python benchmark.py stt --corpus DIR [--backends google vosk]
+    python benchmark.py endpoint [--corpus DIR] [--tune]
+    python benchmark.py bargein [--engine] [--target-ms 100]
+    python benchmark.py stop
+    python benchmark.py memory [--turns 1000]
+    python benchmark.py replay [--wavs DIR] [--report new.json] [--baseline old.json]
+    python benchmark.py load [--sessions 1 4 16 32] [--profile typical]
+    python benchmark.py server [--sessions 10 100 300]
+    python benchmark.py users [--users 100000] [--threads 1 4 16]
+    python benchmark.py auth [--target-ms 100] [--workers 1 2 4]
+    python benchmark.py provision [--rows 10000 100000 1000000]
+    python benchmark.py routing [--fast-delay 0.3 --capable-delay 0.9]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:8.1f} ms"
+
+
+def _percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def bench_stream(args):
+    """Time-to-first-sentence (streaming) vs. time-to-full-reply (blocking)"""
+    import assistant_core
+    from fake_providers import FakeOpenAI
+
+    assistant_core.AI_PROVIDER = "openai"
+    assistant_core.USE_RESPONSE_CACHE = False  # Measure the provider, not the cache
+    assistant_core.OPENAI_CLIENT = FakeOpenAI(
+        first_token_delay=args.first_token_delay,
+        token_delay=args.token_delay,
+    )
+
+    full_times, first_times, stream_total_times = [], [], []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        assistant_core.get_ai_response("What is the capital of France?")
+        full_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        first = None
+        for _sentence in assistant_core.get_ai_response_stream("What is the capital of France?"):
+            if first is None:
+                first = time.perf_counter() - start
+        first_times.append(first)
+        stream_total_times.append(time.perf_counter() - start)
+
+    print("\n" + "=" * 50)
+    print("[BENCH] Streaming vs. blocking AI reply")
+    print("=" * 50)
+    print(f"Blocking  time-to-full-reply:     {_ms(statistics.median(full_times))}")
+    print(f"Streaming time-to-first-sentence: {_ms(statistics.median(first_times))}")
+    print(f"Streaming time-to-last-sentence:  {_ms(statistics.median(stream_total_times))}")
+    print("=" * 50)
+
+    # Streaming must start speaking well before the blocking call returns
+    if statistics.median(first_times) >= statistics.median(full_times):
+        print("[FAIL] First sentence was not faster than the full reply")
+        return 1
+    print("[OK] First sentence arrives before the full reply")
+    return 0
+
+
+def bench_tts(args):
+    """Per-utterance overhead: fresh engine per utterance vs. persistent TTS worker"""
+    import speech
+    from fake_providers import FakeTTSEngine
+
+    if args.real:
+        factory = speech.create_engine
+    else:
+        factory = lambda: FakeTTSEngine(init_delay=args.init_delay, speak_delay=args.speak_delay)
+
+    phrases = [f"This is test sentence number {i}." for i in range(args.runs)]
+
+    # Before: what speak() used to do for every utterance
+    fresh_times = []
+    for text in phrases:
+        start = time.perf_counter()
+        engine = factory()
+        engine.say(text)
+        engine.runAndWait()
+        time.sleep(0.2)
+        fresh_times.append(time.perf_counter() - start)
+
+    # After: one long-lived worker, engine set up once
+    worker = speech.TTSWorker(engine_factory=factory)
+    worker.wait_ready()
+    worker_times = []
+    for text in phrases:
+        start = time.perf_counter()
+        worker.submit(text).wait()
+        worker_times.append(time.perf_counter() - start)
+    worker.shutdown()
+
+    # Subtract the audio itself to get pure overhead (fake engine only)
+    audio = 0.0 if args.real else args.speak_delay
+    print("\n" + "=" * 50)
+    print("[BENCH] TTS per-utterance cost" + (" (real engine)" if args.real else " (fake engine)"))
+    print("=" * 50)
+    print(f"Fresh engine per utterance: {_ms(statistics.median(fresh_times))}"
+          f"  (overhead {_ms(statistics.median(fresh_times) - audio)})")
+    print(f"Persistent TTS worker:      {_ms(statistics.median(worker_times))}"
+          f"  (overhead {_ms(statistics.median(worker_times) - audio)})")
+    print("=" * 50)
+    return 0
+
+
+def bench_ttscache(args):
+    """Time to first audio of fixed and repeated phrases: synthesized vs. played from the audio cache"""
+    import contextlib
+    import io
+    import random
+    import tempfile
+    import assistant_core
+    import speech
+    from audio_cache import AudioCache
+    from fake_providers import FakeAudioPlayer, FakeTTSEngine
+
+    first_word = []
+
+    def factory():
+        engine = FakeTTSEngine(init_delay=0, word_delay=args.word_delay, synth_delay=args.synth_delay,
+                               speak_delay=args.synth_delay)
+        engine.connect('started-word', lambda name, location, length: location == 0
+                       and first_word.append(time.perf_counter()))
+        return engine
+
+    cache = AudioCache(tempfile.mkdtemp(), max_bytes=int(args.max_mb * 1024 * 1024), min_repeats=2)
+    player = FakeAudioPlayer(speed=args.play_speed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        plain = speech.TTSWorker(factory)
+        cached = speech.TTSWorker(factory, audio_cache=cache, player=player)
+        plain.wait_ready()
+        cached.wait_ready()
+
+    def start_latency(worker, text):
+        """Submit to first sound: the first word of the engine or the start of playback"""
+        words, plays = len(first_word), len(player.started)
+        start = time.perf_counter()
+        worker.submit(text).wait()
+        if len(player.started) > plays:
+            return player.started[-1] - start, True
+        return first_word[words] - start, False
+
+    phrases = assistant_core.PRERENDER_PHRASES
+    synthesized = [start_latency(plain, text)[0] for text in phrases]
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        speech._worker = cached
+        for job in speech.prerender(phrases):
+            job.result()
+    prerender_time = time.perf_counter() - started
+    from_cache = [start_latency(cached, text)[0] for text in phrases]
+
+    # Repeated answers: a few popular ones and a long tail, cached from their second use
+    rng = random.Random(args.seed)
+    answers = [f"Answer number {i} is a sentence of about ten words long." for i in range(args.answers)]
+    weights = [1 / (i + 1) for i in range(len(answers))]
+    hits, answer_times = 0, {True: [], False: []}
+    for _ in range(args.turns):
+        latency, hit = start_latency(cached, rng.choices(answers, weights)[0])
+        hits += hit
+        answer_times[hit].append(latency)
+    cached.shutdown()  # After the cache fills still queued on it
+    plain.shutdown(1.0)
+    stats = cache.stats()
+    speech._worker = None
+
+    print("\n" + "=" * 64)
+    print(f"[BENCH] TTS audio cache (synthesis {args.synth_delay * 1000:.0f} ms before the first word)")
+    print("=" * 64)
+    print(f"{'':<30}{'count':>7}{'p50':>13}{'max':>13}")
+    print(f"{'fixed phrases, synthesized':<30}{len(synthesized):>7}{_ms(statistics.median(synthesized)):>13}"
+          f"{_ms(max(synthesized)):>13}")
+    print(f"{'fixed phrases, cached':<30}{len(from_cache):>7}{_ms(statistics.median(from_cache)):>13}"
+          f"{_ms(max(from_cache)):>13}")
+    for hit, label in ((False, "answers, synthesized"), (True, "answers, cached")):
+        times = answer_times[hit]
+        if times:
+            print(f"{label:<30}{len(times):>7}{_ms(statistics.median(times)):>13}{_ms(max(times)):>13}")
+    print("-" * 64)
+    print(f"Pre-rendered {len(phrases)} phrases in {prerender_time:.2f} s; answer hit rate {hits / args.turns:.0%}")
+    print(f"Cache: {stats['entries']} files, {stats['bytes'] / 1024:.0f} KB (limit {args.max_mb:g} MB)")
+    print("=" * 64)
+    if stats['bytes'] > args.max_mb * 1024 * 1024:
+        print("[FAIL] The cache grew past its size limit")
+        return 1
+    if statistics.median(from_cache) * 1000 > args.budget_ms:
+        print(f"[FAIL] Cached phrases took over {args.budget_ms:.0f} ms to start")
+        return 1
+    print("[OK] Cached phrases start without synthesis")
+    return 0
+
+
+def bench_chunked(args):
+    """Time to first audio vs. reply length: whole-text TTS vs. double-buffered chunks"""
+    import contextlib
+    import io
+    import speech
+    from fake_providers import FakeAudioPlayer, FakeTTSEngine
+
+    first_word = []
+
+    def factory():
+        # The fake WAVs last 0.3 s per word; speaking them takes as long, scaled by --play-speed
+        engine = FakeTTSEngine(init_delay=0, speak_delay=args.synth_delay, word_delay=0.3 * args.play_speed,
+                               synth_delay=args.synth_delay, synth_word_delay=args.synth_word_delay)
+        engine.connect('started-word', lambda name, location, length: location == 0
+                       and first_word.append(time.perf_counter()))
+        return engine
+
+    player = FakeAudioPlayer(speed=args.play_speed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        whole = speech.TTSWorker(factory)
+        chunked = speech.TTSWorker(factory, player=player, chunked=True)
+        for worker in (whole, chunked):
+            worker.wait_ready()
+
+    sentence = "This sentence is part of a longer answer about the topic."
+    print("\n" + "=" * 78)
+    print(f"[BENCH] Chunked TTS, synthesis {args.synth_delay * 1000:.0f} ms"
+          f" + {args.synth_word_delay * 1000:.0f} ms/word of the text before the first sound")
+    print("=" * 78)
+    print(f"{'sentences':>9}{'whole: first audio':>20}{'chunked: first audio':>22}{'total':>11}{'max gap':>11}")
+    ttfa = []
+    for count in args.sentences:
+        text = " ".join([sentence] * count)
+        words = len(first_word)
+        start = time.perf_counter()
+        whole.submit(text).wait()
+        whole_first = first_word[words] - start
+
+        plays, words = len(player.started), len(first_word)
+        start = time.perf_counter()
+        chunked.submit(text).wait()
+        total = time.perf_counter() - start
+        starts, ends = player.started[plays:], player.finished[plays:]
+        # A one-chunk text is spoken by the engine directly
+        chunked_first = (starts[0] if starts else first_word[words]) - start
+        gaps = [starts[i + 1] - ends[i] for i in range(len(starts) - 1)] or [0.0]
+        ttfa.append(chunked_first)
+        print(f"{count:>9}{_ms(whole_first):>20}{_ms(chunked_first):>22}{_ms(total):>11}{_ms(max(gaps)):>11}")
+
+    # A streamed AI reply: sentences arrive while earlier ones play, spoken one by one or as one stream
+    def arriving():
+        for _ in range(args.stream_sentences):
+            time.sleep(args.sentence_interval)
+            yield sentence
+
+    reply_times = {}
+    speech._worker = chunked
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for text in arriving():
+            chunked.submit(text).wait()  # What respond() did: one blocking speak() per sentence
+        reply_times['per sentence'] = time.perf_counter() - start
+        plays = len(player.started)
+        start = time.perf_counter()
+        speech.speak_stream(arriving())
+        reply_times['stream'] = time.perf_counter() - start
+    speech._worker = None
+    starts, ends = player.started[plays:], player.finished[plays:]
+    stream_gap = max([starts[i + 1] - ends[i] for i in range(len(starts) - 1)] or [0.0])
+    print("-" * 78)
+    print(f"Streamed reply, {args.stream_sentences} sentences {args.sentence_interval * 1000:.0f} ms apart:"
+          f" spoken per sentence in {_ms(reply_times['per sentence']).strip()},"
+          f" as one stream in {_ms(reply_times['stream']).strip()} (max gap {_ms(stream_gap).strip()})")
+    print("=" * 78)
+    for worker in (whole, chunked):
+        worker.shutdown(1.0)
+    spread = max(ttfa) - min(ttfa)
+    if spread * 1000 > args.max_spread_ms:
+        print(f"[FAIL] Chunked first audio varies by {spread * 1000:.0f} ms with reply length")
+        return 1
+    if stream_gap * 1000 > args.max_gap_ms:
+        print(f"[FAIL] Streamed sentences were up to {stream_gap * 1000:.0f} ms apart")
+        return 1
+    print(f"[OK] Chunked first audio within {spread * 1000:.0f} ms across reply lengths")
+    return 0
+
+
+def bench_cache(args):
+    """Cache miss (fake provider round trip) vs. memory and disk cache hits"""
+    import os
+    import tempfile
+    import assistant_core
+    from fake_providers import FakeOpenAI
+    from response_cache import ResponseCache
+
+    fake = FakeOpenAI(first_token_delay=args.first_token_delay, token_delay=0.0)
+    assistant_core.AI_PROVIDER = "openai"
+    assistant_core.OPENAI_CLIENT = fake
+    assistant_core.USE_RESPONSE_CACHE = True
+    assistant_core.USE_CONVERSATION_MEMORY = False  # No history: every turn may use the cache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "cache.db")
+        assistant_core.RESPONSE_CACHE = ResponseCache(db_path)
+        prompt = "What's the capital of France?"
+
+        start = time.perf_counter()
+        assistant_core.get_ai_response(prompt)
+        miss = time.perf_counter() - start
+
+        memory_hits = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            assistant_core.get_ai_response("what's the capital of france")
+            memory_hits.append(time.perf_counter() - start)
+
+        # Fresh process: empty memory tier, same SQLite file
+        assistant_core.RESPONSE_CACHE.close()
+        assistant_core.RESPONSE_CACHE = ResponseCache(db_path)
+        start = time.perf_counter()
+        assistant_core.get_ai_response(prompt)
+        disk_hit = time.perf_counter() - start
+
+        # Mid-conversation a self-contained question is still a hit; a follow-up depends on the history
+        assistant_core.USE_CONVERSATION_MEMORY = True
+        assistant_core.CONVERSATION = None
+        assistant_core.get_conversation().add("Tell me about Spain", "Spain is in southern Europe.")
+        assistant_core.get_ai_response(prompt)
+        assistant_core.get_ai_response("and what is its capital?")
+        assistant_core.CONVERSATION = None
+
+        stats = dict(assistant_core.RESPONSE_CACHE.stats)
+        assistant_core.RESPONSE_CACHE.close()
+        assistant_core.RESPONSE_CACHE = None
+
+    print("\n" + "=" * 50)
+    print("[BENCH] Response cache")
+    print("=" * 50)
+    print(f"Miss (provider call): {_ms(miss)}")
+    print(f"Memory hit (median):  {statistics.median(memory_hits) * 1e6:8.1f} us")
+    print(f"Disk hit:             {disk_hit * 1e6:8.1f} us")
+    print(f"Provider calls:       {fake.calls} (expected 2: first miss, follow-up with history)")
+    print(f"Stats after reopen:   {stats}")
+    print("=" * 50)
+    return 0 if fake.calls == 2 else 1
+
+
+def bench_intents(args):
+    """Per-command routing cost as the number of intents grows"""
+    import re
+    import random
+    from intents import IntentEngine
+
+    rng = random.Random(0)
+    commands = [
+        "what is 25 times 47",
+        "tell me about the history of rome",
+        "set a timer for intent42 minutes please",
+        "what's the weather like in paris tomorrow",
+        "play some music by the beatles",
+    ]
+
+    print("\n" + "=" * 50)
+    print("[BENCH] Intent routing cost per command")
+    print("=" * 50)
+    print(f"{'intents':>8} {'compiled':>12} {'linear scan':>12}")
+    for count in args.counts:
+        engine = IntentEngine()
+        linear = []
+        for i in range(count):
+            keywords = [f"intent{i}", f"word{rng.randrange(10 * count)}"]
+            pattern = rf"intent{i}\s+(?P<n>\d+)?"
+            engine.register(f"intent{i}", lambda m: m.name, keywords=keywords, patterns=[pattern])
+            linear.append((keywords, re.compile(pattern)))
+        engine.compile()
+
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            for command in commands:
+                engine.respond(command)
+        compiled = (time.perf_counter() - start) / (args.runs * len(commands))
+
+        # The old approach: keyword scan + regex for every intent, in order
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            for command in commands:
+                for keywords, regex in linear:
+                    if any(word in command for word in keywords) and regex.search(command):
+                        break
+        scan = (time.perf_counter() - start) / (args.runs * len(commands))
+
+        print(f"{count:>8} {compiled * 1e6:>9.1f} us {scan * 1e6:>9.1f} us")
+    print("=" * 50)
+    return 0
+
+
+def bench_math(args):
+    """Local math engine: corpus correctness and per-query latency"""
+    from corpora import MATH_CORPUS
+    from local_math import solve
+
+    failures = 0
+    timings = []
+    for query, expected in MATH_CORPUS:
+        solve(query)  # Warm up
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            answer = solve(query)
+        timings.append((time.perf_counter() - start) / args.runs)
+        if answer != expected:
+            failures += 1
+            print(f"[FAIL] {query!r}: got {answer!r}, expected {expected!r}")
+
+    timings.sort()
+    print("\n" + "=" * 50)
+    print("[BENCH] Local math engine")
+    print("=" * 50)
+    print(f"Corpus:  {len(MATH_CORPUS) - failures}/{len(MATH_CORPUS)} correct")
+    print(f"Median:  {statistics.median(timings) * 1e6:8.1f} us per query")
+    print(f"Slowest: {timings[-1] * 1e6:8.1f} us per query")
+    print("=" * 50)
+    if timings[-1] >= 0.001:
+        print("[FAIL] A query took a millisecond or more")
+        failures += 1
+    return 1 if failures else 0
+
+
+def bench_hedge(args):
+    """Sequential ChatGPT -> Gemini fallback vs. hedged racing, on flaky fake providers"""
+    import assistant_core
+    from fake_providers import FakeGemini, FakeOpenAI
+
+    assistant_core.AI_PROVIDER = "both"
+    assistant_core.USE_RESPONSE_CACHE = False
+    assistant_core.HEDGE_DELAY = args.hedge_delay
+
+    def run(hedge):
+        assistant_core.HEDGE_REQUESTS = hedge
+        assistant_core.HEDGER = None
+        assistant_core.OPENAI_CLIENT = FakeOpenAI(
+            first_token_delay=args.primary_delay, token_delay=0.0, failure_rate=args.failure_rate,
+            slow_rate=args.slow_rate, slow_delay=args.slow_delay, seed=1)
+        assistant_core.GEMINI_CLIENT = FakeGemini(
+            first_token_delay=args.secondary_delay, token_delay=0.0, failure_rate=args.failure_rate,
+            slow_rate=args.slow_rate, slow_delay=args.slow_delay, seed=2)
+        latencies, failures = [], 0
+        for i in range(args.runs):
+            start = time.perf_counter()
+            if not assistant_core.get_ai_response(f"Question number {i}"):
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+        return latencies, failures
+
+    results = {"sequential": run(False), "hedged": run(True)}
+
+    print("\n" + "=" * 50)
+    print("[BENCH] Sequential fallback vs. hedged requests")
+    print("=" * 50)
+    for mode, (latencies, failures) in results.items():
+        print(f"{mode:>10}: p50 {_ms(_percentile(latencies, 0.5))}  p95 {_ms(_percentile(latencies, 0.95))}"
+              f"  p99 {_ms(_percentile(latencies, 0.99))}  failed {failures}/{len(latencies)}")
+    for name, stats in assistant_core.get_provider_stats().items():
+        print(f"{name:>10}: {stats}")
+    print("=" * 50)
+    return 0
+
+
+# Modules that must not be loaded before the login window is shown
+STARTUP_FORBIDDEN = [
+    'speech', 'audio_capture', 'pyttsx3', 'speech_recognition', 'pyaudio',
+    'openai', 'google.genai', 'pvporcupine', 'pvrecorder', 'assistant_core', 'dotenv',
+]
+
+_STARTUP_CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+first_frame = None
+error = None
+try:
+    app = main.AssistantApp()
+    app.update_idletasks()
+    app.update()
+    first_frame = time.perf_counter()
+    app.destroy()
+except Exception as e:
+    error = str(e)
+print("STARTUP " + json.dumps({
+    "import_main": imported - start,
+    "first_frame": None if first_frame is None else first_frame - start,
+    "error": error,
+    "loaded": sorted(m for m in sys.modules if m.split('.')[0] in %r or m in %r),
+}))
+"""
+
+
+def _child_env(repo):
+    """Environment for a child interpreter that can import the repo from any cwd"""
+    import os
+    path = os.environ.get("PYTHONPATH")
+    return {**os.environ, "PYTHONPATH": repo + (os.pathsep + path if path else "")}
+
+
+def _import_breakdown(repo, cwd):
+    """Cumulative import time per top-level module for 'import main' (python -X importtime)"""
+    import subprocess
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=cwd, capture_output=True, text=True,
+        env=_child_env(repo),
+    )
+    totals = {}
+    for line in proc.stderr.splitlines():
+        parts = line[len("import time:"):].split("|")
+        if not line.startswith("import time:") or len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:  # main itself and what main imports directly
+            totals[name.strip()] = int(parts[1]) / 1e6
+    return totals
+
+
+def bench_startup(args):
+    """Cold start: import-time breakdown, time to first frame, lazy-import check"""
+    import json
+    import os
+    import subprocess
+    import tempfile
+
+    repo = os.path.dirname(os.path.abspath(__file__))
+    roots = sorted({m.split('.')[0] for m in STARTUP_FORBIDDEN})
+    child = _STARTUP_CHILD % (roots, STARTUP_FORBIDDEN)
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:  # Keep the test database out of the repo
+        breakdown = _import_breakdown(repo, tmp)
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            proc = subprocess.run([sys.executable, "-c", child], cwd=tmp, capture_output=True,
+                                  text=True, env=_child_env(repo))
+            wall = time.perf_counter() - start
+            line = next((l for l in proc.stdout.splitlines() if l.startswith("STARTUP ")), None)
+            if line is None:
+                print(f"[FAIL] Startup probe crashed:\n{proc.stderr[-2000:]}")
+                return 1
+            result = json.loads(line[len("STARTUP "):])
+            result["process"] = wall
+            runs.append(result)
+
+    print("\n" + "=" * 50)
+    print("[BENCH] Startup")
+    print("=" * 50)
+    print("Import time of modules loaded by 'import main':")
+    for name, seconds in sorted(breakdown.items(), key=lambda item: -item[1])[:12]:
+        print(f"  {name:<28} {_ms(seconds)}")
+    print(f"import main (median):        {_ms(statistics.median(r['import_main'] for r in runs))}")
+    print(f"Process wall time (median):  {_ms(statistics.median(r['process'] for r in runs))}")
+
+    failures = 0
+    frames = [r["first_frame"] for r in runs if r["first_frame"] is not None]
+    if frames:
+        first_frame = statistics.median(frames)
+        print(f"Time to first frame:         {_ms(first_frame)}  (budget {args.budget_ms:.0f} ms)")
+        if first_frame * 1000 > args.budget_ms:
+            print("[FAIL] First frame is over budget")
+            failures += 1
+    else:
+        print(f"Time to first frame:         skipped ({runs[0]['error']})")
+
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+    if loaded:
+        print(f"[FAIL] Loaded before login: {', '.join(loaded)}")
+        failures += 1
+    else:
+        print("[OK] No speech, AI or assistant modules loaded before login")
+    print("=" * 50)
+    return 1 if failures else 0
+
+
+TURN_QUERIES = [
+    "what is 12 times 7",
+    "what time is it",
+    "tell me about the moon",
+    "how far away is the sun",
+    "convert 5 miles to kilometers",
+    "tell me about the moon",  # Repeated: answered from the cache
+]
+
+
+def bench_turns(args):
+    """Per-stage latency percentiles over simulated turns, with provider/cache attribution"""
+    import os
+    import tempfile
+    import assistant_core
+    import tracing
+    from fake_providers import FakeOpenAI
+
+    assistant_core.AI_PROVIDER = "openai"
+    assistant_core.OPENAI_CLIENT = FakeOpenAI(
+        first_token_delay=args.first_token_delay,
+        token_delay=args.token_delay,
+    )
+    tmp = tempfile.mkdtemp()
+    assistant_core.RESPONSE_CACHE = None
+    assistant_core.RESPONSE_CACHE_DB = os.path.join(tmp, "cache.db")
+    trace_file = args.trace_file or os.path.join(tmp, "trace.jsonl")
+    tracer = tracing.configure(trace_file)
+
+    def speak(sentence):
+        time.sleep(args.speak_delay)
+
+    for i in range(args.runs):
+        with tracing.turn("bench"):
+            # Stand-ins for the microphone and recognizer
+            with tracing.span("listen"):
+                time.sleep(args.listen_delay)
+            with tracing.span("recognize", engine="fake"):
+                time.sleep(args.recognize_delay)
+            assistant_core.respond(TURN_QUERIES[i % len(TURN_QUERIES)], speak)
+    tracing.configure(None)  # Flush/close the exporter
+
+    print("\n" + "=" * 72)
+    print(f"[BENCH] Per-stage latency over {args.runs} turns (exported to {trace_file})")
+    print("=" * 72)
+    print(f"{'stage':<20}{'count':>7}{'p50':>11}{'p95':>11}{'p99':>11}{'max':>11}")
+    for name, h in sorted(tracer.summary().items()):
+        print(f"{name:<20}{h['count']:>7}{h['p50_ms']:>8.1f} ms{h['p95_ms']:>8.1f} ms"
+              f"{h['p99_ms']:>8.1f} ms{h['max_ms']:>8.1f} ms")
+
+    exported = tracing.load_turns(trace_file)
+    print("-" * 72)
+    print("first_audio by provider (from the exported file):")
+    for provider, stages in sorted(tracing.summarize(exported, by="provider").items()):
+        first = stages.get('first_audio', {'count': 0})
+        if first['count']:
+            print(f"  {provider:<18}{first['count']:>7}{first['p50_ms']:>8.1f} ms{first['p95_ms']:>8.1f} ms")
+    print("=" * 72)
+
+    if len(exported) != args.runs:
+        print(f"[FAIL] Exported {len(exported)} turns, expected {args.runs}")
+        return 1
+    print("[OK] Every turn was traced and exported")
+    return 0
+
+
+def _load_corpus(directory):
+    """(wav path, reference transcript) pairs - each foo.wav needs a foo.txt next to it"""
+    import glob
+    import os
+    corpus = []
+    for wav_path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        txt_path = os.path.splitext(wav_path)[0] + ".txt"
+        if not os.path.exists(txt_path):
+            print(f"[WARN] No transcript for {wav_path} - skipped")
+            continue
+        with open(txt_path, encoding="utf-8") as f:
+            corpus.append((wav_path, f.read().strip()))
+    return corpus
+
+
+def bench_stt(args):
+    """Word error rate and endpoint-to-transcript latency of each speech backend"""
+    import speech
+    from audio_capture import CaptureSession, PCMSource
+    from recognizers import create_recognizer, word_errors
+
+    corpus = _load_corpus(args.corpus)
+    if not corpus:
+        print(f"[FAIL] No WAV files with transcripts in {args.corpus}")
+        return 1
+
+    results = {}
+    for backend in args.backends:
+        kwargs = {'model_path': args.vosk_model} if backend == "vosk" and args.vosk_model else {}
+        recognizer = create_recognizer(backend, **kwargs)
+        try:
+            load_start = time.perf_counter()
+            recognizer.load()
+            load_time = time.perf_counter() - load_start
+        except Exception as e:
+            print(f"[WARN] {backend} unavailable: {e}")
+            continue
+
+        errors = words = failures = 0
+        finalize_times, first_partials, audio_seconds, wall_seconds = [], [], 0.0, 0.0
+        for wav_path, reference in corpus:
+            source = PCMSource.from_wav(wav_path, realtime=args.realtime)
+            session = CaptureSession(source, backlog_seconds=2.0 if args.realtime else None).start()
+            stream = recognizer.start(session.sample_rate, session.sample_width)
+            start = time.perf_counter()
+            first_partial = None
+
+            def on_frame(frame):
+                nonlocal first_partial
+                if stream.accept(frame) and first_partial is None:
+                    first_partial = time.perf_counter() - start
+
+            session.listen(timeout=None, phrase_time_limit=speech.PHRASE_TIME_LIMIT,
+                           endpointer=speech.create_endpointer(session), flush=False, on_frame=on_frame)
+            endpoint = time.perf_counter()
+            try:
+                hypothesis = stream.result() or ""
+            except Exception as e:
+                print(f"[WARN] {backend} failed on {wav_path}: {e}")
+                hypothesis = ""
+                failures += 1
+            finalize_times.append(time.perf_counter() - endpoint)
+            wall_seconds += time.perf_counter() - start
+            audio_seconds += len(source.pcm) / (source.sample_rate * source.sample_width)
+            session.stop()
+            if first_partial is not None:
+                first_partials.append(first_partial)
+
+            file_errors, file_words = word_errors(reference, hypothesis)
+            errors += file_errors
+            words += file_words
+            if args.verbose:
+                print(f"  [{backend}] {wav_path}: '{hypothesis}' ({file_errors}/{file_words} errors)")
+
+        results[backend] = {
+            'wer': errors / words if words else 0.0,
+            'finalize_p50': statistics.median(finalize_times),
+            'finalize_p95': _percentile(finalize_times, 0.95),
+            'first_partial': statistics.median(first_partials) if first_partials else None,
+            'rtf': wall_seconds / audio_seconds if audio_seconds else 0.0,
+            'load': load_time,
+            'failures': failures,
+        }
+
+    print("\n" + "=" * 78)
+    print(f"[BENCH] Speech recognition on {len(corpus)} files "
+          + ("(real-time playback)" if args.realtime else "(as fast as possible)"))
+    print("=" * 78)
+    print(f"{'backend':<10}{'WER':>8}{'endpoint->text p50':>21}{'p95':>12}{'1st partial':>14}{'RTF':>7}{'fails':>6}")
+    for backend, r in results.items():
+        partial = _ms(r['first_partial']) if r['first_partial'] is not None else "       -   "
+        print(f"{backend:<10}{r['wer'] * 100:>7.1f}%{_ms(r['finalize_p50']):>21}{_ms(r['finalize_p95']):>12}"
+              f"{partial:>14}{r['rtf']:>7.2f}{r['failures']:>6}")
+    print("=" * 78)
+    print("endpoint->text: time from end of speech detection to the final transcript")
+    return 0 if results else 1
+
+
+def _endpoint_fixtures(args):
+    """(name, pcm, sample_rate, speech_end) from a fixture folder or synthesized"""
+    from fake_providers import load_endpoint_fixtures, synthetic_utterance, write_endpoint_fixtures
+
+    if args.corpus:
+        return load_endpoint_fixtures(args.corpus)
+
+    fixtures = []
+    for i in range(args.count):
+        pcm, _start, speech_end = synthetic_utterance(seed=args.seed + i, words=3 + i % 8)
+        fixtures.append((f"synthetic-{i:03d}", pcm, 16000, speech_end))
+    if args.write_fixtures:
+        write_endpoint_fixtures(args.write_fixtures, fixtures)
+        print(f"[INFO] Wrote {len(fixtures)} fixtures to {args.write_fixtures}")
+    return fixtures
+
+
+def bench_endpoint(args):
+    """Fixed 1.5 s pause vs. VAD endpointing: delay after the last word and early cuts"""
+    import itertools
+    import speech
+    from fake_providers import evaluate_endpointer
+    from vad import Endpointer
+
+    fixtures = _endpoint_fixtures(args)
+    if not fixtures:
+        print("[FAIL] No endpointing fixtures")
+        return 1
+
+    configs = [
+        ("fixed 1.5 s pause", lambda fs: Endpointer.fixed(fs, speech.PAUSE_THRESHOLD)),
+        ("VAD (defaults)", lambda fs: Endpointer(
+            fs, trailing_silence=speech.ENDPOINT_SILENCE, max_trailing_silence=speech.MAX_ENDPOINT_SILENCE)),
+    ]
+    if args.tune:
+        for trailing, factor, short, short_silence in itertools.product(
+                (0.25, 0.3, 0.35, 0.4), (0.0, 1.3), (0.5, 1.0), (0.5, 0.6)):
+            configs.append((
+                f"trail={trailing} pause_x={factor} short={short}/{short_silence}",
+                lambda fs, t=trailing, f=factor, su=short, ss=short_silence: Endpointer(
+                    fs, trailing_silence=t, pause_factor=f, short_utterance=su,
+                    short_utterance_silence=ss, max_trailing_silence=speech.MAX_ENDPOINT_SILENCE)))
+
+    rows = []
+    for label, make in configs:
+        delays, early = evaluate_endpointer(fixtures, make)
+        p50 = statistics.median(delays) if delays else float("nan")
+        p95 = _percentile(delays, 0.95) if delays else float("nan")
+        rows.append((label, p50, p95, early))
+
+    print("\n" + "=" * 78)
+    print(f"[BENCH] Endpointing on {len(fixtures)} " + ("recorded" if args.corpus else "synthetic") + " utterances")
+    print("=" * 78)
+    print(f"{'rules':<44}{'delay p50':>11}{'p95':>12}{'cut early':>11}")
+    for label, p50, p95, early in rows[:2] if args.tune else rows:
+        print(f"{label:<44}{_ms(p50)}{_ms(p95):>12}{early:>11}")
+    if args.tune:
+        print("-" * 78)
+        print("Best tuned rules (fewest early cuts, then lowest median delay):")
+        for label, p50, p95, early in sorted(rows[2:], key=lambda row: (row[3], row[1]))[:8]:
+            print(f"{label:<44}{_ms(p50)}{_ms(p95):>12}{early:>11}")
+    print("=" * 78)
+
+    _label, vad_p50, _p95, vad_early = rows[1]
+    if vad_early > args.max_early_rate * len(fixtures):
+        print(f"[FAIL] VAD endpointing cut {vad_early}/{len(fixtures)} utterances before the last word")
+        return 1
+    if vad_p50 > args.target_ms / 1000:
+        print(f"[FAIL] Median endpoint delay {vad_p50 * 1000:.0f} ms is over {args.target_ms:.0f} ms")
+        return 1
+    print(f"[OK] Median endpoint delay {vad_p50 * 1000:.0f} ms, {vad_early}/{len(fixtures)} cut early")
+    return 0
+
+
+def _mix(*tracks):
+    """Sum 16-bit PCM tracks (padded to the longest), clipping to the int16 range"""
+    from array import array
+    arrays = []
+    for pcm in tracks:
+        samples = array('h')
+        samples.frombytes(pcm)
+        arrays.append(samples)
+    length = max(len(a) for a in arrays)
+    mixed = array('h', bytes(2 * length))
+    for samples in arrays:
+        for i, value in enumerate(samples):
+            mixed[i] = max(-32768, min(32767, mixed[i] + value))
+    return mixed.tobytes()
+
+
+def bench_bargein(args):
+    """Time from the user starting to talk over a reply until playback stops; echo false triggers"""
+    import speech
+    from audio_capture import CaptureSession, PCMSource
+    from barge_in import BargeInMonitor, EchoGate
+    from fake_providers import FakeAudioPlayer, FakeTTSEngine, synthetic_utterance
+
+    reply = " ".join(["This is a long answer that keeps going for a while."] * 6)
+    detect_times, stop_times, false_triggers = [], [], 0
+    gate = None  # Shared across replies like in the assistant
+    for i in range(args.runs):
+        # Our own voice through the speakers from 0.5 s, the user cutting in at user_at
+        echo, _s, _e = synthetic_utterance(seed=100 + i, words=24, lead_silence=0.5,
+                                           trail_silence=1.0, level=args.echo_level)
+        talk_over = i % 4 != 3  # Every 4th run is echo only (must not trigger)
+        tracks = [echo]
+        user_at = args.user_at
+        if talk_over:
+            user, user_at, _e = synthetic_utterance(seed=200 + i, words=4, lead_silence=args.user_at,
+                                                    trail_silence=0.5)
+            tracks.append(user)
+
+        # Speech is rendered to WAV and played in short buffers, so it stops within one buffer;
+        # --engine speaks with the engine instead, which can only stop at the next word
+        player = None if args.engine else FakeAudioPlayer()
+        worker = speech.TTSWorker(lambda: FakeTTSEngine(init_delay=0, word_delay=args.word_delay),
+                                  player=player, chunked=not args.engine)
+        worker.wait_ready()
+        session = CaptureSession(PCMSource(_mix(*tracks), realtime=True)).start()
+        started = time.perf_counter()
+        utterance = worker.submit(reply)
+        gate = gate or EchoGate(session.frame_seconds)
+        with BargeInMonitor(session, gate, on_barge_in=worker.interrupt) as barge:
+            barge.triggered.wait(user_at + 2.0)
+            detected = time.perf_counter()
+            utterance.wait(2.0 if barge.triggered.is_set() else 0)
+            stopped = player.finished[-1] if player and player.finished else time.perf_counter()
+        worker.interrupt()
+        session.stop()
+        worker.shutdown(1.0)
+
+        if not talk_over:
+            false_triggers += barge.triggered.is_set()
+            continue
+        if barge.triggered.is_set():
+            detect_times.append(detected - started - user_at)
+            stop_times.append(stopped - started - user_at)
+
+    talk_runs = args.runs - args.runs // 4
+    print("\n" + "=" * 60)
+    print(f"[BENCH] Barge-in over {args.runs} replies"
+          + (f" (engine, word callbacks every {args.word_delay * 1000:.0f} ms)" if args.engine else " (WAV playback)"))
+    print("=" * 60)
+    print(f"Detected:                    {len(detect_times)}/{talk_runs}")
+    if detect_times:
+        print(f"User speech -> detected p50: {_ms(statistics.median(detect_times))}"
+              f"  p95 {_ms(_percentile(detect_times, 0.95))}")
+        print(f"User speech -> silence  p50: {_ms(statistics.median(stop_times))}"
+              f"  p95 {_ms(_percentile(stop_times, 0.95))}")
+    print(f"False triggers on echo only: {false_triggers}/{args.runs // 4}")
+    print("=" * 60)
+    if false_triggers or len(detect_times) < talk_runs:
+        print("[FAIL] Barge-in missed the user or triggered on our own voice")
+        return 1
+    if statistics.median(stop_times) * 1000 > args.target_ms:
+        print(f"[FAIL] Speech took {statistics.median(stop_times) * 1000:.0f} ms to stop (target {args.target_ms:.0f} ms)")
+        return 1
+    print(f"[OK] Speech stops {statistics.median(stop_times) * 1000:.0f} ms after the user starts talking (p50)")
+    return 0
+
+
+# Span -> pipeline stage. An abandoned AI request ends its "ai" span after the turn
+# was exported, so the "route" span (done as the request starts) marks that stage
+STOP_STAGES = {"listen": "listen", "recognize": "recognize", "route": "ai", "ai": "ai", "speak": "speak"}
+
+
+def _stage_at(turns, at):
+    """The pipeline stage most recently entered before at (perf_counter seconds), or None"""
+    started = [(span.start, STOP_STAGES[span.name]) for turn in turns for span in turn.spans
+               if span.name in STOP_STAGES and span.start <= at]
+    return max(started)[1] if started else None
+
+
+def bench_stop(args):
+    """Time from request_stop() until the assistant thread has exited, stopped at random points of a turn"""
+    import random
+    import threading
+    import assistant_core
+    import recognizers
+    import speech
+    import tracing
+    from audio_capture import CaptureSession, PCMSource
+    from fake_providers import FakeOpenAI, FakeRecognizer, FakeTTSEngine, synthetic_utterance
+
+    # Listening, a slow recognizer, a slow first token and long speech - every stage can be in flight
+    recognizers.BACKENDS['fake'] = lambda: FakeRecognizer(delay=args.recognize_delay)
+    speech.STT_BACKEND = "fake"
+    assistant_core.AI_PROVIDER = "openai"
+    assistant_core.USE_RESPONSE_CACHE = False
+    assistant_core.OPENAI_CLIENT = FakeOpenAI(first_token_delay=args.first_token_delay, token_delay=0.05)
+
+    rng = random.Random(args.seed)
+    pcm = b"".join(synthetic_utterance(seed=300 + i, words=5, lead_silence=0.5, trail_silence=1.0)[0]
+                   for i in range(8))
+    latencies, stages = [], []
+    for i in range(args.runs):
+        tracer = tracing.configure(None)  # Spans of this trial only
+        assistant_core.reset_stop()
+        speech._recognizer = None
+        speech._capture_session = CaptureSession(PCMSource(pcm, realtime=True)).start()
+        speech._worker = speech.TTSWorker(lambda: FakeTTSEngine(init_delay=0, word_delay=args.word_delay))
+        speech._worker.wait_ready()
+
+        thread = threading.Thread(target=assistant_core.run_simple_mode, args=(False,), daemon=True)
+        thread.start()
+        time.sleep(rng.uniform(0.5, args.max_stop_at))
+        assistant_core.request_stop()
+        thread.join(args.budget_ms / 1000 * 5)
+        token = assistant_core.get_stop_token()
+        latencies.append(time.perf_counter() - token.cancelled_at if not thread.is_alive() else float('inf'))
+        stages.append(_stage_at(tracer.recent, token.cancelled_at))
+
+        speech.close_capture_session()
+        speech._worker.shutdown(1.0)
+
+    finished = [t for t in latencies if t != float('inf')]
+    print("\n" + "=" * 60)
+    print(f"[BENCH] Stop latency over {args.runs} runs (stopped 0.5-{args.max_stop_at:.0f} s into the session)")
+    print("=" * 60)
+    print(f"Stopped:        {len(finished)}/{args.runs}")
+    counts = [(stage or "startup", stages.count(stage)) for stage in ("listen", "recognize", "ai", "speak", None)]
+    print("Stopped during: " + ", ".join(f"{stage} {count}" for stage, count in counts if count))
+    if finished:
+        print(f"Stop -> exit p50: {_ms(statistics.median(finished))}")
+        print(f"Stop -> exit p95: {_ms(_percentile(finished, 0.95))}")
+        print(f"Stop -> exit max: {_ms(max(finished))}")
+    print("=" * 60)
+    if None in stages:
+        print(f"[FAIL] {stages.count(None)} stops came before the assistant started listening")
+        return 1
+    if len(finished) < args.runs or max(finished) * 1000 > args.budget_ms:
+        print(f"[FAIL] The assistant did not stop within {args.budget_ms:.0f} ms")
+        return 1
+    print(f"[OK] Every stop finished within {args.budget_ms:.0f} ms")
+    return 0
+
+
+def bench_memory(args):
+    """Prompt size and request latency over a long session, budgeted memory vs. the full history"""
+    import contextlib
+    import io
+    import random
+    import assistant_core
+    from conversation import ConversationMemory, count_tokens
+    from corpora import synthetic_turn
+    from fake_providers import FakeOpenAI
+
+    rng = random.Random(args.seed)
+    turns = [synthetic_turn(rng, i) for i in range(args.turns)]
+    system = assistant_core.SYSTEM_PROMPT
+    memory = ConversationMemory(args.budget, args.summary_tokens)
+    full = ConversationMemory(budget_tokens=float('inf'))
+    checkpoints = sorted({10, 100, args.turns // 2, args.turns})
+    client = FakeOpenAI(first_token_delay=0, token_delay=0, prompt_token_delay=args.prompt_token_delay)
+
+    sizes, build_times, rows = [], [], []
+    for i, (question, answer) in enumerate(turns, 1):
+        start = time.perf_counter()
+        tokens = memory.prompt_tokens(system, question)
+        build_times.append(time.perf_counter() - start)
+        sizes.append(tokens)
+        if i in checkpoints:
+            latency = {}
+            for name, store in (("memory", memory), ("full", full)):
+                start = time.perf_counter()
+                client.chat.completions.create(messages=store.messages(system, question))
+                latency[name] = (time.perf_counter() - start, client.last_prompt_tokens)
+            rows.append((i, latency))
+        memory.add(question, answer)
+        full.add(question, answer)
+
+    # The same session through the assistant's AI path (history threaded into every request)
+    assistant_core.AI_PROVIDER = "openai"
+    assistant_core.USE_RESPONSE_CACHE = False
+    assistant_core.OPENAI_CLIENT = client
+    assistant_core.reset_conversation()
+    ai_times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for question, _answer in turns:
+            start = time.perf_counter()
+            assistant_core.get_ai_response(question)
+            ai_times.append(time.perf_counter() - start)
+    history = assistant_core.get_conversation()
+
+    bound = (memory.prompt_tokens(system, "") + args.budget + args.summary_tokens
+             + max(count_tokens(q) for q, _a in turns))
+    print("\n" + "=" * 68)
+    print(f"[BENCH] Conversation memory over {args.turns} turns "
+          f"(budget {args.budget} + summary {args.summary_tokens} tokens)")
+    print("=" * 68)
+    print(f"{'turn':>6}{'memory tokens':>16}{'memory req':>14}{'full tokens':>14}{'full req':>14}")
+    for i, latency in rows:
+        print(f"{i:>6}{latency['memory'][1]:>16}{_ms(latency['memory'][0]):>14}"
+              f"{latency['full'][1]:>14}{_ms(latency['full'][0]):>14}")
+    print("-" * 68)
+    print(f"Prompt tokens with memory: max {max(sizes)}, last {sizes[-1]} (bound {bound})")
+    print(f"Building a prompt:         p50 {_ms(statistics.median(build_times))}"
+          f"  max {_ms(max(build_times))}")
+    first, last = ai_times[:100], ai_times[-100:]
+    print(f"AI request, turns 1-100:   p50 {_ms(statistics.median(first))}")
+    print(f"AI request, last 100:      p50 {_ms(statistics.median(last))}")
+    print(f"Kept verbatim at the end:  {len(history)} turns, summary {len(history.summary)} chars")
+    print("=" * 68)
+    if max(sizes) > bound:
+        print("[FAIL] Prompt size grew past the memory budget")
+        return 1
+    print("[OK] Prompt size stayed bounded")
+    return 0
+
+
+def bench_replay(args):
+    """Full assistant loop on recorded (or synthetic) commands with fake STT/AI/TTS; per-stage report"""
+    import replay
+    from fake_providers import synthetic_utterance
+
+    if args.wavs:
+        recordings = replay.load_recordings(args.wavs)
+    else:
+        recordings = []
+        for i in range(args.count):
+            pcm, _start, _end = synthetic_utterance(seed=400 + i, words=5, lead_silence=0.2, trail_silence=0.8)
+            recordings.append((f"command_{i:03d}.wav", pcm, 16000, TURN_QUERIES[i % len(TURN_QUERIES)]))
+        if args.write_fixtures:
+            replay.write_recordings(args.write_fixtures, recordings)
+            print(f"[INFO] Wrote {len(recordings)} recordings to {args.write_fixtures}")
+    if not recordings:
+        print("[FAIL] No recordings to replay")
+        return 1
+
+    harness = replay.ReplayHarness(
+        recordings,
+        recognize_delay=args.recognize_delay,
+        first_token_delay=args.first_token_delay,
+        token_delay=args.token_delay,
+        speak_delay=args.speak_delay,
+        word_delay=args.word_delay,
+        stream=not args.no_stream,
+        barge_in=args.barge_in,
+        trace_file=args.trace_file,
+    )
+    report = harness.run()
+    comparison = None
+    if args.baseline:
+        comparison = replay.compare_reports(replay.load_report(args.baseline), report, args.tolerance)
+    replay.print_report(report, comparison)
+    if args.report:
+        replay.save_report(report, args.report)
+        print(f"[INFO] Report saved to {args.report}")
+
+    if report['answered'] < len(recordings):
+        print(f"[FAIL] Only {report['answered']}/{len(recordings)} recordings were answered")
+        return 1
+    if comparison and any(row[-1] for row in comparison):
+        print(f"[FAIL] Latency regressed by more than {args.tolerance:.0%} against {args.baseline}")
+        return 1
+    print(f"[OK] All {len(recordings)} recordings were answered")
+    return 0
+
+
+LOAD_QUERIES = [
+    "tell me about the moon",
+    "how do airplanes fly",
+    "who painted the mona lisa",
+    "what is 15 percent of 80",  # Answered locally
+    "explain photosynthesis",
+    "what causes the seasons",
+    "and why is that?",  # Follow-up (uses the session's history)
+    "what time is it",  # Answered locally
+]
+
+
+def _use_stand_in(args):
+    """
+    Point the assistant core at the local provider stand-in (started here
+    unless args.base_url is given) through the real SDK clients.
+    Returns (server or None, base_url); base_url is None if the SDK is missing.
+    """
+    import os
+    import assistant_core
+    import tracing
+    from provider_server import ProviderServer
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        server = ProviderServer(args.profile, seed=args.seed).start()
+        base_url = server.openai_base_url if args.provider == "openai" else server.gemini_base_url
+    os.environ.setdefault('OPENAI_API_KEY', "stand-in")
+    os.environ.setdefault('GEMINI_API_KEY', "stand-in")
+    assistant_core.load_environment()
+    assistant_core.AI_PROVIDER = args.provider
+    assistant_core.OPENAI_BASE_URL = base_url
+    assistant_core.GEMINI_BASE_URL = base_url
+    assistant_core.OPENAI_CLIENT = assistant_core.GEMINI_CLIENT = None
+    assistant_core.USE_RESPONSE_CACHE = args.cache
+    tracing.configure(None)
+    client = assistant_core.init_openai() if args.provider == "openai" else assistant_core.init_gemini()
+    if client is None:
+        print(f"[FAIL] Could not create the {args.provider} client (is the SDK installed?)")
+        if server:
+            server.stop()
+        return None, None
+    return server, base_url
+
+
+def _load_session(assistant_core, tracing, deadline, turns, think_time, seed, results):
+    """One simulated user: its own conversation, commands until the deadline/turn count"""
+    import random
+    rng = random.Random(seed)
+    assistant_core.start_session()
+    done = 0
+    while time.perf_counter() < deadline and (not turns or done < turns):
+        command = rng.choice(LOAD_QUERIES)
+        start = time.perf_counter()
+        with tracing.turn("load") as turn:
+            answer = assistant_core.process_command(command)
+        results.append((time.perf_counter() - start, bool(answer) and 'provider' in turn.attrs,
+                        turn.attrs.get('provider')))
+        done += 1
+        if think_time:
+            time.sleep(rng.uniform(0, 2 * think_time))
+
+
+def bench_load(args):
+    """Concurrent sessions through process_command against the local provider stand-in"""
+    import contextlib
+    import io
+    import threading
+    import assistant_core
+    import tracing
+
+    server, base_url = _use_stand_in(args)
+    if base_url is None:
+        return 1
+
+    print("\n" + "=" * 78)
+    print(f"[BENCH] {args.provider} load via {base_url} (profile {args.profile if server else 'external'},"
+          f" {args.duration:.0f} s per level)")
+    print("=" * 78)
+    print(f"{'sessions':>8}{'requests':>10}{'req/s':>9}{'errors':>8}{'p50':>11}{'p95':>11}{'p99':>11}{'max':>11}")
+    worst_error_rate = 0.0
+    for sessions in args.sessions:
+        results = []
+        deadline = time.perf_counter() + args.duration
+        threads = [threading.Thread(target=_load_session, daemon=True,
+                                    args=(assistant_core, tracing, deadline, args.turns, args.think_time,
+                                          args.seed * 1000 + i, results))
+                   for i in range(sessions)]
+        before = server.stats() if server else None
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - started
+        latencies = [r[0] for r in results]
+        errors = sum(1 for r in results if not r[1])
+        worst_error_rate = max(worst_error_rate, errors / len(results) if results else 1.0)
+        if not latencies:
+            print(f"{sessions:>8}{0:>10}")
+            continue
+        print(f"{sessions:>8}{len(results):>10}{len(results) / elapsed:>9.1f}{errors:>8}"
+              f"{_ms(statistics.median(latencies)):>11}{_ms(_percentile(latencies, 0.95)):>11}"
+              f"{_ms(_percentile(latencies, 0.99)):>11}{_ms(max(latencies)):>11}")
+        if server:
+            after = server.stats()
+            print(f"{'':>8}  server: {after['requests'] - before['requests']} requests,"
+                  f" {after['rate_limited'] - before['rate_limited']} rate-limited,"
+                  f" {after['errors'] - before['errors']} failed, max {after['max_in_flight']} in flight")
+    print("=" * 78)
+    if server:
+        server.stop()
+    if worst_error_rate > args.max_error_rate:
+        print(f"[FAIL] {worst_error_rate:.0%} of commands fell back to the offline answers")
+        return 1
+    return 0
+
+
+async def _server_session(port, turns, think_time, seed, results):
+    """One client of the assistant server: create a session, send commands over a keep-alive connection"""
+    import random
+    from assistant_server import ServerClient
+    rng = random.Random(seed)
+    client = await ServerClient(port=port).connect()
+    try:
+        status, session = await client.request("POST", "/sessions")
+        if status != 201:
+            results.append((0.0, False))
+            return
+        for _ in range(turns):
+            start = time.perf_counter()
+            status, reply = await client.request("POST", f"/sessions/{session['session']}/command",
+                                                 {"text": rng.choice(LOAD_QUERIES)})
+            results.append((time.perf_counter() - start, status == 200 and bool(reply.get('provider'))))
+            if think_time:
+                await asyncio.sleep(rng.uniform(0, 2 * think_time))
+        await client.request("DELETE", f"/sessions/{session['session']}")
+    except (ConnectionError, ValueError, IndexError):
+        results.append((0.0, False))
+    finally:
+        await client.close()
+
+
+def bench_server(args):
+    """Throughput of the headless server with hundreds of concurrent sessions against the stand-in"""
+    import contextlib
+    import io
+    from assistant_server import AssistantServer
+
+    provider, base_url = _use_stand_in(args)
+    if base_url is None:
+        return 1
+    with contextlib.redirect_stdout(io.StringIO()):
+        server = AssistantServer(port=0, workers=args.workers).start()
+
+    async def run_level(sessions):
+        results = []
+        await asyncio.gather(*(_server_session(server.port, args.turns, args.think_time,
+                                               args.seed * 1000 + i, results) for i in range(sessions)))
+        return results
+
+    print("\n" + "=" * 78)
+    print(f"[BENCH] Assistant server, {args.turns} commands per session, {server.workers} workers"
+          f" (provider profile {args.profile if provider else 'external'})")
+    print("=" * 78)
+    print(f"{'sessions':>8}{'commands':>10}{'cmd/s':>9}{'errors':>8}{'p50':>11}{'p95':>11}{'p99':>11}{'overlap':>10}")
+    failed = 0
+    for sessions in args.sessions:
+        before = provider.stats() if provider else None
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = asyncio.run(run_level(sessions))
+        elapsed = time.perf_counter() - started
+        latencies = [r[0] for r in results if r[1]]
+        errors = sum(1 for r in results if not r[1])
+        failed += errors
+        if not latencies:
+            print(f"{sessions:>8}{len(results):>10}{'':>9}{errors:>8}")
+            continue
+        # Commands in flight on average: throughput x latency (1.0 = fully serialized)
+        overlap = len(latencies) / elapsed * statistics.mean(latencies)
+        print(f"{sessions:>8}{len(results):>10}{len(results) / elapsed:>9.1f}{errors:>8}"
+              f"{_ms(statistics.median(latencies)):>11}{_ms(_percentile(latencies, 0.95)):>11}"
+              f"{_ms(_percentile(latencies, 0.99)):>11}{overlap:>10.1f}")
+        if provider:
+            after = provider.stats()
+            print(f"{'':>8}  provider: {after['requests'] - before['requests']} requests,"
+                  f" max {after['max_in_flight']} in flight")
+    print("=" * 78)
+    server.stop()
+    if provider:
+        provider.stop()
+    if failed:
+        print(f"[FAIL] {failed} commands failed")
+        return 1
+    print("[OK] Every command was answered")
+    return 0
+
+
+def _legacy_login(path, email, password_hash):
+    """The login as it was: a fresh connection, SELECT, compare, UPDATE, commit"""
+    import sqlite3
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute("SELECT password_hash FROM users WHERE email = ?", (email,)).fetchone()
+        if row and row[0] == password_hash:
+            conn.execute("UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE email = ?", (email,))
+            conn.commit()
+            return "ok"
+        return "wrong_password" if row else "not_found"
+    finally:
+        conn.close()
+
+
+def _run_logins(login, users, logins, threads, seed):
+    """Spread logins over threads; returns (latencies, errors, elapsed)"""
+    import concurrent.futures
+    import random
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        latencies, errors = [], 0
+        for _ in range(logins // threads):
+            email, password_hash = users[rng.randrange(len(users))]
+            start = time.perf_counter()
+            try:
+                if login(email, password_hash) != "ok":
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+        return latencies, errors
+
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(worker, range(threads)))
+    elapsed = time.perf_counter() - started
+    return [l for r in results for l in r[0]], sum(r[1] for r in results), elapsed
+
+
+def bench_users(args):
+    """Login latency/throughput of the pooled WAL user store vs. a connection per call"""
+    import hashlib
+    import os
+    import sqlite3
+    import tempfile
+    import user_store
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "users.db")
+    legacy_path = os.path.join(directory, "users_legacy.db")
+    store = user_store.UserStore(path, pool_size=args.pool_size)
+
+    # Same digest as main.hash_password - the benchmark is about the database, not the hash
+    users = [(f"user{i}@example.com", hashlib.sha256(f"password{i}".encode()).hexdigest())
+             for i in range(args.users)]
+    started = time.perf_counter()
+    with store.pool.transaction() as conn:
+        conn.executemany(user_store.SQL_INSERT_USER, users)
+    populate = time.perf_counter() - started
+
+    # The baseline gets an identical copy in the old rollback-journal mode
+    with sqlite3.connect(legacy_path) as legacy, store.pool.connection() as conn:
+        conn.backup(legacy)
+        legacy.execute("PRAGMA journal_mode = DELETE")
+    legacy.close()
+
+    started = time.perf_counter()
+    user_store.UserStore(path).close()
+    reopen = time.perf_counter() - started
+    plan = store.query_plan(user_store.SQL_LOGIN, ("", ""))
+    indexed = all("INDEX" in step for step in plan)
+
+    print("\n" + "=" * 74)
+    print(f"[BENCH] User database, {args.users} users, {args.logins} logins per run")
+    print(f"[BENCH] Inserted in {populate:.2f} s; reopen (migrations up to date) {reopen * 1000:.1f} ms")
+    print(f"[BENCH] Login plan: {'; '.join(plan)}")
+    print("=" * 74)
+    print(f"{'approach':<18}{'threads':>8}{'logins/s':>10}{'errors':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    approaches = [
+        ("connect per call", lambda email, h: _legacy_login(legacy_path, email, h)),
+        ("pooled WAL", store.login),
+    ]
+    errors = 0
+    for threads in args.threads:
+        for name, login in approaches:
+            latencies, failed, elapsed = _run_logins(login, users, args.logins, threads, args.seed)
+            if name == "pooled WAL":
+                errors += failed
+            print(f"{name:<18}{threads:>8}{len(latencies) / elapsed:>10.0f}{failed:>8}"
+                  f"{_ms(statistics.median(latencies)):>10}{_ms(_percentile(latencies, 0.95)):>10}"
+                  f"{_ms(_percentile(latencies, 0.99)):>10}")
+    print("=" * 74)
+    store.close()
+    if not indexed:
+        print("[FAIL] The login statement does not use an index")
+        return 1
+    if errors:
+        print(f"[FAIL] {errors} pooled logins failed")
+        return 1
+    print("[OK] Every pooled login succeeded using the email index")
+    return 0
+
+
+def _ui_loop(start_login, logins, interval, tick=0.01):
+    """
+    A stand-in for the Tk event loop: ticks every tick seconds and starts a
+    login every interval; start_login() returns a future to poll, or None
+    if it ran inline. Returns the tick gaps (s) - anything over tick is a stall.
+    """
+    gaps, pending, started = [], [], 0
+    next_login = time.perf_counter()
+    last = time.perf_counter()
+    while started < logins or pending:
+        now = time.perf_counter()
+        gaps.append(now - last)
+        last = now
+        pending = [f for f in pending if not f.done()]
+        if started < logins and now >= next_login:
+            future = start_login(started)
+            started += 1
+            next_login = now + interval
+            if future is not None:
+                pending.append(future)
+        time.sleep(tick)
+    return gaps
+
+
+def bench_auth(args):
+    """Salted-hash login throughput on the auth workers and GUI-thread stall: inline vs. AuthService"""
+    import contextlib
+    import io
+    import os
+    import tempfile
+    import auth
+    import user_store
+
+    started = time.perf_counter()
+    params = auth.calibrate(args.target_ms / 1000)
+    calibration = time.perf_counter() - started
+    auth._params = params
+    started = time.perf_counter()
+    auth.hash_password("benchmark", params)
+    hash_time = time.perf_counter() - started
+
+    path = os.path.join(tempfile.mkdtemp(), "users.db")
+    with contextlib.redirect_stdout(io.StringIO()):
+        store = user_store.UserStore(path)
+    users = [(f"user{i}@example.com", f"password{i}") for i in range(args.users)]
+    with store.pool.transaction() as conn:
+        # Half the rows still hold the old unsalted SHA-256 digest
+        conn.executemany(user_store.SQL_INSERT_USER, [
+            (email, auth.legacy_hash(password) if i % 2 else auth.hash_password(password, params))
+            for i, (email, password) in enumerate(users)])
+
+    print("\n" + "=" * 70)
+    print(f"[BENCH] Auth, {params[0]} cost {params[1]}: one hash {hash_time * 1000:.0f} ms"
+          f" (target {args.target_ms:.0f} ms, calibrated in {calibration * 1000:.0f} ms)")
+    print("=" * 70)
+    print(f"{'workers':>8}{'logins':>8}{'logins/s':>10}{'failed':>8}{'p50':>11}{'p95':>11}")
+    failed = 0
+    for workers in args.workers:
+        service = auth.AuthService(store, workers=workers)
+        submitted = {}
+        started = time.perf_counter()
+        for i in range(args.logins):
+            email, password = users[i % len(users)]
+            submitted[service.login(email, password)] = time.perf_counter()
+        latencies, errors = [], 0
+        for future in submitted:
+            ok, _message = future.result()
+            errors += not ok
+            latencies.append(time.perf_counter() - submitted[future])
+        elapsed = time.perf_counter() - started
+        service.shutdown(wait=True)
+        failed += errors
+        print(f"{workers:>8}{args.logins:>8}{args.logins / elapsed:>10.1f}{errors:>8}"
+              f"{_ms(statistics.median(latencies)):>11}{_ms(_percentile(latencies, 0.95)):>11}")
+    upgraded = sum(1 for email, _ in users if not auth.needs_rehash(store.get_password_hash(email), params))
+    print(f"[BENCH] Rows on the current hash after logging in: {upgraded}/{len(users)}")
+
+    print("-" * 70)
+    print(f"{'GUI thread':<20}{'logins':>8}{'max stall':>14}{'p99 tick gap':>16}")
+    service = auth.AuthService(store, workers=2)
+    modes = [
+        ("inline (before)", lambda i: auth.authenticate(store, *users[i % len(users)]) and None),
+        ("AuthService", lambda i: service.login(*users[i % len(users)])),
+    ]
+    stalls = {}
+    for name, start_login in modes:
+        gaps = _ui_loop(start_login, args.ui_logins, args.interval)
+        stalls[name] = max(gaps)
+        print(f"{name:<20}{args.ui_logins:>8}{_ms(max(gaps)):>14}{_ms(_percentile(gaps, 0.99)):>16}")
+    service.shutdown(wait=True)
+    print("=" * 70)
+    store.close()
+    if failed:
+        print(f"[FAIL] {failed} logins failed")
+        return 1
+    if stalls["AuthService"] * 1000 > args.max_stall_ms:
+        print(f"[FAIL] The GUI thread stalled {stalls['AuthService'] * 1000:.0f} ms (budget {args.max_stall_ms:.0f} ms)")
+        return 1
+    print("[OK] Logins never blocked the GUI thread beyond the budget")
+    return 0
+
+
+def _write_user_file(path, rows, seed):
+    """Synthetic import file: ~1% invalid emails, ~0.5% duplicates, ~0.5% short passwords"""
+    import csv
+    import random
+    rng = random.Random(seed)
+    expected_bad, last_good = 0, None
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(("email", "password"))
+        for i in range(rows):
+            roll = rng.random()
+            if roll < 0.01:
+                writer.writerow((f"user{i}.example.com", f"password{i}"))
+            elif roll < 0.015 and last_good is not None:
+                writer.writerow((f"user{last_good}@example.com", f"password{i}"))
+            elif roll < 0.02:
+                writer.writerow((f"user{i}@example.com", "123"))
+            else:
+                writer.writerow((f"user{i}@example.com", f"password{i}"))
+                last_good = i
+                continue
+            expected_bad += 1
+    return expected_bad
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def bench_provision(args):
+    """Bulk import/export throughput and peak memory as the file grows"""
+    import contextlib
+    import io
+    import os
+    import tempfile
+    import auth
+    import provision_users
+    from user_store import UserStore
+
+    directory = tempfile.mkdtemp()
+    params = ("scrypt", args.cost)
+    started = time.perf_counter()
+    auth.hash_password("benchmark", params)
+    cheap = time.perf_counter() - started
+    real_params = auth.calibrate()
+    started = time.perf_counter()
+    auth.hash_password("benchmark", real_params)
+    real = time.perf_counter() - started
+
+    print("\n" + "=" * 78)
+    print(f"[BENCH] User provisioning, scrypt cost {args.cost} ({cheap * 1000:.1f} ms/hash),"
+          f" {args.workers or os.cpu_count()} workers, batches of {args.batch_size}")
+    print("=" * 78)
+    print(f"{'rows':>9}{'imported':>10}{'rejected':>10}{'rows/s':>9}{'export/s':>10}{'peak RSS':>11}"
+          f"{'at real cost':>16}")
+    failed = False
+    for rows in args.rows:
+        path = os.path.join(directory, f"users_{rows}.csv")
+        expected_bad = _write_user_file(path, rows, args.seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            store = UserStore(os.path.join(directory, f"users_{rows}.db"))
+        stats = provision_users.import_users(store, provision_users.read_users(path), params=params,
+                                             batch_size=args.batch_size, workers=args.workers)
+        started = time.perf_counter()
+        exported = provision_users.export_users(store, os.path.join(directory, f"export_{rows}.jsonl"))
+        export_rate = exported / (time.perf_counter() - started)
+        store.close()
+        peak = _peak_rss_mb()
+        # The same pipeline with the calibrated hash is bound by hashing on every core
+        projected = rows * real / (args.workers or os.cpu_count() or 1)
+        print(f"{rows:>9}{stats['imported']:>10}{stats['rejected']:>10}{rows / stats['seconds']:>9.0f}"
+              f"{export_rate:>10.0f}{(f'{peak:.0f} MB' if peak else 'n/a'):>11}{projected / 60:>12.1f} min")
+        if stats['rejected'] != expected_bad or exported != stats['imported']:
+            print(f"[FAIL] expected {expected_bad} rejected rows and an export of every imported row")
+            failed = True
+    print("=" * 78)
+    print(f"[BENCH] Calibrated cost here: {real_params[0]} {real_params[1]} ({real * 1000:.0f} ms/hash)")
+    if failed:
+        return 1
+    print("[OK] Every bad row was reported and every imported row exported")
+    return 0
+
+
+# (prompt, expected tier) - everyday lookups vs. questions that need reasoning or a longer answer
+ROUTING_CORPUS = [
+    ("What's the capital of France?", "fast"),
+    ("Who wrote Romeo and Juliet?", "fast"),
+    ("When was the Eiffel Tower built?", "fast"),
+    ("Where is Mount Everest?", "fast"),
+    ("How many legs does a spider have?", "fast"),
+    ("What is 15 squared?", "fast"),
+    ("Convert 100 fahrenheit to celsius", "fast"),
+    ("Define photosynthesis", "fast"),
+    ("How tall is the Burj Khalifa?", "fast"),
+    ("What's the population of Japan?", "fast"),
+    ("Is a tomato a fruit?", "fast"),
+    ("Who is the CEO of Tesla?", "fast"),
+    ("What does CPU stand for?", "fast"),
+    ("What's the boiling point of water?", "fast"),
+    ("Translate hello to Spanish", "fast"),
+    ("How old is the universe?", "fast"),
+    ("Which planet is the largest?", "fast"),
+    ("Tell me a fun fact about cats", "fast"),
+    ("What's a synonym for happy?", "fast"),
+    ("Can dogs eat chocolate?", "fast"),
+    ("How far is the moon?", "fast"),
+    ("What year did World War Two end?", "fast"),
+    ("Why is the sky blue?", "capable"),
+    ("Explain how vaccines train the immune system", "capable"),
+    ("Compare Python and JavaScript for building web servers", "capable"),
+    ("What are the pros and cons of electric cars?", "capable"),
+    ("How does a neural network learn, step by step?", "capable"),
+    ("Write a short poem about the ocean", "capable"),
+    ("What's the difference between a virus and a bacterium, and how do antibiotics work?", "capable"),
+    ("Should I learn Rust or Go first, and why?", "capable"),
+    ("Describe the causes of the French Revolution", "capable"),
+    ("How do I plan a two week trip to Japan on a budget?", "capable"),
+    ("Summarize the plot of Hamlet and its main themes", "capable"),
+    ("Write a Python function that checks whether a string is a palindrome", "capable"),
+    ("What are the tradeoffs between SQL and NoSQL databases?", "capable"),
+    ("Analyze the economic implications of a four day work week", "capable"),
+    ("Why do we dream? What does science say about it?", "capable"),
+    ("Explain the difference between TCP and UDP and when to use each", "capable"),
+    ("How does the stock market work?", "capable"),
+    ("Tell me a story about a dragon who is afraid of fire", "capable"),
+    ("What caused the 2008 financial crisis and could it happen again?", "capable"),
+    ("Derive the quadratic formula", "capable"),
+]
+
+
+def bench_routing(args):
+    """Query classifier cost and accuracy, and latency of routed vs. single-tier replies"""
+    import assistant_core
+    import routing
+    from fake_providers import FakeOpenAI
+
+    prompts = [prompt for prompt, _tier in ROUTING_CORPUS]
+    for prompt in prompts:
+        routing.complexity(prompt)  # Warm up
+    start = time.perf_counter()
+    for _ in range(args.runs):
+        for prompt in prompts:
+            routing.complexity(prompt)
+    classify_us = (time.perf_counter() - start) / (args.runs * len(prompts)) * 1e6
+
+    assistant_core.AI_PROVIDER = "openai"
+    assistant_core.USE_RESPONSE_CACHE = False
+    fake = FakeOpenAI(first_token_delay=args.fast_delay, token_delay=args.token_delay,
+                      model_delays={assistant_core.OPENAI_MODEL: args.fast_delay,
+                                    assistant_core.CAPABLE_OPENAI_MODEL: args.capable_delay})
+    assistant_core.OPENAI_CLIENT = fake
+
+    def run(mode):
+        """(latencies, misrouted) with routing on, or every prompt sent to one tier"""
+        assistant_core.ROUTER = None
+        assistant_core.USE_MODEL_ROUTING = mode == "routed"
+        if mode == "capable":  # The fast tier with the capable models: "always the big model"
+            assistant_core.OPENAI_MODEL = assistant_core.CAPABLE_OPENAI_MODEL
+            assistant_core.FAST_MAX_TOKENS = assistant_core.CAPABLE_MAX_TOKENS
+        latencies, misrouted = [], []
+        try:
+            for prompt, expected in ROUTING_CORPUS:
+                start = time.perf_counter()
+                assistant_core.get_ai_response(prompt)
+                latencies.append(time.perf_counter() - start)
+                routed = mode
+                if mode == "routed":
+                    routed = "capable" if routing.complexity(prompt)[0] >= assistant_core.ROUTING_THRESHOLD else "fast"
+                if routed != expected:
+                    misrouted.append((prompt, expected, routed))
+        finally:
+            assistant_core.OPENAI_MODEL = fast_model
+            assistant_core.FAST_MAX_TOKENS = fast_tokens
+        return latencies, misrouted
+
+    fast_model, fast_tokens = assistant_core.OPENAI_MODEL, assistant_core.FAST_MAX_TOKENS
+    results = {mode: run(mode) for mode in ("fast", "capable", "routed")}
+    tier_stats = assistant_core.get_routing_stats()
+
+    print("\n" + "=" * 70)
+    print("[BENCH] Query routing: fast vs. capable model tier")
+    print("=" * 70)
+    print(f"Classifier cost: {classify_us:6.1f} us/query ({len(prompts)} prompts x {args.runs})")
+    print(f"{'Mode':<10}{'p50':>12}{'p95':>12}{'mean':>12}{'matches label':>16}")
+    for mode, (latencies, misrouted) in results.items():
+        correct = len(latencies) - len(misrouted)
+        print(f"{mode:<10}{_ms(_percentile(latencies, 0.5)):>12}{_ms(_percentile(latencies, 0.95)):>12}"
+              f"{_ms(statistics.mean(latencies)):>12}{correct:>9}/{len(latencies)}")
+    print("Per tier (routed):")
+    for name, stats in tier_stats.items():
+        reply = stats['reply']
+        print(f"  {name:<8} {stats['openai_model']:<16} max_tokens={stats['max_tokens']:<4} "
+              f"routed={stats['routed']:<4} p50={reply['p50_ms']:>8.1f} ms  p95={reply['p95_ms']:>8.1f} ms")
+    for prompt, expected, routed in results["routed"][1]:
+        print(f"  misrouted: {prompt!r} -> {routed} (expected {expected})")
+    print("=" * 70)
+
+    accuracy = 1 - len(results["routed"][1]) / len(ROUTING_CORPUS)
+    if accuracy < args.min_accuracy:
+        print(f"[FAIL] Routing accuracy {accuracy:.0%} < {args.min_accuracy:.0%}")
+        return 1
+    if classify_us > args.budget_us:
+        print(f"[FAIL] Classifier took {classify_us:.1f} us/query (budget {args.budget_us:.0f} us)")
+        return 1
+    print(f"[OK] {accuracy:.0%} routed as labelled; the classifier costs {classify_us:.1f} us per query")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AI Assistant Zen latency benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    stream = subparsers.add_parser("stream", help="streaming vs. blocking AI reply")
+    stream.add_argument("--runs", type=int, default=5)
+    stream.add_argument("--first-token-delay", type=float, default=0.3)
+    stream.add_argument("--token-delay", type=float, default=0.02)
+    stream.set_defaults(func=bench_stream)
+
+    tts = subparsers.add_parser("tts", help="fresh TTS engine vs. persistent worker")
+    tts.add_argument("--runs", type=int, default=5)
+    tts.add_argument("--real", action="store_true", help="use the real pyttsx3 engine")
+    tts.add_argument("--init-delay", type=float, default=0.25)
+    tts.add_argument("--speak-delay", type=float, default=0.05)
+    tts.set_defaults(func=bench_tts)
+
+    ttscache = subparsers.add_parser("ttscache", help="fixed/repeated phrases: synthesized vs. pre-rendered audio")
+    ttscache.add_argument("--synth-delay", type=float, default=0.3, help="engine time before the first word")
+    ttscache.add_argument("--word-delay", type=float, default=0.01)
+    ttscache.add_argument("--play-speed", type=float, default=0.02, help="fake playback time / audio length")
+    ttscache.add_argument("--answers", type=int, default=30, help="distinct answers")
+    ttscache.add_argument("--turns", type=int, default=100)
+    ttscache.add_argument("--max-mb", type=float, default=2.0, help="cache size limit")
+    ttscache.add_argument("--budget-ms", type=float, default=20.0, help="max median start of a cached phrase")
+    ttscache.add_argument("--seed", type=int, default=1)
+    ttscache.set_defaults(func=bench_ttscache)
+
+    chunked = subparsers.add_parser("chunked", help="time to first audio vs. reply length, chunked TTS")
+    chunked.add_argument("--sentences", type=int, nargs="+", default=[1, 2, 5, 10, 20])
+    chunked.add_argument("--synth-delay", type=float, default=0.05, help="engine time before any text")
+    chunked.add_argument("--synth-word-delay", type=float, default=0.005, help="engine time per word of text")
+    chunked.add_argument("--play-speed", type=float, default=0.1, help="fake playback time / audio length")
+    chunked.add_argument("--max-spread-ms", type=float, default=50.0,
+                         help="fail if first audio differs more than this between lengths")
+    chunked.add_argument("--stream-sentences", type=int, default=6, help="sentences of the streamed reply")
+    chunked.add_argument("--sentence-interval", type=float, default=0.05, help="AI time between sentences")
+    chunked.add_argument("--max-gap-ms", type=float, default=20.0, help="max silence between streamed sentences")
+    chunked.set_defaults(func=bench_chunked)
+
+    cache = subparsers.add_parser("cache", help="response cache hits vs. provider calls")
+    cache.add_argument("--runs", type=int, default=1000)
+    cache.add_argument("--first-token-delay", type=float, default=0.5)
+    cache.set_defaults(func=bench_cache)
+
+    intents = subparsers.add_parser("intents", help="intent routing cost vs. intent count")
+    intents.add_argument("--runs", type=int, default=2000)
+    intents.add_argument("--counts", type=int, nargs="+", default=[5, 50, 500])
+    intents.set_defaults(func=bench_intents)
+
+    math_parser = subparsers.add_parser("math", help="local math engine corpus and latency")
+    math_parser.add_argument("--runs", type=int, default=200)
+    math_parser.set_defaults(func=bench_math)
+
+    hedge = subparsers.add_parser("hedge", help="sequential fallback vs. hedged provider racing")
+    hedge.add_argument("--runs", type=int, default=40)
+    hedge.add_argument("--hedge-delay", type=float, default=0.3)
+    hedge.add_argument("--primary-delay", type=float, default=0.15)
+    hedge.add_argument("--secondary-delay", type=float, default=0.25)
+    hedge.add_argument("--failure-rate", type=float, default=0.1)
+    hedge.add_argument("--slow-rate", type=float, default=0.15)
+    hedge.add_argument("--slow-delay", type=float, default=2.0)
+    hedge.set_defaults(func=bench_hedge)
+
+    startup = subparsers.add_parser("startup", help="cold start time and lazy-import check")
+    startup.add_argument("--runs", type=int, default=3)
+    startup.add_argument("--budget-ms", type=float, default=1500.0,
+                         help="fail if the login window takes longer than this to appear")
+    startup.set_defaults(func=bench_startup)
+
+    turns = subparsers.add_parser("turns", help="per-stage latency percentiles for simulated turns")
+    turns.add_argument("--runs", type=int, default=30)
+    turns.add_argument("--trace-file", help="keep the exported trace (.jsonl or .db)")
+    turns.add_argument("--listen-delay", type=float, default=0.05)
+    turns.add_argument("--recognize-delay", type=float, default=0.03)
+    turns.add_argument("--first-token-delay", type=float, default=0.1)
+    turns.add_argument("--token-delay", type=float, default=0.005)
+    turns.add_argument("--speak-delay", type=float, default=0.01)
+    turns.set_defaults(func=bench_turns)
+
+    stt = subparsers.add_parser("stt", help="speech recognizer WER and latency on a WAV corpus")
+    stt.add_argument("--corpus", required=True, help="folder of 16-bit mono foo.wav + foo.txt pairs")
+    stt.add_argument("--backends", nargs="+", default=["google", "vosk"])
+    stt.add_argument("--vosk-model", help="path to an unpacked Vosk model")
+    stt.add_argument("--realtime", action="store_true", help="feed audio at microphone speed")
+    stt.add_argument("--verbose", action="store_true")
+    stt.set_defaults(func=bench_stt)
+
+    endpoint = subparsers.add_parser("endpoint", help="VAD endpointing delay vs. the fixed pause")
+    endpoint.add_argument("--corpus", help="folder of foo.wav + foo.json {\"speech_end\": s} fixtures")
+    endpoint.add_argument("--count", type=int, default=40, help="synthetic utterances when no corpus")
+    endpoint.add_argument("--seed", type=int, default=1)
+    endpoint.add_argument("--write-fixtures", help="save the synthetic utterances as WAV/JSON fixtures")
+    endpoint.add_argument("--tune", action="store_true", help="grid-search the endpointing rules")
+    endpoint.add_argument("--target-ms", type=float, default=400.0, help="max median endpoint delay")
+    endpoint.add_argument("--max-early-rate", type=float, default=0.1,
+                          help="max share of utterances cut during a mid-sentence pause")
+    endpoint.set_defaults(func=bench_endpoint)
+
+    bargein = subparsers.add_parser("bargein", help="interrupting playback when the user talks over it")
+    bargein.add_argument("--runs", type=int, default=12)
+    bargein.add_argument("--user-at", type=float, default=2.0, help="seconds into the reply the user cuts in")
+    bargein.add_argument("--echo-level", type=float, default=0.2, help="loudness of our own voice at the mic")
+    bargein.add_argument("--word-delay", type=float, default=0.25, help="TTS word length (stop granularity)")
+    bargein.add_argument("--engine", action="store_true", help="speak with the engine instead of WAV playback")
+    bargein.add_argument("--target-ms", type=float, default=100.0, help="max p50 from user speech to silence")
+    bargein.set_defaults(func=bench_bargein)
+
+    stop = subparsers.add_parser("stop", help="how fast Stop ends listening, AI and speech in flight")
+    stop.add_argument("--runs", type=int, default=20)
+    stop.add_argument("--seed", type=int, default=1)
+    stop.add_argument("--max-stop-at", type=float, default=8.0, help="latest stop, in seconds after start")
+    stop.add_argument("--recognize-delay", type=float, default=1.5, help="slow cloud recognition")
+    stop.add_argument("--first-token-delay", type=float, default=2.0, help="slow AI provider")
+    stop.add_argument("--word-delay", type=float, default=0.25, help="TTS word length")
+    stop.add_argument("--budget-ms", type=float, default=1000.0, help="fail if a stop takes longer")
+    stop.set_defaults(func=bench_stop)
+
+    memory = subparsers.add_parser("memory", help="prompt size/latency of conversation memory over a long session")
+    memory.add_argument("--turns", type=int, default=1000)
+    memory.add_argument("--seed", type=int, default=1)
+    memory.add_argument("--budget", type=int, default=600, help="tokens of recent turns kept verbatim")
+    memory.add_argument("--summary-tokens", type=int, default=200)
+    memory.add_argument("--prompt-token-delay", type=float, default=0.00002,
+                        help="fake provider processing time per prompt token")
+    memory.set_defaults(func=bench_memory)
+
+    replay_parser = subparsers.add_parser("replay", help="end-to-end latency of the assistant loop on recorded audio")
+    replay_parser.add_argument("--wavs", help="folder of 16-bit mono foo.wav (+ foo.txt transcript) commands")
+    replay_parser.add_argument("--count", type=int, default=12, help="synthetic commands when no --wavs")
+    replay_parser.add_argument("--write-fixtures", help="save the synthetic commands as WAV/TXT files")
+    replay_parser.add_argument("--report", help="save the report as JSON (e.g. replay_<commit>.json)")
+    replay_parser.add_argument("--baseline", help="JSON report of another commit to compare against")
+    replay_parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    replay_parser.add_argument("--trace-file", help="keep the exported trace (.jsonl or .db)")
+    replay_parser.add_argument("--recognize-delay", type=float, default=0.3)
+    replay_parser.add_argument("--first-token-delay", type=float, default=0.5)
+    replay_parser.add_argument("--token-delay", type=float, default=0.02)
+    replay_parser.add_argument("--speak-delay", type=float, default=0.2, help="TTS time per sentence")
+    replay_parser.add_argument("--word-delay", type=float, help="TTS time per word (instead of --speak-delay)")
+    replay_parser.add_argument("--no-stream", action="store_true", help="blocking process_command path")
+    replay_parser.add_argument("--barge-in", action="store_true", help="keep barge-in monitoring on")
+    replay_parser.set_defaults(func=bench_replay)
+
+    load = subparsers.add_parser("load", help="concurrent sessions against the local provider stand-in")
+    load.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16, 32])
+    load.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    load.add_argument("--turns", type=int, help="commands per session (default: until --duration)")
+    load.add_argument("--think-time", type=float, default=0.5, help="mean pause between a user's commands")
+    load.add_argument("--provider", choices=["openai", "gemini"], default="openai")
+    load.add_argument("--profile", default="typical",
+                      help="stand-in profile: instant, typical, slow, flaky, rate_limited, saturated")
+    load.add_argument("--base-url", help="use an already running stand-in (or another endpoint)")
+    load.add_argument("--cache", action="store_true", help="keep the response cache on")
+    load.add_argument("--max-error-rate", type=float, default=0.05)
+    load.add_argument("--seed", type=int, default=1)
+    load.set_defaults(func=bench_load)
+
+    server = subparsers.add_parser("server", help="headless server throughput with many concurrent sessions")
+    server.add_argument("--sessions", type=int, nargs="+", default=[10, 100, 300])
+    server.add_argument("--turns", type=int, default=3, help="commands per session")
+    server.add_argument("--think-time", type=float, default=0.2, help="mean pause between a user's commands")
+    server.add_argument("--workers", type=int, help="server command threads (default: sized by the server)")
+    server.add_argument("--provider", choices=["openai", "gemini"], default="openai")
+    server.add_argument("--profile", default="typical", help="provider stand-in profile")
+    server.add_argument("--base-url", help="use an already running stand-in (or another endpoint)")
+    server.add_argument("--cache", action="store_true", help="keep the response cache on")
+    server.add_argument("--seed", type=int, default=1)
+    server.set_defaults(func=bench_server)
+
+    users = subparsers.add_parser("users", help="user database logins: pooled WAL store vs. connection per call")
+    users.add_argument("--users", type=int, default=100000)
+    users.add_argument("--logins", type=int, default=4000, help="logins per approach and thread count")
+    users.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    users.add_argument("--pool-size", type=int, default=4)
+    users.add_argument("--seed", type=int, default=1)
+    users.set_defaults(func=bench_users)
+
+    auth_parser = subparsers.add_parser("auth", help="salted-hash login throughput and GUI-thread stall time")
+    auth_parser.add_argument("--target-ms", type=float, default=100.0, help="hash time to calibrate for")
+    auth_parser.add_argument("--users", type=int, default=40, help="half of them with legacy SHA-256 rows")
+    auth_parser.add_argument("--logins", type=int, default=40, help="logins per worker count")
+    auth_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    auth_parser.add_argument("--ui-logins", type=int, default=10, help="logins during the GUI-thread run")
+    auth_parser.add_argument("--interval", type=float, default=0.3, help="seconds between GUI logins")
+    auth_parser.add_argument("--max-stall-ms", type=float, default=50.0)
+    auth_parser.set_defaults(func=bench_auth)
+
+    provision = subparsers.add_parser("provision", help="bulk user import/export throughput and peak memory")
+    provision.add_argument("--rows", type=int, nargs="+", default=[10000, 100000],
+                           help="file sizes, ascending (peak memory should stay flat)")
+    provision.add_argument("--cost", type=int, default=16,
+                           help="scrypt N for the run (the calibrated cost is projected)")
+    provision.add_argument("--batch-size", type=int, default=500)
+    provision.add_argument("--workers", type=int, help="hashing processes (default: CPU count)")
+    provision.add_argument("--seed", type=int, default=1)
+    provision.set_defaults(func=bench_provision)
+
+    routing_parser = subparsers.add_parser("routing", help="query classifier accuracy/cost and per-tier latency")
+    routing_parser.add_argument("--runs", type=int, default=1000, help="classifier passes over the corpus")
+    routing_parser.add_argument("--fast-delay", type=float, default=0.3, help="fast model first-token delay")
+    routing_parser.add_argument("--capable-delay", type=float, default=0.9, help="capable model first-token delay")
+    routing_parser.add_argument("--token-delay", type=float, default=0.0)
+    routing_parser.add_argument("--min-accuracy", type=float, default=0.9)
+    routing_parser.add_argument("--budget-us", type=float, default=200.0, help="max classifier time per query")
+    routing_parser.set_defaults(func=bench_routing)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
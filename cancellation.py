@@ -0,0 +1,95 @@
+"""
+Cancellation - Cooperative stop signal shared by every stage of a turn
+One CancelToken is passed through listening, recognition, the AI request
+and speech. Blocking waits check it (or register a callback that unblocks
+them), so a stop request ends whatever is in flight within a frame or two
+instead of after the current phrase/answer/utterance has finished.
+"""
+import contextvars
+import threading
+import time
+
+
+class CancelledError(Exception):
+    """The operation was abandoned because its CancelToken was cancelled"""
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.reason = None
+        self.cancelled_at = None  # time.perf_counter() of cancel()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason="cancelled"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self.cancelled_at = time.perf_counter()
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[WARN] Cancel callback failed: {e}")
+
+    def add_callback(self, callback):
+        """Call callback() on cancel (right away if already cancelled)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def wait(self, timeout=None):
+        """Sleep up to timeout, True as soon as the token is cancelled"""
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise CancelledError(self.reason)
+
+
+def run_cancellable(fn, cancel, *args, **kwargs):
+    """
+    Run a blocking call that cannot be interrupted (e.g. an HTTP request)
+    in a helper thread; raises CancelledError as soon as cancel fires and
+    leaves the call to finish in the background. The call sees the caller's
+    context variables (e.g. the current tracing turn).
+    """
+    if cancel is None:
+        return fn(*args, **kwargs)
+    cancel.raise_if_cancelled()
+    done = threading.Event()
+    outcome = {}
+    context = contextvars.copy_context()
+
+    def run():
+        try:
+            outcome['value'] = context.run(fn, *args, **kwargs)
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            done.set()
+            cancel.remove_callback(done.set)
+
+    cancel.add_callback(done.set)
+    threading.Thread(target=run, name="cancellable", daemon=True).start()
+    done.wait()
+    if 'error' in outcome:
+        raise outcome['error']
+    if 'value' in outcome:
+        return outcome['value']
+    raise CancelledError(cancel.reason)
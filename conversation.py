@@ -0,0 +1,185 @@
+"""
+Conversation Memory - Token-budgeted chat history for follow-up questions
+Recent turns are sent verbatim while they fit in the token budget; older
+turns are folded into a short running summary that travels with the
+system prompt. Tokens are counted locally (tiktoken when installed, else a
+~4 characters/token estimate), so the prompt - and with it the request
+latency - stays flat no matter how long the session runs.
+
+    memory = ConversationMemory(budget_tokens=600)
+    messages = memory.messages(SYSTEM_PROMPT, "and what about its population?")
+    ...
+    memory.add("and what about its population?", answer)
+"""
+import collections
+import re
+import threading
+
+# Words that only make sense with the previous turns ("and its population?")
+FOLLOW_UP_WORDS = {
+    'it', 'its', "it's", 'that', 'this', 'those', 'these', 'they', 'them', 'their',
+    'he', 'him', 'his', 'she', 'her', 'there', 'then', 'else', 'more', 'another', 'same',
+}
+_FOLLOW_UP_START = re.compile(r"^(and|but|so|also|what about|how about|why|why not)\b")
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder():
+    """tiktoken's cl100k encoding if installed, else False (use the estimate)"""
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            try:
+                import tiktoken
+                _encoder = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                _encoder = False
+        return _encoder
+
+
+def count_tokens(text):
+    """Tokens in text - exact with tiktoken, otherwise a close upper estimate"""
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder:
+        return len(encoder.encode(text))
+    # Short words are one token, long ones about one per 4 characters
+    return sum(max(1, (len(piece) + 3) // 4) for piece in _TOKEN.findall(text))
+
+
+def is_follow_up(prompt):
+    """True if the prompt refers back to earlier turns (so its answer depends on the history)"""
+    text = prompt.lower().strip()
+    if _FOLLOW_UP_START.match(text):
+        return True
+    return any(word in FOLLOW_UP_WORDS for word in re.findall(r"[a-z']+", text))
+
+
+def _first_sentence(text, max_tokens):
+    sentence = _SENTENCE_END.split(text.strip(), 1)[0]
+    words = sentence.split()
+    while words and count_tokens(" ".join(words)) > max_tokens:
+        words = words[:-1]
+    return " ".join(words)
+
+
+def _truncate(text, max_tokens):
+    """The leading words of text that fit in max_tokens, marked with "..." if cut"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    fits, too_many = 0, len(words)
+    while too_many - fits > 1:  # Binary search for the longest prefix that fits
+        middle = (fits + too_many) // 2
+        if count_tokens(" ".join(words[:middle]) + " ...") <= max_tokens:
+            fits = middle
+        else:
+            too_many = middle
+    return " ".join(words[:fits] + ["..."])
+
+
+def extractive_summary(summary, user, assistant, max_tokens=200):
+    """
+    Fold one turn into the running summary without a model call
+    Keeps the question and the first sentence of the answer; the oldest
+    facts are dropped once the summary exceeds max_tokens.
+    """
+    line = f"User asked: {_first_sentence(user, 40)} Zen said: {_first_sentence(assistant, 40)}"
+    lines = [l for l in summary.split("\n") if l] + [line]
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class ConversationMemory:
+    """
+    History of one session: recent turns verbatim plus a running summary
+    budget_tokens bounds the verbatim turns, summary_tokens the summary, so
+    the history part of every prompt stays under their sum. The newest turn
+    is always kept verbatim (cut to the budget if it is larger on its own),
+    so a follow-up can refer to it. summarizer(
+    summary, user, assistant, max_tokens) folds an evicted turn into the
+    summary (extractive_summary by default - no extra request).
+    """
+
+    def __init__(self, budget_tokens=600, summary_tokens=200, summarizer=None):
+        self.budget_tokens = budget_tokens
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer or extractive_summary
+        self.summary = ""
+        self.turns = collections.deque()  # (user, assistant, tokens)
+        self.turn_tokens = 0
+        self.total_turns = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.turns)
+
+    def add(self, user, assistant):
+        """Record a finished exchange, folding the oldest turns into the summary if over budget"""
+        if not user or not assistant:
+            return
+        tokens = count_tokens(user) + count_tokens(assistant) + 8  # Role/message overhead
+        if tokens > self.budget_tokens:
+            user = _truncate(user, self.budget_tokens // 4)
+            assistant = _truncate(assistant, self.budget_tokens - 8 - count_tokens(user))
+            tokens = count_tokens(user) + count_tokens(assistant) + 8
+        with self._lock:
+            self.turns.append((user, assistant, tokens))
+            self.turn_tokens += tokens
+            self.total_turns += 1
+            while len(self.turns) > 1 and self.turn_tokens > self.budget_tokens:
+                old_user, old_assistant, old_tokens = self.turns.popleft()
+                self.turn_tokens -= old_tokens
+                try:
+                    self.summary = self.summarizer(self.summary, old_user, old_assistant, self.summary_tokens)
+                except Exception as e:
+                    print(f"[WARN] Conversation summary failed: {e}")
+                    self.summary = extractive_summary(self.summary, old_user, old_assistant,
+                                                      self.summary_tokens)
+
+    def clear(self):
+        with self._lock:
+            self.summary = ""
+            self.turns.clear()
+            self.turn_tokens = 0
+
+    def system_prompt(self, base):
+        """The system prompt with the running summary appended"""
+        with self._lock:
+            summary = self.summary
+        if not summary:
+            return base
+        return f"{base}\n\nEarlier in this conversation:\n{summary}"
+
+    def history(self):
+        """Recent turns as (user, assistant) pairs, oldest first"""
+        with self._lock:
+            return [(user, assistant) for user, assistant, _tokens in self.turns]
+
+    def messages(self, system_prompt, prompt):
+        """OpenAI chat messages: system (+ summary), recent turns, then the new prompt"""
+        messages = [{"role": "system", "content": self.system_prompt(system_prompt)}]
+        for user, assistant in self.history():
+            messages.append({"role": "user", "content": user})
+            messages.append({"role": "assistant", "content": assistant})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def contents(self, prompt):
+        """Gemini contents: recent turns, then the new prompt (summary goes in system_instruction)"""
+        contents = []
+        for user, assistant in self.history():
+            contents.append({"role": "user", "parts": [{"text": user}]})
+            contents.append({"role": "model", "parts": [{"text": assistant}]})
+        contents.append({"role": "user", "parts": [{"text": prompt}]})
+        return contents
+
+    def prompt_tokens(self, system_prompt, prompt):
+        """Tokens the next request would send"""
+        return sum(count_tokens(m["content"]) + 4 for m in self.messages(system_prompt, prompt))
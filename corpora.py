@@ -0,0 +1,76 @@
+"""
+Corpora - Labelled inputs shared by benchmark.py and the tests
+Spoken math questions with their expected answers, and a generator of
+synthetic conversation turns for the memory benchmark.
+"""
+
+# (spoken query, expected answer) - None means "leave it to the AI"
+MATH_CORPUS = [
+    ("what is 25 times 47", "25 times 47 equals 1175"),
+    ("what is twenty five percent of 80", "twenty five percent of 80 equals 20"),
+    ("3 plus 4 times 2", "3 plus 4 times 2 equals 11"),
+    ("what's the square root of 144", "square root of 144 equals 12"),
+    ("cube root of twenty seven", "cube root of twenty seven equals 3"),
+    ("two to the power of ten", "two to the power of ten equals 1024"),
+    ("7 squared", "7 squared equals 49"),
+    ("what is 9 cubed minus 1", "9 cubed minus 1 equals 728"),
+    ("one hundred and five minus six", "one hundred and five minus six equals 99"),
+    ("two thousand three hundred twelve divided by four", "two thousand three hundred twelve divided by four equals 578"),
+    ("three point five times two", "three point five times two equals 7"),
+    ("what is negative five plus 2", "negative five plus 2 equals -3"),
+    ("what is the square root of negative 4", "I cannot take the square root of a negative number"),
+    ("square root of minus 9", "I cannot take the square root of a negative number"),
+    ("what is negative 4 squared", "negative 4 squared equals 16"),
+    ("12.5 percent of 200", "12.5 percent of 200 equals 25"),
+    ("1,000 times 3", "1,000 times 3 equals 3000"),
+    ("what is twenty-one plus nine?", "twenty-one plus nine equals 30"),
+    ("10 divided by 4", "10 divided by 4 equals 2.5"),
+    ("10 mod 3", "10 mod 3 equals 1"),
+    ("half of 90", "half of 90 equals 45"),
+    ("add 3 and 4", "add 3 and 4 equals 7"),
+    ("what is 15 into 4", "15 into 4 equals 60"),
+    ("6 multiplied by 7", "6 multiplied by 7 equals 42"),
+    ("a million divided by 8", "a million divided by 8 equals 125000"),
+    ("5 divided by 0", "I cannot divide by zero"),
+    ("2 to the power of 5000", "That number is too large for me to calculate"),
+    ("2 to the power of 1000", "2 to the power of 1000 equals about 1.07 times 10 to the power of 301"),
+    ("9 to the power of 999", "9 to the power of 999 equals about 1.94 times 10 to the power of 953"),
+    ("a billion times a billion", "a billion times a billion equals 1 times 10 to the power of 18"),
+    ("2.5 to the power of 1000", "That number is too large for me to calculate"),
+    ("convert 5 miles to kilometers", "5 miles is 8.05 kilometers"),
+    ("how many feet in a mile", "1 mile is 5280 feet"),
+    ("how many grams are in 3 pounds", "3 pounds is 1360.78 grams"),
+    ("100 degrees fahrenheit in celsius", "100 degrees Fahrenheit is 37.78 degrees Celsius"),
+    ("minus 40 celsius to fahrenheit", "-40 degrees Celsius is -40 degrees Fahrenheit"),
+    ("convert 2 liters to cups", "2 liters is 8.45 cups"),
+    ("how many minutes in a day", "1 day is 1440 minutes"),
+    ("what is 0 to the power of negative 1", "I cannot divide by zero"),
+    ("what is the capital of france", None),
+    ("what time is it", None),
+    ("what is 5", None),
+    ("times square in new york", None),
+    ("convert 5 miles to kilograms", None),
+    ("what is two three times 4", None),
+    ("what is 5 6 plus 1", None),
+    ("what is 2 times 3 4", None),
+    ("twenty twenty one plus 1", None),
+]
+
+
+MEMORY_TOPICS = ["France", "the moon", "photosynthesis", "Python", "the Roman empire", "black holes",
+                 "coffee", "the Amazon river", "jazz", "volcanoes", "chess", "the human heart"]
+
+
+def synthetic_turn(rng, i):
+    """A question (every other one a follow-up) and an answer of 1-5 sentences"""
+    topic = MEMORY_TOPICS[(i // 2) % len(MEMORY_TOPICS)]
+    if i % 2:
+        question = rng.choice(["and what about its history?", "why is that?", "tell me more about it",
+                               "how big is it?", "and who discovered that?"])
+    else:
+        question = f"what can you tell me about {topic}?"
+    words = ("the a of and in is it was for on are with as at by from this that which".split()
+             + topic.split() * 3)
+    sentences = [" ".join(rng.choice(words) for _ in range(rng.randint(6, 20))).capitalize() + "."
+                 for _ in range(rng.randint(1, 5))]
+    return question, " ".join(sentences)
@@ -0,0 +1,460 @@
+"""
+Fake AI Providers - Local stand-ins for OpenAI and Gemini clients
+Mimic the parts of the client APIs that assistant_core uses, with
+controllable delays, so latency can be measured without the network.
+Also a fake recognizer and speech-like audio for endpointing tests.
+"""
+import collections
+import math
+import random
+import struct
+import threading
+import time
+import wave
+from types import SimpleNamespace
+
+DEFAULT_REPLY = (
+    "Paris is the capital of France. "
+    "It sits on the Seine river in the north of the country. "
+    "The city is famous for the Eiffel Tower and the Louvre museum. "
+    "About two million people live in the city itself."
+)
+
+
+class FakeProviderError(Exception):
+    """Raised by a fake provider when a simulated failure is triggered"""
+
+
+class _FakeBackend:
+    """
+    Shared timing model: wait first_token_delay, then emit one word
+    every token_delay seconds. failure_rate makes a call raise, and
+    slow_rate makes a call wait slow_delay instead (a latency tail).
+    prompt_token_delay adds time per prompt token (longer prompts take
+    longer to process, like a real model). model_delays maps a model name
+    to its own first_token_delay; max_tokens cuts the reply short.
+    Streams can be closed from another thread like an HTTP response: the
+    reading side then raises, and the call is counted in aborted.
+    """
+
+    def __init__(self, reply=DEFAULT_REPLY, first_token_delay=0.3, token_delay=0.02,
+                 failure_rate=0.0, slow_rate=0.0, slow_delay=3.0, seed=None,
+                 prompt_token_delay=0.0, model_delays=None):
+        self.reply = reply
+        self.first_token_delay = first_token_delay
+        self.model_delays = model_delays or {}
+        self.model_calls = collections.Counter()
+        self.token_delay = token_delay
+        self.prompt_token_delay = prompt_token_delay
+        self.last_prompt_tokens = 0
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.calls = 0
+        self.aborted = 0
+        self.tokens_sent = 0  # Across all calls; stops growing once a stream is closed
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _wait(self, seconds, abort=None):
+        """Sleep, or raise as soon as abort is set (the stream was closed)"""
+        if abort is None:
+            time.sleep(seconds)
+        elif abort.wait(seconds):
+            with self._lock:
+                self.aborted += 1
+            raise FakeProviderError("Stream closed by the client")
+
+    def _start_call(self, prompt="", model=None, abort=None):
+        from conversation import count_tokens
+        with self._lock:
+            self.calls += 1
+            self.model_calls[model] += 1
+            fail = self.failure_rate and self._random.random() < self.failure_rate
+            slow = self.slow_rate and self._random.random() < self.slow_rate
+        self.last_prompt_tokens = count_tokens(prompt) if self.prompt_token_delay else 0
+        first_token_delay = self.model_delays.get(model, self.first_token_delay)
+        self._wait((self.slow_delay if slow else first_token_delay)
+                   + self.prompt_token_delay * self.last_prompt_tokens, abort)
+        if fail:
+            raise FakeProviderError("Simulated provider failure")
+
+    def _tokens(self, max_tokens=None, abort=None):
+        words = self.reply.split(" ")[:max_tokens]
+        for i, word in enumerate(words):
+            if i:
+                self._wait(self.token_delay, abort)
+            self.tokens_sent += 1
+            yield word if i == len(words) - 1 else word + " "
+
+    def complete(self, prompt="", model=None, max_tokens=None):
+        """Return the full reply after the whole generation time"""
+        self._start_call(prompt, model)
+        return "".join(self._tokens(max_tokens))
+
+    def stream(self, prompt="", model=None, max_tokens=None, abort=None):
+        """Yield the reply word by word; setting abort (threading.Event) ends it with an error"""
+        self._start_call(prompt, model, abort)
+        yield from self._tokens(max_tokens, abort)
+
+
+class _FakeStream:
+    """Iterator over a streamed reply that close() aborts from any thread"""
+
+    def __init__(self, chunks):
+        self._closed = threading.Event()
+        self._chunks = chunks(self._closed)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._chunks)
+
+    def close(self):
+        self._closed.set()
+
+
+# ===== OPENAI-STYLE CLIENT =====
+
+class _FakeCompletions:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def create(self, model=None, messages=None, stream=False, max_tokens=None, **kwargs):
+        prompt = "\n".join(m["content"] for m in messages or [])
+        if stream:
+            return _FakeStream(lambda closed: (
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+                for token in self._backend.stream(prompt, model, max_tokens, closed)
+            ))
+        text = self._backend.complete(prompt, model, max_tokens)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+class FakeOpenAI(_FakeBackend):
+    """Drop-in for openai.OpenAI: client.chat.completions.create(...)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.chat = SimpleNamespace(completions=_FakeCompletions(self))
+
+
+# ===== GEMINI-STYLE CLIENT =====
+
+class _FakeModels:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def _prompt(self, contents, config):
+        if isinstance(contents, list):
+            contents = "\n".join(part["text"] for c in contents for part in c["parts"])
+        return "\n".join([(config or {}).get('system_instruction', ''), contents or ""])
+
+    def generate_content(self, model=None, contents=None, config=None):
+        max_tokens = (config or {}).get('max_output_tokens')
+        return SimpleNamespace(text=self._backend.complete(self._prompt(contents, config), model, max_tokens))
+
+    def generate_content_stream(self, model=None, contents=None, config=None):
+        max_tokens = (config or {}).get('max_output_tokens')
+        prompt = self._prompt(contents, config)
+        return _FakeStream(lambda closed: (SimpleNamespace(text=token)
+                                           for token in self._backend.stream(prompt, model, max_tokens, closed)))
+
+
+class FakeGemini(_FakeBackend):
+    """Drop-in for google.genai.Client: client.models.generate_content(...)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.models = _FakeModels(self)
+
+
+# ===== TTS ENGINE =====
+
+class FakeTTSEngine:
+    """
+    Stand-in for a pyttsx3 engine
+    init_delay models pyttsx3.init() + voice listing, speak_delay models
+    the audio itself. With word_delay set, each word takes that long and
+    fires 'started-word' callbacks, so stop() cuts speech at word boundaries
+    like the real engine. synth_delay (+ synth_word_delay per word of the
+    whole text) models the engine processing the text before the first
+    sound. Set fail_next to make the next runAndWait() raise, broken to
+    make every one raise (a driver that died). Like
+    pyttsx3, runAndWait() raises if the engine is already running (e.g.
+    called from a second thread); run_threads records who ran it.
+    """
+
+    def __init__(self, init_delay=0.25, speak_delay=0.05, word_delay=None, synth_delay=0.0,
+                 synth_word_delay=0.0):
+        time.sleep(init_delay)
+        self.speak_delay = speak_delay
+        self.synth_delay = synth_delay
+        self.synth_word_delay = synth_word_delay
+        self.word_delay = word_delay
+        self.spoken = []
+        self.fail_next = False
+        self.broken = False
+        self._pending = []
+        self._files = []
+        self._callbacks = {}
+        self._stopped = False
+        self._running = False
+        self._run_lock = threading.Lock()
+        self.run_threads = set()
+
+    def getProperty(self, name):
+        return [] if name == 'voices' else None
+
+    def setProperty(self, name, value):
+        pass
+
+    def connect(self, topic, callback):
+        self._callbacks.setdefault(topic, []).append(callback)
+
+    def say(self, text):
+        self._pending.append(text)
+
+    def save_to_file(self, text, path):
+        """Rendered at the next runAndWait(): silence as long as the speech would be"""
+        self._files.append((text, path))
+
+    def runAndWait(self):
+        with self._run_lock:
+            if self._running:
+                raise RuntimeError("run loop already started")
+            self._running = True
+            self.run_threads.add(threading.get_ident())
+        try:
+            self._run()
+        finally:
+            self._running = False
+
+    def _run(self):
+        if self.fail_next or self.broken:
+            self.fail_next = False
+            self._pending = []
+            raise RuntimeError("Simulated TTS engine failure")
+        self._stopped = False
+        files, self._files = self._files, []
+        for text, path in files:
+            time.sleep(self.speak_delay + self.synth_word_delay * len(text.split()))
+            seconds = 0.3 * len(text.split())
+            with wave.open(path, 'wb') as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(16000)
+                wav.writeframes(bytes(2 * int(16000 * seconds)))
+        pending, self._pending = self._pending, []
+        for text in pending:
+            time.sleep(self.synth_delay + self.synth_word_delay * len(text.split()))
+            if self.word_delay is None:
+                time.sleep(self.speak_delay)
+            else:
+                location = 0
+                for word in text.split():
+                    for callback in self._callbacks.get('started-word', []):
+                        callback(None, location, len(word))
+                    if self._stopped:
+                        return
+                    time.sleep(self.word_delay)
+                    location += len(word) + 1
+            self.spoken.append(text)
+
+    def stop(self):
+        self._pending = []
+        self._stopped = True
+
+
+class FakePyttsx3:
+    """
+    Stand-in for the pyttsx3 module: init(driverName) returns one shared
+    engine per driver, like pyttsx3's engine cache. Install it with
+    sys.modules['pyttsx3'] = FakePyttsx3(...); kwargs go to FakeTTSEngine.
+    """
+
+    def __init__(self, **engine_kwargs):
+        self.engine_kwargs = dict({'init_delay': 0}, **engine_kwargs)
+        self.engines = {}
+        self._lock = threading.Lock()
+
+    def init(self, driverName=None, debug=False):
+        with self._lock:
+            if driverName not in self.engines:
+                self.engines[driverName] = FakeTTSEngine(**self.engine_kwargs)
+            return self.engines[driverName]
+
+
+class FakeAudioPlayer:
+    """
+    Stand-in for speech.play_wav: "plays" a WAV (path or file object) by waiting its duration
+    (scaled by speed) in 20 ms steps, honouring interrupted(). started
+    holds the perf_counter time each playback began.
+    """
+
+    def __init__(self, speed=1.0):
+        self.speed = speed
+        self.started = []
+        self.finished = []
+        self.played = []
+
+    def __call__(self, path, interrupted=None):
+        self.started.append(time.perf_counter())
+        with wave.open(path, 'rb') as wav:
+            seconds = wav.getnframes() / wav.getframerate() * self.speed
+        self.played.append(path)
+        end = time.perf_counter() + seconds
+        try:
+            while time.perf_counter() < end:
+                if interrupted is not None and interrupted():
+                    return False
+                time.sleep(min(0.02, max(0.0, end - time.perf_counter())))
+            return True
+        finally:
+            self.finished.append(time.perf_counter())
+
+
+# ===== SPEECH RECOGNIZER =====
+
+class _FakeRecognizerStream:
+    def __init__(self, recognizer):
+        self._recognizer = recognizer
+
+    def accept(self, frame):
+        return None
+
+    def result(self):
+        time.sleep(self._recognizer.delay)
+        return self._recognizer.next_transcript()
+
+
+class FakeRecognizer:
+    """
+    Stand-in for a cloud recognizer (see recognizers.py)
+    Every utterance takes delay seconds after the endpoint and is
+    transcribed as text, whatever was actually said. text may also be a
+    list of transcripts, returned one per utterance in order (then "").
+    """
+    name = "fake"
+    streaming = False
+
+    def __init__(self, text="what is the capital of France", delay=0.5):
+        self.text = text
+        self.delay = delay
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def next_transcript(self):
+        if isinstance(self.text, str):
+            return self.text
+        with self._lock:
+            index, self._next = self._next, self._next + 1
+        return self.text[index] if index < len(self.text) else ""
+
+    def load(self):
+        return None
+
+    def start(self, sample_rate, sample_width=2):
+        return _FakeRecognizerStream(self)
+
+    def recognize(self, pcm, sample_rate, sample_width=2):
+        return self.start(sample_rate, sample_width).result()
+
+
+def synthetic_utterance(seed=None, words=6, sample_rate=16000, pause_rate=0.1,
+                        lead_silence=1.0, trail_silence=2.5, noise=40, level=1.0):
+    """
+    Speech-like 16-bit mono PCM with known boundaries
+    Words are 150-400 ms voiced bursts with fade-out tails, separated by
+    short gaps and (with probability pause_rate) 200-400 ms hesitations.
+    level scales the loudness (e.g. 0.3 for our own voice heard through the
+    speakers). Returns (pcm, speech_start, speech_end) with times in seconds.
+    """
+    rng = random.Random(seed)
+    segments = [(lead_silence, 0.0, 0.0)]  # (seconds, amplitude, pitch)
+    for i in range(words):
+        if i:
+            gap = rng.uniform(0.2, 0.4) if rng.random() < pause_rate else rng.uniform(0.06, 0.18)
+            segments.append((gap, 0.0, 0.0))
+        segments.append((rng.uniform(0.15, 0.4), level * rng.uniform(1500, 4000), rng.uniform(110, 260)))
+    segments.append((trail_silence, 0.0, 0.0))
+
+    samples = []
+    speech_start = speech_end = None
+    fade = int(0.04 * sample_rate)
+    for seconds, amplitude, pitch in segments:
+        count = int(seconds * sample_rate)
+        if amplitude:
+            if speech_start is None:
+                speech_start = len(samples) / sample_rate
+            for n in range(count):
+                envelope = min(1.0, n / fade, (count - n) / fade)
+                voiced = math.sin(2 * math.pi * pitch * n / sample_rate)
+                voiced += 0.5 * math.sin(4 * math.pi * pitch * n / sample_rate)
+                samples.append(amplitude * envelope * voiced / 1.5 + rng.gauss(0, noise))
+            speech_end = len(samples) / sample_rate
+        else:
+            samples.extend(rng.gauss(0, noise) for _ in range(count))
+    clipped = [max(-32768, min(32767, int(v))) for v in samples]
+    return struct.pack(f'<{len(clipped)}h', *clipped), speech_start, speech_end
+
+
+# ===== ENDPOINTING FIXTURES =====
+
+def load_endpoint_fixtures(directory):
+    """[(name, pcm, sample_rate, speech_end)] from foo.wav + foo.json {"speech_end": seconds} pairs"""
+    import glob
+    import json
+    import os
+    fixtures = []
+    for wav_path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        json_path = os.path.splitext(wav_path)[0] + ".json"
+        if not os.path.exists(json_path):
+            print(f"[WARN] No speech_end label for {wav_path} - skipped")
+            continue
+        with open(json_path, encoding="utf-8") as f:
+            speech_end = json.load(f)["speech_end"]
+        with wave.open(wav_path, "rb") as wav:
+            fixtures.append((wav_path, wav.readframes(wav.getnframes()), wav.getframerate(), speech_end))
+    return fixtures
+
+
+def write_endpoint_fixtures(directory, fixtures):
+    """Save (name, pcm, sample_rate, speech_end) tuples in the load_endpoint_fixtures layout"""
+    import json
+    import os
+    os.makedirs(directory, exist_ok=True)
+    for name, pcm, rate, speech_end in fixtures:
+        base = os.path.join(directory, name)
+        with wave.open(base + ".wav", "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(rate)
+            wav.writeframes(pcm)
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump({"speech_end": round(speech_end, 4)}, f)
+
+
+def evaluate_endpointer(fixtures, make_endpointer):
+    """
+    Endpoint delays (detected end - labelled end) and the number of phrases cut early
+    make_endpointer(frame_seconds) builds the Endpointer under test for each fixture.
+    """
+    from audio_capture import CaptureSession, PCMSource
+
+    delays, early = [], 0
+    for _name, pcm, rate, speech_end in fixtures:
+        session = CaptureSession(PCMSource(pcm, sample_rate=rate), backlog_seconds=None).start()
+        phrase = session.listen(timeout=None, phrase_time_limit=None, flush=False,
+                                endpointer=make_endpointer(session.frame_seconds))
+        session.stop()
+        if not phrase:
+            early += 1
+            continue
+        delay = session.last_phrase[1] - speech_end
+        if delay < 0:
+            early += 1
+        else:
+            delays.append(delay)
+    return delays, early
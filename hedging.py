@@ -0,0 +1,169 @@
+"""
+Hedged Requests - Race AI providers and keep the first good answer
+The primary request starts at once; the next one starts after a delay
+(or as soon as the primary fails). The first success wins and the others
+are cancelled. Per-provider win rates and latencies are kept in .stats.
+"""
+import collections
+import contextvars
+import queue
+import threading
+import time
+
+
+class HedgeError(Exception):
+    """Every provider in the race failed"""
+
+
+class ProviderStats:
+    def __init__(self, window=200):
+        self.launched = 0
+        self.wins = 0
+        self.failures = 0
+        self.cancelled = 0
+        self.latencies = collections.deque(maxlen=window)  # Seconds, successful calls only
+
+    @property
+    def win_rate(self):
+        return self.wins / self.launched if self.launched else 0.0
+
+    def percentile(self, p):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    def as_dict(self):
+        return {
+            'launched': self.launched,
+            'wins': self.wins,
+            'failures': self.failures,
+            'cancelled': self.cancelled,
+            'win_rate': round(self.win_rate, 3),
+            'p50_ms': None if not self.latencies else round(self.percentile(0.5) * 1000, 1),
+            'p95_ms': None if not self.latencies else round(self.percentile(0.95) * 1000, 1),
+        }
+
+
+class Hedger:
+    """
+    candidates are (name, fn) pairs in priority order. fn(cancel_event)
+    returns the answer for call() or an iterator of chunks for stream();
+    it should give up once cancel_event is set.
+    """
+
+    def __init__(self, delay=1.0):
+        self.delay = delay
+        self.stats = collections.defaultdict(ProviderStats)
+        self._lock = threading.Lock()
+
+    def stats_dict(self):
+        with self._lock:
+            return {name: s.as_dict() for name, s in self.stats.items()}
+
+    def _launch(self, name, fn, results, cancels, mode):
+        cancel = threading.Event()
+        cancels[name] = cancel
+        with self._lock:
+            self.stats[name].launched += 1
+        start = time.perf_counter()
+
+        def run():
+            try:
+                if mode == 'call':
+                    value = fn(cancel)
+                    results.put((name, 'done', value, time.perf_counter() - start))
+                    return
+                chunks = fn(cancel)
+                try:
+                    for chunk in chunks:
+                        if cancel.is_set():
+                            break
+                        results.put((name, 'chunk', chunk, time.perf_counter() - start))
+                finally:
+                    close = getattr(chunks, 'close', None)
+                    if close:
+                        close()
+                results.put((name, 'done', None, time.perf_counter() - start))
+            except Exception as e:
+                results.put((name, 'error', e, time.perf_counter() - start))
+
+        # Candidates see the caller's context (tracing turn, session memory)
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(run,), name=f"hedge-{name}", daemon=True).start()
+
+    def _race(self, candidates, delay, mode):
+        """Yield (name, kind, value) events of the winning candidate only"""
+        delay = self.delay if delay is None else delay
+        pending = list(candidates)
+        if not pending:
+            raise HedgeError("No AI providers configured")
+        results = queue.Queue()
+        cancels = {}
+        running = set()
+        winner = None
+        errors = []
+
+        def launch_next():
+            name, fn = pending.pop(0)
+            running.add(name)
+            self._launch(name, fn, results, cancels, mode)
+            return time.monotonic() + delay
+
+        deadline = launch_next()
+        try:
+            while True:
+                timeout = None
+                if winner is None and pending:
+                    timeout = max(0.0, deadline - time.monotonic())
+                try:
+                    name, kind, value, latency = results.get(timeout=timeout)
+                except queue.Empty:
+                    print(f"[HEDGE] No answer after {delay:.1f}s - starting {pending[0][0]}")
+                    deadline = launch_next()
+                    continue
+
+                if winner is not None and name != winner:
+                    continue  # Late events from a cancelled loser
+
+                if kind == 'error' or (kind == 'done' and winner is None and not value):
+                    running.discard(name)
+                    with self._lock:
+                        self.stats[name].failures += 1
+                    errors.append(f"{name}: {value or 'empty answer'}")
+                    if winner is not None:
+                        raise HedgeError(f"{name} failed mid-answer: {value}")
+                    if pending:
+                        deadline = launch_next()
+                    elif not running:
+                        raise HedgeError("All AI providers failed (" + "; ".join(errors) + ")")
+                    continue
+
+                if winner is None:
+                    winner = name
+                    with self._lock:
+                        self.stats[name].wins += 1
+                        self.stats[name].latencies.append(latency)
+                        for other in running - {name}:
+                            cancels[other].set()
+                            self.stats[other].cancelled += 1
+                    print(f"[HEDGE] {name} answered first ({latency * 1000:.0f} ms)")
+
+                yield name, kind, value
+                if kind == 'done':
+                    return
+        finally:
+            # Also cancel everything if the consumer stops early
+            for cancel in cancels.values():
+                cancel.set()
+
+    def call(self, candidates, delay=None):
+        """Return (provider name, answer) from the first provider to succeed"""
+        for name, _kind, value in self._race(candidates, delay, 'call'):
+            return name, value
+
+    def stream(self, candidates, delay=None):
+        """Yield chunks from the first provider to start answering"""
+        for _name, kind, value in self._race(candidates, delay, 'stream'):
+            if kind == 'chunk':
+                yield value
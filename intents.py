@@ -0,0 +1,133 @@
+"""
+Intent Engine - Compiled matcher for local commands
+Intents are registered once with trigger keywords, optional regex patterns
+(named groups become slots) and a priority. compile() builds a word-level
+keyword automaton, so routing cost depends on the utterance length and the
+few candidate intents it triggers - not on how many intents exist.
+"""
+import re
+
+_TOKEN = re.compile(r"[a-z0-9']+|[^\sa-z0-9']")
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+class Intent:
+    def __init__(self, name, handler, keywords=(), patterns=(), priority=0, order=0):
+        self.name = name
+        self.handler = handler
+        self.keywords = [tuple(tokenize(k)) for k in keywords]
+        self.patterns = list(patterns)
+        self.priority = priority
+        self.order = order
+        self.regex = None
+
+    def compile(self):
+        if self.patterns:
+            self.regex = re.compile("|".join(f"(?:{p})" for p in self.patterns))
+        return self
+
+
+class IntentMatch:
+    def __init__(self, intent, text, slots):
+        self.intent = intent
+        self.text = text
+        self.slots = slots
+
+    @property
+    def name(self):
+        return self.intent.name
+
+    def __repr__(self):
+        return f"IntentMatch({self.name!r}, {self.slots!r})"
+
+
+class IntentEngine:
+    """
+    Register intents, then match() utterances against all of them at once
+    Candidates are found in one pass over the words; they are then tried in
+    priority order (higher first, ties in registration order) and the first
+    whose pattern matches and whose handler returns a response wins.
+    """
+
+    def __init__(self):
+        self.intents = []
+        self._index = None  # first keyword token -> [(phrase tokens, intent)]
+        self._always = []  # intents without keywords (pattern only)
+
+    def register(self, name, handler, keywords=(), patterns=(), priority=0):
+        intent = Intent(name, handler, keywords, patterns, priority, order=len(self.intents))
+        self.intents.append(intent)
+        self._index = None
+        return intent
+
+    def intent(self, name, keywords=(), patterns=(), priority=0):
+        """Decorator form of register()"""
+        def decorator(handler):
+            self.register(name, handler, keywords, patterns, priority)
+            return handler
+        return decorator
+
+    def compile(self):
+        index = {}
+        always = []
+        for intent in self.intents:
+            intent.compile()
+            if not intent.keywords:
+                always.append(intent)
+            for phrase in intent.keywords:
+                if phrase:
+                    index.setdefault(phrase[0], []).append((phrase, intent))
+        self._index = index
+        self._always = always
+        return self
+
+    def candidates(self, text):
+        """Intents whose keywords occur in text, best first"""
+        if self._index is None:
+            self.compile()
+        tokens = tokenize(text)
+        found = {intent.order: intent for intent in self._always}
+        index = self._index
+        for i, token in enumerate(tokens):
+            entries = index.get(token)
+            if not entries:
+                continue
+            for phrase, intent in entries:
+                if intent.order not in found and tuple(tokens[i:i + len(phrase)]) == phrase:
+                    found[intent.order] = intent
+        return sorted(found.values(), key=lambda it: (-it.priority, it.order))
+
+    def match(self, text):
+        """Best IntentMatch for text, or None"""
+        text_lower = text.lower()
+        for intent in self.candidates(text_lower):
+            if intent.regex is None:
+                return IntentMatch(intent, text_lower, {})
+            found = intent.regex.search(text_lower)
+            if found:
+                slots = {k: v for k, v in found.groupdict().items() if v is not None}
+                return IntentMatch(intent, text_lower, slots)
+        return None
+
+    def dispatch(self, text):
+        """Run handlers of matching intents in priority order, return (IntentMatch, response)"""
+        text_lower = text.lower()
+        for intent in self.candidates(text_lower):
+            slots = {}
+            if intent.regex is not None:
+                found = intent.regex.search(text_lower)
+                if not found:
+                    continue
+                slots = {k: v for k, v in found.groupdict().items() if v is not None}
+            match = IntentMatch(intent, text_lower, slots)
+            response = intent.handler(match)
+            if response:
+                return match, response
+        return None, None
+
+    def respond(self, text):
+        """Response of the first matching intent whose handler answers, or None"""
+        return self.dispatch(text)[1]
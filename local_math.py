@@ -0,0 +1,442 @@
+"""
+Local Math - Spoken arithmetic and unit conversions without the AI
+Spoken numbers are turned into digits, the phrase into an arithmetic
+expression, and the expression is evaluated by walking a whitelisted
+Python AST (never eval). Anything that is not clearly math returns None.
+"""
+import ast
+import math
+import operator
+import re
+
+# ===== NUMBER WORDS =====
+
+_UNITS = {
+    'zero': 0, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6,
+    'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12,
+    'thirteen': 13, 'fourteen': 14, 'fifteen': 15, 'sixteen': 16,
+    'seventeen': 17, 'eighteen': 18, 'nineteen': 19,
+}
+_TENS = {
+    'twenty': 20, 'thirty': 30, 'forty': 40, 'fifty': 50,
+    'sixty': 60, 'seventy': 70, 'eighty': 80, 'ninety': 90,
+}
+_SCALES = {'hundred': 100, 'thousand': 1000, 'million': 10 ** 6, 'billion': 10 ** 9}
+
+_WORD = re.compile(r"\d+(?:\.\d+)?|[a-z']+|\*\*|[^\sa-z\d]")
+
+
+def _is_digits(word):
+    return word[0].isdigit()
+
+
+def _parse_number(words, i):
+    """Parse a spoken number starting at words[i], return (value, next index) or (None, i)"""
+    total = 0
+    current = 0
+    seen = False
+    start = i
+    n = len(words)
+    while i < n:
+        w = words[i]
+        nxt = words[i + 1] if i + 1 < n else None
+        if w in _UNITS:
+            # "twenty five" / "hundred five" continue a number, "five six" does not
+            if seen and not (current % 100 == 0 or (current % 100 >= 20 and current % 10 == 0)):
+                break
+            current += _UNITS[w]
+        elif w in _TENS:
+            if seen and current % 100 != 0:
+                break
+            current += _TENS[w]
+        elif _is_digits(w):
+            if seen:
+                break
+            current = float(w) if '.' in w else int(w)
+        elif w == 'a' and not seen and nxt in _SCALES:
+            current = 1
+        elif w in _SCALES and (seen or w != 'hundred'):
+            if not seen:
+                break
+            if w == 'hundred':
+                current *= 100
+            else:
+                total += current * _SCALES[w]
+                current = 0
+        elif w == 'and' and seen and nxt is not None and (nxt in _UNITS or nxt in _TENS):
+            pass
+        elif w == 'point' and seen and nxt is not None and (nxt in _UNITS or _is_digits(nxt)):
+            digits = []
+            i += 1
+            while i < n and (words[i] in _UNITS and _UNITS[words[i]] < 10 or _is_digits(words[i])):
+                digits.append(str(_UNITS.get(words[i], words[i])))
+                i += 1
+            return float(f"{int(total + current)}.{''.join(digits)}"), i
+        else:
+            break
+        seen = True
+        i += 1
+    if not seen:
+        return None, start
+    return total + current, i
+
+
+def words_to_numbers(text):
+    """Split text into words with every spoken number replaced by its value"""
+    text = text.lower()
+    text = re.sub(r'(?<=\d),(?=\d{3})', '', text)  # 1,000 -> 1000
+    text = re.sub(r'(?<=[a-z])-(?=[a-z])', ' ', text)  # twenty-five -> twenty five
+    words = _WORD.findall(text)
+    out = []
+    i = 0
+    while i < len(words):
+        value, j = _parse_number(words, i)
+        if value is None:
+            out.append(words[i])
+            i += 1
+        else:
+            out.append(value)
+            i = j
+    return out
+
+
+# ===== ARITHMETIC =====
+
+# Spoken operator phrases -> expression tokens (longest phrases first)
+_PHRASES = sorted([
+    (('plus',), '+'), (('+',), '+'), (('add',), '+'), (('and',), '+'),
+    (('minus',), '-'), (('-',), '-'), (('negative',), '-'), (('subtract',), '-'),
+    (('times',), '*'), (('multiplied', 'by'), '*'), (('multiply', 'by'), '*'),
+    (('multiply',), '*'), (('x',), '*'), (('*',), '*'), (('into',), '*'),
+    (('divided', 'by'), '/'), (('divide', 'by'), '/'), (('divide',), '/'),
+    (('over',), '/'), (('/',), '/'),
+    (('mod',), '%'), (('modulo',), '%'),
+    (('to', 'the', 'power', 'of'), '**'), (('raised', 'to', 'the', 'power', 'of'), '**'),
+    (('raised', 'to'), '**'), (('to', 'the', 'power'), '**'), (('power',), '**'),
+    (('^',), '**'), (('**',), '**'),
+    (('squared',), 'SQUARED'), (('cubed',), 'CUBED'),
+    (('percent', 'of'), 'PERCENT_OF'), (('percent',), 'PERCENT'),
+    (('%', 'of'), 'PERCENT_OF'), (('%',), 'PERCENT'),
+    (('square', 'root', 'of'), 'sqrt'), (('square', 'root'), 'sqrt'), (('root', 'of'), 'sqrt'),
+    (('sqrt',), 'sqrt'), (('cube', 'root', 'of'), 'cbrt'), (('cube', 'root'), 'cbrt'),
+    (('half', 'of'), 'HALF_OF'), (('double',), 'DOUBLE'), (('twice',), 'DOUBLE'),
+    (('(',), '('), ((')',), ')'),
+], key=lambda item: -len(item[0]))
+
+# Words that may surround a math question without changing it
+_FILLER = {
+    'what', "what's", 'whats', 'is', 'the', 'calculate', 'compute', 'how', 'much',
+    'equals', 'equal', 'please', 'tell', 'me', 'result', 'of', 'answer',
+    'zen', 'hey', 'ok', 'okay', 'can', 'you', '?', '.', ',', '!', '=', 'by',
+}
+
+_BINARY = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+}
+_UNARY = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+_FUNCTIONS = {
+    'sqrt': math.sqrt,
+    'cbrt': lambda x: math.copysign(abs(x) ** (1.0 / 3.0), x),
+}
+# Tokens that close an operand, so a "-" after them is subtraction
+_OPERAND_END = {'SQUARED', 'CUBED', 'PERCENT', ')'}
+# Tokens that open an operand, so one right after an operand is missing an operator
+_OPERAND_START = {'sqrt', 'cbrt', 'HALF_OF', 'DOUBLE', '('}
+MAX_EXPONENT = 1000
+MAX_RESULT_BITS = 1 << 16  # Integer powers beyond this (about 19,700 digits) are refused before computing
+MAX_SPOKEN_DIGITS = 15  # Longer whole numbers are spoken as "about 1.07 times 10 to the power of 301"
+
+
+class MathError(Exception):
+    """The expression is math, but cannot be answered (e.g. divide by zero)"""
+
+
+def _pow_bits(base, exponent):
+    """Upper bound on the bits of an integer power; floats overflow on their own"""
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0:
+        return abs(base).bit_length() * exponent
+    return 0
+
+
+def _evaluate(node):
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+            and not isinstance(node.value, bool):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+        left, right = _evaluate(node.left), _evaluate(node.right)
+        if isinstance(node.op, ast.Pow) and (abs(right) > MAX_EXPONENT or _pow_bits(left, right) > MAX_RESULT_BITS):
+            raise MathError("That number is too large for me to calculate")
+        if isinstance(node.op, (ast.Div, ast.Mod)) and right == 0 \
+                or isinstance(node.op, ast.Pow) and left == 0 and right < 0:
+            raise MathError("I cannot divide by zero")
+        return _BINARY[type(node.op)](left, right)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY:
+        return _UNARY[type(node.op)](_evaluate(node.operand))
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) \
+            and node.func.id in _FUNCTIONS and len(node.args) == 1 and not node.keywords:
+        value = _evaluate(node.args[0])
+        if node.func.id == 'sqrt' and value < 0:
+            raise MathError("I cannot take the square root of a negative number")
+        return _FUNCTIONS[node.func.id](value)
+    raise ValueError(f"Unsupported expression: {ast.dump(node)}")
+
+
+def safe_eval(expression):
+    """Evaluate an arithmetic expression string through a whitelisted AST walk"""
+    try:
+        return _evaluate(ast.parse(expression, mode='eval'))
+    except OverflowError:
+        # A float result (or an integer mixed with floats) beyond about 1e308
+        raise MathError("That number is too large for me to calculate")
+
+
+def _is_number(token):
+    """True for a number token, signed ("-4", "(-4)") or not"""
+    return token.lstrip('(-')[:1].isdigit()
+
+
+def _to_expression(words):
+    """Turn number/operator words into an expression string, None if it is not math"""
+    tokens = []
+    i = 0
+    while i < len(words):
+        w = words[i]
+        if not isinstance(w, str):
+            tokens.append(repr(w))
+            i += 1
+            continue
+        for phrase, token in _PHRASES:
+            if tuple(words[i:i + len(phrase)]) == phrase:
+                tokens.append(token)
+                i += len(phrase)
+                break
+        else:
+            if w in _FILLER:
+                i += 1
+                continue
+            return None
+
+    # "and" only means plus between two numbers ("add 3 and 4"); drop the leading "add"
+    if tokens and tokens[0] == '+':
+        tokens = tokens[1:]
+
+    expression = []
+    operators = 0
+    pending_function = None
+    negate = False
+    ended = False  # The last token closed an operand
+    for j, token in enumerate(tokens):
+        # A sign with no operand before it belongs to the next number:
+        # "square root of negative 4" is sqrt(-4), "negative 4 squared" is (-4)**2
+        if token == '-' and j + 1 < len(tokens) and tokens[j + 1][0].isdigit() \
+                and (j == 0 or not (tokens[j - 1][0].isdigit() or tokens[j - 1] in _OPERAND_END)):
+            negate = True
+            operators += 1
+            continue
+        if negate and token[0].isdigit():
+            token = f"-{token}" if pending_function else f"(-{token})"
+            negate = False
+        if ended and (_is_number(token) or token in _OPERAND_START):
+            return None  # No operator between two numbers ("two three times 4") - not understood
+        ended = _is_number(token) or token in _OPERAND_END
+        if token in ('sqrt', 'cbrt'):
+            pending_function = token
+            operators += 1
+            continue
+        if token == 'SQUARED':
+            expression.append('**2')
+        elif token == 'CUBED':
+            expression.append('**3')
+        elif token == 'PERCENT':
+            expression.append('/100')
+        elif token == 'PERCENT_OF':
+            expression.append('/100*')
+        elif token == 'HALF_OF':
+            expression.append('0.5*')
+        elif token == 'DOUBLE':
+            expression.append('2*')
+        elif pending_function and _is_number(token):
+            expression.append(f"{pending_function}({token})")
+            pending_function = None
+            continue
+        else:
+            expression.append(token)
+            if not _is_number(token) and token not in '()':
+                operators += 1
+            continue
+        operators += 1
+    if pending_function or not operators:
+        return None
+    return "".join(expression)
+
+
+def _scientific(value):
+    """Speakable form of a number with more than MAX_SPOKEN_DIGITS digits (3 significant digits)"""
+    sign = "-" if value < 0 else ""
+    value = abs(int(value))
+    # Integer arithmetic from here: huge results do not fit in a float
+    exponent = int(math.log10(value))
+    while 10 ** exponent > value:
+        exponent -= 1
+    while 10 ** (exponent + 1) <= value:
+        exponent += 1
+    unit = 10 ** (exponent - 2)
+    lead = (value + unit // 2) // unit
+    if lead == 1000:  # 9.995... rounds up to 10
+        lead, exponent, unit = 100, exponent + 1, unit * 10
+    about = "" if lead * unit == value else "about "
+    return f"{about}{sign}{format_number(lead / 100, 2)} times 10 to the power of {exponent}"
+
+
+def format_number(value, places=4):
+    """Speakable number: no trailing .0, more than MAX_SPOKEN_DIGITS digits in scientific words"""
+    if isinstance(value, float) and (math.isinf(value) or math.isnan(value)):
+        raise MathError("That number is too large for me to calculate")
+    if abs(value) >= 10 ** MAX_SPOKEN_DIGITS:
+        return _scientific(value)
+    if value == int(value):
+        return str(int(value))
+    text = f"{value:.{places}f}".rstrip('0').rstrip('.')
+    return text if text not in ('0', '-0') else f"{value:.2g}"
+
+
+def _strip_question(text):
+    text = text.lower().strip().rstrip('?.!').strip()
+    return re.sub(r"^(?:(?:hey|ok|okay|zen|what is|what's|whats|calculate|compute|"
+                  r"how much is|tell me|please|the)\s+)+", '', text)
+
+
+def calculate(text):
+    """Answer a spoken arithmetic question, None if it is not one"""
+    words = words_to_numbers(text)
+    if not any(not isinstance(w, str) for w in words):
+        return None
+    expression = _to_expression(words)
+    if expression is None:
+        return None
+    try:
+        result = safe_eval(expression)
+        return f"{_strip_question(text)} equals {format_number(result)}"
+    except MathError as e:
+        return str(e)
+    except (SyntaxError, ValueError, TypeError, OverflowError):
+        return None
+
+
+# ===== UNIT CONVERSION =====
+
+# unit -> (dimension, factor to the base unit, singular name, plural name)
+_UNIT_TABLE = {
+    # Length (meters)
+    'meter': ('length', 1.0, 'meter', 'meters'), 'kilometer': ('length', 1000.0, 'kilometer', 'kilometers'),
+    'centimeter': ('length', 0.01, 'centimeter', 'centimeters'), 'millimeter': ('length', 0.001, 'millimeter', 'millimeters'),
+    'mile': ('length', 1609.344, 'mile', 'miles'), 'yard': ('length', 0.9144, 'yard', 'yards'),
+    'foot': ('length', 0.3048, 'foot', 'feet'), 'inch': ('length', 0.0254, 'inch', 'inches'),
+    # Mass (kilograms)
+    'kilogram': ('mass', 1.0, 'kilogram', 'kilograms'), 'gram': ('mass', 0.001, 'gram', 'grams'),
+    'pound': ('mass', 0.45359237, 'pound', 'pounds'), 'ounce': ('mass', 0.028349523125, 'ounce', 'ounces'),
+    'stone': ('mass', 6.35029318, 'stone', 'stone'), 'ton': ('mass', 1000.0, 'tonne', 'tonnes'),
+    # Volume (liters)
+    'liter': ('volume', 1.0, 'liter', 'liters'), 'milliliter': ('volume', 0.001, 'milliliter', 'milliliters'),
+    'gallon': ('volume', 3.785411784, 'gallon', 'gallons'), 'quart': ('volume', 0.946352946, 'quart', 'quarts'),
+    'pint': ('volume', 0.473176473, 'pint', 'pints'), 'cup': ('volume', 0.2365882365, 'cup', 'cups'),
+    # Time (seconds)
+    'second': ('time', 1.0, 'second', 'seconds'), 'minute': ('time', 60.0, 'minute', 'minutes'),
+    'hour': ('time', 3600.0, 'hour', 'hours'), 'day': ('time', 86400.0, 'day', 'days'),
+    'week': ('time', 604800.0, 'week', 'weeks'),
+    # Temperature (handled separately)
+    'celsius': ('temperature', None, 'degree Celsius', 'degrees Celsius'),
+    'fahrenheit': ('temperature', None, 'degree Fahrenheit', 'degrees Fahrenheit'),
+    'kelvin': ('temperature', None, 'kelvin', 'kelvin'),
+}
+
+_UNIT_ALIASES = {
+    'meters': 'meter', 'metre': 'meter', 'metres': 'meter', 'm': 'meter',
+    'kilometers': 'kilometer', 'kilometre': 'kilometer', 'kilometres': 'kilometer', 'km': 'kilometer',
+    'centimeters': 'centimeter', 'centimetre': 'centimeter', 'centimetres': 'centimeter', 'cm': 'centimeter',
+    'millimeters': 'millimeter', 'millimetre': 'millimeter', 'millimetres': 'millimeter', 'mm': 'millimeter',
+    'miles': 'mile', 'mi': 'mile', 'yards': 'yard', 'yd': 'yard',
+    'feet': 'foot', 'ft': 'foot', 'inches': 'inch', 'in': 'inch',
+    'kilograms': 'kilogram', 'kilo': 'kilogram', 'kilos': 'kilogram', 'kg': 'kilogram',
+    'grams': 'gram', 'g': 'gram', 'pounds': 'pound', 'lb': 'pound', 'lbs': 'pound',
+    'ounces': 'ounce', 'oz': 'ounce', 'tons': 'ton', 'tonne': 'ton', 'tonnes': 'ton',
+    'liters': 'liter', 'litre': 'liter', 'litres': 'liter', 'l': 'liter',
+    'milliliters': 'milliliter', 'millilitre': 'milliliter', 'millilitres': 'milliliter', 'ml': 'milliliter',
+    'gallons': 'gallon', 'quarts': 'quart', 'pints': 'pint', 'cups': 'cup',
+    'seconds': 'second', 'sec': 'second', 'secs': 'second', 'minutes': 'minute', 'min': 'minute',
+    'mins': 'minute', 'hours': 'hour', 'hr': 'hour', 'hrs': 'hour', 'days': 'day', 'weeks': 'week',
+    'centigrade': 'celsius', 'c': 'celsius', 'f': 'fahrenheit', 'k': 'kelvin',
+}
+
+_UNIT_WORD = r"(?:degrees?\s+)?(?P<{name}>[a-z]+)"
+_NUM = r"(?P<value>-?\d+(?:\.\d+)?)"
+_CONVERSIONS = [
+    re.compile(rf"^(?:convert\s+)?{_NUM}\s*{_UNIT_WORD.format(name='src')}\s+(?:to|in|into|as)\s+{_UNIT_WORD.format(name='dst')}$"),
+    re.compile(rf"^how\s+many\s+{_UNIT_WORD.format(name='dst')}\s+(?:are\s+)?(?:there\s+)?in\s+(?:(?:a|an|one)\s+|{_NUM}\s*)?{_UNIT_WORD.format(name='src')}$"),
+]
+
+
+def _unit(word):
+    word = _UNIT_ALIASES.get(word, word)
+    return word if word in _UNIT_TABLE else None
+
+
+def _to_kelvin(value, unit):
+    if unit == 'celsius':
+        return value + 273.15
+    if unit == 'fahrenheit':
+        return (value - 32) * 5 / 9 + 273.15
+    return value
+
+
+def _from_kelvin(value, unit):
+    if unit == 'celsius':
+        return value - 273.15
+    if unit == 'fahrenheit':
+        return (value - 273.15) * 9 / 5 + 32
+    return value
+
+
+def convert_units(text):
+    """Answer a unit conversion question, None if it is not one"""
+    words = words_to_numbers(_strip_question(text))
+    phrase = " ".join(format_number(w) if not isinstance(w, str) else w for w in words)
+    phrase = re.sub(r'(^|\s)(?:-|minus|negative)\s+(?=\d)', r'\1-', phrase)
+    for pattern in _CONVERSIONS:
+        match = pattern.match(phrase)
+        if match:
+            break
+    else:
+        return None
+
+    src, dst = _unit(match.group('src')), _unit(match.group('dst'))
+    if not src or not dst or _UNIT_TABLE[src][0] != _UNIT_TABLE[dst][0]:
+        return None
+    value = float(match.group('value')) if match.group('value') else 1.0
+
+    dimension = _UNIT_TABLE[src][0]
+    if dimension == 'temperature':
+        result = _from_kelvin(_to_kelvin(value, src), dst)
+    else:
+        result = value * _UNIT_TABLE[src][1] / _UNIT_TABLE[dst][1]
+
+    value_text, result_text = format_number(value), format_number(result, 2)
+    src_name = _UNIT_TABLE[src][2 if value_text == '1' else 3]
+    dst_name = _UNIT_TABLE[dst][2 if result_text == '1' else 3]
+    return f"{value_text} {src_name} is {result_text} {dst_name}"
+
+
+# Words that make a command worth trying here (used as intent keywords)
+TRIGGER_WORDS = sorted(
+    {phrase[0] for phrase, _ in _PHRASES if phrase[0] not in ('and', 'x', '(', ')', 'over', 'power')}
+    | {'convert', 'how many'}
+    | {unit for unit in list(_UNIT_TABLE) + list(_UNIT_ALIASES) if len(unit) > 2}
+)
+
+
+def solve(text):
+    """Local answer for a math or unit question, None to let the AI answer"""
+    return convert_units(text) or calculate(text)
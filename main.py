@@ -1,167 +1,70 @@
 """
 AI Assistant Zen - Main GUI Application
-SECURITY: SHA-256 password hashing, Email validation (RFC 5322)
+SECURITY: Salted scrypt password hashing (auth.py), Email validation (RFC 5322)
 THREADING: Proper thread lifecycle management (HIGH-001 Fixed)
-DATABASE: SQLite for persistent user storage
+DATABASE: SQLite for persistent user storage (pooled WAL connections, see user_store.py)
 """
 import customtkinter as ctk
 import tkinter.messagebox as messagebox
 import os
-import sqlite3
-import hashlib
 import threading
-import re
+import time
 import sys
-from assistant_core import run_ai_assistant_zen, request_stop, reset_stop
-from dotenv import load_dotenv
 
-# Load .env file
-load_dotenv()
+import auth
+from auth import validate_email
+# assistant_core, warmup and the speech/AI stacks are imported on first use so the
+# login window appears without loading them (see: python benchmark.py startup)
 
 # Database setup
 DB_NAME = "assistant_users.db"
 
+# Seconds to wait for the assistant thread after Stop before warning
+STOP_TIMEOUT = 5.0
+
+_user_store = None
+_user_store_lock = threading.Lock()
+
+def get_user_store():
+    """The shared UserStore (connection pool); opened and migrated on first use"""
+    global _user_store
+    with _user_store_lock:
+        if _user_store is None:
+            from user_store import UserStore
+            _user_store = UserStore(DB_NAME)
+        return _user_store
+
 def init_database():
-    """Initialize SQLite database with users table"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            last_login TIMESTAMP
-        )
-    """)
-    
-    conn.commit()
-    conn.close()
+    """Open the user database, applying any pending schema migrations"""
+    get_user_store()
     print(f"[OK] Database initialized: {DB_NAME}")
 
 def hash_password(password):
-    """Hash password using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hash password using salted scrypt (cost calibrated to this machine)"""
+    return auth.hash_password(password)
 
 def verify_password(password, password_hash):
-    """Verify password against hash"""
-    return hash_password(password) == password_hash
-
-def validate_email(email):
-    """
-    Validate email format using regex (RFC 5322 compliant)
-    Returns True if email is valid, False otherwise
-    """
-    # Comprehensive email validation regex
-    email_pattern = r'^[a-zA-Z0-9][a-zA-Z0-9._%+-]{0,63}@[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?(?:\.[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)*\.[a-zA-Z]{2,}$'
-    
-    # Additional validation checks
-    if not email or len(email) > 254:  # Max email length per RFC 5321
-        return False
-    
-    if email.count('@') != 1:  # Must have exactly one @ symbol
-        return False
-    
-    local_part, domain = email.rsplit('@', 1)
-    
-    # Local part (before @) validation
-    if len(local_part) > 64:  # Max local part length
-        return False
-    
-    if local_part.startswith('.') or local_part.endswith('.'):
-        return False
-    
-    if '..' in local_part:  # No consecutive dots
-        return False
-    
-    # Domain validation
-    if len(domain) > 253:  # Max domain length
-        return False
-    
-    if domain.startswith('-') or domain.endswith('-'):
-        return False
-    
-    # Apply regex pattern
-    return re.match(email_pattern, email) is not None
+    """Verify password against hash (salted or legacy SHA-256)"""
+    return auth.verify_password(password, password_hash)
 
 def register_user_db(email, password):
-    """Register a new user in the database"""
+    """Register a new user in the database (blocking - the GUI uses AuthService)"""
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        
-        password_hash = hash_password(password)
-        
-        cursor.execute(
-            "INSERT INTO users (email, password_hash) VALUES (?, ?)",
-            (email, password_hash)
-        )
-        
-        conn.commit()
-        conn.close()
-        return True, "Account created successfully!"
-    
-    except sqlite3.IntegrityError:
-        return False, "User already exists!"
+        return auth.register(get_user_store(), email, password)
     except Exception as e:
         return False, f"Database error: {str(e)}"
 
 def login_user_db(email, password):
-    """Verify user login credentials"""
+    """Verify user login credentials (blocking - the GUI uses AuthService)"""
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "SELECT password_hash FROM users WHERE email = ?",
-            (email,)
-        )
-        
-        result = cursor.fetchone()
-        
-        if result:
-            password_hash = result[0]
-            if verify_password(password, password_hash):
-                # Update last login time
-                cursor.execute(
-                    "UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE email = ?",
-                    (email,)
-                )
-                conn.commit()
-                conn.close()
-                return True, "Login successful!"
-            else:
-                conn.close()
-                return False, "Incorrect password!"
-        else:
-            conn.close()
-            return False, "User not found!"
-    
+        return auth.authenticate(get_user_store(), email, password)
     except Exception as e:
         return False, f"Database error: {str(e)}"
 
 def get_user_stats(email):
     """Get user statistics from database"""
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "SELECT created_at, last_login FROM users WHERE email = ?",
-            (email,)
-        )
-        
-        result = cursor.fetchone()
-        conn.close()
-        
-        if result:
-            return {
-                'created_at': result[0],
-                'last_login': result[1]
-            }
-        return None
-    
+        return get_user_store().get_stats(email)
     except Exception as e:
         print(f"Error fetching user stats: {e}")
         return None
@@ -178,10 +81,16 @@ class AssistantApp(ctk.CTk):
 
         self.current_user = None
         self.assistant_thread = None
+        self.warmup = None  # Background warm-up of TTS, microphone and AI clients
+        self.auth_pending = False  # A login/registration is running on the auth workers
         
         # Initialize database
         init_database()
         
+        # Hashing and database work run off the Tk thread
+        self.auth = auth.AuthService(get_user_store())
+        self.auth.warm_up()
+        
         self.show_login_screen()
 
     def clear_window(self):
@@ -240,6 +149,8 @@ class AssistantApp(ctk.CTk):
         self.back_to_login.pack(pady=10)
 
     def register_user(self):
+        if self.auth_pending:
+            return
         email = self.new_email.get().strip()
         password = self.new_password.get()
         confirm_password = self.confirm_password.get()
@@ -253,17 +164,19 @@ class AssistantApp(ctk.CTk):
             messagebox.showerror("Error", "Please enter a valid email address!")
             return
         
-        if len(password) < 6:
-            messagebox.showerror("Error", "Password must be at least 6 characters long!")
+        if len(password) < auth.MIN_PASSWORD_LENGTH:
+            messagebox.showerror("Error", f"Password must be at least {auth.MIN_PASSWORD_LENGTH} characters long!")
             return
         
         if password != confirm_password:
             messagebox.showerror("Error", "Passwords do not match!")
             return
         
-        # Register in database
-        success, message = register_user_db(email, password)
-        
+        # Register in database (on the auth workers)
+        self._run_auth(self.auth.register(email, password), self.register_btn, self._on_registered)
+
+    def _on_registered(self, result):
+        success, message = result
         if success:
             messagebox.showinfo("Success", message)
             self.show_login_screen()
@@ -271,6 +184,8 @@ class AssistantApp(ctk.CTk):
             messagebox.showerror("Error", message)
 
     def login_user(self):
+        if self.auth_pending:
+            return
         email = self.email_entry.get().strip()
         password = self.password_entry.get()
         
@@ -282,15 +197,34 @@ class AssistantApp(ctk.CTk):
             messagebox.showerror("Error", "Please enter a valid email address!")
             return
         
-        # Verify credentials from database
-        success, message = login_user_db(email, password)
-        
+        # Verify credentials from database (on the auth workers)
+        self._run_auth(self.auth.login(email, password), self.login_button,
+                       lambda result: self._on_login(email, result))
+
+    def _on_login(self, email, result):
+        success, message = result
         if success:
             self.current_user = email
             self.show_dashboard()
         else:
             messagebox.showerror("Login Failed", message)
 
+    def _run_auth(self, future, button, callback):
+        """Disable button until the auth future finishes, then call callback(result) on the Tk thread"""
+        self.auth_pending = True
+        button.configure(state="disabled")
+        self._poll_auth(future, button, callback)
+
+    def _poll_auth(self, future, button, callback):
+        """Polled with after() - Tk is not thread-safe"""
+        if not future.done():
+            self.after(20, self._poll_auth, future, button, callback)
+            return
+        self.auth_pending = False
+        if button.winfo_exists():
+            button.configure(state="normal")
+        callback(future.result())
+
     def logout_user(self):
         self.current_user = None
         self.show_login_screen()
@@ -322,6 +256,7 @@ class AssistantApp(ctk.CTk):
             font=("Arial", 14)
         )
         self.start_button.pack(pady=20)
+        self._wait_for_old_assistant()
 
         self.logout_button = ctk.CTkButton(
             self, 
@@ -333,8 +268,55 @@ class AssistantApp(ctk.CTk):
         )
         self.logout_button.pack(pady=10)
 
+        # Readiness of the background warm-up
+        self.warmup_label = ctk.CTkLabel(self, text="", font=("Arial", 11), text_color="gray")
+        self.warmup_label.pack(pady=5)
+        self.start_warmup()
+
+    def _wait_for_old_assistant(self):
+        """Keep Start disabled until an assistant thread that outlived the stop timeout exits"""
+        button = getattr(self, 'start_button', None)
+        if button is None or not button.winfo_exists():
+            return
+        if self.assistant_thread is not None and self.assistant_thread.is_alive():
+            button.configure(state="disabled", text="Waiting for the assistant to stop...")
+            self.after(200, self._wait_for_old_assistant)
+            return
+        self.assistant_thread = None
+        button.configure(state="normal", text="🎤 Start Voice Assistant")
+
+    def start_warmup(self):
+        """Bring up TTS, microphone and AI clients in parallel while the dashboard is shown"""
+        if self.warmup is None:
+            from warmup import Warmup
+            print("[GUI] Starting background warm-up...")
+            self.warmup = Warmup().start()
+        self._poll_warmup()
+
+    def _poll_warmup(self):
+        """Show warm-up progress (polled with after() - Tk is not thread-safe)"""
+        label = getattr(self, 'warmup_label', None)
+        if self.warmup is None or label is None or not label.winfo_exists():
+            return
+        parts = []
+        for name, status in self.warmup.status.items():
+            mark = "✓" if status == 'ready' else ("…" if status == 'pending' else "✗")
+            parts.append(f"{mark} {name}")
+        if self.warmup.is_done():
+            label.configure(text="Ready: " + "  ".join(parts))
+        else:
+            label.configure(text="Warming up: " + "  ".join(parts))
+            self.after(100, self._poll_warmup)
+
     def start_assistant(self):
         """Start voice assistant in separate thread with proper lifecycle management"""
+        from assistant_core import reset_stop
+        
+        # Never run two assistant loops on one microphone and TTS worker
+        if self.assistant_thread is not None and self.assistant_thread.is_alive():
+            print("[GUI WARNING] The previous assistant is still stopping")
+            return
+        
         # HIGH-001 FIX: Reset stop flag before starting
         reset_stop()
         
@@ -370,19 +352,23 @@ class AssistantApp(ctk.CTk):
 
         # HIGH-001 FIX: Run assistant in separate thread with proper termination support
         # Thread is NOT daemon - we want to clean it up properly
+        # Skip the spoken self-test when the warm-up already proved TTS works
+        warmed_up = self.warmup is not None and self.warmup.is_ready('tts')
         self.assistant_thread = threading.Thread(
             target=self._run_assistant_wrapper,
+            args=(not warmed_up,),
             daemon=False  # Changed from True - proper cleanup required
         )
         self.assistant_thread.start()
         
         print("[GUI] Assistant thread started")
 
-    def _run_assistant_wrapper(self):
+    def _run_assistant_wrapper(self, greeting=True):
         """Wrapper to run assistant and handle exceptions"""
         try:
+            from assistant_core import run_ai_assistant_zen
             print("[GUI] Assistant starting in thread...")
-            run_ai_assistant_zen()
+            run_ai_assistant_zen(greeting=greeting)
         except Exception as e:
             print(f"[GUI ERROR] Assistant thread crashed: {e}")
             import traceback
@@ -392,60 +378,43 @@ class AssistantApp(ctk.CTk):
 
     def stop_assistant(self):
         """HIGH-001 FIX: Properly stop the assistant thread"""
+        from assistant_core import request_stop
+        
         print("[GUI] Stop button clicked - initiating graceful shutdown...")
         
         # HIGH-001 FIX: Signal the assistant core to stop
         request_stop()
         
-        # Update UI to show stopping with helpful message
+        # Update UI to show stopping
         if hasattr(self, 'status_label'):
-            self.status_label.configure(
-                text="⏹️ Stopping assistant...\n" 
-                     "⚠️ If you're speaking, please STOP talking\n"
-                     "to exit faster (usually 5-8 seconds)"
-            )
+            self.status_label.configure(text="⏹️ Stopping assistant...")
         if hasattr(self, 'activity_label'):
             self.activity_label.configure(text="● STOPPING", text_color="orange")
         if hasattr(self, 'stop_button'):
-            self.stop_button.configure(state="disabled", text="Stopping... Please wait")
-        
-        # Update GUI to show changes
-        self.update()
+            self.stop_button.configure(state="disabled", text="Stopping...")
         
-        # OPTIMIZED: Two-stage timeout for better UX
+        # Listening, the AI request and speech all watch the stop token, so the
+        # thread exits within a second - poll for it instead of blocking Tk in join()
+        self._stop_started = time.perf_counter()
+        self._poll_stop()
+
+    def _poll_stop(self):
+        """Wait for the assistant thread without freezing the window"""
+        elapsed = time.perf_counter() - self._stop_started
         if self.assistant_thread and self.assistant_thread.is_alive():
-            print("[GUI] Waiting for assistant thread to terminate...")
-            
-            # Stage 1: Wait 8 seconds (covers normal case - just listening)
-            self.assistant_thread.join(timeout=8.0)
-            
-            if self.assistant_thread.is_alive():
-                # Still alive - user might be speaking
-                print("[GUI] Thread still active, likely user is speaking...")
-                if hasattr(self, 'status_label'):
-                    self.status_label.configure(
-                        text="⏹️ Still stopping...\n"
-                             "⚠️ Please STOP SPEAKING immediately!\n"
-                             "Waiting for speech to end..."
-                    )
-                self.update()
-                
-                # Stage 2: Wait additional 17 seconds (max phrase_time_limit=20s total)
-                self.assistant_thread.join(timeout=17.0)
-            
-            if self.assistant_thread.is_alive():
-                print("[GUI WARNING] Thread did not stop gracefully within timeout")
-                messagebox.showwarning(
-                    "Warning", 
-                    "Assistant may still be running in background.\nPlease restart the application if issues persist."
-                )
-            else:
-                print("[GUI] Assistant thread terminated successfully ✓")
-        
-        # Clean up thread reference
-        self.assistant_thread = None
+            if elapsed < STOP_TIMEOUT:
+                self.after(50, self._poll_stop)
+                return
+            print("[GUI WARNING] Thread did not stop gracefully within timeout")
+            messagebox.showwarning(
+                "Warning", 
+                "Assistant may still be running in background.\nPlease restart the application if issues persist."
+            )
+        else:
+            print(f"[GUI] Assistant stopped in {elapsed * 1000:.0f} ms ✓")
+            self.assistant_thread = None
         
-        # Return to dashboard
+        # Return to dashboard (Start stays disabled while a stuck thread is still alive)
         self.show_dashboard()
         print("[GUI] Returned to dashboard")
 
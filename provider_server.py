@@ -0,0 +1,358 @@
+"""
+Provider Stand-in Server - Local OpenAI/Gemini-compatible HTTP endpoint
+Speaks enough of the chat-completions and generate-content APIs (plain and
+streamed, plus model lookups) for the official SDKs, so the assistant core can be load-tested
+without the real services. Latency, errors, rate limits and capacity come
+from a Profile.
+
+    python provider_server.py --port 8765 --profile typical
+
+    # .env
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+    GEMINI_BASE_URL=http://127.0.0.1:8765/
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fake_providers import DEFAULT_REPLY
+
+_GEMINI_PATH = re.compile(r"^/v1(?:beta|alpha)?/models/([^/:]+):(generateContent|streamGenerateContent)$")
+_MODEL_PATH = re.compile(r"^/v1(beta|alpha)?/models/([^/:]+)$")  # Model lookup (the SDKs' cheap warm-up call)
+
+
+class Profile:
+    """
+    How the stand-in behaves
+    first_token_delay/token_delay: generation time (one token per word),
+    jitter: +/- relative variation, slow_rate/slow_delay: a latency tail,
+    error_rate: HTTP 500s, rate_limit: requests per second before HTTP 429,
+    capacity: requests generated at once (the rest queue, like a busy backend).
+    """
+
+    def __init__(self, first_token_delay=0.3, token_delay=0.02, jitter=0.2, slow_rate=0.0,
+                 slow_delay=3.0, error_rate=0.0, rate_limit=None, capacity=None, reply=DEFAULT_REPLY):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.jitter = jitter
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.capacity = capacity
+        self.reply = reply
+
+    def as_dict(self):
+        return {k: v for k, v in vars(self).items() if k != 'reply'}
+
+
+PROFILES = {
+    'instant': Profile(first_token_delay=0.0, token_delay=0.0, jitter=0.0),
+    'typical': Profile(),
+    'slow': Profile(first_token_delay=1.2, token_delay=0.05, slow_rate=0.05),
+    'flaky': Profile(error_rate=0.1, slow_rate=0.1),
+    'rate_limited': Profile(rate_limit=5.0),
+    'saturated': Profile(capacity=4),
+}
+
+
+class _RateLimiter:
+    """Token bucket: rate requests per second, bursts of up to rate"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class ProviderServer:
+    """
+    The stand-in server on a background thread
+    port=0 picks a free port; see openai_base_url / gemini_base_url.
+    stats() counts requests, outcomes and the highest concurrency seen.
+    """
+
+    def __init__(self, profile=None, host="127.0.0.1", port=0, seed=None):
+        self.profile = PROFILES[profile] if isinstance(profile, str) else (profile or Profile())
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._limiter = _RateLimiter(self.profile.rate_limit) if self.profile.rate_limit else None
+        self._slots = threading.BoundedSemaphore(self.profile.capacity) if self.profile.capacity else None
+        self._stats_lock = threading.Lock()
+        self._stats = {'requests': 0, 'ok': 0, 'errors': 0, 'rate_limited': 0, 'streamed': 0,
+                       'in_flight': 0, 'max_in_flight': 0}
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def openai_base_url(self):
+        return self.url + "/v1"
+
+    @property
+    def gemini_base_url(self):
+        return self.url + "/"
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="provider-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _count(self, key, delta=1):
+        with self._stats_lock:
+            self._stats[key] += delta
+            if key == 'in_flight':
+                self._stats['max_in_flight'] = max(self._stats['max_in_flight'], self._stats['in_flight'])
+
+    # ----- Behaviour -----
+
+    def admit(self):
+        """None to serve the request, else (status, reason) to fail it with"""
+        self._count('requests')
+        if self._limiter and not self._limiter.allow():
+            self._count('rate_limited')
+            return 429, "rate limit exceeded"
+        with self._random_lock:
+            fail = self._random.random() < self.profile.error_rate
+        if fail:
+            self._count('errors')
+            return 500, "simulated server error"
+        return None
+
+    def _delay(self, seconds):
+        if seconds <= 0:
+            return
+        with self._random_lock:
+            factor = 1 + self._random.uniform(-self.profile.jitter, self.profile.jitter)
+        time.sleep(seconds * factor)
+
+    def truncates(self, max_tokens):
+        """True if a max_tokens budget cuts the reply short"""
+        return max_tokens is not None and max_tokens < len(self.profile.reply.split(" "))
+
+    def generate(self, max_tokens=None):
+        """Yield the reply word by word at the profile's pace, at most max_tokens words"""
+        if self._slots:
+            self._slots.acquire()
+        self._count('in_flight')
+        try:
+            with self._random_lock:
+                slow = self._random.random() < self.profile.slow_rate
+            self._delay(self.profile.slow_delay if slow else self.profile.first_token_delay)
+            words = self.profile.reply.split(" ")[:max_tokens]
+            for i, word in enumerate(words):
+                if i:
+                    self._delay(self.profile.token_delay)
+                yield word if i == len(words) - 1 else word + " "
+            self._count('ok')
+        finally:
+            self._count('in_flight', -1)
+            if self._slots:
+                self._slots.release()
+
+
+def _make_handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, like the SDKs' connection pools expect
+
+        def log_message(self, format, *args):
+            pass
+
+        def _read_json(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b""
+            return json.loads(body or b"{}")
+
+        def _send_json(self, status, payload, headers=None):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_events(self, events):
+            """Server-sent events; the connection is closed at the end (no length known up front)"""
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+            server._count('streamed')
+            try:
+                for event in events:
+                    self.wfile.write(b"data: " + event.encode() + b"\n\n")
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # The client gave up (e.g. a hedged loser or barge-in)
+
+        def _send_error(self, status, reason, gemini):
+            headers = {'Retry-After': '1'} if status == 429 else None
+            if gemini:
+                payload = {'error': {'code': status, 'message': reason,
+                                     'status': 'RESOURCE_EXHAUSTED' if status == 429 else 'INTERNAL'}}
+            else:
+                payload = {'error': {'message': reason, 'code': None,
+                                     'type': 'rate_limit_exceeded' if status == 429 else 'server_error'}}
+            self._send_json(status, payload, headers)
+
+        def do_GET(self):
+            path = self.path.split('?', 1)[0].rstrip('/')
+            match = _MODEL_PATH.match(path)
+            if path == '/stats':
+                self._send_json(200, {'profile': server.profile.as_dict(), **server.stats()})
+            elif match and match.group(1):
+                model = match.group(2)
+                self._send_json(200, {'name': f"models/{model}", 'displayName': model,
+                                      'supportedGenerationMethods': ['generateContent', 'streamGenerateContent']})
+            elif match:
+                self._send_json(200, {'id': match.group(2), 'object': 'model', 'created': 0,
+                                      'owned_by': 'stand-in'})
+            else:
+                self._send_json(404, {'error': {'message': f"Unknown path {self.path}"}})
+
+        def do_POST(self):
+            path = self.path.split('?', 1)[0]
+            try:
+                request = self._read_json()
+            except ValueError:
+                self._send_json(400, {'error': {'message': "Invalid JSON body"}})
+                return
+            if path.rstrip('/') == '/v1/chat/completions':
+                self._openai(request)
+                return
+            match = _GEMINI_PATH.match(path)
+            if match:
+                self._gemini(request, match.group(1), match.group(2) == 'streamGenerateContent')
+                return
+            self._send_json(404, {'error': {'message': f"Unknown path {self.path}"}})
+
+        def _openai(self, request):
+            failure = server.admit()
+            if failure:
+                self._send_error(*failure, gemini=False)
+                return
+            model = request.get('model', 'stand-in')
+            max_tokens = request.get('max_completion_tokens') or request.get('max_tokens')
+            finish_reason = 'length' if server.truncates(max_tokens) else 'stop'
+            response_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+            created = int(time.time())
+            if request.get('stream'):
+                def events():
+                    for token in server.generate(max_tokens):
+                        yield json.dumps({
+                            'id': response_id, 'object': 'chat.completion.chunk', 'created': created,
+                            'model': model,
+                            'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}],
+                        })
+                    yield json.dumps({
+                        'id': response_id, 'object': 'chat.completion.chunk', 'created': created,
+                        'model': model, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': finish_reason}],
+                    })
+                    yield "[DONE]"
+                self._send_events(events())
+                return
+            text = "".join(server.generate(max_tokens))
+            self._send_json(200, {
+                'id': response_id, 'object': 'chat.completion', 'created': created, 'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text},
+                             'finish_reason': finish_reason}],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': len(text.split()),
+                          'total_tokens': len(text.split())},
+            })
+
+        def _gemini(self, request, model, stream):
+            failure = server.admit()
+            if failure:
+                self._send_error(*failure, gemini=True)
+                return
+            max_tokens = (request.get('generationConfig') or {}).get('maxOutputTokens')
+            finish_reason = 'MAX_TOKENS' if server.truncates(max_tokens) else 'STOP'
+
+            def candidate(text, finished):
+                chunk = {'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]},
+                                         'index': 0}],
+                         'modelVersion': model}
+                if finished:
+                    chunk['candidates'][0]['finishReason'] = finish_reason
+                return chunk
+
+            if stream:
+                self._send_events(json.dumps(candidate(token, False)) for token in server.generate(max_tokens))
+                return
+            self._send_json(200, candidate("".join(server.generate(max_tokens)), True))
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local OpenAI/Gemini stand-in for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="typical")
+    parser.add_argument("--first-token-delay", type=float)
+    parser.add_argument("--token-delay", type=float)
+    parser.add_argument("--error-rate", type=float)
+    parser.add_argument("--rate-limit", type=float, help="requests per second before HTTP 429")
+    parser.add_argument("--capacity", type=int, help="requests generated at once")
+    args = parser.parse_args(argv)
+
+    profile = Profile(**PROFILES[args.profile].as_dict())
+    for name in ('first_token_delay', 'token_delay', 'error_rate', 'rate_limit', 'capacity'):
+        if getattr(args, name) is not None:
+            setattr(profile, name, getattr(args, name))
+    server = ProviderServer(profile, args.host, args.port)
+    print(f"[SERVER] Stand-in provider on {server.url} (profile {args.profile})")
+    print(f"[SERVER] OPENAI_BASE_URL={server.openai_base_url}")
+    print(f"[SERVER] GEMINI_BASE_URL={server.gemini_base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[SERVER] Stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,226 @@
+"""
+User Provisioning - Bulk import/export of accounts from the command line
+Streams CSV or JSONL files (email + password, or email + password_hash from
+an export) in batches: each batch is validated and hashed in a process
+pool, then inserted in one transaction with every rejected row reported.
+Only a few batches are held at a time, so memory stays flat whatever the
+file size.
+
+    python provision_users.py import new_users.csv --errors rejected.csv
+    python provision_users.py export users.jsonl
+    python provision_users.py export backup.jsonl --include-hashes
+"""
+import argparse
+import collections
+import concurrent.futures
+import csv
+import json
+import os
+import sys
+import time
+
+import auth
+from user_store import UserStore
+
+DEFAULT_DB = "assistant_users.db"  # Same file as main.DB_NAME
+BATCH_SIZE = 500
+EXPORT_FIELDS = ("email", "password_hash", "created_at", "last_login")
+HASH_FIELD = EXPORT_FIELDS.index("password_hash")
+
+
+def _format(path, fmt=None):
+    if fmt:
+        return fmt
+    return "jsonl" if path.lower().endswith((".jsonl", ".json", ".ndjson")) else "csv"
+
+
+def _open(path, mode):
+    if path == "-":
+        return open((sys.stdin if "r" in mode else sys.stdout).fileno(), mode, encoding="utf-8",
+                    newline="", closefd=False)
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def read_users(path, fmt=None):
+    """Yield (line, row dict) from a CSV (with header) or JSONL file; "-" is stdin"""
+    with _open(path, "r") as f:
+        if _format(path, fmt) == "csv":
+            reader = csv.DictReader(f)
+            while True:
+                try:
+                    row = next(reader)
+                except StopIteration:
+                    return
+                except csv.Error as e:
+                    row = {"_error": f"invalid CSV: {e}"}  # Reported like any bad row; the reader goes on
+                yield reader.reader.line_num, row  # DictReader.line_num is not updated on an error
+        for line, text in enumerate(f, 1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as e:
+                row = {"_error": f"invalid JSON: {e}"}
+            yield line, row if isinstance(row, dict) else {"_error": "not a JSON object"}
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def prepare_batch(rows, params):
+    """
+    Validate and hash one batch (runs in a worker process)
+    Returns [(line, email, password_hash, error)] - error is None for good rows.
+    """
+    prepared = []
+    for line, row in rows:
+        email, password, password_hash = row.get("email"), row.get("password"), row.get("password_hash")
+        if row.get("_error"):
+            error = row["_error"]
+        elif not all(isinstance(value, (str, type(None))) for value in (email, password, password_hash)):
+            error = "email, password and password_hash must be strings"
+        elif not auth.validate_email((email or "").strip()):
+            error = "invalid email"
+        elif password_hash:
+            # Already hashed (e.g. from an export); stored as-is, so it must be a hash login can check
+            error = None if auth.is_valid_hash(password_hash) else "malformed password_hash"
+        elif not password or len(password) < auth.MIN_PASSWORD_LENGTH:
+            error = f"password must be at least {auth.MIN_PASSWORD_LENGTH} characters"
+        else:
+            error = None
+            password_hash = auth.hash_password(password, params)
+        email = email.strip() if isinstance(email, str) else "" if email is None else repr(email)
+        prepared.append((line, email, None if error else password_hash, error))
+    return prepared
+
+
+def import_users(store, rows, params=None, batch_size=BATCH_SIZE, workers=None, on_error=None,
+                 progress=None):
+    """
+    Insert rows from read_users(); returns {'rows', 'imported', 'rejected', 'seconds'}
+    on_error(line, email, error) is called for every rejected row, progress(stats)
+    after every batch. At most 2 x workers batches are in flight.
+    """
+    params = params or auth.get_params()
+    workers = workers or os.cpu_count() or 1
+    stats = {'rows': 0, 'imported': 0, 'rejected': 0, 'seconds': 0.0}
+    started = time.perf_counter()
+
+    def reject(line, email, error):
+        stats['rejected'] += 1
+        if on_error:
+            on_error(line, email, error)
+
+    def commit(prepared):
+        good = [(line, email, password_hash) for line, email, password_hash, error in prepared if not error]
+        for line, email, _hash, error in prepared:
+            if error:
+                reject(line, email, error)
+        failed = store.insert_users([(email, password_hash) for _line, email, password_hash in good])
+        for index, error in failed:
+            reject(good[index][0], good[index][1], error)
+        stats['rows'] += len(prepared)
+        stats['imported'] += len(good) - len(failed)
+        stats['seconds'] = time.perf_counter() - started
+        if progress:
+            progress(stats)
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        in_flight = collections.deque()
+        for batch in batched(rows, batch_size):
+            in_flight.append(pool.submit(prepare_batch, batch, params))
+            if len(in_flight) >= 2 * workers:
+                commit(in_flight.popleft().result())  # In file order, bounded memory
+        while in_flight:
+            commit(in_flight.popleft().result())
+    stats['seconds'] = time.perf_counter() - started
+    return stats
+
+
+def export_users(store, path, fmt=None, include_hashes=False):
+    """
+    Stream the users table to CSV or JSONL; returns the number of rows
+    Password hashes are left out unless include_hashes is set (a backup
+    that import can restore logins from).
+    """
+    keep = [i for i in range(len(EXPORT_FIELDS)) if include_hashes or i != HASH_FIELD]
+    fields = [EXPORT_FIELDS[i] for i in keep]
+    count = 0
+    with _open(path, "w") as f:
+        if _format(path, fmt) == "csv":
+            writer = csv.writer(f)
+            writer.writerow(fields)
+            for row in store.iter_users():
+                writer.writerow([row[i] for i in keep])
+                count += 1
+        else:
+            for row in store.iter_users():
+                f.write(json.dumps({field: row[i] for field, i in zip(fields, keep)}) + "\n")
+                count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AI Assistant Zen - bulk user import/export")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="create accounts from a CSV/JSONL file")
+    import_parser.add_argument("path", help="file with email and password (or password_hash) columns; - for stdin")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"], help="default: from the extension")
+    import_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    import_parser.add_argument("--workers", type=int, help="hashing processes (default: CPU count)")
+    import_parser.add_argument("--errors", help="write rejected rows here as CSV (default: stderr)")
+
+    export_parser = subparsers.add_parser("export", help="write all accounts to a CSV/JSONL file")
+    export_parser.add_argument("path", help="output file; - for stdout")
+    export_parser.add_argument("--format", choices=["csv", "jsonl"], help="default: from the extension")
+    export_parser.add_argument("--include-hashes", action="store_true",
+                               help="also write the password hashes (needed to restore logins on import)")
+    args = parser.parse_args(argv)
+
+    store = UserStore(args.db)
+    try:
+        if args.command == "export":
+            started = time.perf_counter()
+            count = export_users(store, args.path, args.format, args.include_hashes)
+            print(f"[EXPORT] {count} users in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+            return 0
+
+        errors_file = open(args.errors, "w", encoding="utf-8", newline="") if args.errors else sys.stderr
+        error_writer = csv.writer(errors_file)
+        error_writer.writerow(("line", "email", "error"))
+
+        last_report = [0.0]
+
+        def progress(stats):
+            if stats['seconds'] - last_report[0] < 1.0:
+                return  # At most one line a second
+            last_report[0] = stats['seconds']
+            print(f"[IMPORT] {stats['rows']} rows, {stats['imported']} imported, {stats['rejected']} rejected"
+                  f" ({stats['rows'] / max(stats['seconds'], 1e-9):.0f} rows/s)", file=sys.stderr)
+
+        try:
+            stats = import_users(store, read_users(args.path, args.format), batch_size=args.batch_size,
+                                 workers=args.workers, on_error=lambda *row: error_writer.writerow(row),
+                                 progress=progress)
+        finally:
+            if args.errors:
+                errors_file.close()
+        print(f"[IMPORT] Done: {stats['imported']} imported, {stats['rejected']} rejected"
+              f" in {stats['seconds']:.1f} s", file=sys.stderr)
+        return 0 if not stats['rejected'] else 2
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
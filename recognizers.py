@@ -0,0 +1,185 @@
+"""
+Speech Recognizers - Pluggable speech-to-text backends
+Every backend hands out a stream per utterance: captured frames are fed in
+with accept() while the user is still speaking (streaming backends return
+partial hypotheses), and result() returns the final transcript as soon as
+the endpoint is detected.
+
+    google  - Google Web Speech API (cloud, sends the whole phrase at the end)
+    vosk    - Vosk/Kaldi (offline, CPU only, decodes while you speak)
+"""
+import json
+import os
+import re
+import threading
+
+DEFAULT_BACKEND = "google"
+DEFAULT_VOSK_MODEL = "vosk-model-small-en-us-0.15"  # Folder from https://alphacephei.com/vosk/models
+
+
+class RecognitionError(Exception):
+    """The recognition service could not be reached or refused the request"""
+
+
+class RecognizerStream:
+    """One utterance being recognized"""
+
+    def accept(self, frame):
+        """Feed a PCM frame, return the current partial transcript (or None)"""
+        return None
+
+    def result(self):
+        """Final transcript ("" if nothing was understood)"""
+        raise NotImplementedError
+
+
+class Recognizer:
+    name = "base"
+    streaming = False  # True if accept() does the decoding work while audio arrives
+
+    def load(self):
+        """Load models ahead of the first utterance (no-op for cloud backends)"""
+        return None
+
+    def start(self, sample_rate, sample_width=2):
+        """Begin a new utterance"""
+        raise NotImplementedError
+
+    def recognize(self, pcm, sample_rate, sample_width=2):
+        """Transcribe a complete recording in one call"""
+        stream = self.start(sample_rate, sample_width)
+        stream.accept(pcm)
+        return stream.result()
+
+
+# ===== GOOGLE (CLOUD) =====
+
+class _BufferedStream(RecognizerStream):
+    def __init__(self, transcribe, sample_rate, sample_width):
+        self._transcribe = transcribe
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self._frames = []
+
+    def accept(self, frame):
+        self._frames.append(frame)
+        return None
+
+    def result(self):
+        return self._transcribe(b"".join(self._frames), self.sample_rate, self.sample_width)
+
+
+class GoogleRecognizer(Recognizer):
+    """
+    The original cloud path: nothing happens until the phrase is complete
+    Unintelligible audio gives "", network/API failures raise RecognitionError.
+    """
+    name = "google"
+
+    def __init__(self):
+        self._recognizer = None
+
+    def _transcribe(self, pcm, sample_rate, sample_width):
+        import speech_recognition as sr
+        if self._recognizer is None:
+            self._recognizer = sr.Recognizer()
+        try:
+            return self._recognizer.recognize_google(sr.AudioData(pcm, sample_rate, sample_width))
+        except sr.UnknownValueError:
+            return ""
+        except sr.RequestError as e:
+            raise RecognitionError(str(e)) from e
+
+    def start(self, sample_rate, sample_width=2):
+        return _BufferedStream(self._transcribe, sample_rate, sample_width)
+
+
+# ===== VOSK (OFFLINE) =====
+
+class _VoskStream(RecognizerStream):
+    def __init__(self, recognizer):
+        self._recognizer = recognizer
+        self._segments = []  # Finished segments (Vosk finalizes on its own pauses)
+        self._partial = ""
+
+    def accept(self, frame):
+        if self._recognizer.AcceptWaveform(frame):
+            text = json.loads(self._recognizer.Result()).get('text', '')
+            if text:
+                self._segments.append(text)
+            self._partial = ""
+        else:
+            self._partial = json.loads(self._recognizer.PartialResult()).get('partial', '')
+        return " ".join(self._segments + ([self._partial] if self._partial else []))
+
+    def result(self):
+        text = json.loads(self._recognizer.FinalResult()).get('text', '')
+        return " ".join(self._segments + ([text] if text else []))
+
+
+class VoskRecognizer(Recognizer):
+    """
+    Offline recognizer, model is loaded once and shared by all streams
+    model_path defaults to $VOSK_MODEL_PATH, then DEFAULT_VOSK_MODEL.
+    """
+    name = "vosk"
+    streaming = True
+
+    def __init__(self, model_path=None):
+        self.model_path = model_path or os.getenv('VOSK_MODEL_PATH', DEFAULT_VOSK_MODEL)
+        self._model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._model is None:
+                import vosk
+                if not os.path.isdir(self.model_path):
+                    raise FileNotFoundError(f"Vosk model not found: {self.model_path}")
+                vosk.SetLogLevel(-1)
+                self._model = vosk.Model(self.model_path)
+            return self._model
+
+    def start(self, sample_rate, sample_width=2):
+        import vosk
+        if sample_width != 2:
+            raise ValueError("Vosk needs 16-bit PCM")
+        return _VoskStream(vosk.KaldiRecognizer(self.load(), sample_rate))
+
+
+# name -> factory
+BACKENDS = {
+    'google': GoogleRecognizer,
+    'vosk': VoskRecognizer,
+}
+
+
+def create_recognizer(name=DEFAULT_BACKEND, **kwargs):
+    try:
+        factory = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown speech recognizer '{name}' (choose from {', '.join(BACKENDS)})")
+    return factory(**kwargs)
+
+
+# ===== EVALUATION =====
+
+def _words(text):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def word_errors(reference, hypothesis):
+    """(edit distance in words, reference word count)"""
+    ref, hyp = _words(reference), _words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return previous[-1], len(ref)
+
+
+def word_error_rate(reference, hypothesis):
+    errors, words = word_errors(reference, hypothesis)
+    return errors / words if words else float(errors > 0)
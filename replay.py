@@ -0,0 +1,334 @@
+"""
+Replay Harness - Run the real assistant loop on recorded audio
+Drives run_simple_mode (listen -> process_command -> AI -> speak) from a
+folder of WAV files instead of the microphone, with fake speech-to-text,
+AI and text-to-speech backends whose delays are configurable. Every turn
+is traced; the report holds per-stage and end-to-end p50/p95/p99 and can
+be saved as JSON and compared against the report of another commit.
+
+    harness = ReplayHarness(load_recordings("replay_wavs"))
+    report = harness.run()
+    print_report(report, compare_reports(load_report("baseline.json"), report))
+"""
+import glob
+import json
+import os
+import subprocess
+import threading
+import time
+import wave
+
+import tracing
+from audio_capture import FRAME_SAMPLES, SAMPLE_WIDTH
+
+# Derived end-to-end metrics, from the end of the listen span (user done speaking)
+END_TO_END = {
+    'e2e_first_audio': "endpoint -> first spoken sentence",
+    'e2e_reply': "endpoint -> reply fully spoken",
+}
+
+
+def load_recordings(directory):
+    """[(name, pcm, sample_rate, transcript)] - foo.wav with an optional foo.txt transcript"""
+    recordings = []
+    for wav_path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        with wave.open(wav_path, 'rb') as wav:
+            if wav.getsampwidth() != SAMPLE_WIDTH or wav.getnchannels() != 1:
+                print(f"[WARN] {wav_path}: expected 16-bit mono WAV - skipped")
+                continue
+            pcm, sample_rate = wav.readframes(wav.getnframes()), wav.getframerate()
+        txt_path = os.path.splitext(wav_path)[0] + ".txt"
+        transcript = ""
+        if os.path.exists(txt_path):
+            with open(txt_path, encoding="utf-8") as f:
+                transcript = f.read().strip()
+        recordings.append((os.path.basename(wav_path), pcm, sample_rate, transcript))
+    return recordings
+
+
+def write_recordings(directory, recordings):
+    """Save (name, pcm, sample_rate, transcript) tuples as foo.wav + foo.txt"""
+    os.makedirs(directory, exist_ok=True)
+    for name, pcm, sample_rate, transcript in recordings:
+        base = os.path.join(directory, os.path.splitext(name)[0])
+        with wave.open(base + ".wav", 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(SAMPLE_WIDTH)
+            wav.setframerate(sample_rate)
+            wav.writeframes(pcm)
+        with open(base + ".txt", 'w', encoding="utf-8") as f:
+            f.write(transcript + "\n")
+
+
+class ReplaySource:
+    """
+    Audio source that plays one recording per advance() call
+    Delivers silence in between, at microphone pace, so the assistant sees
+    the user speak only when it is ready for the next command - like a
+    person waiting for the reply before asking the next question.
+    """
+
+    def __init__(self, recordings, sample_rate=16000, frame_samples=FRAME_SAMPLES, lead_silence=0.3):
+        self.recordings = [pcm for _name, pcm, _rate, _text in recordings]
+        self.sample_rate = sample_rate
+        self.sample_width = SAMPLE_WIDTH
+        self.frame_samples = frame_samples
+        self.lead_silence = lead_silence
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._pending = b""
+        self._next = 0
+
+    def open(self):
+        self._closed.clear()
+
+    def advance(self):
+        """Queue the next recording (after lead_silence); False when all have been played"""
+        with self._lock:
+            if self._next >= len(self.recordings):
+                return False
+            lead = bytes(int(self.lead_silence * self.sample_rate) * self.sample_width)
+            self._pending += lead + self.recordings[self._next]
+            self._next += 1
+            return True
+
+    @property
+    def playing(self):
+        with self._lock:
+            return bool(self._pending)
+
+    def read(self):
+        size = self.frame_samples * self.sample_width
+        with self._lock:
+            frame, self._pending = self._pending[:size], self._pending[size:]
+        if self._closed.wait(self.frame_samples / self.sample_rate):
+            return b""
+        return frame.ljust(size, b"\0")
+
+    def close(self):
+        self._closed.set()
+
+
+_MISSING = object()
+
+
+class ReplayHarness:
+    """
+    Runs run_simple_mode over recordings with fake backends
+    recognize_delay: STT time after the endpoint; first_token_delay and
+    token_delay: the AI provider; speak_delay (per sentence) or word_delay
+    (per word): the TTS engine. stream=False takes the blocking
+    process_command -> get_ai_response path instead of streaming.
+    """
+
+    def __init__(self, recordings, recognize_delay=0.3, first_token_delay=0.5, token_delay=0.02,
+                 speak_delay=0.2, word_delay=None, stream=True, barge_in=False,
+                 turn_timeout=30.0, trace_file=None):
+        if not recordings:
+            raise ValueError("No recordings to replay")
+        self.recordings = recordings
+        self.recognize_delay = recognize_delay
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.speak_delay = speak_delay
+        self.word_delay = word_delay
+        self.stream = stream
+        self.barge_in = barge_in
+        self.turn_timeout = turn_timeout
+        self.trace_file = trace_file
+        self._saved = []  # (namespace dict, name, original value) replaced by _install_fakes
+
+    def config(self):
+        return {
+            'recordings': len(self.recordings),
+            'recognize_delay': self.recognize_delay,
+            'first_token_delay': self.first_token_delay,
+            'token_delay': self.token_delay,
+            'speak_delay': self.speak_delay,
+            'word_delay': self.word_delay,
+            'stream': self.stream,
+            'barge_in': self.barge_in,
+        }
+
+    def _install_fakes(self, source):
+        import assistant_core
+        import recognizers
+        import speech
+        from audio_capture import CaptureSession
+        from fake_providers import FakeOpenAI, FakeRecognizer, FakeTTSEngine
+
+        transcripts = [text or name for name, _pcm, _rate, text in self.recordings]
+        recognizer = FakeRecognizer(transcripts, delay=self.recognize_delay)
+        speech.close_capture_session()
+        self._saved = [(recognizers.BACKENDS, 'replay', recognizers.BACKENDS.get('replay', _MISSING))]
+        recognizers.BACKENDS['replay'] = lambda: recognizer
+        self._patch(speech, STT_BACKEND="replay", _recognizer=None,
+                    _capture_session=CaptureSession(source, tracking_paused=speech.is_speaking).start(),
+                    _worker=speech.TTSWorker(lambda: FakeTTSEngine(
+                        init_delay=0, speak_delay=self.speak_delay, word_delay=self.word_delay)))
+        speech._worker.wait_ready()
+
+        self._patch(assistant_core, AI_PROVIDER="openai",
+                    OPENAI_CLIENT=FakeOpenAI(first_token_delay=self.first_token_delay, token_delay=self.token_delay),
+                    USE_RESPONSE_CACHE=False,  # Every turn should reach the (fake) provider
+                    STREAM_RESPONSES=self.stream, ENABLE_BARGE_IN=self.barge_in)
+        assistant_core.reset_conversation()
+        assistant_core.reset_stop()
+
+    def _patch(self, module, **values):
+        for name, value in values.items():
+            self._saved.append((vars(module), name, getattr(module, name)))
+            setattr(module, name, value)
+
+    def _restore_fakes(self):
+        """Put back every global _install_fakes replaced (later runs in this process see the real setup)"""
+        for namespace, name, value in reversed(self._saved):
+            if value is _MISSING:
+                namespace.pop(name, None)
+            else:
+                namespace[name] = value
+        self._saved = []
+
+    def run(self):
+        """Replay every recording as one turn; returns the report dict"""
+        import tempfile
+        import assistant_core
+        import speech
+
+        sample_rate = self.recordings[0][2]
+        source = ReplaySource(self.recordings, sample_rate=sample_rate)
+        trace_file = self.trace_file or os.path.join(tempfile.mkdtemp(), "replay_trace.jsonl")
+        tracer = tracing.configure(trace_file)
+        try:
+            self._install_fakes(source)
+        except BaseException:
+            self._restore_fakes()
+            raise
+
+        thread = threading.Thread(target=assistant_core.run_simple_mode, args=(False,),
+                                  name="replay-assistant", daemon=True)
+        started = time.perf_counter()
+        thread.start()
+        try:
+            for done in range(len(self.recordings)):
+                source.advance()
+                deadline = time.perf_counter() + self.turn_timeout
+                while len(tracer.recent) <= done and thread.is_alive():
+                    if time.perf_counter() > deadline:
+                        print(f"[WARN] Turn {done + 1} did not finish within {self.turn_timeout:.0f} s")
+                        break
+                    time.sleep(0.01)
+                else:
+                    if tracer.recent and 'first_audio' not in tracer.recent[-1].marks:
+                        print(f"[WARN] Turn {done + 1} finished without a reply")
+                if not thread.is_alive():
+                    break
+        finally:
+            assistant_core.request_stop()
+            thread.join(5.0)
+            speech.close_capture_session()
+            speech._worker.shutdown(1.0)
+            self._restore_fakes()
+            assistant_core.reset_conversation()
+            assistant_core.reset_stop()
+            tracing.configure(None)  # Flush/close the exporter
+        wall = time.perf_counter() - started
+        return build_report(tracing.load_turns(trace_file), self.config(), wall)
+
+
+# ===== REPORTS =====
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+        return out.stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+
+def end_to_end(turn):
+    """Derived end-to-end samples (ms) for one exported turn"""
+    listens = [s for s in turn.get('spans', []) if s['name'] == 'listen' and s.get('duration_ms') is not None]
+    if not listens:
+        return {}
+    endpoint = listens[0]['start_ms'] + listens[0]['duration_ms']
+    samples = {}
+    first_audio = turn.get('marks_ms', {}).get('first_audio')
+    if first_audio is not None:
+        samples['e2e_first_audio'] = first_audio - endpoint
+        samples['e2e_reply'] = turn['duration_ms'] - endpoint
+    return samples
+
+
+def build_report(turns, config=None, wall_seconds=None):
+    """Per-stage and end-to-end percentiles of exported turns"""
+    stages = tracing.summarize(turns)
+    histograms = {}
+    for turn in turns:
+        for name, ms in end_to_end(turn).items():
+            histograms.setdefault(name, tracing.LatencyHistogram()).record(ms / 1000)
+    stages.update({name: h.as_dict() for name, h in histograms.items()})
+    return {
+        'commit': _git_commit(),
+        'created_at': time.time(),
+        'config': config or {},
+        'turns': len(turns),
+        'answered': sum(1 for t in turns if 'first_audio' in t.get('marks_ms', {})),
+        'wall_seconds': None if wall_seconds is None else round(wall_seconds, 2),
+        'stages': stages,
+    }
+
+
+def save_report(report, path):
+    with open(path, 'w', encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+def load_report(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_reports(baseline, current, tolerance=0.2, min_delta_ms=5.0):
+    """
+    [(stage, percentile, baseline_ms, current_ms, regressed)] for p50/p95/p99
+    A stage regressed if it got slower by more than tolerance (relative)
+    and min_delta_ms (absolute, to ignore timer noise on fast stages).
+    """
+    rows = []
+    for stage in sorted(set(baseline['stages']) & set(current['stages'])):
+        before, after = baseline['stages'][stage], current['stages'][stage]
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if key not in before or key not in after:
+                continue
+            delta = after[key] - before[key]
+            regressed = delta > min_delta_ms and delta > tolerance * before[key]
+            rows.append((stage, key[:3], before[key], after[key], regressed))
+    return rows
+
+
+def print_report(report, comparison=None):
+    print("\n" + "=" * 72)
+    print(f"[REPLAY] {report['turns']} turns ({report['answered']} answered) at commit {report['commit']}"
+          + (f" in {report['wall_seconds']:.1f} s" if report.get('wall_seconds') else ""))
+    print("=" * 72)
+    print(f"{'stage':<20}{'count':>7}{'p50':>11}{'p95':>11}{'p99':>11}{'max':>11}")
+    stages = report['stages']
+    ordered = [n for n in sorted(stages) if n not in END_TO_END] + [n for n in END_TO_END if n in stages]
+    for name in ordered:
+        h = stages[name]
+        if not h.get('count'):
+            continue
+        if name == next(iter(END_TO_END)):
+            print("-" * 72)
+        print(f"{name:<20}{h['count']:>7}{h['p50_ms']:>8.1f} ms{h['p95_ms']:>8.1f} ms"
+              f"{h['p99_ms']:>8.1f} ms{h['max_ms']:>8.1f} ms")
+    if comparison:
+        print("-" * 72)
+        print(f"{'vs. baseline':<20}{'':>7}{'before':>11}{'after':>11}{'change':>11}")
+        for stage, percentile, before, after, regressed in comparison:
+            change = (after - before) / before * 100 if before else 0.0
+            flag = "  REGRESSED" if regressed else ""
+            print(f"{stage + ' ' + percentile:<27}{before:>8.1f} ms{after:>8.1f} ms{change:>+10.0f}%{flag}")
+    print("=" * 72)
@@ -0,0 +1,172 @@
+"""
+Response Cache - Two-tier cache in front of the AI providers
+Memory LRU tier + persistent SQLite tier with TTL expiry and a size bound.
+Keys combine the normalized prompt with provider, model and system prompt.
+"""
+import collections
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB = "response_cache.db"
+DEFAULT_TTL = 7 * 24 * 3600  # One week
+MEMORY_ENTRIES = 256
+MAX_DB_BYTES = 5 * 1024 * 1024  # 5 MB of cached responses
+
+# Freshness rules: first matching pattern decides the TTL in seconds (0 = never cache)
+FRESHNESS_RULES = [
+    (re.compile(r'\b(time|date|today|tonight|tomorrow|yesterday|now|currently|current|latest|recent)\b'), 0),
+    (re.compile(r'\b(news|weather|forecast|temperature|score|scores|stock|stocks|price|prices)\b'), 0),
+    (re.compile(r'\b(this|next|last) (week|month|year)\b'), 0),
+    (re.compile(r'\b(joke|funny|random|surprise)\b'), 0),  # Expected to vary
+]
+
+_FILLER = re.compile(r'^(?:(?:hey|ok|okay|zen|please|so|um|uh)\s+)+|\s+(?:please|thanks|thank you)$')
+_PUNCTUATION = re.compile(r"[^\w\s']")
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_prompt(prompt):
+    """Lowercase, drop punctuation and filler words, collapse whitespace"""
+    text = _PUNCTUATION.sub(' ', prompt.lower())
+    text = _SPACES.sub(' ', text).strip()
+    return _FILLER.sub('', text).strip()
+
+
+def ttl_for(prompt, default_ttl=DEFAULT_TTL):
+    """TTL in seconds for a prompt; 0 means the answer must not be cached"""
+    normalized = normalize_prompt(prompt)
+    for pattern, ttl in FRESHNESS_RULES:
+        if pattern.search(normalized):
+            return ttl
+    return default_ttl
+
+
+def make_key(prompt, provider, model, system_prompt):
+    raw = "\0".join([provider, model, hashlib.sha256(system_prompt.encode()).hexdigest(),
+                     normalize_prompt(prompt)])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    get()/put() keyed on (prompt, provider, model, system_prompt)
+    Memory hits never touch SQLite; disk hits are promoted into memory.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB, memory_entries=MEMORY_ENTRIES,
+                 max_db_bytes=MAX_DB_BYTES, default_ttl=DEFAULT_TTL):
+        self.db_path = db_path
+        self.memory_entries = memory_entries
+        self.max_db_bytes = max_db_bytes
+        self.default_ttl = default_ttl
+        self.stats = collections.Counter()
+        self._memory = collections.OrderedDict()  # key -> (response, expires_at)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                prompt TEXT NOT NULL,
+                response TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+        self._conn.commit()
+
+    def get(self, prompt, provider, model, system_prompt):
+        """Return the cached response or None"""
+        key = make_key(prompt, provider, model, system_prompt)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return response
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT response, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            response, expires_at = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self._remember(key, response, expires_at)
+            self.stats['disk_hits'] += 1
+            return response
+
+    def put(self, prompt, provider, model, system_prompt, response):
+        """Store a response unless its freshness rule forbids caching"""
+        ttl = ttl_for(prompt, self.default_ttl)
+        if ttl <= 0 or not response:
+            self.stats['skipped'] += 1
+            return False
+
+        key = make_key(prompt, provider, model, system_prompt)
+        now = time.time()
+        expires_at = now + ttl
+        with self._lock:
+            self._remember(key, response, expires_at)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, prompt, response, expires_at, last_access, size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, normalize_prompt(prompt), response, expires_at, now, len(response.encode()))
+            )
+            self._evict(now)
+            self._conn.commit()
+            self.stats['stores'] += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def hit_rate(self):
+        hits = self.stats['memory_hits'] + self.stats['disk_hits']
+        total = hits + self.stats['misses']
+        return hits / total if total else 0.0
+
+    def _remember(self, key, response, expires_at):
+        self._memory[key] = (response, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now):
+        """Drop expired rows, then least recently used rows until under max_db_bytes"""
+        self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_db_bytes:
+            return
+        for key, size in self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            if total <= self.max_db_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._memory.pop(key, None)
+            total -= size
+            self.stats['evictions'] += 1
@@ -0,0 +1,144 @@
+"""
+Model Routing - Send each question to a model tier that fits its complexity
+A local scorer (length, clause count, question type and keywords - no model
+call, a few microseconds) decides between a fast/small tier for lookups and
+short facts and a capable/large tier for explanations, comparisons and
+multi-part questions. Decisions are annotated on the latency trace (tier,
+route_score, route_reasons), so tracing.summarize(turns, by="tier") shows
+what each tier costs in latency.
+
+    router = QueryRouter({'fast': Tier('fast', 'gpt-3.5-turbo', 'gemini-2.0-flash-exp', 150),
+                          'capable': Tier('capable', 'gpt-4o', 'gemini-1.5-pro', 400)})
+    decision = router.route("compare TCP and UDP and explain when to use each")
+    decision.tier.openai_model  # 'gpt-4o'
+"""
+import re
+import threading
+
+from tracing import LatencyHistogram
+
+_WORD = re.compile(r"[a-z0-9']+")
+_CLAUSE = re.compile(r",|;|\band\b|\bor\b|\bbut\b|\bthen\b|\bwhile\b|\bbecause\b")
+
+# Question openers that usually want a short fact vs. a reasoned answer
+SIMPLE_OPENERS = {'what', 'who', 'when', 'where', 'which', 'is', 'are', 'does', 'do', 'can', 'convert',
+                  'define', 'spell', 'translate', 'calculate', 'how many', 'how much', 'how old',
+                  'how far', 'how long', 'how tall'}
+COMPLEX_OPENERS = {'why', 'how', 'explain', 'describe', 'compare', 'analyze', 'analyse', 'evaluate',
+                   'discuss', 'summarize', 'summarise', 'write', 'plan', 'design', 'debug', 'should', 'derive'}
+# Words that signal a longer or harder answer wherever they appear (weight each)
+COMPLEX_KEYWORDS = {
+    'explain': 1.0, 'compare': 1.0, 'comparison': 1.0, 'difference': 0.8, 'differences': 0.8,
+    'versus': 0.8, 'vs': 0.6, 'pros': 0.8, 'cons': 0.8, 'tradeoffs': 1.0, 'trade-offs': 1.0,
+    'step': 0.6, 'steps': 0.6, 'detail': 0.8, 'detailed': 0.8, 'analyze': 1.0, 'analysis': 1.0,
+    'implications': 1.0, 'strategy': 0.8, 'algorithm': 0.8, 'code': 0.8, 'program': 0.6,
+    'function': 0.4, 'essay': 1.2, 'story': 1.0, 'poem': 0.8, 'plan': 0.6, 'proof': 1.0,
+    'derive': 1.0, 'why': 0.6, 'recommend': 0.6, 'advice': 0.6, 'history': 0.4, 'cause': 0.6,
+    'caused': 0.6, 'causes': 0.6, 'work': 0.5, 'works': 0.5, 'themes': 0.6, 'should': 0.5,
+}
+# ...and ones that mark a quick lookup
+SIMPLE_KEYWORDS = {
+    'capital': 0.6, 'binary': 0.4, 'squared': 0.4, 'convert': 0.6, 'spell': 0.6, 'define': 0.6,
+    'meaning': 0.4, 'synonym': 0.6, 'population': 0.4, 'weather': 0.4, 'born': 0.4,
+}
+# Contracted openers, scored like their spelled-out forms ("what's" -> "what is")
+CONTRACTIONS = {
+    "what's": "what is", "whats": "what is", "who's": "who is", "where's": "where is",
+    "when's": "when is", "which's": "which is", "how's": "how is", "what're": "what are",
+    "who're": "who are", "where're": "where are", "isn't": "is not", "aren't": "are not",
+    "doesn't": "does not", "don't": "do not", "can't": "can not",
+}
+DEFAULT_THRESHOLD = 1.0  # Scores at or above go to the capable tier
+METRICS = ('reply', 'first_sentence')  # Latencies kept per tier (see QueryRouter.record)
+
+
+class Tier:
+    """A model tier: the model used with each provider and the reply token budget"""
+
+    def __init__(self, name, openai_model, gemini_model, max_tokens):
+        self.name = name
+        self.openai_model = openai_model
+        self.gemini_model = gemini_model
+        self.max_tokens = max_tokens
+
+    def __repr__(self):
+        return f"Tier({self.name!r}, {self.openai_model!r}, {self.gemini_model!r}, {self.max_tokens})"
+
+
+class RouteDecision:
+    def __init__(self, tier, score, reasons):
+        self.tier = tier
+        self.score = score
+        self.reasons = reasons  # Feature -> contribution, for the trace and tuning
+
+
+def complexity(prompt):
+    """
+    (score, reasons) - roughly 0 for lookups, 1+ for reasoned or multi-part answers
+    reasons maps each feature that fired to its contribution.
+    """
+    text = prompt.lower().strip().replace("\u2019", "'")
+    words = [part for word in _WORD.findall(text) for part in CONTRACTIONS.get(word, word).split()]
+    reasons = {}
+    if not words:
+        return 0.0, reasons
+    if len(words) > 12:
+        reasons['length'] = min(1.5, (len(words) - 12) / 12)
+    clauses = len(_CLAUSE.findall(text))
+    if clauses:
+        reasons['clauses'] = min(1.0, 0.3 * clauses)
+    if text.count('?') > 1:
+        reasons['multi_question'] = 0.8
+    keyword_score = sum(COMPLEX_KEYWORDS.get(w, 0.0) for w in set(words))
+    opener = " ".join(words[:2])
+    if opener in SIMPLE_OPENERS or (words[0] in SIMPLE_OPENERS and words[0] != 'how'):
+        if not keyword_score:  # "what are the pros and cons..." is not a lookup
+            reasons['simple_question'] = -0.5
+    elif words[0] in COMPLEX_OPENERS:
+        reasons['complex_question'] = 0.8
+    if keyword_score:
+        reasons['complex_keywords'] = min(2.0, keyword_score)
+    simple_score = sum(SIMPLE_KEYWORDS.get(w, 0.0) for w in set(words))
+    if simple_score:
+        reasons['simple_keywords'] = -min(1.0, simple_score)
+    score = round(max(0.0, sum(reasons.values())), 2)
+    return score, {name: round(value, 2) for name, value in reasons.items()}
+
+
+class QueryRouter:
+    """
+    Picks a tier per prompt and keeps per-tier request latencies
+    tiers: {'fast': Tier, 'capable': Tier}; prompts scoring threshold or
+    more go to 'capable', the rest to 'fast'. record(tier_name, seconds,
+    metric) feeds stats(), one histogram per metric: 'reply' (full answer,
+    blocking path) and 'first_sentence' (streaming path).
+    """
+
+    def __init__(self, tiers, threshold=DEFAULT_THRESHOLD):
+        self.tiers = tiers
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._counts = {name: 0 for name in tiers}
+        self._latency = {name: {metric: LatencyHistogram() for metric in METRICS} for name in tiers}
+
+    def route(self, prompt):
+        score, reasons = complexity(prompt)
+        name = 'capable' if score >= self.threshold and 'capable' in self.tiers else 'fast'
+        if name not in self.tiers:
+            name = next(iter(self.tiers))
+        with self._lock:
+            self._counts[name] += 1
+        return RouteDecision(self.tiers[name], score, reasons)
+
+    def record(self, tier_name, seconds, metric='reply'):
+        with self._lock:
+            if tier_name in self._latency:
+                self._latency[tier_name][metric].record(seconds)
+
+    def stats(self):
+        """{tier: {'routed': n, 'openai_model': ..., 'reply': percentiles, 'first_sentence': percentiles}}"""
+        with self._lock:
+            return {name: {'routed': self._counts[name], 'openai_model': tier.openai_model,
+                           'gemini_model': tier.gemini_model, 'max_tokens': tier.max_tokens,
+                           **{metric: h.as_dict() for metric, h in self._latency[name].items()}}
+                    for name, tier in self.tiers.items()}
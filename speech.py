@@ -1,193 +1,744 @@
 # Speech module for voice input/output
-import pyttsx3
-import speech_recognition as sr
-import time
+# pyttsx3 and speech_recognition are imported on first use - they are slow to load
+import queue
+import sys
+import threading
+import tracing
+from audio_capture import CaptureSession, MicrophoneSource
+from cancellation import CancelledError, run_cancellable
+from recognizers import RecognitionError, create_recognizer
+from streaming import split_chunks
+from vad import Endpointer, create_classifier
 
-engine = None
-# Use fresh engine for each speech (more reliable on Windows)
-USE_FRESH_ENGINE = True
+# Voice settings
+SPEECH_RATE = 150  # Speed of speech
+SPEECH_VOLUME = 1.0  # Volume (0.0 to 1.0)
+# Voice name keywords in order of preference - DAVID is louder and clearer on Windows
+PREFERRED_VOICES = ['david', 'zira', 'female']
 
-def init_engine():
-    global engine
-    try:
-        print("[INFO] Initializing text-to-speech engine...")
-        engine = pyttsx3.init()
-        voices = engine.getProperty('voices')
-        
-        # Try to set a female voice, otherwise use default
-        for voice in voices:
-            if any(keyword in voice.name.lower() for keyword in ['female', 'woman', 'girl', 'zira']):
-                engine.setProperty('voice', voice.id)
-                print(f"[OK] Voice set: {voice.name}")
-                break
-        
-        engine.setProperty('rate', 150)  # Speed of speech
-        engine.setProperty('volume', 1.0)  # Volume (0.0 to 1.0)
-        print("[OK] Text-to-speech engine ready!")
-        return engine
-    except Exception as e:
-        print(f"[ERROR] TTS init error: {e}")
-        return None
+# Pre-rendered audio for fixed and frequent phrases (played from disk, no synthesis)
+USE_AUDIO_CACHE = True
+AUDIO_CACHE_DIR = ".tts_cache"
+AUDIO_CACHE_MAX_MB = 50  # Least recently played files are evicted beyond this
+AUDIO_CACHE_MIN_REPEATS = 2  # Render a phrase once it has been spoken this many times
+# Render speech to WAV and play it in short buffers (stops at once on barge-in);
+# long replies are chunked and the next chunk renders while the current one plays
+USE_CHUNKED_TTS = True
+TTS_CHUNK_CHARS = 200  # Sentences longer than this are cut at clause boundaries
+
+
+def default_driver():
+    """Pick the pyttsx3 driver for this platform"""
+    if sys.platform.startswith('win'):
+        return 'sapi5'
+    if sys.platform == 'darwin':
+        return 'nsss'
+    return 'espeak'
 
-def speak(text):
-    global engine
+
+def create_engine(driver=None):
+    """
+    Create and configure a pyttsx3 engine
+    Voice lookup happens here, once per engine - not once per utterance
+    """
+    import pyttsx3
     
-    print(f"[SPEAKING] {text}")
-    print(f"[DEBUG] USE_FRESH_ENGINE = {USE_FRESH_ENGINE}")
+    engine = pyttsx3.init(driver or default_driver())
+    voices = engine.getProperty('voices') or []
     
-    # Use fresh engine for each speech (more reliable on Windows)
-    if USE_FRESH_ENGINE:
-        temp_engine = None
+    chosen = None
+    for keyword in PREFERRED_VOICES:
+        chosen = next((v for v in voices if keyword in (v.name or '').lower()), None)
+        if chosen:
+            break
+    if not chosen and voices:
+        chosen = voices[0]
+    if chosen:
+        engine.setProperty('voice', chosen.id)
+        print(f"[OK] Voice set: {chosen.name}")
+    
+    engine.setProperty('rate', SPEECH_RATE)
+    engine.setProperty('volume', SPEECH_VOLUME)
+    return engine
+
+
+def voice_settings(engine):
+    """(voice, rate, volume) the engine speaks with - part of the audio cache key"""
+    defaults = (None, SPEECH_RATE, SPEECH_VOLUME)
+    settings = []
+    for name, default in zip(('voice', 'rate', 'volume'), defaults):
         try:
-            print("[DEBUG] Creating fresh TTS engine...")
-            
-            # Create fresh engine with driver specification
-            temp_engine = pyttsx3.init('sapi5')  # Explicitly use SAPI5 on Windows
-            
-            print("[DEBUG] Getting voices...")
-            voices = temp_engine.getProperty('voices')
-            print(f"[DEBUG] Found {len(voices)} voices")
-            
-            # Set voice - Use DAVID (male voice) as it's louder and clearer
-            voice_set = False
-            for voice in voices:
-                if 'david' in voice.name.lower():  # Changed from 'zira' to 'david'
-                    temp_engine.setProperty('voice', voice.id)
-                    print(f"[DEBUG] Using voice: {voice.name}")
-                    voice_set = True
-                    break
-            
-            if not voice_set and len(voices) > 0:
-                temp_engine.setProperty('voice', voices[0].id)
-                print(f"[DEBUG] Using default voice: {voices[0].name}")
-            
-            # Set properties
-            print("[DEBUG] Setting speech properties...")
-            temp_engine.setProperty('rate', 150)
-            temp_engine.setProperty('volume', 1.0)
-            
-            # Speak - CRITICAL PART
-            print("[DEBUG] Adding text to speech queue...")
-            temp_engine.say(text)
-            
-            print("[DEBUG] Running speech engine (this should produce sound)...")
-            temp_engine.runAndWait()
-            
-            print("[OK] Speech completed successfully!")
-            
-            # Clean up
+            value = engine.getProperty(name)
+        except Exception:
+            value = None
+        settings.append(default if value is None else value)
+    return tuple(settings)
+
+
+_pyaudio = None
+_output = None  # (stream, format) kept open between plays so chunks follow each other without a gap
+
+
+def play_wav(source, interrupted=None, chunk_frames=512):
+    """
+    Play a WAV (path or file object) on the default output device (PyAudio)
+    interrupted() is checked between chunks (~25 ms) for barge-in/stop;
+    returns False if playback was cut short. Calls must not overlap (the
+    TTS worker plays one chunk at a time) - the output stream is shared.
+    """
+    global _pyaudio, _output
+    import wave
+    import pyaudio
+    if _pyaudio is None:
+        _pyaudio = pyaudio.PyAudio()
+    with wave.open(source, 'rb') as wav:
+        audio_format = (_pyaudio.get_format_from_width(wav.getsampwidth()), wav.getnchannels(),
+                        wav.getframerate())
+        if _output is None or _output[1] != audio_format:
+            close_output()
+            stream = _pyaudio.open(format=audio_format[0], channels=audio_format[1],
+                                   rate=audio_format[2], output=True)
+            _output = (stream, audio_format)
+        stream = _output[0]
+        while True:
+            if interrupted is not None and interrupted():
+                return False
+            data = wav.readframes(chunk_frames)
+            if not data:
+                return True
+            stream.write(data)
+
+
+def close_output():
+    """Close the shared playback stream"""
+    global _output
+    if _output is not None:
+        stream, _output = _output[0], None
+        try:
+            stream.stop_stream()
+            stream.close()
+        except Exception:
+            pass
+
+
+class Utterance:
+    """Handle for a queued piece of speech - wait() blocks until it was spoken"""
+    
+    def __init__(self, text, generation=0):
+        self.text = text
+        self.generation = generation
+        self.spoken = False
+        self.interrupted = False
+        self._done = threading.Event()
+    
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+    
+    def done(self):
+        return self._done.is_set()
+    
+    def _finish(self, spoken, interrupted=False):
+        self.spoken = spoken
+        self.interrupted = interrupted
+        self._done.set()
+
+
+class SentenceStream:
+    """
+    Text of an utterance that is still being written (e.g. an AI reply)
+    add() sentences as they arrive and close() at the end; the TTS worker
+    speaks them as one utterance, rendering ahead across sentences.
+    """
+    
+    def __init__(self):
+        self._queue = queue.Queue()
+        self.closed = False
+    
+    def add(self, sentence):
+        self._queue.put(sentence)
+    
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._queue.put(None)
+    
+    def __iter__(self):
+        while True:
+            sentence = self._queue.get()
+            if sentence is None:
+                return
+            yield sentence
+    
+    def __str__(self):
+        return "<sentence stream>"
+
+
+class RenderJob:
+    """
+    Handle for text queued to be rendered to WAV on the engine thread
+    result() blocks until the WAV bytes are ready (None on failure);
+    callback(wav) runs on the engine thread once they are.
+    """
+    
+    def __init__(self, text, callback=None):
+        self.text = text
+        self.callback = callback
+        self.wav = None
+        self.cancelled = False  # Set by a caller that gave up waiting; skipped if not started yet
+        self._done = threading.Event()
+    
+    def result(self, timeout=None):
+        self._done.wait(timeout)
+        return self.wav
+    
+    def done(self):
+        return self._done.is_set()
+
+
+class TTSWorker:
+    """
+    Long-lived text-to-speech thread with an utterance queue
+    The engine is created once, inside the worker thread (SAPI5/COM engines
+    must stay on the thread that created them), and rebuilt only after a failure.
+    It is the only thread that touches the engine: pyttsx3.init() hands out
+    one shared engine per driver, so renders to WAV (render(), audio cache
+    fills) are queued here too and run between utterances.
+    interrupt() drops queued utterances and cuts the current one: WAV
+    playback stops within one buffer, speech from the engine itself at the
+    next word boundary (stopped from its own word callback).
+    With an audio_cache, cached phrases are played from disk with player()
+    and frequent ones are rendered into the cache for next time. With
+    chunked=True, long texts and SentenceStreams are rendered chunk by chunk
+    here while the previous chunk plays on a playback thread.
+    """
+    
+    def __init__(self, engine_factory=create_engine, audio_cache=None, player=play_wav, chunked=False,
+                 chunk_chars=None):
+        self.engine_factory = engine_factory
+        self.audio_cache = audio_cache
+        self.player = player
+        self.chunked = chunked
+        self.chunk_chars = chunk_chars or TTS_CHUNK_CHARS
+        self._playback = None  # Plays chunk N while chunk N+1 renders (created on first use)
+        self.engine = None
+        self._queue = queue.Queue()
+        self._generation = 0  # Bumped by interrupt(); older utterances are dropped
+        self._current = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="tts-worker", daemon=True)
+        self._thread.start()
+    
+    def wait_ready(self, timeout=None):
+        """Block until the engine has been created (or failed to)"""
+        return self._ready.wait(timeout)
+    
+    def is_alive(self):
+        return self._thread.is_alive()
+    
+    def submit(self, text):
+        utterance = Utterance(text, self._generation)
+        self._queue.put(utterance)
+        return utterance
+    
+    def render_async(self, text, callback=None):
+        """Queue text to be rendered to WAV; returns a RenderJob"""
+        job = RenderJob(text, callback)
+        self._queue.put(job)
+        return job
+    
+    def render(self, text, timeout=None):
+        """WAV bytes of text spoken with the current voice settings (None on failure or timeout)"""
+        if threading.current_thread() is self._thread:
+            return self._render(text)
+        job = self.render_async(text)
+        wav = job.result(timeout)
+        if not job.done():
+            job.cancelled = True
+        return wav
+    
+    def interrupt(self):
+        """Stop what is being said now and everything queued before this call"""
+        self._generation += 1
+        current = self._current
+        if current is not None and isinstance(current.text, SentenceStream):
+            current.text.close()  # Stop waiting for more sentences
+        kept = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, Utterance):
+                item._finish(False, interrupted=True)
+            else:
+                kept.append(item)  # Renders and the shutdown marker survive an interrupt
+        for item in kept:
+            self._queue.put(item)
+    
+    def is_speaking(self):
+        return self._current is not None
+    
+    def _interrupted(self, utterance):
+        return utterance.generation < self._generation
+    
+    def shutdown(self, timeout=None):
+        self._queue.put(None)
+        self._thread.join(timeout)
+    
+    def _init_engine(self):
+        try:
+            print("[INFO] Initializing text-to-speech engine...")
+            self.engine = self.engine_factory()
+            if hasattr(self.engine, 'connect'):
+                self.engine.connect('started-word', self._on_word)
+            print("[OK] Text-to-speech engine ready!")
+        except Exception as e:
+            print(f"[ERROR] TTS init error: {e}")
+            self.engine = None
+        return self.engine
+    
+    def _on_word(self, name, location, length):
+        # Runs inside runAndWait() - the only safe place to stop the engine
+        current = self._current
+        if current is not None and self._interrupted(current):
+            self.engine.stop()
+    
+    def _say(self, text):
+        self.engine.say(text)
+        self.engine.runAndWait()
+    
+    def _with_engine(self, action, text):
+        """action(text) with the engine; if it fails, rebuild the engine once and retry"""
+        try:
+            return action(text)
+        except Exception as e:
+            print(f"[WARN] TTS engine failed: {e} - reinitializing...")
+            self.engine = None
+            if self._init_engine() is None:
+                raise
             try:
-                del temp_engine
-            except:
+                return action(text)
+            except Exception:
+                self.engine = None
+                raise
+    
+    def _save_wav(self, text):
+        import os
+        import tempfile
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            self.engine.save_to_file(text, path)
+            self.engine.runAndWait()  # The file is complete once this returns
+            with open(path, 'rb') as f:
+                return f.read() or None
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
                 pass
-            
-            time.sleep(0.2)  # Increased delay for stability
-            return
-            
+    
+    def _render(self, text):
+        """Render text to WAV bytes on this (the engine) thread; None on failure"""
+        if self.engine is None and self._init_engine() is None:
+            return None
+        try:
+            return self._with_engine(self._save_wav, text)
         except Exception as e:
-            print(f"[ERROR] Fresh engine failed: {e}")
-            import traceback
-            traceback.print_exc()
-            
-            # Cleanup on error
-            if temp_engine:
-                try:
-                    del temp_engine
-                except:
-                    pass
-            
-            print("[INFO] Trying fallback method...")
-            # Fall through to old method
+            print(f"[WARN] Rendering speech failed: {e}")
+            return None
     
-    # Fallback method (original persistent engine)
-    print("[DEBUG] Using fallback persistent engine method...")
+    def _run_render(self, job):
+        try:
+            if not job.cancelled:
+                job.wav = self._render(job.text)
+            if job.callback is not None:
+                job.callback(job.wav)
+        except Exception as e:
+            print(f"[WARN] Render callback failed: {e}")
+        finally:
+            job._done.set()
     
-    if not engine:
-        print("[DEBUG] Engine not initialized, initializing now...")
-        engine = init_engine()
+    def _run(self):
+        self._init_engine()
+        self._ready.set()
+        
+        while True:
+            utterance = self._queue.get()
+            if utterance is None:
+                break
+            if isinstance(utterance, RenderJob):
+                self._run_render(utterance)
+                continue
+            if self._interrupted(utterance):
+                utterance._finish(False, interrupted=True)
+                continue
+            self._current = utterance
+            try:
+                spoken = self._speak(utterance.text)
+            except Exception as e:
+                # e.g. the audio cache or playback thread failed - keep serving the queue
+                print(f"[ERROR] TTS worker failed on an utterance: {e}")
+                spoken = False
+            finally:
+                self._current = None
+            interrupted = self._interrupted(utterance)
+            utterance._finish(spoken and not interrupted, interrupted)
     
-    if not engine:
-        print(f"[ERROR] TTS not available. Cannot speak: {text}")
-        return
+    def voice_settings(self):
+        return voice_settings(self.engine) if self.engine is not None else None
     
-    try:
-        print(f"[DEBUG] Using persistent engine to speak...")
+    def cache_phrase(self, text, settings=None):
+        """Render text into the audio cache after whatever is queued now; returns the RenderJob"""
+        cache = self.audio_cache
+        settings = settings or self.voice_settings()
         
-        # Method 1: Simple approach
+        def store(wav):
+            if wav:
+                cache.put(text, settings, wav)
+            else:
+                cache.discard(text, settings)
+        return self.render_async(text, store)
+    
+    def _play_cached(self, text):
+        """True if text was played from the audio cache"""
+        settings = self.voice_settings()
+        path = self.audio_cache.get(text, settings)
+        if path is None:
+            if self.audio_cache.should_render(text, settings):
+                self.cache_phrase(text, settings)  # Rendered once this utterance is done
+            return False
+        current = self._current
         try:
-            print("[DEBUG] Clearing speech queue...")
-            engine.stop()
-            
-            print("[DEBUG] Adding text to queue...")
-            engine.say(text)
-            
-            print("[DEBUG] Running engine...")
-            engine.runAndWait()
-            
-            print("[DEBUG] Clearing queue again...")
-            engine.stop()
-            
-            print("[OK] Speech completed (fallback method)")
+            self.player(path, lambda: current is not None and self._interrupted(current))
+            return True
+        except Exception as e:
+            print(f"[WARN] Cached audio playback failed: {e}")
+            return False
+    
+    def _render_chunk(self, text):
+        """Something player() can play for text: a cached file or freshly rendered WAV (None on failure)"""
+        import io
+        settings = self.voice_settings()
+        if self.audio_cache is not None:
+            path = self.audio_cache.get(text, settings)
+            if path is not None:
+                return path
+        wav = self._render(text)
+        if wav and self.audio_cache is not None and self.audio_cache.should_render(text, settings):
+            self.audio_cache.put(text, settings, wav)  # Already rendered - caching is free
+        return io.BytesIO(wav) if wav else None
+    
+    def _say_chunk(self, chunk):
+        """Speak a chunk with the engine directly (its render or playback failed)"""
+        try:
+            self._with_engine(self._say, chunk)
+        except Exception as e:
+            print(f"[ERROR] TTS failed: {e}")
+            print(f"[TEXT ONLY] {chunk}")
+    
+    def _finish_playback(self, playing, interrupted):
+        """Wait for a chunk on the playback thread; speak it with the engine if playback failed"""
+        if playing is None:
             return
-            
-        except RuntimeError as e:
-            print(f"[WARN] RuntimeError in fallback: {e}")
-            raise  # Re-raise to trigger reinit
-            
-    except Exception as e:
-        # Last resort: reinitialize and try once more
-        print(f"[ERROR] Fallback method failed: {e}")
-        print(f"[INFO] Last attempt: Reinitializing engine...")
-        
-        engine = None
-        engine = init_engine()
-        
-        if engine:
-            try:
-                engine.say(text)
-                engine.runAndWait()
-                print("[OK] Speech completed (after reinit)")
-            except Exception as e2:
-                print(f"[ERROR] All methods failed: {e2}")
-                print(f"[TEXT ONLY] {text}")
-        else:
-            print(f"[ERROR] Cannot initialize TTS engine")
-            print(f"[TEXT ONLY] {text}")
-
-def listen():
-    r = sr.Recognizer()
+        future, chunk = playing
+        try:
+            future.result()
+        except Exception as e:
+            print(f"[WARN] Chunk playback failed: {e} - speaking it directly")
+            if isinstance(e, ImportError):
+                self.chunked = False  # No audio output library - stop rendering to WAV
+            if not interrupted():
+                self._say_chunk(chunk)
+    
+    def _speak_chunked(self, chunks):
+        """
+        Play chunk N on the playback thread while chunk N+1 renders on this one
+        chunks may be a live iterator (sentences of a reply still being generated);
+        gapless as long as rendering keeps up with playback.
+        """
+        import concurrent.futures
+        current = self._current
+        interrupted = lambda: current is not None and self._interrupted(current)
+        if self._playback is None:
+            self._playback = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="tts-playback")
+        playing = None  # (future, chunk) of the chunk being played
+        for chunk in chunks:
+            if interrupted():
+                break
+            audio = self._render_chunk(chunk) if self.chunked else None
+            self._finish_playback(playing, interrupted)
+            playing = None
+            if interrupted():
+                break
+            if audio is None:
+                self._say_chunk(chunk)  # Render failed - speak this chunk directly
+            else:
+                playing = (self._playback.submit(self.player, audio, interrupted), chunk)
+        self._finish_playback(playing, interrupted)
+        return True
     
-    # FIX: Adjust recognizer settings for better long-sentence handling
-    r.energy_threshold = 300  # Minimum audio energy to consider for recording
-    r.dynamic_energy_threshold = True  # Automatically adjust to ambient noise
-    r.pause_threshold = 1.5  # INCREASED from 0.8 to 1.5 - allows pauses mid-sentence
+    def _speak_stream(self, stream):
+        """Speak a SentenceStream as its sentences arrive"""
+        if self.chunked:
+            return self._speak_chunked(chunk for sentence in stream
+                                       for chunk in split_chunks(sentence, self.chunk_chars))
+        current = self._current
+        for sentence in stream:
+            if self._interrupted(current):
+                break
+            self._speak(sentence)
+        return True
     
+    def _speak(self, text):
+        if self.engine is None and self._init_engine() is None:
+            for sentence in (text if isinstance(text, SentenceStream) else [text]):
+                print(f"[TEXT ONLY] {sentence}")
+            return False
+        if isinstance(text, SentenceStream):
+            return self._speak_stream(text)
+        if self.audio_cache is not None and self._play_cached(text):
+            return True
+        if self.chunked:
+            # Played from WAV in short buffers, so interrupt() silences it at once
+            return self._speak_chunked(split_chunks(text, self.chunk_chars))
+        try:
+            self._with_engine(self._say, text)
+            return True
+        except Exception as e:
+            print(f"[ERROR] TTS failed: {e}")
+            print(f"[TEXT ONLY] {text}")
+            return False
+
+
+_worker = None
+_worker_lock = threading.Lock()
+_audio_cache = None
+_audio_cache_lock = threading.Lock()
+
+
+def get_audio_cache():
+    """The shared AudioCache (None when USE_AUDIO_CACHE is off)"""
+    global _audio_cache
+    if not USE_AUDIO_CACHE:
+        return None
+    with _audio_cache_lock:
+        if _audio_cache is None:
+            from audio_cache import AudioCache
+            _audio_cache = AudioCache(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_MB * 1024 * 1024,
+                                      AUDIO_CACHE_MIN_REPEATS)
+        return _audio_cache
+
+
+def prerender(phrases):
+    """
+    Cache phrases that will certainly be spoken (greetings, prompts) ahead of time
+    Renders on the TTS worker between utterances; returns the RenderJobs of
+    the phrases not cached yet.
+    """
+    worker = init_engine()
+    worker.wait_ready()
+    cache, settings = worker.audio_cache, worker.voice_settings()
+    if cache is None or settings is None:
+        return []
+    return [worker.cache_phrase(text, settings) for text in phrases if (text, settings) not in cache]
+
+
+def init_engine():
+    """Start the background TTS worker (safe to call more than once)"""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = TTSWorker(audio_cache=get_audio_cache(), chunked=USE_CHUNKED_TTS)
+    return _worker
+
+
+def speak(text, block=True, cancel=None):
+    """
+    Speak text on the background TTS worker
+    block=True waits until the speech has finished; block=False returns
+    an Utterance handle immediately (call .wait() on it if needed).
+    A cancelled token interrupts the speech and ends the wait.
+    """
+    print(f"[SPEAKING] {text}")
+    worker = init_engine()
+    utterance = worker.submit(text)
+    if cancel is not None:
+        cancel.add_callback(worker.interrupt)
     try:
-        with sr.Microphone() as source:
-            print("\n[LISTENING] Speak now...")
-            
-            # Adjust for ambient noise
-            print("[INFO] Adjusting for background noise...")
-            r.adjust_for_ambient_noise(source, duration=1)
-            
-            # FIX: Balanced timeout for responsiveness and longer questions
-            print("[READY] Speak your command...")
-            # OPTIMIZED: timeout=5s (wait for speech to start), phrase_time_limit=20s (max speech duration)
-            # This allows stop button to respond within ~7 seconds maximum
-            audio = r.listen(source, timeout=5, phrase_time_limit=20)
-            
-            print("[PROCESSING] Recognizing speech...")
-            text = r.recognize_google(audio)
-            print(f"[RECOGNIZED] '{text}'\n")
-            return text
+        if block:
+            while not utterance.wait(0.05):
+                if cancel is not None and cancel.cancelled or not worker.is_alive():
+                    break
+    finally:
+        if cancel is not None:
+            cancel.remove_callback(worker.interrupt)
+    return utterance
+
+
+def speak_stream(sentences, cancel=None):
+    """
+    Speak sentences (e.g. a streamed AI reply) as they arrive, as one utterance
+    The TTS worker renders the next chunk while the current one plays, also
+    across sentences. Blocks until everything was spoken or interrupted.
+    """
+    worker = init_engine()
+    stream = SentenceStream()
+    utterance = worker.submit(stream)
+    if cancel is not None:
+        cancel.add_callback(worker.interrupt)
+    try:
+        for sentence in sentences:
+            if utterance.done() or not worker.is_alive():
+                break  # Interrupted - stop pulling sentences
+            print(f"[SPEAKING] {sentence}")
+            stream.add(sentence)
+        stream.close()
+        while not utterance.wait(0.05):
+            if cancel is not None and cancel.cancelled or not worker.is_alive():
+                break
+    finally:
+        stream.close()
+        if cancel is not None:
+            cancel.remove_callback(worker.interrupt)
+    return utterance
+
+
+def render_wav(text, timeout=30.0):
+    """Speech for text as WAV bytes, without playing it (None if TTS is unavailable)"""
+    return init_engine().render(text, timeout)
+
+def speak_async(text):
+    """Queue text for speech and return immediately"""
+    return speak(text, block=False)
+
+
+def stop_speaking():
+    """Cut off the current speech and drop anything queued (barge-in)"""
+    if _worker is not None:
+        _worker.interrupt()
+
+
+def is_speaking():
+    """True while the TTS worker is saying something"""
+    worker = _worker
+    return worker is not None and worker.is_speaking()
+
+# Listening settings
+LISTEN_TIMEOUT = 5  # Seconds to wait for speech to start
+PHRASE_TIME_LIMIT = 20  # Max speech duration
+PAUSE_THRESHOLD = 1.5  # Fixed silence that ends a phrase when VAD endpointing is off
+USE_VAD_ENDPOINTING = True  # End commands ~300 ms after the last word, adapting to mid-sentence pauses
+VAD_BACKEND = "energy"  # "energy" (noise-floor threshold) or "webrtc" (pip install webrtcvad)
+ENDPOINT_SILENCE = 0.3  # Trailing silence that ends a command
+MAX_ENDPOINT_SILENCE = 1.0  # Upper bound for the adaptive trailing silence
+STT_BACKEND = "google"  # "google" (cloud) or "vosk" (offline, transcribes while you speak)
+
+_capture_session = None
+_capture_lock = threading.Lock()
+_recognizer = None
+_recognizer_lock = threading.Lock()
+
+
+def get_capture_session():
+    """Open the microphone once and keep it open across turns"""
+    global _capture_session
+    with _capture_lock:
+        if _capture_session is None or not _capture_session.running:
+            print("[INFO] Opening microphone...")
+            # Our own speech must not raise the noise floor between turns
+            _capture_session = CaptureSession(MicrophoneSource(), tracking_paused=is_speaking).start()
+        return _capture_session
+
+
+def close_capture_session():
+    global _capture_session
+    with _capture_lock:
+        if _capture_session is not None:
+            _capture_session.stop()
+            _capture_session = None
+
+
+def create_endpointer(session):
+    """Endpointing rules for one listen() call"""
+    if not USE_VAD_ENDPOINTING:
+        return Endpointer.fixed(session.frame_seconds, PAUSE_THRESHOLD)
+    return Endpointer(
+        session.frame_seconds,
+        classifier=create_classifier(VAD_BACKEND, session.sample_rate),
+        trailing_silence=ENDPOINT_SILENCE,
+        max_trailing_silence=MAX_ENDPOINT_SILENCE
+    )
+
+
+def get_recognizer():
+    """Speech-to-text backend selected by STT_BACKEND (created once)"""
+    global _recognizer
+    with _recognizer_lock:
+        if _recognizer is None or _recognizer.name != STT_BACKEND:
+            _recognizer = create_recognizer(STT_BACKEND)
+        return _recognizer
+
+
+def listen(session=None, on_partial=None, start_position=None, timeout=None, cancel=None):
+    """
+    Record one command and return its transcript ("" on timeout/failure)
+    Streaming backends decode while the user speaks and report partial
+    transcripts through on_partial(text). start_position rewinds into audio
+    the capture session already holds (e.g. right after the wake word).
+    cancel (CancelToken) abandons listening or recognition at once.
+    """
+    try:
+        session = session or get_capture_session()
+        recognizer = get_recognizer()
+        stream = recognizer.start(session.sample_rate, session.sample_width)
+        endpointer = create_endpointer(session)
+        last_partial = ""
+        
+        def on_frame(frame):
+            nonlocal last_partial
+            partial = stream.accept(frame)
+            if partial and partial != last_partial:
+                last_partial = partial
+                endpointer.hint(partial)
+                tracing.mark("first_partial")
+                if on_partial:
+                    on_partial(partial)
+                else:
+                    print(f"[PARTIAL] {partial}")
+        
+        print("\n[LISTENING] Speak now...")
+        print(f"[READY] Speak your command... (noise threshold {session.tracker.threshold:.0f})")
+        
+        with tracing.span("listen"):
+            frame_data = session.listen(
+                timeout=LISTEN_TIMEOUT if timeout is None else timeout,
+                phrase_time_limit=PHRASE_TIME_LIMIT,
+                on_frame=on_frame,
+                endpointer=endpointer,
+                start_position=start_position,
+                cancel=cancel
+            )
+        if cancel is not None and cancel.cancelled:
+            return ""
+        if not frame_data:
+            print(f"[TIMEOUT] No speech detected (waited {LISTEN_TIMEOUT if timeout is None else timeout} seconds)")
+            return ""
+        
+        print("[PROCESSING] Recognizing speech...")
+        with tracing.span("recognize", engine=recognizer.name):
+            # A cloud request cannot be aborted - stop waiting for it instead
+            text = run_cancellable(stream.result, cancel)
+        if not text:
+            print("[ERROR] Could not understand audio - please speak clearly")
+            return ""
+        print(f"[RECOGNIZED] '{text}'\n")
+        return text
             
-    except sr.WaitTimeoutError:
-        print("[TIMEOUT] No speech detected (waited 10 seconds)")
-        return ""
-    except sr.UnknownValueError:
-        print("[ERROR] Could not understand audio - please speak clearly")
+    except CancelledError:
+        print("[INFO] Listening cancelled")
         return ""
-    except sr.RequestError as e:
+    except RecognitionError as e:
         print(f"[ERROR] Network error: {e}")
         print("[WARN] Check your internet connection")
         return ""
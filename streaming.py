@@ -0,0 +1,180 @@
+"""
+Streaming helpers - Cut partial LLM output into speakable sentences
+Used by assistant_core to start speaking before the full reply arrives
+"""
+import contextvars
+import queue
+import re
+import threading
+from cancellation import CancelledError
+
+# A sentence ends at . ! or ? (optionally followed by quotes/brackets) and then whitespace
+_SENTENCE_END = re.compile(r'[.!?]+["\')\]]*\s+')
+
+# Words that end with a period but do not end a sentence
+_ABBREVIATIONS = {
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'vs', 'etc',
+    'e.g', 'i.e', 'approx', 'no', 'fig', 'inc', 'ltd', 'co', 'mt',
+}
+
+# Sentences shorter than this are merged with the next one (avoids choppy TTS)
+MIN_SENTENCE_CHARS = 12
+
+# Longer sentences are cut at clause boundaries for chunked speech (see split_chunks)
+MAX_CHUNK_CHARS = 200
+_CLAUSE_END = re.compile(r'[,;:\u2014]\s+|\s+[-\u2013]\s+')
+
+
+class SentenceSplitter:
+    """
+    Incremental sentence splitter
+    feed() partial text as it arrives and get back every sentence that
+    is now complete; flush() returns whatever is left at the end.
+    """
+
+    def __init__(self, min_chars=MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text):
+        """Add partial text, return a list of finished sentences"""
+        if not text:
+            return []
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            if self._is_abbreviation(self._buffer[:match.start() + 1]):
+                continue
+            if len(candidate) < self.min_chars:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self):
+        """Return the remaining text (may be an unterminated sentence)"""
+        rest = self._buffer.strip()
+        self._buffer = ""
+        return [rest] if rest else []
+
+    @staticmethod
+    def _is_abbreviation(text):
+        last_word = text.rstrip('.!?').rsplit(None, 1)[-1].lower() if text.strip() else ""
+        return text.endswith('.') and last_word in _ABBREVIATIONS
+
+
+def split_sentences(text, min_chars=MIN_SENTENCE_CHARS):
+    """Split a complete text into sentences"""
+    splitter = SentenceSplitter(min_chars)
+    return splitter.feed(text) + splitter.flush()
+
+
+def _split_long(sentence, max_chars):
+    """Cut a sentence at the last clause boundary (else the last space) before max_chars"""
+    pieces = []
+    while len(sentence) > max_chars:
+        cut = None
+        for match in _CLAUSE_END.finditer(sentence, 0, max_chars + 1):
+            if match.start() >= MIN_SENTENCE_CHARS:
+                cut = match.end()
+        if cut is None:
+            cut = sentence.rfind(" ", MIN_SENTENCE_CHARS, max_chars + 1)
+        if cut <= 0:
+            break  # One very long word - leave it whole
+        pieces.append(sentence[:cut].strip())
+        sentence = sentence[cut:].strip()
+    return pieces + ([sentence] if sentence else [])
+
+
+def split_chunks(text, max_chars=MAX_CHUNK_CHARS, min_chars=MIN_SENTENCE_CHARS):
+    """
+    Split a complete text into prosody-safe speech chunks
+    Whole sentences (short ones merged), with sentences over max_chars cut
+    at commas/semicolons/dashes - never inside a word.
+    """
+    chunks = []
+    for sentence in split_sentences(text, min_chars):
+        chunks.extend(_split_long(sentence, max_chars))
+    return chunks
+
+
+def iter_sentences(chunks, min_chars=MIN_SENTENCE_CHARS):
+    """Turn an iterable of text chunks into an iterator of sentences"""
+    splitter = SentenceSplitter(min_chars)
+    for chunk in chunks:
+        yield from splitter.feed(chunk)
+    yield from splitter.flush()
+
+
+_DONE = object()
+
+
+def prefetch(iterable, maxsize=0, cancel=None):
+    """
+    Consume an iterable in a background thread
+    Lets generation keep running while the caller is busy (e.g. speaking)
+    Exceptions from the producer are re-raised in the consumer.
+    The producer runs in a copy of the caller's context (keeps tracing spans).
+    With a cancel token the consumer stops waiting (CancelledError) as soon
+    as it fires. Once the token fires or the consumer is closed, the producer
+    stops after the item in hand and closes the iterable, so a generator's
+    cleanup runs (e.g. closing a provider stream) and the rest of it doesn't.
+    """
+    items = queue.Queue(maxsize)
+    context = contextvars.copy_context()
+    closed = threading.Event()
+
+    def stopped():
+        return closed.is_set() or (cancel is not None and cancel.cancelled)
+
+    def put(item):
+        while True:
+            try:
+                items.put(item, timeout=0.05)
+                return
+            except queue.Full:
+                if stopped():
+                    return  # Nobody will read it
+
+    def producer():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if stopped():
+                    break
+                put(item)
+            if stopped() and hasattr(iterator, 'close'):
+                iterator.close()
+        except BaseException as e:
+            put(_ProducerError(e))
+        finally:
+            put(_DONE)
+
+    threading.Thread(target=context.run, args=(producer,), daemon=True).start()
+
+    try:
+        while True:
+            if cancel is None:
+                item = items.get()
+            else:
+                try:
+                    item = items.get(timeout=0.05)
+                except queue.Empty:
+                    cancel.raise_if_cancelled()
+                    continue
+                cancel.raise_if_cancelled()  # Items left in the queue are not wanted either
+            if item is _DONE:
+                return
+            if isinstance(item, _ProducerError):
+                raise item.error
+            yield item
+    finally:
+        closed.set()
+
+
+class _ProducerError:
+    def __init__(self, error):
+        self.error = error
@@ -0,0 +1,66 @@
+"""Headless server: request validation and worker pool sizing"""
+import base64
+import http.client
+import json
+import socket
+
+import pytest
+
+import assistant_server
+from assistant_server import AssistantServer
+
+
+@pytest.fixture
+def server():
+    server = AssistantServer(port=0, workers=2).start()
+    yield server
+    server.stop()
+
+
+def request(server, method, path, payload=None):
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+    try:
+        body = json.dumps(payload).encode() if payload is not None else None
+        conn.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b"{}")
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("audio", [b"not a wav file", b"RIFF\x24\x00\x00\x00WAVEfmt ", b""])
+def test_malformed_wav_is_a_bad_request(server, audio):
+    status, created = request(server, "POST", "/sessions")
+    assert status == 201
+    status, payload = request(server, "POST", f"/sessions/{created['session']}/command",
+                              {'audio': base64.b64encode(audio).decode() or "AA=="})
+    assert status == 400
+    assert "error" in payload
+
+
+@pytest.mark.parametrize("payload", [{'text': 5}, {'text': ["hello"]}, {'audio': 5}, {'audio': {"data": "AA=="}},
+                                     ["hello"]])
+def test_non_string_command_fields_are_a_bad_request(server, payload):
+    _status, created = request(server, "POST", "/sessions")
+    status, body = request(server, "POST", f"/sessions/{created['session']}/command", payload)
+    assert status == 400
+    assert "error" in body
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1.5"])
+def test_invalid_content_length_is_a_bad_request(server, length):
+    with socket.create_connection(("127.0.0.1", server.port), timeout=10) as sock:
+        sock.sendall(f"POST /sessions HTTP/1.1\r\nHost: x\r\nContent-Length: {length}\r\n\r\n".encode())
+        response = sock.makefile('rb').readline()
+    assert response.split()[1] == b"400"
+
+
+def test_worker_pool_is_sized_from_cpus_and_sessions(monkeypatch):
+    monkeypatch.setattr(assistant_server.os, 'cpu_count', lambda: 1)
+    assert assistant_server.default_workers(max_sessions=1000) == assistant_server.WORKERS_PER_CPU
+    assert assistant_server.default_workers(max_sessions=10) == 10
+    server = AssistantServer(port=0, max_sessions=10)
+    try:
+        assert server.workers == 10
+    finally:
+        server.executor.shutdown()
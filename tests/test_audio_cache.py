@@ -0,0 +1,65 @@
+"""AudioCache: LRU eviction by size, the repeat threshold, key sensitivity and reloading from disk"""
+import os
+
+from audio_cache import AudioCache, cache_key
+
+SETTINGS = ("voice-1", 175, 1.0)  # (voice, rate, volume) as speech.voice_settings() returns them
+WAV = b"RIFF" + bytes(96)  # 100 bytes; the cache never parses the audio
+
+
+def test_least_recently_played_is_evicted_past_max_bytes(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=250)
+    cache.put("Hello!", SETTINGS, WAV)
+    cache.put("Goodbye!", SETTINGS, WAV)
+    assert cache.get("Hello!", SETTINGS)  # Now "Goodbye!" is the least recently played
+    cache.put("See you soon!", SETTINGS, WAV)
+
+    assert ("Goodbye!", SETTINGS) not in cache
+    assert ("Hello!", SETTINGS) in cache and ("See you soon!", SETTINGS) in cache
+    assert cache.total_bytes == 200 and len(os.listdir(tmp_path)) == 2
+
+
+def test_wav_larger_than_the_cache_is_not_stored(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=50)
+    assert cache.put("Hello!", SETTINGS, WAV) is None
+    assert len(cache) == 0 and os.listdir(tmp_path) == []
+
+
+def test_should_render_after_min_repeats(tmp_path):
+    cache = AudioCache(str(tmp_path), min_repeats=3)
+    assert [cache.should_render("Hello!", SETTINGS) for _ in range(3)] == [False, False, True]
+    assert not cache.should_render("Hello!", SETTINGS)  # Render pending - asked for once
+    cache.put("Hello!", SETTINGS, WAV)
+    assert not cache.should_render("Hello!", SETTINGS)  # Cached
+
+    cache.should_render("Goodbye!", SETTINGS)
+    cache.should_render("Goodbye!", SETTINGS)
+    assert cache.should_render("Goodbye!", SETTINGS)
+    cache.discard("Goodbye!", SETTINGS)  # The render failed - it may be asked for again
+    assert cache.should_render("Goodbye!", SETTINGS)
+
+
+def test_key_depends_on_voice_rate_and_volume(tmp_path):
+    keys = {cache_key("Hello!", settings) for settings in
+            [SETTINGS, ("voice-2", 175, 1.0), ("voice-1", 200, 1.0), ("voice-1", 175, 0.5)]}
+    assert len(keys) == 4
+    assert cache_key(" Hello! ", SETTINGS) == cache_key("Hello!", SETTINGS)
+
+    cache = AudioCache(str(tmp_path))
+    cache.put("Hello!", SETTINGS, WAV)
+    assert cache.get("Hello!", ("voice-1", 200, 1.0)) is None
+    assert cache.get("Hello!", SETTINGS).endswith(".wav")
+    assert cache.stats()['hits'] == cache.stats()['misses'] == 1
+
+
+def test_index_is_reloaded_from_disk_in_lru_order(tmp_path):
+    cache = AudioCache(str(tmp_path))
+    for i, text in enumerate(["old", "middle", "new"]):
+        path = cache.put(text, SETTINGS, WAV)
+        os.utime(path, (1000 + i, 1000 + i))  # Last played at these times
+    (tmp_path / "notes.txt").write_text("not audio")
+
+    reloaded = AudioCache(str(tmp_path), max_bytes=250)  # Too small for all three: the oldest goes
+    assert len(reloaded) == 2 and reloaded.total_bytes == 200
+    assert ("old", SETTINGS) not in reloaded
+    assert reloaded.get("new", SETTINGS) == cache.get("new", SETTINGS)
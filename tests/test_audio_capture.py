@@ -0,0 +1,80 @@
+"""CaptureSession over a recorded PCMSource: pre-roll, start_position and shared readers"""
+import time
+
+import pytest
+
+from audio_capture import FRAME_SAMPLES, SAMPLE_RATE, SAMPLE_WIDTH, CaptureSession, PCMSource
+from fake_providers import synthetic_utterance
+
+FRAME_BYTES = FRAME_SAMPLES * SAMPLE_WIDTH
+FRAME_SECONDS = FRAME_SAMPLES / SAMPLE_RATE
+
+
+@pytest.fixture
+def utterance():
+    return synthetic_utterance(seed=3, words=4, lead_silence=1.0, trail_silence=1.5)
+
+
+@pytest.fixture
+def captured(utterance):
+    """A session that has already captured the whole recording"""
+    session = CaptureSession(PCMSource(utterance[0]), backlog_seconds=None).start()
+    deadline = time.monotonic() + 5
+    while session.running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    yield session
+    session.stop()
+
+
+def test_start_position_rewinds_to_speech_captured_before_listening(captured, utterance):
+    pcm, start, end = utterance
+    phrase = captured.listen(timeout=5, start_position=1, pre_roll_seconds=0.3)
+
+    assert phrase
+    offset = pcm.find(phrase)
+    assert offset >= 0 and offset % FRAME_BYTES == 0  # Whole frames of the recording, in order
+    phrase_start = offset / SAMPLE_WIDTH / SAMPLE_RATE
+    phrase_end = phrase_start + len(phrase) / SAMPLE_WIDTH / SAMPLE_RATE
+    # The pre-roll reaches back over the speech onset without dragging in the whole lead silence
+    assert start - 0.3 - 2 * FRAME_SECONDS <= phrase_start <= start
+    assert phrase_end >= end
+
+
+def test_flush_skips_audio_captured_before_listening(captured):
+    assert captured.listen(timeout=1) is None
+
+
+def test_every_reader_sees_every_frame(captured, utterance):
+    frames = -(-len(utterance[0]) // FRAME_BYTES)
+    first, second = captured.reader(start_position=1), captured.reader(start_position=1)
+    positions = [position for _frame, _energy, position in first]
+    assert positions == list(range(1, frames + 1))
+    assert [position for _frame, _energy, position in second] == positions
+    assert first.dropped == second.dropped == 0
+
+
+def test_reader_behind_the_backlog_skips_to_the_oldest_buffered_frame(utterance):
+    session = CaptureSession(PCMSource(utterance[0]), backlog_seconds=0.5).start()
+    try:
+        deadline = time.monotonic() + 5
+        while session.running and time.monotonic() < deadline:
+            time.sleep(0.01)
+        reader = session.reader(start_position=1)
+        positions = [position for _frame, _energy, position in reader]
+        kept = int(0.5 / FRAME_SECONDS)  # Frames the ring holds
+        assert positions == list(range(session.head - kept + 1, session.head + 1))
+        assert reader.dropped == session.head - kept
+    finally:
+        session.stop()
+
+
+@pytest.mark.parametrize("paused", [False, True])
+def test_noise_floor_is_not_tracked_while_paused(utterance, paused):
+    session = CaptureSession(PCMSource(utterance[0]), backlog_seconds=None, tracking_paused=lambda: paused).start()
+    try:
+        deadline = time.monotonic() + 5
+        while session.running and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert (session.tracker.noise_floor is None) == paused
+    finally:
+        session.stop()
@@ -0,0 +1,75 @@
+"""auth: legacy rehash on login, wrong password / unknown user, concurrent logins and tampered hashes"""
+import threading
+
+import pytest
+
+import auth
+from user_store import UserStore
+
+PARAMS = ("scrypt", auth.KDF_MIN_COST)
+
+
+@pytest.fixture(autouse=True)
+def calibrated(monkeypatch):
+    monkeypatch.setattr(auth, '_params', PARAMS)  # Skip calibration
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = UserStore(str(tmp_path / "users.db"))
+    yield store
+    store.close()
+
+
+def test_legacy_digest_is_rehashed_on_login(store):
+    store.create_user("a@b.com", auth.legacy_hash("secret1"))
+
+    assert auth.authenticate(store, "a@b.com", "secret1") == (True, auth.LOGIN_SUCCESS)
+
+    stored = store.get_password_hash("a@b.com")
+    assert stored.startswith(f"scrypt${auth.KDF_MIN_COST}$")
+    assert not auth.needs_rehash(stored)
+    assert store.get_stats("a@b.com")['last_login'] is not None
+    assert auth.authenticate(store, "a@b.com", "secret1") == (True, auth.LOGIN_SUCCESS)
+
+
+def test_wrong_password_and_unknown_user(store):
+    auth.register(store, "a@b.com", "secret1")
+
+    assert auth.authenticate(store, "a@b.com", "secret2") == (False, auth.WRONG_PASSWORD)
+    assert auth.authenticate(store, "c@d.com", "secret1") == (False, auth.USER_NOT_FOUND)
+    assert store.get_stats("a@b.com")['last_login'] is None
+
+
+def test_concurrent_logins_on_a_legacy_row_all_succeed(store):
+    store.create_user("a@b.com", auth.legacy_hash("secret1"))
+    start = threading.Barrier(4)
+    results = []
+
+    def login():
+        start.wait()
+        results.append(auth.authenticate(store, "a@b.com", "secret1"))
+
+    threads = [threading.Thread(target=login) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [(True, auth.LOGIN_SUCCESS)] * 4
+    assert not auth.needs_rehash(store.get_password_hash("a@b.com"))
+
+
+@pytest.mark.parametrize("password_hash", [
+    "not-a-hash", "scrypt$1099511627776$00$00", "scrypt$1099511627776$00" + "$" + "0" * 64,
+    "scrypt$1000$00" + "$" + "0" * 64, "pbkdf2_sha256$0$00" + "$" + "0" * 64, "md5$1$00" + "$" + "0" * 64,
+])
+def test_malformed_or_out_of_range_hashes_fail_to_verify(password_hash):
+    assert not auth.is_valid_hash(password_hash)
+    assert auth.verify_password("secret1", password_hash) is False
+
+
+def test_hashes_this_module_writes_are_valid():
+    assert auth.is_valid_hash(auth.hash_password("secret1", PARAMS))
+    assert auth.is_valid_hash(auth.hash_password("secret1", ("pbkdf2_sha256", 1000)))
+    assert auth.is_valid_hash(auth.legacy_hash("secret1"))
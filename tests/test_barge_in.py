@@ -0,0 +1,72 @@
+"""BargeInMonitor over a recorded capture session: echo alone never triggers, the user cutting in does"""
+import threading
+from array import array
+
+import pytest
+
+from audio_capture import CaptureSession, PCMSource
+from barge_in import BargeInMonitor, EchoGate
+from fake_providers import synthetic_utterance
+
+
+class GatedSource(PCMSource):
+    """A recorded source that starts delivering frames once go is set"""
+
+    def __init__(self, pcm):
+        super().__init__(pcm)
+        self.go = threading.Event()
+
+    def read(self):
+        self.go.wait(5)
+        return super().read()
+
+
+def mix(*tracks):
+    arrays = []
+    for pcm in tracks:
+        samples = array('h')
+        samples.frombytes(pcm)
+        arrays.append(samples)
+    mixed = array('h', bytes(2 * max(len(a) for a in arrays)))
+    for samples in arrays:
+        for i, value in enumerate(samples):
+            mixed[i] = max(-32768, min(32767, mixed[i] + value))
+    return mixed.tobytes()
+
+
+def monitor(pcm):
+    """Run a BargeInMonitor over the whole recording; returns (monitor, on_barge_in calls, frame seconds)"""
+    source = GatedSource(pcm)
+    session = CaptureSession(source, backlog_seconds=None).start()
+    calls = []
+    try:
+        barge = BargeInMonitor(session, EchoGate(session.frame_seconds), on_barge_in=lambda: calls.append(1))
+        with barge:
+            source.go.set()  # The monitor reads from the first frame on
+            barge._thread.join(5)  # Ends once it triggered or the recording ran out
+        return barge, calls, session.frame_seconds
+    finally:
+        session.stop()
+
+
+@pytest.fixture(scope="module")
+def echo():
+    # Our own reply heard through the speakers, from 0.5 s on
+    return synthetic_utterance(seed=100, words=14, lead_silence=0.5, trail_silence=1.0, level=0.2)[0]
+
+
+def test_echo_alone_never_triggers(echo):
+    barge, calls, _frame_seconds = monitor(echo)
+    assert not barge.triggered.is_set() and barge.position is None
+    assert calls == []
+
+
+@pytest.mark.parametrize("user_at", [1.5, 3.0])
+def test_user_cutting_in_triggers_once_where_they_started(echo, user_at):
+    user, start, _end = synthetic_utterance(seed=200, words=4, lead_silence=user_at, trail_silence=0.5)
+    barge, calls, frame_seconds = monitor(mix(echo, user))
+
+    assert barge.triggered.is_set()
+    assert calls == [1]  # Playback is interrupted exactly once
+    # listen(start_position=...) would begin within two frames of the user's first word
+    assert abs((barge.position - 1) * frame_seconds - start) <= 2 * frame_seconds
@@ -0,0 +1,112 @@
+"""CancelToken: callbacks, run_cancellable and propagation through prefetch and a streamed reply"""
+import contextvars
+import threading
+import time
+
+import pytest
+
+import assistant_core
+from cancellation import CancelledError, CancelToken, run_cancellable
+from fake_providers import FakeOpenAI
+from streaming import prefetch
+
+
+def test_cancel_runs_callbacks_once_and_keeps_the_first_reason():
+    token, calls = CancelToken(), []
+    token.add_callback(lambda: calls.append("a"))
+    removed = lambda: calls.append("removed")
+    token.add_callback(removed)
+    token.remove_callback(removed)
+
+    token.cancel("stop requested")
+    token.cancel("again")
+    token.add_callback(lambda: calls.append("late"))  # Already cancelled: runs at once
+
+    assert calls == ["a", "late"]
+    assert token.cancelled and token.reason == "stop requested" and token.cancelled_at is not None
+    with pytest.raises(CancelledError, match="stop requested"):
+        token.raise_if_cancelled()
+
+
+def test_failing_callback_does_not_stop_the_others():
+    token, calls = CancelToken(), []
+    token.add_callback(lambda: 1 / 0)
+    token.add_callback(lambda: calls.append("ran"))
+    token.cancel()
+    assert calls == ["ran"]
+
+
+def test_run_cancellable_returns_raises_or_abandons():
+    assert run_cancellable(lambda x: x * 2, CancelToken(), 21) == 42
+    assert run_cancellable(lambda: "no token", None) == "no token"
+    with pytest.raises(ZeroDivisionError):
+        run_cancellable(lambda: 1 / 0, CancelToken())
+
+    token = CancelToken()
+    threading.Timer(0.05, token.cancel, args=("stop requested",)).start()
+    start = time.perf_counter()
+    with pytest.raises(CancelledError):
+        run_cancellable(time.sleep, token, 2.0)
+    assert time.perf_counter() - start < 1.0
+
+
+def test_run_cancellable_keeps_the_callers_context():
+    variable = contextvars.ContextVar('variable', default=None)
+    variable.set("turn 7")
+    assert run_cancellable(variable.get, CancelToken()) == "turn 7"
+
+
+def test_cancel_stops_the_prefetch_producer():
+    produced = []
+
+    def slow():
+        try:
+            for i in range(100):
+                produced.append(i)
+                yield i
+                time.sleep(0.01)
+        finally:
+            produced.append("closed")
+
+    token = CancelToken()
+    items = prefetch(slow(), cancel=token)
+    assert next(items) == 0
+    token.cancel("stop requested")
+    with pytest.raises(CancelledError):
+        list(items)
+    time.sleep(0.1)
+    assert produced[-1] == "closed" and len(produced) < 20
+
+
+def test_closing_the_consumer_stops_the_producer():
+    closed = threading.Event()
+
+    def endless():
+        try:
+            while True:
+                yield "x"
+                time.sleep(0.01)
+        finally:
+            closed.set()
+
+    items = prefetch(endless())
+    next(items)
+    items.close()
+    assert closed.wait(1.0)
+
+
+def test_stop_token_reaches_a_streamed_reply(monkeypatch):
+    monkeypatch.setattr(assistant_core, 'AI_PROVIDER', "openai")
+    monkeypatch.setattr(assistant_core, 'OPENAI_CLIENT', FakeOpenAI(first_token_delay=1.0, token_delay=0.0))
+    monkeypatch.setattr(assistant_core, 'USE_RESPONSE_CACHE', False)
+    monkeypatch.setattr(assistant_core, 'USE_CONVERSATION_MEMORY', False)
+    token = CancelToken()
+    spoken = []
+    threading.Timer(0.1, token.cancel, args=("stop requested",)).start()
+
+    start = time.perf_counter()
+    with pytest.raises(CancelledError):
+        assistant_core.respond("tell me about Paris", spoken.append, cancel=token)
+
+    assert time.perf_counter() - start < 0.5  # Did not wait for the provider's first token
+    assert spoken == []
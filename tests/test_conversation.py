@@ -0,0 +1,79 @@
+"""ConversationMemory stays within its token budget, and follow-ups stay out of the response cache"""
+import random
+
+import pytest
+
+import assistant_core
+from conversation import ConversationMemory, count_tokens, is_follow_up
+from corpora import synthetic_turn
+from fake_providers import FakeOpenAI
+from response_cache import ResponseCache
+
+SYSTEM = "You are a helpful voice assistant."
+
+
+def test_prompt_stays_bounded_over_1000_turns():
+    rng = random.Random(0)
+    memory = ConversationMemory(budget_tokens=600, summary_tokens=200)
+    largest = 0
+    for i in range(1000):
+        question, answer = synthetic_turn(rng, i)
+        largest = max(largest, memory.prompt_tokens(SYSTEM, question))
+        memory.add(question, answer)
+        assert memory.turn_tokens <= memory.budget_tokens
+        assert count_tokens(memory.summary) <= memory.summary_tokens
+
+    assert memory.total_turns == 1000
+    assert memory.history()[-1] == (question, answer)  # The latest turn is always kept verbatim
+    # Budget + summary + system prompt + the question, plus per-message overhead
+    assert largest < 600 + 200 + count_tokens(SYSTEM) + 100
+
+
+def test_turn_larger_than_the_budget_is_kept_verbatim_cut_to_fit():
+    memory = ConversationMemory(budget_tokens=100, summary_tokens=50)
+    memory.add("what is the capital of France", "Paris.")
+    answer = "The Eiffel Tower was built for the 1889 World's Fair. " * 40
+    memory.add("tell me about the Eiffel Tower", answer)
+
+    (question, kept), = memory.history()  # The earlier turn went to the summary
+    assert question == "tell me about the Eiffel Tower"
+    assert answer.startswith(kept[:-len(" ...")]) and kept.endswith(" ...")
+    assert memory.turn_tokens <= memory.budget_tokens
+    assert "capital of France" in memory.summary
+
+
+@pytest.fixture
+def cached_session(tmp_path, monkeypatch):
+    client = FakeOpenAI(first_token_delay=0.0, token_delay=0.0)
+    monkeypatch.setattr(assistant_core, 'AI_PROVIDER', "openai")
+    monkeypatch.setattr(assistant_core, 'OPENAI_CLIENT', client)
+    monkeypatch.setattr(assistant_core, 'USE_RESPONSE_CACHE', True)
+    monkeypatch.setattr(assistant_core, 'USE_CONVERSATION_MEMORY', True)
+    monkeypatch.setattr(assistant_core, 'CONVERSATION', None)
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(assistant_core, 'RESPONSE_CACHE', cache)
+    assistant_core.get_ai_response("what is the capital of France")  # No history: cached
+    assert client.calls == 1
+    yield client
+    cache.close()
+
+
+@pytest.mark.parametrize("prompt", ["and what is its population", "why is that", "tell me more about it"])
+def test_follow_ups_are_detected(prompt):
+    assert is_follow_up(prompt)
+    assert not is_follow_up("what is the capital of France")
+
+
+def test_self_contained_question_with_history_uses_the_cache(cached_session):
+    assistant_core.get_ai_response("what is the capital of France")  # With history, still a hit
+    assert cached_session.calls == 1
+
+    assistant_core.get_ai_response("and what is its population")  # Follow-up: depends on the history
+    assistant_core.get_ai_response("and what is its population")
+    assert cached_session.calls == 3
+
+
+def test_cache_with_history_off_bypasses_the_cache_mid_conversation(cached_session, monkeypatch):
+    monkeypatch.setattr(assistant_core, 'CACHE_WITH_HISTORY', False)
+    assistant_core.get_ai_response("what is the capital of France")
+    assert cached_session.calls == 2
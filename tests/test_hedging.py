@@ -0,0 +1,97 @@
+"""Hedger: racing fake providers - the winner, the cancelled loser and error fallback"""
+import threading
+import time
+
+import pytest
+
+import assistant_core
+from fake_providers import DEFAULT_REPLY, FakeGemini, FakeOpenAI
+from hedging import HedgeError, Hedger
+
+
+def candidate(name, client, finished=None):
+    """(name, fn) streaming from a fake client; finished is set once its stream was closed"""
+    def fn(cancel):
+        def chunks():
+            try:
+                for token in client.stream("what is the capital of France"):
+                    if cancel.is_set():
+                        return
+                    yield token
+            finally:
+                if finished is not None:
+                    finished.set()
+        return chunks()
+    return name, fn
+
+
+def collect(name, fn):
+    return name, lambda cancel: "".join(fn(cancel)).strip()
+
+
+def test_fast_backup_wins_and_slow_primary_is_cancelled():
+    primary = FakeOpenAI(first_token_delay=0.5, token_delay=0.0)
+    backup = FakeGemini(first_token_delay=0.0, token_delay=0.0)
+    primary_closed = threading.Event()
+    hedger = Hedger(delay=0.05)
+
+    name, answer = hedger.call([collect(*candidate("ChatGPT", primary, primary_closed)),
+                                collect(*candidate("Gemini", backup))])
+
+    assert (name, answer) == ("Gemini", DEFAULT_REPLY)
+    assert primary_closed.wait(2.0)
+    stats = hedger.stats_dict()
+    assert stats["Gemini"]["wins"] == 1
+    assert stats["ChatGPT"]["cancelled"] == 1 and stats["ChatGPT"]["wins"] == 0
+
+
+def test_fast_primary_wins_without_starting_the_backup():
+    primary = FakeOpenAI(first_token_delay=0.0, token_delay=0.0)
+    backup = FakeGemini(first_token_delay=0.0, token_delay=0.0)
+    hedger = Hedger(delay=1.0)
+
+    chunks = list(hedger.stream([candidate("ChatGPT", primary), candidate("Gemini", backup)]))
+
+    assert "".join(chunks) == DEFAULT_REPLY
+    assert backup.calls == 0
+    assert hedger.stats_dict()["ChatGPT"]["win_rate"] == 1.0
+
+
+def test_failed_primary_starts_the_backup_at_once():
+    primary = FakeOpenAI(first_token_delay=0.0, failure_rate=1.0)
+    backup = FakeGemini(first_token_delay=0.0, token_delay=0.0)
+    hedger = Hedger(delay=10.0)
+
+    start = time.perf_counter()
+    name, answer = hedger.call([collect(*candidate("ChatGPT", primary)), collect(*candidate("Gemini", backup))])
+
+    assert (name, answer) == ("Gemini", DEFAULT_REPLY)
+    assert time.perf_counter() - start < 1.0  # Did not wait out the hedge delay
+    assert hedger.stats_dict()["ChatGPT"]["failures"] == 1
+
+
+def test_every_provider_failing_raises():
+    hedger = Hedger(delay=0.01)
+    candidates = [collect(*candidate(name, FakeOpenAI(first_token_delay=0.0, failure_rate=1.0)))
+                  for name in ("ChatGPT", "Gemini")]
+
+    with pytest.raises(HedgeError):
+        hedger.call(candidates)
+
+
+def test_losing_provider_request_is_aborted_before_its_first_chunk(monkeypatch):
+    primary = FakeOpenAI(first_token_delay=3.0, token_delay=0.0)
+    backup = FakeGemini(first_token_delay=0.0, token_delay=0.0)
+    monkeypatch.setattr(assistant_core, 'OPENAI_CLIENT', primary)
+    monkeypatch.setattr(assistant_core, 'GEMINI_CLIENT', backup)
+    monkeypatch.setattr(assistant_core, 'USE_CONVERSATION_MEMORY', False)
+    candidates = assistant_core._hedge_candidates("what is the capital of France",
+                                                  assistant_core.get_router().tiers['fast'])
+
+    chunks = list(Hedger(delay=0.05).stream(candidates))
+
+    assert "".join(chunks) == DEFAULT_REPLY
+    deadline = time.monotonic() + 1.0  # Well before its 3 s first chunk
+    while not primary.aborted and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert primary.aborted == 1 and primary.tokens_sent == 0
@@ -0,0 +1,74 @@
+"""IntentEngine: keyword candidates, priority order, slots, and the assistant's local routing table"""
+import pytest
+
+import assistant_core
+from intents import IntentEngine, tokenize
+
+
+@pytest.fixture
+def engine():
+    engine = IntentEngine()
+    engine.register("timer", lambda m: f"timer {m.slots.get('minutes')}", keywords=["timer"],
+                    patterns=[r"timer for (?P<minutes>\d+) minutes?"], priority=10)
+    engine.register("weather", lambda m: "sunny", keywords=["weather", "forecast"])
+    engine.register("music", lambda m: None, keywords=["play"])  # Declines: falls through
+    engine.register("play any", lambda m: "playing", keywords=["play"])
+    engine.register("greeting", lambda m: "hello", patterns=[r"^(?:hi|hello)\b"])
+    return engine.compile()
+
+
+def test_multi_word_keywords_match_whole_tokens():
+    engine = IntentEngine()
+    engine.register("date", lambda m: "today", keywords=["what date"])
+    assert tokenize("What date, is it?") == ["what", "date", ",", "is", "it", "?"]
+    assert engine.respond("so what date is it") == "today"
+    assert engine.respond("whatever date") is None
+    assert engine.respond("date what") is None
+
+
+def test_slots_come_from_named_groups(engine):
+    match, response = engine.dispatch("Set a TIMER for 5 minutes")
+    assert (match.name, match.slots, response) == ("timer", {'minutes': "5"}, "timer 5")
+
+
+def test_keyword_without_matching_pattern_is_skipped(engine):
+    assert engine.dispatch("the timer is broken") == (None, None)
+
+
+def test_candidates_are_tried_by_priority_then_registration_order(engine):
+    assert [i.name for i in engine.candidates("weather timer play")] == [
+        "timer", "weather", "music", "play any", "greeting"]
+    assert engine.respond("play the weather forecast") == "sunny"
+    assert engine.dispatch("play something")[0].name == "play any"  # music declined
+
+
+def test_pattern_only_intents_are_always_candidates(engine):
+    assert engine.respond("hello there") == "hello"
+    assert engine.respond("say hello") is None
+
+
+def test_registering_after_compile_recompiles(engine):
+    engine.register("news", lambda m: "headlines", keywords=["news"])
+    assert engine.respond("any news") == "headlines"
+
+
+@pytest.mark.parametrize("command, intent", [
+    ("what is 25 times 47", "math"),
+    ("convert 100 fahrenheit to celsius", "math"),
+    ("what time is it", "time"),
+    ("what's the current time", "time"),
+    ("what date is it today", "date"),
+    ("tell me about the history of rome", None),
+    ("explain time zones", None),  # "time" keyword, but not asking for the clock
+])
+def test_local_routing_table(command, intent):
+    match, response = assistant_core.LOCAL_INTENTS.dispatch(command)
+    assert (match.name if match else None) == intent
+    assert bool(response) == (intent is not None)
+
+
+def test_fallback_intents_answer_only_when_the_ai_is_down():
+    assert assistant_core.LOCAL_INTENTS.respond("tell me a joke") is None
+    assert assistant_core.FALLBACK_INTENTS.respond("tell me a joke")
+    assert assistant_core.FALLBACK_INTENTS.respond("help") == assistant_core.HELP_REPLY
+    assert assistant_core._fallback_response("what is love") == assistant_core.NO_AI_REPLY
@@ -0,0 +1,45 @@
+"""local_math: the spoken-math corpus, huge results and overflow"""
+import time
+
+import pytest
+
+import local_math
+from corpora import MATH_CORPUS
+
+
+@pytest.mark.parametrize("query, expected", MATH_CORPUS)
+def test_corpus(query, expected):
+    assert local_math.solve(query) == expected
+
+
+@pytest.mark.parametrize("query", ["2 to the power of 1000", "9 to the power of 999", "99999 to the power of 1000"])
+def test_huge_integers_are_spoken_in_scientific_words(query):
+    answer = local_math.solve(query)
+    assert " equals about " in answer and " times 10 to the power of " in answer
+    assert max(len(word) for word in answer.split()) <= local_math.MAX_SPOKEN_DIGITS
+
+
+@pytest.mark.parametrize("query", ["2.5 to the power of 1000", "9 to the power of 999 times 1.5",
+                                   "square root of 9 to the power of 999"])
+def test_float_overflow_is_refused_not_left_to_the_ai(query):
+    assert local_math.solve(query) == "That number is too large for me to calculate"
+
+
+@pytest.mark.parametrize("query", ["(9 to the power of 999) to the power of 999",
+                                   "((9 to the power of 999) to the power of 999) to the power of 999"])
+def test_nested_powers_are_refused_before_computing(query):
+    start = time.perf_counter()
+    assert local_math.solve(query) == "That number is too large for me to calculate"
+    assert time.perf_counter() - start < 1.0
+
+
+def test_longest_spoken_integer():
+    assert local_math.format_number(10 ** local_math.MAX_SPOKEN_DIGITS - 1) == "9" * local_math.MAX_SPOKEN_DIGITS
+    assert local_math.format_number(10 ** local_math.MAX_SPOKEN_DIGITS) == "1 times 10 to the power of 15"
+    assert local_math.format_number(-(10 ** 20) * 3 - 1) == "about -3 times 10 to the power of 20"
+
+
+@pytest.mark.parametrize("query", ["0 to the power of negative 1", "zero to the power of minus 2.5",
+                                   "(2 minus 2) to the power of negative 3"])
+def test_zero_to_a_negative_power_is_a_division_by_zero(query):
+    assert local_math.solve(query) == "I cannot divide by zero"
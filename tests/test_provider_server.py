@@ -0,0 +1,57 @@
+"""Stand-in provider server through the official SDKs: token budgets and the warm-up model lookups"""
+import pytest
+
+import assistant_core
+import warmup
+from provider_server import PROFILES, ProviderServer
+
+openai = pytest.importorskip("openai")
+genai = pytest.importorskip("google.genai")
+
+MESSAGES = [{"role": "user", "content": "what is the capital of France"}]
+
+
+@pytest.fixture(scope="module")
+def server():
+    with ProviderServer(PROFILES['instant']) as server:
+        yield server
+
+
+def test_openai_replies_stop_at_max_tokens(server):
+    client = openai.OpenAI(api_key="test", base_url=server.openai_base_url)
+    reply = client.chat.completions.create(model="gpt-3.5-turbo", messages=MESSAGES, max_tokens=5)
+    assert reply.choices[0].message.content == "Paris is the capital of"
+    assert reply.choices[0].finish_reason == "length"
+
+    chunks = list(client.chat.completions.create(model="gpt-3.5-turbo", messages=MESSAGES,
+                                                 max_tokens=5, stream=True))
+    assert "".join(c.choices[0].delta.content or "" for c in chunks) == "Paris is the capital of"
+    assert chunks[-1].choices[0].finish_reason == "length"
+
+    full = client.chat.completions.create(model="gpt-3.5-turbo", messages=MESSAGES)
+    assert full.choices[0].finish_reason == "stop" and len(full.choices[0].message.content.split()) > 5
+
+
+def test_gemini_replies_stop_at_max_output_tokens(server):
+    from google.genai import types
+    client = genai.Client(api_key="test", http_options=types.HttpOptions(base_url=server.gemini_base_url))
+    config = {'max_output_tokens': 5}
+    reply = client.models.generate_content(model="gemini-2.0-flash", contents="hi", config=config)
+    assert reply.text == "Paris is the capital of"
+    assert reply.candidates[0].finish_reason == types.FinishReason.MAX_TOKENS
+    streamed = client.models.generate_content_stream(model="gemini-2.0-flash", contents="hi", config=config)
+    assert "".join(chunk.text for chunk in streamed) == "Paris is the capital of"
+
+
+def test_warmup_model_lookups_succeed(server, monkeypatch):
+    from google.genai import types
+    openai_client = openai.OpenAI(api_key="test", base_url=server.openai_base_url)
+    gemini_client = genai.Client(api_key="test", http_options=types.HttpOptions(base_url=server.gemini_base_url))
+    monkeypatch.setattr(assistant_core, 'OPENAI_CLIENT', openai_client)
+    monkeypatch.setattr(assistant_core, 'GEMINI_CLIENT', gemini_client)
+    assert assistant_core.OPENAI_CLIENT.models.retrieve("gpt-3.5-turbo").id == "gpt-3.5-turbo"
+    assert assistant_core.GEMINI_CLIENT.models.get(model="gemini-2.0-flash").name == "models/gemini-2.0-flash"
+
+    done = warmup.Warmup({'openai': warmup._warm_openai, 'gemini': warmup._warm_gemini}).start()
+    assert done.wait(10)
+    assert done.status == {'openai': 'ready', 'gemini': 'ready'}
@@ -0,0 +1,97 @@
+"""provision_users: import/export round trip and per-line rejection of bad rows"""
+import json
+
+import pytest
+
+import auth
+import provision_users
+from user_store import UserStore
+
+PARAMS = ("scrypt", 16)  # Cheap enough for tests, still a real salted hash
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = UserStore(str(tmp_path / "users.db"))
+    yield store
+    store.close()
+
+
+def write_jsonl(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write((row if isinstance(row, str) else json.dumps(row)) + "\n")
+    return str(path)
+
+
+def run_import(store, path):
+    errors = []
+    stats = provision_users.import_users(store, provision_users.read_users(path), params=PARAMS, workers=1,
+                                         on_error=lambda *row: errors.append(row))
+    return stats, errors
+
+
+def test_export_reimports_to_the_same_logins(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(auth, '_params', PARAMS)
+    source = write_jsonl(tmp_path / "new.jsonl", [{"email": f"user{i}@example.com", "password": f"password{i}"}
+                                                  for i in range(5)])
+    assert run_import(store, source)[0]['imported'] == 5
+
+    exported = str(tmp_path / "export.jsonl")
+    assert provision_users.export_users(store, exported, include_hashes=True) == 5
+    copy = UserStore(str(tmp_path / "copy.db"))
+    try:
+        stats, errors = run_import(copy, exported)
+        assert (stats['imported'], errors) == (5, [])
+        assert [row[:2] for row in copy.iter_users()] == [row[:2] for row in store.iter_users()]
+        assert auth.authenticate(copy, "user3@example.com", "password3") == (True, auth.LOGIN_SUCCESS)
+    finally:
+        copy.close()
+
+
+def test_bad_rows_are_reported_and_the_rest_imported(store, tmp_path):
+    path = write_jsonl(tmp_path / "mixed.jsonl", [
+        {"email": "good1@example.com", "password": "password1"},
+        {"email": 5, "password": "password2"},
+        {"email": "list@example.com", "password": ["password3"]},
+        {"email": "fake@example.com", "password_hash": "not-a-hash"},
+        {"email": "huge@example.com", "password_hash": "scrypt$1099511627776$00$00"},
+        {"email": "short@example.com", "password": "123"},
+        {"email": "no-at-sign.example.com", "password": "password7"},
+        "{not json",
+        ["not", "an", "object"],
+        {"email": "legacy@example.com", "password_hash": auth.legacy_hash("password10")},
+        {"email": "good1@example.com", "password": "password11"},
+    ])
+
+    stats, errors = run_import(store, path)
+
+    assert (stats['rows'], stats['imported'], stats['rejected']) == (11, 2, 9)
+    assert [line for line, _email, _error in errors] == [2, 3, 4, 5, 6, 7, 8, 9, 11]
+    by_line = {line: (email, error) for line, email, error in errors}
+    assert by_line[2] == ("5", "email, password and password_hash must be strings")
+    assert by_line[4][1] == by_line[5][1] == "malformed password_hash"
+    assert by_line[11][1] == "already exists"
+    assert store.count_users() == 2
+
+
+def test_export_leaves_out_password_hashes_by_default(store, tmp_path):
+    store.insert_users([("user@example.com", auth.hash_password("password1", PARAMS))])
+    exported = tmp_path / "export.csv"
+    assert provision_users.export_users(store, str(exported)) == 1
+    assert exported.read_text(encoding="utf-8").splitlines()[0] == "email,created_at,last_login"
+    assert "scrypt$" not in exported.read_text(encoding="utf-8")
+
+
+def test_malformed_csv_line_is_rejected_and_the_rest_imported(store, tmp_path):
+    path = tmp_path / "users.csv"
+    path.write_text("email,password\n"
+                    "good1@example.com,password1\n"
+                    f"huge@example.com,{'x' * 200000}\n"  # Beyond csv.field_size_limit()
+                    "good2@example.com,password2\n", encoding="utf-8")
+
+    stats, errors = run_import(store, str(path))
+
+    assert (stats['imported'], stats['rejected']) == (2, 1)
+    assert errors[0][0] == 3 and errors[0][2].startswith("invalid CSV")
+    assert store.count_users() == 2
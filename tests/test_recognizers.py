@@ -0,0 +1,36 @@
+"""recognizers: word error rate alignment and backend selection"""
+import pytest
+
+import recognizers
+import speech
+
+
+@pytest.mark.parametrize("reference, hypothesis, expected", [
+    ("what time is it", "what time is it", (0, 4)),
+    ("what time is it", "what time is it now", (1, 4)),  # Insertion
+    ("what time is it", "what is it", (1, 4)),  # Deletion
+    ("what time is it", "what tame is it", (1, 4)),  # Substitution
+    ("turn on the lights", "turn the light off", (3, 4)),  # Deletion, substitution and insertion
+    ("What time is it?", "what TIME is it", (0, 4)),  # Case and punctuation are ignored
+])
+def test_word_errors(reference, hypothesis, expected):
+    assert recognizers.word_errors(reference, hypothesis) == expected
+
+
+def test_word_error_rate():
+    assert recognizers.word_error_rate("what time is it", "what is it") == 0.25
+    assert recognizers.word_error_rate("one two", "three four five") == 1.5  # Insertions count too
+
+
+def test_word_error_rate_of_an_empty_reference():
+    assert recognizers.word_error_rate("", "") == 0.0
+    assert recognizers.word_error_rate("", "something was heard") == 1.0
+
+
+def test_unknown_backend_is_rejected(monkeypatch):
+    with pytest.raises(ValueError, match="Unknown speech recognizer 'whisper'"):
+        recognizers.create_recognizer("whisper")
+    monkeypatch.setattr(speech, 'STT_BACKEND', 'whisper')
+    monkeypatch.setattr(speech, '_recognizer', None)
+    with pytest.raises(ValueError):
+        speech.get_recognizer()
@@ -0,0 +1,38 @@
+"""ReplayHarness: a 2-file run through the real assistant loop, reports, and restoring the real backends"""
+import assistant_core
+import recognizers
+import replay
+import speech
+from fake_providers import synthetic_utterance
+
+
+def test_two_recordings_are_answered_and_the_fakes_removed(tmp_path):
+    recordings = []
+    for i, text in enumerate(["what is the capital of France", "tell me about the moon"]):
+        pcm, _start, _end = synthetic_utterance(seed=400 + i, words=2, lead_silence=0.2, trail_silence=0.8)
+        recordings.append((f"command_{i}.wav", pcm, 16000, text))
+    replay.write_recordings(str(tmp_path / "wavs"), recordings)
+    loaded = replay.load_recordings(str(tmp_path / "wavs"))
+    assert [(name, text) for name, _pcm, _rate, text in loaded] == [(name, text) for name, _pcm, _rate, text in recordings]
+    before = (assistant_core.AI_PROVIDER, assistant_core.OPENAI_CLIENT, assistant_core.USE_RESPONSE_CACHE,
+              assistant_core.STREAM_RESPONSES, assistant_core.ENABLE_BARGE_IN, speech.STT_BACKEND, speech._worker)
+
+    harness = replay.ReplayHarness(loaded, recognize_delay=0.01, first_token_delay=0.01, token_delay=0.0,
+                                   speak_delay=0.01, trace_file=str(tmp_path / "trace.jsonl"))
+    report = harness.run()
+
+    assert report['answered'] == 2  # Plus the listen the stop request cut short
+    assert {'listen', 'e2e_first_audio', 'e2e_reply'} <= set(report['stages'])
+    assert (assistant_core.AI_PROVIDER, assistant_core.OPENAI_CLIENT, assistant_core.USE_RESPONSE_CACHE,
+            assistant_core.STREAM_RESPONSES, assistant_core.ENABLE_BARGE_IN, speech.STT_BACKEND,
+            speech._worker) == before
+    assert 'replay' not in recognizers.BACKENDS
+
+
+def test_a_slower_stage_is_flagged_against_the_baseline():
+    baseline = {'stages': {'ai': {'p50_ms': 100.0, 'p95_ms': 200.0, 'p99_ms': 300.0},
+                           'listen': {'p50_ms': 2.0, 'p95_ms': 3.0, 'p99_ms': 4.0}}}
+    current = {'stages': {'ai': {'p50_ms': 100.0, 'p95_ms': 260.0, 'p99_ms': 310.0},
+                          'listen': {'p50_ms': 4.0, 'p95_ms': 6.0, 'p99_ms': 8.0}}}
+    regressed = [(stage, percentile) for stage, percentile, *_ms, flag in replay.compare_reports(baseline, current) if flag]
+    assert regressed == [('ai', 'p95')]  # listen doubled, but by less than min_delta_ms
@@ -0,0 +1,85 @@
+"""ResponseCache: freshness rules, TTL expiry in both tiers, keys and the size bound"""
+import pytest
+
+import response_cache
+from response_cache import DEFAULT_TTL, ResponseCache, ttl_for
+
+KEY = ("openai", "gpt-3.5-turbo", "You are a helpful voice assistant.")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, 'time', clock.time)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), default_ttl=60)
+    yield cache
+    cache.close()
+
+
+@pytest.mark.parametrize("prompt", [
+    "what time is it", "what's the weather like", "any news today", "what's the latest iPhone",
+    "who won the game last week", "tell me a joke", "what is the bitcoin price",
+])
+def test_time_sensitive_prompts_are_never_cached(prompt, cache):
+    assert ttl_for(prompt) == 0
+    assert not cache.put(prompt, *KEY, "an answer that will be stale soon")
+    assert cache.get(prompt, *KEY) is None
+
+
+@pytest.mark.parametrize("prompt", ["what is the capital of France", "how far away is the moon"])
+def test_stable_prompts_get_the_default_ttl(prompt):
+    assert ttl_for(prompt) == DEFAULT_TTL
+
+
+def test_normalized_prompts_share_an_entry(cache):
+    cache.put("What is the capital of France?", *KEY, "Paris.")
+    assert cache.get("hey what is the capital of france please", *KEY) == "Paris."
+    assert cache.get("What is the capital of France?", "gemini", *KEY[1:]) is None
+    assert cache.get("What is the capital of France?", KEY[0], "gpt-4o", KEY[2]) is None
+    assert cache.get("What is the capital of France?", *KEY[:2], "Answer in French.") is None
+
+
+def test_entries_expire_in_memory_and_on_disk(cache, clock, tmp_path):
+    cache.put("what is the capital of France", *KEY, "Paris.")
+    clock.now += 59
+    assert cache.get("what is the capital of France", *KEY) == "Paris."
+    assert cache.stats['memory_hits'] == 1
+
+    reopened = ResponseCache(str(tmp_path / "cache.db"), default_ttl=60)
+    try:
+        assert reopened.get("what is the capital of France", *KEY) == "Paris."
+        assert reopened.stats['disk_hits'] == 1
+        clock.now += 2
+        assert reopened.get("what is the capital of France", *KEY) is None
+        assert reopened.stats['expired'] == 1
+    finally:
+        reopened.close()
+
+    assert cache.get("what is the capital of France", *KEY) is None  # Memory tier expired too
+
+
+def test_least_recently_used_rows_are_evicted_over_the_size_bound(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_db_bytes=250)
+    try:
+        for i in range(3):
+            clock.now += 1
+            cache.put(f"question number {i}", *KEY, "x" * 100)
+        assert cache.stats['evictions'] == 1
+        cache._memory.clear()  # Force disk lookups
+        assert cache.get("question number 0", *KEY) is None
+        assert cache.get("question number 2", *KEY) == "x" * 100
+    finally:
+        cache.close()
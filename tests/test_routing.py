@@ -0,0 +1,38 @@
+"""QueryRouter: tier choice and separate reply / first-sentence latency per tier"""
+from routing import QueryRouter, Tier
+
+
+def make_router():
+    return QueryRouter({'fast': Tier('fast', "gpt-3.5-turbo", "gemini-2.0-flash-exp", 150),
+                        'capable': Tier('capable', "gpt-4o", "gemini-1.5-pro", 400)})
+
+
+def test_simple_and_complex_prompts_go_to_their_tiers():
+    router = make_router()
+    assert router.route("what is the capital of France").tier.name == 'fast'
+    decision = router.route("compare the economic causes of the first and second world wars and explain why")
+    assert decision.tier.name == 'capable' and decision.score >= router.threshold
+
+
+def test_contracted_openers_route_like_spelled_out_ones():
+    router = make_router()
+    assert router.route("what's the capital of France").tier.name == 'fast'
+    # Long and multi-clause: only the simple-question opener keeps it on the fast tier
+    question = "{} the name of the tallest mountain in europe, asia, africa and south america"
+    contracted, spelled = router.route(question.format("what's")), router.route(question.format("what is"))
+    assert contracted.reasons == spelled.reasons and 'simple_question' in contracted.reasons
+    assert contracted.tier.name == spelled.tier.name == 'fast'
+
+
+def test_reply_and_first_sentence_latencies_are_kept_apart():
+    router = make_router()
+    router.route("what is the capital of France")
+    router.record('fast', 2.0)
+    router.record('fast', 0.2, 'first_sentence')
+    router.record('fast', 0.3, 'first_sentence')
+
+    fast = router.stats()['fast']
+    assert fast['routed'] == 1
+    assert fast['reply']['count'] == 1 and fast['reply']['max_ms'] == 2000.0
+    assert fast['first_sentence']['count'] == 2 and fast['first_sentence']['max_ms'] == 300.0
+    assert router.stats()['capable']['reply'] == {'count': 0}
@@ -0,0 +1,130 @@
+"""
+speech.py: the TTS worker (the one thread that owns the per-driver, shared
+pyttsx3 engine) and listen() over an injected recognizer
+"""
+import os
+import sys
+import tempfile
+import threading
+
+import pytest
+
+import recognizers
+import speech
+from audio_capture import CaptureSession, PCMSource
+from fake_providers import FakeAudioPlayer, FakePyttsx3, FakeRecognizer, FakeTTSEngine, synthetic_utterance
+
+
+@pytest.fixture
+def pyttsx3(monkeypatch):
+    fake = FakePyttsx3(word_delay=0.01)
+    monkeypatch.setitem(sys.modules, 'pyttsx3', fake)
+    return fake
+
+
+@pytest.fixture
+def worker(pyttsx3, tmp_path, monkeypatch):
+    monkeypatch.setattr(speech, 'AUDIO_CACHE_DIR', str(tmp_path / "tts_cache"))
+    monkeypatch.setattr(speech, 'AUDIO_CACHE_MIN_REPEATS', 1)
+    monkeypatch.setattr(speech, '_audio_cache', None)
+    monkeypatch.setattr(speech, '_worker', None)
+    worker = speech.init_engine()
+    worker.player = FakeAudioPlayer(speed=0.01)
+    worker.wait_ready()
+    yield worker
+    worker.shutdown(5.0)
+
+
+def test_renders_and_speech_share_one_engine_thread(pyttsx3, worker):
+    utterance = speech.speak("this reply keeps the shared engine busy for a little while", block=False)
+    wavs = []
+    renderers = [threading.Thread(target=lambda: wavs.append(speech.render_wav("rendered for the server")))
+                 for _ in range(3)]
+    for thread in renderers:
+        thread.start()
+    jobs = speech.prerender(["Hello there!", "Goodbye!"])
+    for thread in renderers:
+        thread.join(10)
+
+    assert utterance.wait(10) and utterance.spoken
+    assert len(wavs) == 3 and all(wav and wav.startswith(b"RIFF") for wav in wavs)
+    assert jobs and all(job.result(10) for job in jobs)
+    assert list(pyttsx3.engines) == [speech.default_driver()]
+    assert pyttsx3.engines[speech.default_driver()].run_threads == {worker._thread.ident}
+
+
+def test_spoken_phrase_is_cached_and_then_played_from_disk(worker):
+    speech.speak("See you soon!")
+    speech.speak("Something else")  # Queued behind the cache fill
+    assert worker.audio_cache.stats()['entries'] == 1
+    speech.speak("See you soon!")
+    assert worker.player.played[-1] == worker.audio_cache.get("See you soon!", worker.voice_settings())
+
+
+def test_render_timeout_leaves_no_file_behind(worker, tmp_path, monkeypatch):
+    scratch = tmp_path / "scratch"
+    scratch.mkdir()
+    monkeypatch.setattr(tempfile, 'tempdir', str(scratch))
+    utterance = speech.speak("a long reply that is still being spoken when the render times out", block=False)
+    assert speech.render_wav("too late", timeout=0.01) is None
+    assert utterance.wait(10)
+    assert speech.render_wav("in time", timeout=10)
+    assert os.listdir(scratch) == []
+
+
+def test_reply_stream_is_rendered_ahead_across_sentences(worker):
+    sentences = ["First sentence of the reply.", "Second one.", "And the third."]
+    utterance = speech.speak_stream(iter(sentences))
+    assert utterance.spoken
+    assert len(worker.player.played) == len(sentences)
+
+
+def test_playback_failure_falls_back_to_the_engine(pyttsx3, worker):
+    def broken_player(audio, interrupted=None):
+        raise OSError("output device went away")
+    worker.player = broken_player
+    sentences = ["First sentence of the reply.", "Second one."]
+    assert speech.speak_stream(iter(sentences)).spoken
+    assert pyttsx3.engines[speech.default_driver()].spoken == sentences
+
+
+def test_chunked_speech_rebuilds_a_failed_engine():
+    engines = []
+
+    def factory():
+        engines.append(FakeTTSEngine(init_delay=0))
+        engines[0].broken = True  # The first engine dies; its replacement works
+        return engines[-1]
+    worker = speech.TTSWorker(engine_factory=factory, player=FakeAudioPlayer(speed=0.01), chunked=True,
+                              chunk_chars=20)
+    try:
+        text = "The first chunk of a reply. The second chunk of it. And then a third one."
+        assert worker.submit(text).wait(10)
+        assert len(engines) == 2
+        assert len(worker.player.played) == len(speech.split_chunks(text, 20))
+    finally:
+        worker.shutdown(5.0)
+
+
+def test_worker_survives_a_failing_utterance(worker):
+    def broken_get(text, settings):
+        raise OSError("cache disk went away")
+    worker.audio_cache.get = broken_get
+    failed = speech.speak("Hello there!")
+    assert failed.done() and not failed.spoken
+    del worker.audio_cache.get
+    assert worker.is_alive() and speech.speak("Still here.").spoken
+
+
+def test_listen_with_an_injected_recognizer_needs_no_speech_recognition(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'speech_recognition', None)  # Any import of it fails
+    recognizer = FakeRecognizer("what time is it", delay=0.0)
+    monkeypatch.setitem(recognizers.BACKENDS, 'fake', lambda: recognizer)
+    monkeypatch.setattr(speech, 'STT_BACKEND', 'fake')
+    monkeypatch.setattr(speech, '_recognizer', None)
+    pcm, _start, _end = synthetic_utterance(seed=1, words=4, lead_silence=0.3, trail_silence=1.0)
+    session = CaptureSession(PCMSource(pcm), backlog_seconds=None).start()
+    try:
+        assert speech.listen(session, start_position=1, timeout=5) == "what time is it"
+    finally:
+        session.stop()
@@ -0,0 +1,101 @@
+"""Streamed replies: sentence splitting and the first sentence arriving long before the full reply"""
+import time
+
+import pytest
+
+import assistant_core
+from cancellation import CancelledError, CancelToken
+from fake_providers import DEFAULT_REPLY, FakeOpenAI
+from streaming import SentenceSplitter, iter_sentences, split_chunks, split_sentences
+
+
+def test_sentences_complete_as_tokens_arrive():
+    splitter = SentenceSplitter()
+    assert splitter.feed("Paris is the capital") == []
+    assert splitter.feed(" of France. It sits") == ["Paris is the capital of France."]
+    assert splitter.flush() == ["It sits"]
+
+
+def test_abbreviations_and_short_sentences_do_not_end_a_sentence():
+    text = "Dr. Smith lives on Baker St. in London. Yes. He is a doctor there."
+    assert split_sentences(text) == ["Dr. Smith lives on Baker St. in London.", "Yes. He is a doctor there."]
+
+
+def test_long_sentences_are_cut_at_clauses_not_words():
+    sentence = "The river runs through the city, past the old cathedral, under eleven bridges, and out to sea."
+    chunks = split_chunks(sentence, max_chars=40)
+    assert " ".join(chunks) == sentence
+    assert all(len(chunk) <= 40 for chunk in chunks)
+
+
+def test_token_stream_yields_the_same_sentences_as_the_whole_text():
+    tokens = [word + " " for word in DEFAULT_REPLY.split(" ")]
+    assert list(iter_sentences(tokens)) == split_sentences(DEFAULT_REPLY)
+
+
+def test_first_sentence_arrives_well_before_the_full_reply(monkeypatch):
+    monkeypatch.setattr(assistant_core, 'AI_PROVIDER', "openai")
+    monkeypatch.setattr(assistant_core, 'OPENAI_CLIENT', FakeOpenAI(first_token_delay=0.05, token_delay=0.02))
+    monkeypatch.setattr(assistant_core, 'USE_RESPONSE_CACHE', False)
+    monkeypatch.setattr(assistant_core, 'USE_CONVERSATION_MEMORY', False)
+
+    start = time.perf_counter()
+    assistant_core.get_ai_response("tell me about Paris")
+    full_reply = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stream = assistant_core.get_ai_response_stream("tell me about Paris")
+    first = next(stream)
+    first_sentence = time.perf_counter() - start
+    rest = list(stream)
+
+    assert [first] + rest == split_sentences(DEFAULT_REPLY)
+    assert first_sentence < full_reply / 2
+
+
+def test_abandoned_reply_aborts_the_request_and_is_not_kept(tmp_path, monkeypatch):
+    from response_cache import ResponseCache
+    client = FakeOpenAI(first_token_delay=0.0, token_delay=0.02)
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(assistant_core, 'AI_PROVIDER', "openai")
+    monkeypatch.setattr(assistant_core, 'OPENAI_CLIENT', client)
+    monkeypatch.setattr(assistant_core, 'USE_RESPONSE_CACHE', True)
+    monkeypatch.setattr(assistant_core, 'RESPONSE_CACHE', cache)
+    monkeypatch.setattr(assistant_core, 'USE_CONVERSATION_MEMORY', True)
+    monkeypatch.setattr(assistant_core, 'CONVERSATION', None)
+    try:
+        sentences = assistant_core.process_command_stream("tell me about Paris", CancelToken())
+        assert next(sentences) == split_sentences(DEFAULT_REPLY)[0]
+        sentences.close()  # Barge-in: the rest of the reply is dropped
+        time.sleep(0.2)
+        sent = client.tokens_sent
+        time.sleep(0.3)
+
+        assert client.tokens_sent == sent < len(DEFAULT_REPLY.split(" "))
+        assert cache.get("tell me about Paris", *assistant_core._cache_key_parts(assistant_core.get_router().tiers['fast']),
+                         assistant_core.SYSTEM_PROMPT) is None
+        assert len(assistant_core.get_conversation()) == 0
+    finally:
+        cache.close()
+
+
+def test_stop_aborts_the_request_mid_sentence(monkeypatch):
+    client = FakeOpenAI(first_token_delay=0.0, token_delay=0.02)
+    monkeypatch.setattr(assistant_core, 'AI_PROVIDER', "openai")
+    monkeypatch.setattr(assistant_core, 'OPENAI_CLIENT', client)
+    monkeypatch.setattr(assistant_core, 'USE_RESPONSE_CACHE', False)
+    monkeypatch.setattr(assistant_core, 'USE_CONVERSATION_MEMORY', True)
+    monkeypatch.setattr(assistant_core, 'CONVERSATION', None)
+    cancel = CancelToken()
+    sentences = assistant_core.process_command_stream("tell me about Paris", cancel)
+
+    next(sentences)
+    cancel.cancel("stop requested")
+    with pytest.raises(CancelledError):
+        list(sentences)
+    time.sleep(0.2)
+    sent = client.tokens_sent
+    time.sleep(0.3)
+
+    assert client.tokens_sent == sent < len(DEFAULT_REPLY.split(" "))
+    assert len(assistant_core.get_conversation()) == 0
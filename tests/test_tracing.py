@@ -0,0 +1,97 @@
+"""tracing: spans inside turns, annotate on the innermost span, histograms, exporters and summaries"""
+import threading
+import time
+
+import pytest
+
+import tracing
+from tracing import LatencyHistogram, Tracer
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    tracer = Tracer()
+    monkeypatch.setattr(tracing, '_tracer', tracer)
+    return tracer
+
+
+def test_spans_are_no_ops_outside_a_turn(tracer):
+    with tracing.span("listen") as span:
+        tracing.annotate(provider="x")
+        tracing.mark("first_audio")
+    assert span is None
+    assert tracer.summary() == {}
+
+
+def test_nested_spans_and_annotations(tracer):
+    with tracing.turn("simple", session="s1") as turn:
+        with tracing.span("ai", streaming=True):
+            with tracing.span("route"):
+                tracing.annotate(intent="ai")
+            tracing.annotate(provider="ChatGPT")
+            tracing.mark("first_audio")
+            tracing.mark("first_audio")  # Only the first time counts
+        with tracing.span("speak"):
+            pass
+        with tracing.span("speak"):
+            pass
+
+    data = turn.as_dict()
+    spans = {s['name']: s for s in data['spans']}
+    assert [s['name'] for s in data['spans']] == ["route", "ai", "speak", "speak"]  # In finishing order
+    assert spans['route']['attrs'] == {'intent': "ai"}
+    assert spans['ai']['attrs'] == {'streaming': True, 'provider': "ChatGPT"}
+    assert spans['ai']['start_ms'] <= spans['route']['start_ms']
+    assert data['attrs'] == {'session': "s1", 'intent': "ai", 'provider': "ChatGPT"}
+    assert list(data['marks_ms']) == ["first_audio"]
+    assert set(turn.stage_totals()) == {"route", "ai", "speak"}
+
+    summary = tracer.summary()
+    assert summary['speak']['count'] == 1  # Both speak spans add up to one sample per turn
+    assert {'turn', 'ai', 'route', 'first_audio'} <= set(summary)
+
+
+def test_turns_are_separate_per_thread(tracer):
+    def run(name):
+        with tracing.turn(name):
+            with tracing.span(name):
+                time.sleep(0.01)
+
+    threads = [threading.Thread(target=run, args=(f"stage{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(s.name for t in tracer.recent for s in t.spans) == [f"stage{i}" for i in range(4)]
+    assert all(len(t.spans) == 1 and t.mode == t.spans[0].name for t in tracer.recent)
+
+
+def test_histogram_percentiles_within_bucket_precision():
+    histogram = LatencyHistogram()
+    for ms in range(1, 1001):
+        histogram.record(ms / 1000)
+    stats = histogram.as_dict()
+    assert stats['count'] == 1000 and stats['max_ms'] == 1000.0
+    assert stats['p50_ms'] == pytest.approx(500, rel=0.06)
+    assert stats['p95_ms'] == pytest.approx(950, rel=0.06)
+    assert stats['p99_ms'] == pytest.approx(990, rel=0.06)
+    assert LatencyHistogram().as_dict() == {'count': 0}
+
+
+@pytest.mark.parametrize("name", ["trace.jsonl", "trace.db"])
+def test_exported_turns_load_back_and_summarize(tmp_path, name):
+    path = str(tmp_path / name)
+    tracer = Tracer(tracing.make_exporter(path))
+    for provider in ("ChatGPT", "Gemini", "ChatGPT"):
+        with tracer.turn("simple"):
+            with tracing.span("ai"):
+                tracing.annotate(provider=provider)
+    tracer.close()
+
+    turns = tracing.load_turns(path)
+    assert [t['attrs']['provider'] for t in turns] == ["ChatGPT", "Gemini", "ChatGPT"]
+    assert all(t['spans'][0]['name'] == "ai" for t in turns)
+    assert tracing.summarize(turns)['ai']['count'] == 3
+    by_provider = tracing.summarize(turns, by="provider")
+    assert {key: stages['ai']['count'] for key, stages in by_provider.items()} == {"ChatGPT": 2, "Gemini": 1}
@@ -0,0 +1,166 @@
+"""UserStore: the connection pool, WAL setup, user_version migrations, bulk inserts and login result codes"""
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import user_store
+from user_store import ConnectionPool, UserStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = UserStore(str(tmp_path / "users.db"), pool_size=2)
+    yield store
+    store.close()
+
+
+def test_pool_reuses_connections_up_to_its_size(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=2)
+    try:
+        with pool.connection() as first:
+            pass
+        with pool.connection() as again:
+            assert again is first  # Idle connection handed out again, not reopened
+        with pool.connection() as a, pool.connection() as b:
+            assert a is not b
+        assert pool._opened == 2
+
+        waited = []
+
+        def borrow():
+            with pool.connection() as conn:
+                waited.append(conn)
+
+        with pool.connection(), pool.connection():
+            thread = threading.Thread(target=borrow)
+            thread.start()
+            time.sleep(0.1)
+            assert not waited  # A third caller waits for a connection to come back
+        thread.join(2)
+        assert len(waited) == 1 and pool._opened == 2
+    finally:
+        pool.close()
+
+
+def test_close_closes_checked_out_connections_when_they_come_back(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=2)
+    with pool.connection() as busy:
+        with pool.connection() as idle:
+            pass
+        pool.close()
+        with pytest.raises(sqlite3.ProgrammingError):
+            idle.execute("SELECT 1")
+        busy.execute("SELECT 1")  # Still usable by the caller that holds it
+    with pytest.raises(sqlite3.ProgrammingError):
+        busy.execute("SELECT 1")
+
+
+def test_closed_pool_opens_no_new_connections(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=1)
+    errors = []
+
+    def borrow():
+        try:
+            with pool.connection():
+                pass
+        except sqlite3.ProgrammingError as e:
+            errors.append(e)
+
+    with pool.connection():
+        waiters = [threading.Thread(target=borrow) for _ in range(2)]
+        for thread in waiters:
+            thread.start()
+        time.sleep(0.1)  # Both wait for the one connection
+        pool.close()
+    for thread in waiters:
+        thread.join(2)
+    assert len(errors) == 2  # Woken by the shutdown instead of waiting forever
+    with pytest.raises(sqlite3.ProgrammingError, match="closed"):
+        with pool.connection():
+            pass
+    assert pool._opened == 1
+
+
+def test_connections_use_wal_and_roll_back_failed_transactions(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=1)
+    try:
+        with pool.connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+            conn.execute("CREATE TABLE t (x)")
+        with pytest.raises(RuntimeError):
+            with pool.transaction() as conn:
+                conn.execute("INSERT INTO t VALUES (1)")
+                raise RuntimeError("boom")
+        with pool.connection() as conn:
+            assert not conn.in_transaction
+            assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    finally:
+        pool.close()
+
+
+def test_migrations_run_once_and_set_user_version(tmp_path, monkeypatch):
+    path = str(tmp_path / "users.db")
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        assert user_store.migrate(conn) == [1]
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == user_store.SCHEMA_VERSION
+        assert user_store.migrate(conn) == []  # Already up to date
+
+        monkeypatch.setattr(user_store, 'MIGRATIONS', user_store.MIGRATIONS + [
+            (2, "test column", ["ALTER TABLE users ADD COLUMN nickname TEXT"]),
+        ])
+        assert user_store.migrate(conn) == [2]
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 2
+        assert "nickname" in [row[1] for row in conn.execute("PRAGMA table_info(users)")]
+    finally:
+        conn.close()
+
+
+def test_failed_migration_leaves_the_version_unchanged(tmp_path, monkeypatch):
+    conn = sqlite3.connect(str(tmp_path / "users.db"), isolation_level=None)
+    try:
+        user_store.migrate(conn)
+        monkeypatch.setattr(user_store, 'MIGRATIONS', user_store.MIGRATIONS + [
+            (2, "broken", ["ALTER TABLE users ADD COLUMN nickname TEXT", "NOT SQL"]),
+        ])
+        with pytest.raises(sqlite3.OperationalError):
+            user_store.migrate(conn)
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+        assert "nickname" not in [row[1] for row in conn.execute("PRAGMA table_info(users)")]
+    finally:
+        conn.close()
+
+
+def test_insert_users_reports_duplicates_and_commits_the_rest(store):
+    store.create_user("a@b.com", "hash-a")
+    errors = store.insert_users([("c@d.com", "hash-c"), ("a@b.com", "hash-x"), ("e@f.com", "hash-e"),
+                                 ("c@d.com", "hash-y")])
+
+    assert errors == [(1, "already exists"), (3, "already exists")]
+    assert store.count_users() == 3
+    assert [row[:2] for row in store.iter_users(batch_size=1)] == [
+        ("a@b.com", "hash-a"), ("c@d.com", "hash-c"), ("e@f.com", "hash-e")]
+    assert not store.create_user("e@f.com", "hash-z")
+
+
+def test_login_result_codes(store):
+    store.create_user("a@b.com", "hash-a")
+
+    assert store.login("a@b.com", "wrong") == user_store.WRONG_PASSWORD
+    assert store.get_stats("a@b.com")['last_login'] is None
+    assert store.login("x@y.com", "hash-a") == user_store.NOT_FOUND
+    assert store.login("a@b.com", "hash-a") == user_store.LOGIN_OK
+    assert store.get_stats("a@b.com")['last_login'] is not None
+
+    # Rehash: only replaces the hash that was verified
+    assert store.login("a@b.com", "stale", new_hash="hash-b") == user_store.WRONG_PASSWORD
+    assert store.login("a@b.com", "hash-a", new_hash="hash-b") == user_store.LOGIN_OK
+    assert store.get_password_hash("a@b.com") == "hash-b"
+
+
+def test_email_lookups_use_the_unique_index(store):
+    plan = " ".join(store.query_plan(user_store.SQL_PASSWORD_HASH, ("a@b.com",)))
+    assert "USING INDEX" in plan or "USING COVERING INDEX" in plan
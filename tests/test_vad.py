@@ -0,0 +1,88 @@
+"""Endpointer: onset, adaptive trailing silence and transcript hints; evaluation on labelled fixtures"""
+import os
+
+import pytest
+
+import speech
+from fake_providers import evaluate_endpointer, load_endpoint_fixtures
+from vad import Endpointer
+
+FRAME = 0.02
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "endpoint")
+
+
+def frames_until_end(endpointer, speech_frames, pause_frames=0, more_speech_frames=0):
+    """Feed speech (optionally a pause and more speech), then silence; frames of silence until the end"""
+    for _ in range(speech_frames):
+        endpointer.update(True)
+    for _ in range(pause_frames):
+        assert not endpointer.update(False)
+    for _ in range(more_speech_frames):
+        endpointer.update(True)
+    for silent in range(1, 500):
+        if endpointer.update(False):
+            return silent
+    raise AssertionError("The utterance never ended")
+
+
+def started(frames=100):
+    endpointer = Endpointer(FRAME, trailing_silence=0.3, short_utterance=1.0, short_utterance_silence=0.5,
+                            pause_factor=1.3, max_trailing_silence=1.0, onset_seconds=0.06)
+    for _ in range(endpointer.onset_frames):
+        endpointer.onset(True)
+    assert endpointer.in_speech
+    return endpointer
+
+
+def test_onset_needs_continuous_speech():
+    endpointer = Endpointer(FRAME, onset_seconds=0.06)
+    assert [endpointer.onset(s) for s in (True, True, False, True, True)] == [False] * 5  # Clicks
+    assert endpointer.onset(True)
+    assert endpointer.speech_seconds == pytest.approx(0.06)
+
+
+def test_trailing_silence_after_a_long_utterance():
+    assert frames_until_end(started(), speech_frames=100) * FRAME == pytest.approx(0.3)
+
+
+def test_short_utterances_wait_longer():
+    assert frames_until_end(started(), speech_frames=10) * FRAME == pytest.approx(0.5)
+
+
+def test_mid_sentence_pauses_raise_the_trailing_silence():
+    silent = frames_until_end(started(), speech_frames=60, pause_frames=14, more_speech_frames=20)
+    assert silent * FRAME == pytest.approx(1.3 * 14 * FRAME, abs=FRAME)
+
+
+def test_trailing_silence_is_capped():
+    endpointer = started()
+    endpointer.pause_factor = 5.0
+    silent = frames_until_end(endpointer, speech_frames=60, pause_frames=14, more_speech_frames=20)
+    assert silent * FRAME == pytest.approx(1.0)
+
+
+def test_partial_transcript_ending_mid_phrase_holds_the_endpoint():
+    endpointer = started()
+    endpointer.hint("what's the weather in")
+    assert frames_until_end(endpointer, speech_frames=100) * FRAME == pytest.approx(1.0)
+    endpointer = started()
+    endpointer.hint("what's the weather in Paris")
+    assert frames_until_end(endpointer, speech_frames=100) * FRAME == pytest.approx(0.3)
+
+
+def test_fixed_rules_wait_the_pause_threshold():
+    endpointer = Endpointer.fixed(FRAME, 1.5)
+    assert endpointer.onset(True)
+    assert frames_until_end(endpointer, speech_frames=5) * FRAME == pytest.approx(1.5)
+
+
+def test_labelled_fixtures_end_soon_after_the_last_word():
+    fixtures = load_endpoint_fixtures(FIXTURES)
+    assert len(fixtures) == 4
+
+    delays, early = evaluate_endpointer(fixtures, lambda fs: Endpointer(
+        fs, trailing_silence=speech.ENDPOINT_SILENCE, max_trailing_silence=speech.MAX_ENDPOINT_SILENCE))
+
+    assert early == 0
+    assert max(delays) <= speech.MAX_ENDPOINT_SILENCE + 0.1
+    assert sorted(delays)[len(delays) // 2] < 0.6
@@ -0,0 +1,53 @@
+"""Warmup: tasks run in parallel, failures are reported per task, on_update sees each result"""
+import threading
+import time
+
+from warmup import Warmup
+
+
+def test_tasks_run_in_parallel_and_report_status_and_timings():
+    tasks = {name: (lambda: time.sleep(0.2)) for name in ('tts', 'audio', 'openai')}
+    warmup = Warmup(tasks).start()
+    assert not warmup.is_done() and warmup.status == {name: 'pending' for name in tasks}
+    assert warmup.wait(5)
+
+    assert warmup.status == {name: 'ready' for name in tasks}
+    assert all(warmup.is_ready(name) for name in tasks)
+    assert all(0.2 <= seconds < 0.5 for seconds in warmup.timings.values())  # Together, not 0.6 s in a row
+
+
+def test_failing_task_is_reported_without_blocking_the_others():
+    release = threading.Event()
+
+    def broken():
+        raise RuntimeError("ChatGPT not configured")
+
+    def slow():
+        release.wait(5)
+    warmup = Warmup({'openai': broken, 'tts': slow}).start()
+    deadline = time.monotonic() + 5
+    while warmup.status['openai'] == 'pending' and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert warmup.status['openai'] == 'failed: ChatGPT not configured'
+    assert not warmup.is_done() and warmup.status['tts'] == 'pending'
+    release.set()
+    assert warmup.wait(5)
+    assert warmup.is_ready('tts') and not warmup.is_ready('openai')
+
+
+def test_on_update_is_called_once_per_task():
+    updates = []
+
+    def on_update(name, status, seconds):
+        updates.append((name, status))
+        raise ValueError("a broken callback must not stop the warm-up")
+
+    def broken():
+        raise OSError("no microphone")
+    warmup = Warmup({'tts': lambda: None, 'audio': broken}, on_update=on_update).start()
+    assert warmup.wait(5)
+    assert sorted(updates) == [('audio', 'failed: no microphone'), ('tts', 'ready')]
+
+
+def test_no_tasks_is_done_at_once():
+    assert Warmup({}).start().wait(0)
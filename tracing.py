@@ -0,0 +1,384 @@
+"""
+Latency Tracing - Per-turn spans for listen, recognize, route, AI and speak
+Every assistant turn records timed spans; durations feed per-stage
+histograms (p50/p95/p99) and finished turns are appended to a local
+JSONL or SQLite file. Spans are no-ops when no turn is active.
+
+    with tracing.turn("simple"):
+        with tracing.span("listen"):
+            ...
+        tracing.annotate(provider="ChatGPT", cache="miss")
+
+    tracing.get_tracer().summary()  # {'listen': {'count': .., 'p50_ms': ..}, ...}
+"""
+import contextlib
+import contextvars
+import itertools
+import json
+import math
+import sqlite3
+import threading
+import time
+
+_current_turn = contextvars.ContextVar('current_turn', default=None)
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram (about 5% relative precision)
+    Constant memory no matter how many samples are recorded.
+    """
+    GROWTH = 1.1
+    MIN_SECONDS = 0.0001
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def _bucket(self, seconds):
+        if seconds <= self.MIN_SECONDS:
+            return 0
+        return int(math.log(seconds / self.MIN_SECONDS, self.GROWTH)) + 1
+
+    def _bucket_value(self, index):
+        if index == 0:
+            return self.MIN_SECONDS
+        # Geometric middle of the bucket
+        return self.MIN_SECONDS * self.GROWTH ** (index - 0.5)
+
+    def record(self, seconds):
+        index = self._bucket(seconds)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, p):
+        if not self.count:
+            return None
+        rank = p * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(max(self._bucket_value(index), self.min), self.max)
+        return self.max
+
+    def as_dict(self):
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * 1000, 1),
+            'p50_ms': round(self.percentile(0.50) * 1000, 1),
+            'p95_ms': round(self.percentile(0.95) * 1000, 1),
+            'p99_ms': round(self.percentile(0.99) * 1000, 1),
+            'max_ms': round(self.max * 1000, 1),
+        }
+
+
+class Span:
+    def __init__(self, name, start, attrs):
+        self.name = name
+        self.start = start
+        self.duration = None
+        self.attrs = dict(attrs)
+
+
+class Turn:
+    """One listen -> respond cycle"""
+
+    def __init__(self, turn_id, mode):
+        self.id = turn_id
+        self.mode = mode
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.spans = []
+        self.marks = {}  # name -> seconds since turn start
+        self.attrs = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def mark(self, name):
+        """Record the first time something happened in this turn"""
+        with self._lock:
+            self.marks.setdefault(name, time.perf_counter() - self.start)
+
+    def stage_totals(self):
+        """Total seconds per span name (a stage may run several times per turn)"""
+        totals = {}
+        with self._lock:
+            for span in self.spans:
+                if span.duration is not None:
+                    totals[span.name] = totals.get(span.name, 0.0) + span.duration
+        return totals
+
+    def as_dict(self):
+        with self._lock:
+            spans = [{
+                'name': s.name,
+                'start_ms': round((s.start - self.start) * 1000, 2),
+                'duration_ms': None if s.duration is None else round(s.duration * 1000, 2),
+                **({'attrs': s.attrs} if s.attrs else {}),
+            } for s in self.spans]
+        return {
+            'turn': self.id,
+            'mode': self.mode,
+            'started_at': self.started_at,
+            'duration_ms': None if self.duration is None else round(self.duration * 1000, 2),
+            'marks_ms': {k: round(v * 1000, 2) for k, v in self.marks.items()},
+            'attrs': self.attrs,
+            'spans': spans,
+        }
+
+
+# ===== EXPORTERS =====
+
+class JSONLExporter:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, turn):
+        line = json.dumps(turn.as_dict(), default=str)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+
+    def close(self):
+        pass
+
+
+class SQLiteExporter:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                mode TEXT, started_at REAL, duration_ms REAL, attrs TEXT, marks TEXT
+            );
+            CREATE TABLE IF NOT EXISTS spans (
+                turn_id INTEGER REFERENCES turns(id), name TEXT,
+                start_ms REAL, duration_ms REAL, attrs TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_spans_name ON spans(name);
+        """)
+
+    def export(self, turn):
+        data = turn.as_dict()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO turns (mode, started_at, duration_ms, attrs, marks) VALUES (?, ?, ?, ?, ?)",
+                (data['mode'], data['started_at'], data['duration_ms'],
+                 json.dumps(data['attrs'], default=str), json.dumps(data['marks_ms']))
+            )
+            self._conn.executemany(
+                "INSERT INTO spans (turn_id, name, start_ms, duration_ms, attrs) VALUES (?, ?, ?, ?, ?)",
+                [(cursor.lastrowid, s['name'], s['start_ms'], s['duration_ms'],
+                  json.dumps(s.get('attrs', {}), default=str)) for s in data['spans']]
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def make_exporter(path):
+    """JSONL for *.jsonl, SQLite for *.db / *.sqlite, nothing for None"""
+    if not path:
+        return None
+    if path.endswith(('.db', '.sqlite', '.sqlite3')):
+        return SQLiteExporter(path)
+    return JSONLExporter(path)
+
+
+# ===== TRACER =====
+
+class Tracer:
+    def __init__(self, exporter=None, keep_turns=100):
+        self.exporter = exporter
+        self.histograms = {}
+        self.recent = []
+        self.keep_turns = keep_turns
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def turn(self, mode, **attrs):
+        turn = Turn(next(self._ids), mode)
+        turn.attrs.update(attrs)
+        token = _current_turn.set(turn)
+        try:
+            yield turn
+        finally:
+            _current_turn.reset(token)
+            turn.duration = time.perf_counter() - turn.start
+            self.finish(turn)
+
+    def finish(self, turn):
+        with self._lock:
+            self._record('turn', turn.duration)
+            for name, seconds in turn.stage_totals().items():
+                self._record(name, seconds)
+            for name, seconds in turn.marks.items():
+                self._record(name, seconds)
+            self.recent.append(turn)
+            del self.recent[:-self.keep_turns]
+        if self.exporter:
+            try:
+                self.exporter.export(turn)
+            except Exception as e:
+                print(f"[WARN] Trace export failed: {e}")
+
+    def _record(self, name, seconds):
+        self.histograms.setdefault(name, LatencyHistogram()).record(seconds)
+
+    def record(self, name, seconds):
+        """Add a sample to a histogram directly (outside of any turn)"""
+        with self._lock:
+            self._record(name, seconds)
+
+    def summary(self):
+        """Per-stage latency percentiles"""
+        with self._lock:
+            return {name: h.as_dict() for name, h in self.histograms.items()}
+
+    def recent_turns(self, limit=None):
+        with self._lock:
+            turns = self.recent[-limit:] if limit else list(self.recent)
+        return [t.as_dict() for t in turns]
+
+    def close(self):
+        if self.exporter:
+            self.exporter.close()
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    return _tracer
+
+
+def configure(path=None):
+    """Replace the global tracer (path: .jsonl or .db file for finished turns, None = memory only)"""
+    global _tracer
+    _tracer.close()
+    _tracer = Tracer(make_exporter(path))
+    return _tracer
+
+
+def turn(mode, **attrs):
+    return _tracer.turn(mode, **attrs)
+
+
+def current_turn():
+    return _current_turn.get()
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """Time a stage of the current turn (no-op outside a turn)"""
+    turn = _current_turn.get()
+    if turn is None:
+        yield None
+        return
+    current = Span(name, time.perf_counter(), attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        _current_span.reset(token)
+        current.duration = time.perf_counter() - current.start
+        turn.add_span(current)
+
+
+def add_span(name, start, end=None, **attrs):
+    """Record a span measured by hand (start/end from time.perf_counter())"""
+    turn = _current_turn.get()
+    if turn is None:
+        return
+    current = Span(name, start, attrs)
+    current.duration = (end or time.perf_counter()) - start
+    turn.add_span(current)
+
+
+def annotate(**attrs):
+    """Attach attributes to the innermost span and to the current turn"""
+    turn = _current_turn.get()
+    if turn is None:
+        return
+    current = _current_span.get()
+    if current is not None:
+        current.attrs.update(attrs)
+    with turn._lock:
+        turn.attrs.update(attrs)
+
+
+def mark(name):
+    """Record when something first happened in the current turn (e.g. first audio)"""
+    turn = _current_turn.get()
+    if turn is not None:
+        turn.mark(name)
+
+
+# ===== OFFLINE ANALYSIS =====
+
+def load_turns(path):
+    """Read exported turns back as dicts (same shape as Turn.as_dict())"""
+    if path.endswith(('.db', '.sqlite', '.sqlite3')):
+        conn = sqlite3.connect(path)
+        try:
+            turns = {}
+            for turn_id, mode, started_at, duration_ms, attrs, marks in conn.execute(
+                    "SELECT id, mode, started_at, duration_ms, attrs, marks FROM turns ORDER BY id"):
+                turns[turn_id] = {
+                    'turn': turn_id, 'mode': mode, 'started_at': started_at,
+                    'duration_ms': duration_ms, 'marks_ms': json.loads(marks or '{}'),
+                    'attrs': json.loads(attrs or '{}'), 'spans': [],
+                }
+            for turn_id, name, start_ms, duration_ms, attrs in conn.execute(
+                    "SELECT turn_id, name, start_ms, duration_ms, attrs FROM spans"):
+                if turn_id in turns:
+                    turns[turn_id]['spans'].append({
+                        'name': name, 'start_ms': start_ms, 'duration_ms': duration_ms,
+                        'attrs': json.loads(attrs or '{}'),
+                    })
+            return list(turns.values())
+        finally:
+            conn.close()
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(turns, by=None):
+    """
+    Per-stage percentiles for exported turns
+    by='provider' (or any turn attribute) groups the summary by that value.
+    """
+    groups = {}
+    for data in turns:
+        key = data.get('attrs', {}).get(by, 'none') if by else None
+        histograms = groups.setdefault(key, {})
+        samples = {}
+        for s in data.get('spans', []):
+            if s.get('duration_ms') is not None:
+                samples[s['name']] = samples.get(s['name'], 0.0) + s['duration_ms']
+        samples.update(data.get('marks_ms', {}))
+        if data.get('duration_ms') is not None:
+            samples['turn'] = data['duration_ms']
+        for name, ms in samples.items():
+            histograms.setdefault(name, LatencyHistogram()).record(ms / 1000)
+    result = {key: {name: h.as_dict() for name, h in hs.items()} for key, hs in groups.items()}
+    return result if by else result.get(None, {})
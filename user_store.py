@@ -0,0 +1,261 @@
+"""
+User Store - Data-access layer for the user database
+A small pool of long-lived SQLite connections in WAL mode (readers never
+wait for the writer), statements reused from each connection's prepared
+statement cache, schema versioned with PRAGMA user_version, and a login
+that checks the password and records the login in a single UPDATE.
+
+    store = UserStore("assistant_users.db")
+    store.create_user("a@b.com", password_hash)
+    store.login("a@b.com", password_hash)  # LOGIN_OK / WRONG_PASSWORD / NOT_FOUND
+"""
+import contextlib
+import queue
+import sqlite3
+import threading
+
+DEFAULT_POOL_SIZE = 4
+BUSY_TIMEOUT_MS = 5000
+
+LOGIN_OK = "ok"
+WRONG_PASSWORD = "wrong_password"
+NOT_FOUND = "not_found"
+
+# (version, description, statements) - applied in order, each in its own transaction.
+# Lookups are all by email, served by the UNIQUE constraint's index; no other index is needed.
+MIGRATIONS = [
+    (1, "users table", [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_login TIMESTAMP
+        )
+        """,
+    ]),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Statements are module constants so every call reuses the connection's prepared statement
+SQL_INSERT_USER = "INSERT INTO users (email, password_hash) VALUES (?, ?)"
+SQL_LOGIN = "UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE email = ? AND password_hash = ?"
+SQL_LOGIN_REHASH = ("UPDATE users SET last_login = CURRENT_TIMESTAMP, password_hash = ? "
+                    "WHERE email = ? AND password_hash = ?")
+SQL_USER_EXISTS = "SELECT 1 FROM users WHERE email = ?"
+SQL_USER_STATS = "SELECT created_at, last_login FROM users WHERE email = ?"
+SQL_PASSWORD_HASH = "SELECT password_hash FROM users WHERE email = ?"
+SQL_COUNT_USERS = "SELECT COUNT(*) FROM users"
+SQL_EXPORT_USERS = "SELECT email, password_hash, created_at, last_login FROM users ORDER BY id"
+
+
+class ConnectionPool:
+    """
+    Fixed set of SQLite connections shared by all threads
+    Connections are opened lazily up to size and handed out one caller at a
+    time; autocommit mode, so single statements need no explicit commit.
+    close() closes the idle connections at once and the checked-out ones
+    when they are returned; connection() raises sqlite3.ProgrammingError
+    from then on.
+    """
+
+    def __init__(self, path, size=DEFAULT_POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()  # None marks a slot freed by a connection closed on return
+        self._opened = 0
+        self._in_use = set()
+        self._retired = set()  # Checked out when close() ran - closed on return
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None,
+                               check_same_thread=False, cached_statements=64)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")  # Durable at checkpoints; safe with WAL
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        return conn
+
+    def _acquire(self):
+        """A connection registered as checked out; raises once the pool is closed"""
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("The connection pool is closed")
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = None
+                    if self._opened < self.size:
+                        self._opened += 1
+                        try:
+                            conn = self._open()
+                        except Exception:
+                            self._opened -= 1
+                            raise
+                if conn is not None:
+                    self._in_use.add(conn)
+                    return conn
+            conn = self._idle.get()
+            with self._lock:
+                if self._closed:
+                    if conn is not None:
+                        conn.close()  # Taken off the queue while close() ran
+                    self._idle.put(None)  # Wake the next waiter so it raises too
+                    raise sqlite3.ProgrammingError("The connection pool is closed")
+                if conn is not None:
+                    self._in_use.add(conn)
+                    return conn
+
+    @contextlib.contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()  # The caller failed mid-transaction
+            with self._lock:
+                self._in_use.discard(conn)
+                retired = conn in self._retired
+                self._retired.discard(conn)
+            if retired:
+                conn.close()
+                self._idle.put(None)  # Wake a caller waiting for a connection
+            else:
+                self._idle.put(conn)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Connection with BEGIN ... COMMIT around the block (ROLLBACK on error)"""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def close(self):
+        with self._lock:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if conn is not None:
+                    conn.close()
+            # Closing a connection another thread is using is unsafe - close it on return
+            self._retired |= self._in_use
+            self._closed = True
+
+
+def migrate(conn):
+    """Bring the schema up to SCHEMA_VERSION; returns the versions applied"""
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-check under the write lock - another process may have migrated meanwhile
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                conn.rollback()
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        print(f"[DB] Migration {version}: {description}")
+        applied.append(version)
+    return applied
+
+
+class UserStore:
+    def __init__(self, path, pool_size=DEFAULT_POOL_SIZE):
+        self.path = path
+        self.pool = ConnectionPool(path, pool_size)
+        with self.pool.connection() as conn:
+            migrate(conn)
+
+    def close(self):
+        self.pool.close()
+
+    def create_user(self, email, password_hash):
+        """False if the email is already registered"""
+        with self.pool.connection() as conn:
+            try:
+                conn.execute(SQL_INSERT_USER, (email, password_hash))
+                return True
+            except sqlite3.IntegrityError:
+                return False
+
+    def login(self, email, password_hash, new_hash=None):
+        """
+        Check the password and stamp last_login in one statement
+        Only a failed login needs a second lookup (to tell why it failed).
+        new_hash replaces the stored hash in the same statement (rehash on login).
+        """
+        with self.pool.connection() as conn:
+            if new_hash is None:
+                updated = conn.execute(SQL_LOGIN, (email, password_hash)).rowcount
+            else:
+                updated = conn.execute(SQL_LOGIN_REHASH, (new_hash, email, password_hash)).rowcount
+            if updated:
+                return LOGIN_OK
+            if conn.execute(SQL_USER_EXISTS, (email,)).fetchone():
+                return WRONG_PASSWORD
+            return NOT_FOUND
+
+    def get_password_hash(self, email):
+        with self.pool.connection() as conn:
+            row = conn.execute(SQL_PASSWORD_HASH, (email,)).fetchone()
+            return row[0] if row else None
+
+    def get_stats(self, email):
+        with self.pool.connection() as conn:
+            row = conn.execute(SQL_USER_STATS, (email,)).fetchone()
+            if row is None:
+                return None
+            return {'created_at': row[0], 'last_login': row[1]}
+
+    def insert_users(self, users):
+        """
+        Insert (email, password_hash) pairs in one transaction
+        Returns [(index, error)] for the rows that were rejected (e.g. duplicates);
+        the rest are committed.
+        """
+        errors = []
+        with self.pool.transaction() as conn:
+            for index, user in enumerate(users):
+                try:
+                    conn.execute(SQL_INSERT_USER, user)
+                except sqlite3.IntegrityError as e:
+                    errors.append((index, "already exists" if "UNIQUE" in str(e) else str(e)))
+        return errors
+
+    def iter_users(self, batch_size=1000):
+        """Stream (email, password_hash, created_at, last_login) rows in id order"""
+        with self.pool.connection() as conn:
+            cursor = conn.execute(SQL_EXPORT_USERS)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+
+    def count_users(self):
+        with self.pool.connection() as conn:
+            return conn.execute(SQL_COUNT_USERS).fetchone()[0]
+
+    def query_plan(self, sql, params=()):
+        """EXPLAIN QUERY PLAN details (e.g. to check a lookup uses an index)"""
+        with self.pool.connection() as conn:
+            return [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
@@ -0,0 +1,139 @@
+"""
+Voice Activity Detection - Decide when the user has finished speaking
+Frames are classified as speech/non-speech (energy against the tracked
+noise floor, or webrtcvad when installed) and the Endpointer closes the
+utterance after a short trailing silence. The silence it waits for adapts:
+longer after only a word or two, and longer for speakers who pause a lot
+mid-sentence - so commands end ~300 ms after the last word without cutting
+"what's the weather... in Paris" in half. Streaming recognizers can also
+hold the endpoint while the partial transcript ends mid-phrase ("... in the").
+"""
+import re
+
+# A partial transcript ending in one of these is probably not finished
+HOLD_WORDS = {
+    'a', 'an', 'the', 'and', 'or', 'but', 'to', 'of', 'in', 'on', 'at', 'for',
+    'with', 'about', 'from', 'is', 'are', 'my', 'your', 'what', "what's",
+    'how', 'um', 'uh', 'like',
+}
+
+
+class EnergyClassifier:
+    """Speech = frame energy above the noise-floor threshold"""
+    name = "energy"
+
+    def is_speech(self, frame, energy, threshold):
+        return energy > threshold
+
+
+class WebRTCClassifier:
+    """
+    webrtcvad (GMM classifier) - more robust to steady noise such as fans
+    Frames are checked in 30 ms slices; any speech slice makes the frame speech.
+    """
+    name = "webrtc"
+
+    def __init__(self, sample_rate, aggressiveness=2):
+        import webrtcvad
+        if sample_rate not in (8000, 16000, 32000, 48000):
+            raise ValueError(f"webrtcvad does not support {sample_rate} Hz")
+        self._vad = webrtcvad.Vad(aggressiveness)
+        self.sample_rate = sample_rate
+        self._slice = int(sample_rate * 0.03) * 2  # bytes of 16-bit audio
+
+    def is_speech(self, frame, energy, threshold):
+        for start in range(0, len(frame) - self._slice + 1, self._slice):
+            if self._vad.is_speech(frame[start:start + self._slice], self.sample_rate):
+                return True
+        return False
+
+
+def create_classifier(name="energy", sample_rate=16000):
+    if name == "webrtc":
+        try:
+            return WebRTCClassifier(sample_rate)
+        except ImportError:
+            print("[WARN] webrtcvad not installed - using energy VAD")
+            print("[WARN] Install: pip install webrtcvad")
+    return EnergyClassifier()
+
+
+class Endpointer:
+    """
+    Utterance start/end detection over a stream of classified frames
+    onset_seconds of continuous speech start an utterance (ignores clicks).
+    The utterance ends after trailing_silence of non-speech, raised to
+    short_utterance_silence while less than short_utterance seconds have been
+    spoken, and to pause_factor x the longest pause seen so far (capped at
+    max_trailing_silence). hint() holds it at max_trailing_silence.
+    """
+
+    def __init__(self, frame_seconds, classifier=None, trailing_silence=0.3,
+                 short_utterance=1.0, short_utterance_silence=0.5,
+                 pause_factor=1.3, max_trailing_silence=1.0, onset_seconds=0.06):
+        self.frame_seconds = frame_seconds
+        self.classifier = classifier or EnergyClassifier()
+        self.trailing_silence = trailing_silence
+        self.short_utterance = short_utterance
+        self.short_utterance_silence = short_utterance_silence
+        self.pause_factor = pause_factor
+        self.max_trailing_silence = max_trailing_silence
+        self.onset_frames = max(1, round(onset_seconds / frame_seconds))
+        self.reset()
+
+    @classmethod
+    def fixed(cls, frame_seconds, pause_threshold, classifier=None):
+        """The old behaviour: a constant pause ends the phrase"""
+        return cls(frame_seconds, classifier, trailing_silence=pause_threshold,
+                   short_utterance=0.0, pause_factor=0.0,
+                   max_trailing_silence=pause_threshold, onset_seconds=0.0)
+
+    def reset(self):
+        self.in_speech = False
+        self.speech_seconds = 0.0
+        self.silence_seconds = 0.0
+        self.longest_pause = 0.0
+        self.holding = False
+        self._run = 0
+
+    def is_speech(self, frame, energy, threshold):
+        return self.classifier.is_speech(frame, energy, threshold)
+
+    @property
+    def required_silence(self):
+        """Trailing silence that currently ends the utterance"""
+        required = self.trailing_silence
+        if self.speech_seconds < self.short_utterance:
+            required = max(required, self.short_utterance_silence)
+        required = max(required, self.pause_factor * self.longest_pause)
+        if self.holding:
+            required = self.max_trailing_silence
+        return min(required, max(self.max_trailing_silence, self.trailing_silence))
+
+    def hint(self, partial):
+        """Partial transcript from a streaming recognizer - hold while it ends mid-phrase"""
+        words = re.findall(r"[a-z']+", (partial or "").lower())
+        self.holding = bool(words) and words[-1] in HOLD_WORDS
+
+    def onset(self, speech):
+        """Feed a frame before the utterance; True once speech has started"""
+        self._run = self._run + 1 if speech else 0
+        if self._run >= self.onset_frames:
+            self.in_speech = True
+            self.speech_seconds = self._run * self.frame_seconds
+            return True
+        return False
+
+    def update(self, speech):
+        """Feed a frame inside the utterance; True when the utterance has ended"""
+        if speech:
+            if self.silence_seconds:
+                self.longest_pause = max(self.longest_pause, self.silence_seconds)
+            self.silence_seconds = 0.0
+            self.speech_seconds += self.frame_seconds
+            return False
+        self.silence_seconds += self.frame_seconds
+        if self.silence_seconds >= self.required_silence - 1e-9:
+            self.in_speech = False
+            return True
+        return False
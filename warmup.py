@@ -0,0 +1,106 @@
+"""
+Warm-up - Initialize every subsystem in parallel before the user needs it
+Started when the dashboard opens: TTS engine, microphone capture and both
+AI clients (with a first request so an HTTP keep-alive connection is open)
+come up concurrently in the background and report readiness as they finish.
+"""
+import threading
+import time
+
+
+def _warm_tts():
+    import assistant_core
+    import speech
+    speech.init_engine().wait_ready()
+    # Fixed prompts are rendered in the background; they play from disk from then on
+    speech.prerender(assistant_core.PRERENDER_PHRASES)
+
+
+def _warm_audio():
+    import speech
+    speech.get_capture_session()
+    speech.get_recognizer().load()
+
+
+def _warm_openai():
+    import assistant_core
+    client = assistant_core.init_openai()
+    if client is None:
+        raise RuntimeError("ChatGPT not configured")
+    # A cheap request opens the TLS connection that later questions reuse
+    client.models.retrieve(assistant_core.OPENAI_MODEL)
+
+
+def _warm_gemini():
+    import assistant_core
+    client = assistant_core.init_gemini()
+    if client is None:
+        raise RuntimeError("Gemini not configured")
+    client.models.get(model=assistant_core.GEMINI_MODEL)
+
+
+# name -> warm-up function (all run at the same time)
+DEFAULT_TASKS = {
+    'tts': _warm_tts,
+    'audio': _warm_audio,
+    'openai': _warm_openai,
+    'gemini': _warm_gemini,
+}
+
+
+class Warmup:
+    """
+    Run warm-up tasks concurrently
+    on_update(name, status, seconds) is called from the worker threads with
+    status 'ready' or 'failed: <reason>' - GUI callers must marshal it to
+    their own thread (e.g. Tk after()).
+    """
+
+    def __init__(self, tasks=None, on_update=None):
+        self.tasks = dict(DEFAULT_TASKS if tasks is None else tasks)
+        self.on_update = on_update
+        self.status = {name: 'pending' for name in self.tasks}
+        self.timings = {}  # name -> seconds from warm-up start
+        self.started_at = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._remaining = len(self.tasks)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        if not self.tasks:
+            self._done.set()
+        for name, fn in self.tasks.items():
+            threading.Thread(target=self._run, args=(name, fn), name=f"warmup-{name}", daemon=True).start()
+        return self
+
+    def _run(self, name, fn):
+        try:
+            fn()
+            status = 'ready'
+        except Exception as e:
+            status = f'failed: {e}'
+        elapsed = time.perf_counter() - self.started_at
+        with self._lock:
+            self.status[name] = status
+            self.timings[name] = elapsed
+            self._remaining -= 1
+            finished = self._remaining == 0
+        print(f"[WARMUP] {name} {status} after {elapsed * 1000:.0f} ms")
+        if self.on_update:
+            try:
+                self.on_update(name, status, elapsed)
+            except Exception as e:
+                print(f"[WARN] Warm-up callback failed: {e}")
+        if finished:
+            print(f"[WARMUP] All subsystems done in {max(self.timings.values()) * 1000:.0f} ms")
+            self._done.set()
+
+    def is_done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def is_ready(self, name):
+        return self.status.get(name) == 'ready'